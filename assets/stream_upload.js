@@ -0,0 +1,81 @@
+// Chunked upload of large input files (see utils/core/streaming_upload.py).
+// The file is sent in pieces to /upload/stream; once parsed on the server,
+// the page is reopened with ?upload=<id> and the table is loaded into the
+// 'stored-data' store for the Submit button.
+document.addEventListener("click", function (event) {
+    const trigger = event.target.closest("#stream-upload-trigger");
+    if (!trigger) {
+        return;
+    }
+    event.preventDefault();
+
+    const input = document.createElement("input");
+    input.type = "file";
+    input.accept = ".txt,.tsv,.annotations,.npz,.parquet,.gz,.bz2,.xz,.zip";
+    input.addEventListener("change", function () {
+        if (input.files.length) {
+            streamUpload(input.files[0]);
+        }
+    });
+    input.click();
+});
+
+function setStreamUploadStatus(text) {
+    const status = document.getElementById("stream-upload-status");
+    if (status) {
+        status.textContent = text;
+    }
+}
+
+async function streamUpload(file) {
+    try {
+        let response = await fetch("/upload/stream", {
+            method: "POST",
+            headers: { "Content-Type": "application/json" },
+            body: JSON.stringify({ filename: file.name }),
+        });
+        let result = await response.json();
+        if (!response.ok) {
+            throw new Error(result.error);
+        }
+        const uploadId = result.upload_id;
+        const chunkSize = result.chunk_size;
+
+        let offset = 0;
+        let retries = 0;
+        while (offset < file.size) {
+            setStreamUploadStatus(`Uploading ${file.name}: ${Math.floor((100 * offset) / file.size)}%`);
+            try {
+                response = await fetch(`/upload/stream/${uploadId}`, {
+                    method: "PUT",
+                    headers: { "Upload-Offset": String(offset) },
+                    body: file.slice(offset, offset + chunkSize),
+                });
+                result = await response.json();
+            } catch (error) {
+                // Network error: resume from the offset known to the server
+                if (++retries > 5) {
+                    throw error;
+                }
+                response = await fetch(`/upload/stream/${uploadId}`);
+                result = await response.json();
+                offset = result.received;
+                continue;
+            }
+            if (!response.ok && response.status !== 409) {
+                throw new Error(result.error);
+            }
+            offset = result.received;
+        }
+
+        setStreamUploadStatus(`Validating ${file.name}...`);
+        response = await fetch(`/upload/stream/${uploadId}/complete`, { method: "POST" });
+        result = await response.json();
+        if (!response.ok) {
+            throw new Error(result.error);
+        }
+        window.location.search = `?upload=${uploadId}`;
+    } catch (error) {
+        setStreamUploadStatus(`Upload failed: ${error.message}`);
+    }
+}
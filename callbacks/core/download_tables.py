@@ -31,10 +31,10 @@ License:
 
 from dash import callback, Input, Output, State, dcc
 from dash.exceptions import PreventUpdate
-import pandas as pd
 import dash_bootstrap_components as dbc
 
 from utils.core.data_processing import merge_input_with_database, merge_input_with_database_hadegDB, merge_with_toxcsm
+from utils.core.upload_handlers import load_input_data
 
 
 @callback(
@@ -50,7 +50,8 @@ def download_merged_csv(n_clicks, user_data):
 
     Parameters:
         n_clicks (int): Number of clicks on the download button.
-        user_data (list[dict]): User data stored in the Dash Store component.
+        user_data (list[dict] or dict): User data stored in the Dash Store component
+            (records, or the session-store handle of a chunked or multi-file upload).
 
     Returns:
         dash.dcc.Download: Object that triggers a CSV file download with the merged data.
@@ -69,7 +70,7 @@ def download_merged_csv(n_clicks, user_data):
     if not user_data:
         raise PreventUpdate
 
-    df_input = pd.DataFrame(user_data)
+    df_input = load_input_data(user_data)
     merged_df = merge_input_with_database(df_input)
 
     return dcc.send_data_frame(
@@ -91,7 +92,8 @@ def download_hadeg_csv(n_clicks, user_data):
 
     Parameters:
         n_clicks (int): Number of clicks on the download button.
-        user_data (list[dict]): User data stored in the Dash Store component.
+        user_data (list[dict] or dict): User data stored in the Dash Store component
+            (records, or the session-store handle of a chunked or multi-file upload).
 
     Returns:
         dash.dcc.Download: Object that triggers a CSV file download with the HADEG-merged data.
@@ -110,7 +112,7 @@ def download_hadeg_csv(n_clicks, user_data):
     if not user_data:
         raise PreventUpdate
 
-    df_input = pd.DataFrame(user_data)
+    df_input = load_input_data(user_data)
     hadeg_merged_df = merge_input_with_database_hadegDB(df_input)
 
     return dcc.send_data_frame(
@@ -133,7 +135,8 @@ def download_toxcsm_csv(n_clicks, user_data):
 
     Parameters:
         n_clicks (int): Number of clicks on the download button.
-        user_data (list[dict]): User data stored in the Dash Store component.
+        user_data (list[dict] or dict): User data stored in the Dash Store component
+            (records, or the session-store handle of a chunked or multi-file upload).
 
     Returns:
         dash.dcc.Download: Object that triggers a CSV file download with the ToxCSM-merged data.
@@ -152,7 +155,7 @@ def download_toxcsm_csv(n_clicks, user_data):
     if not user_data:
         raise PreventUpdate
 
-    df_input = pd.DataFrame(user_data)
+    df_input = load_input_data(user_data)
     main_merged = merge_input_with_database(df_input)
     final_merged = merge_with_toxcsm(main_merged)
 
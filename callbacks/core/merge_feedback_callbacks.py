@@ -1,26 +1,27 @@
 # callbacks/core/merge_feedback_callbacks.py
 
-import time
 import logging
-import pandas as pd
 import dash_bootstrap_components as dbc
 from dash import callback_context, html
 from dash.exceptions import PreventUpdate
 from dash.dependencies import Input, Output, State
 
 from app import app
-from utils.core.data_processing import (
-    merge_input_with_database,
-    merge_input_with_database_hadegDB,
-    merge_with_toxcsm,
-    merge_with_kegg
-)
+from utils.core.aggregate_bundle import AGGREGATE_SPECS, get_aggregate_bundle
 from utils.core.feedback_alerts import create_alert
+from utils.core.merge_scheduler import run_reference_merges
+from utils.core.reference_specs import get_reference_spec, merge_plan
+from utils.core.session_store import discard_session, is_store_handle, new_session_token
+from utils.core.store_codec import encode_store_data
+from utils.core.upload_handlers import load_input_data
 
 # Setup logging
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
+# Merges whose results are kept in dedicated stores
+MERGE_STORES = ['biorempp', 'kegg', 'hadeg', 'toxcsm']
+
 
 @app.callback(  
     [  
@@ -34,93 +35,69 @@ logging.basicConfig(level=logging.INFO)
         Output('toxcsm-merged-data', 'data')  
     ],  
     [Input('process-data', 'n_clicks')],  
-    [State('stored-data', 'data')],  
+    [State('stored-data', 'data'),  
+     State('biorempp-merged-data', 'data')],  
     prevent_initial_call=True  
 )  
-def handle_merge_and_feedback(n_clicks, stored_data):  
+def handle_merge_and_feedback(n_clicks, stored_data, previous_handle=None):  
     """  
-    Handles the sequential merging of input data with multiple databases,  
-    measuring execution time and storing results in dedicated stores.  
+    Handles the merging of input data with multiple databases, running  
+    independent merges concurrently, measuring wall and CPU time per merge  
+    and storing results in the server-side session store. The dedicated  
+    dcc.Stores only receive small handles to the stored tables (or compact  
+    columnar payloads when the tables are sent inline).  
     """  
     if n_clicks is None or not stored_data:  
         raise PreventUpdate  
   
-    input_df = pd.DataFrame(stored_data)  
+    input_df = load_input_data(stored_data)  
     merge_times = {}  
+    cpu_times = {}  
     errors = []  
-      
-    # Inicializar variáveis para armazenar dados processados  
-    merged_biorempp_data = None  
-    merged_kegg_data = None  
-    merged_hadeg_data = None  
-    merged_toxcsm_data = None  
-  
-    # MERGE 1: BioRemPP  
-    try:  
-        logger.info("Starting merge with BioRemPP...")  
-        start = time.time()  
-        merged_biorempp = merge_input_with_database(input_df.copy())  
-        merge_times['BioRemPP'] = round(time.time() - start, 2)  
-        logger.info("BioRemPP merge completed in %.2fs", merge_times['BioRemPP'])  
-        # ARMAZENAR DADOS PROCESSADOS  
-        merged_biorempp_data = merged_biorempp.to_dict('records') if merged_biorempp is not None else None  
-    except Exception as e:  
-        error_msg = f"BioRemPP merge failed: {str(e)}"  
-        logger.error(error_msg)  
-        errors.append(error_msg)  
-        merged_biorempp = None  
   
-    # MERGE 2: KEGG (requires BioRemPP merge)  
-    if merged_biorempp is not None:  
-        try:  
-            logger.info("Starting merge with KEGG...")  
-            start = time.time()  
-            merged_kegg = merge_with_kegg(merged_biorempp.copy())  
-            merge_times['KEGG'] = round(time.time() - start, 2)  
-            logger.info("KEGG merge completed in %.2fs", merge_times['KEGG'])  
-            # ARMAZENAR DADOS PROCESSADOS  
-            merged_kegg_data = merged_kegg.to_dict('records') if merged_kegg is not None else None  
-        except Exception as e:  
-            error_msg = f"KEGG merge failed: {str(e)}"  
-            logger.error(error_msg)  
-            errors.append(error_msg)  
-    else:  
-        msg = "KEGG merge skipped due to BioRemPP merge failure."  
-        logger.warning(msg)  
-        errors.append(msg)  
+    # Run the merges as a DAG: HADEG only needs the input, KEGG and ToxCSM  
+    # only need BioRemPP, so independent merges run concurrently  
+    outcome = run_reference_merges(input_df, MERGE_STORES)  
   
-    # MERGE 3: HADEG  
-    try:  
-        logger.info("Starting merge with HADEG...")  
-        start = time.time()  
-        merged_hadeg = merge_input_with_database_hadegDB(input_df.copy())  
-        merge_times['HADEG'] = round(time.time() - start, 2)  
-        logger.info("HADEG merge completed in %.2fs", merge_times['HADEG'])  
-        # ARMAZENAR DADOS PROCESSADOS  
-        merged_hadeg_data = merged_hadeg.to_dict('records') if merged_hadeg is not None else None  
-    except Exception as e:  
-        error_msg = f"HADEG merge failed: {str(e)}"  
-        logger.error(error_msg)  
-        errors.append(error_msg)  
+    # A new Submit replaces the tables of the previous one  
+    if is_store_handle(previous_handle):  
+        discard_session(previous_handle['session'])  
+    session = new_session_token()  
   
-    # MERGE 4: ToxCSM (requires BioRemPP merge)  
-    if merged_biorempp is not None:  
-        try:  
-            logger.info("Starting merge with ToxCSM...")  
-            start = time.time()  
-            merged_toxcsm = merge_with_toxcsm(merged_biorempp.copy())  
-            merge_times['ToxCSM'] = round(time.time() - start, 2)  
-            logger.info("ToxCSM merge completed in %.2fs", merge_times['ToxCSM'])  
-            # ARMAZENAR DADOS PROCESSADOS  
-            merged_toxcsm_data = merged_toxcsm.to_dict('records') if merged_toxcsm is not None else None  
-        except Exception as e:  
-            error_msg = f"ToxCSM merge failed: {str(e)}"  
+    merged_data = {}  
+    for spec in merge_plan(MERGE_STORES):  
+        label = spec.label  
+        if spec.name in outcome.results:  
+            merge_times[label] = round(outcome.wall_times[spec.name], 2)  
+            cpu_times[label] = round(outcome.cpu_times[spec.name], 2)  
+            logger.info("%s merge completed in %.2fs (CPU %.2fs)", label, merge_times[label], cpu_times[label])  
+            # ARMAZENAR DADOS PROCESSADOS (handle or compact payload; empty results stay empty lists)  
+            merged_df = outcome.results[spec.name]  
+            merged_data[spec.name] = encode_store_data(merged_df, session, spec.name) if not merged_df.empty else []  
+            # Compute the aggregates used by the analysis callbacks once, now  
+            if spec.name in AGGREGATE_SPECS and merged_data[spec.name]:  
+                try:  
+                    get_aggregate_bundle(merged_data[spec.name], spec.name)  
+                except Exception as e:  
+                    logger.warning("%s aggregates not precomputed: %s", label, e)  
+        elif spec.name in outcome.errors:  
+            error_msg = f"{label} merge failed: {str(outcome.errors[spec.name])}"  
             logger.error(error_msg)  
             errors.append(error_msg)  
-    else:  
-        msg = "ToxCSM merge skipped due to BioRemPP merge failure."  
-        logger.warning(msg)  
-        errors.append(msg)  
+        elif spec.name in outcome.skipped:  
+            msg = f"{label} merge skipped due to {get_reference_spec(outcome.skipped[spec.name]).label} merge failure."  
+            logger.warning(msg)  
+            errors.append(msg)  
+  
+    merged_biorempp_data = merged_data.get('biorempp')  
+    merged_kegg_data = merged_data.get('kegg')  
+    merged_hadeg_data = merged_data.get('hadeg')  
+    merged_toxcsm_data = merged_data.get('toxcsm')  
+    merge_status = {  
+        'merge_times': merge_times,  
+        'cpu_times': cpu_times,  
+        'total_time': round(outcome.total_time, 2)  
+    }  
   
     # UI Feedback (mesmo código existente)  
     if errors:  
@@ -129,7 +106,7 @@ def handle_merge_and_feedback(n_clicks, stored_data):
             html.Ul([html.Li(err) for err in errors])  
         ], color='danger')  
         return (  
-            {'status': 'failed', 'merge_times': merge_times},   
+            {'status': 'failed', **merge_status},   
             'initial',   
             alert,  
             merged_biorempp_data,  
@@ -161,7 +138,7 @@ def handle_merge_and_feedback(n_clicks, stored_data):
       
     # RETORNAR TODOS OS DADOS PROCESSADOS  
     return (  
-        {'status': 'done', 'merge_times': merge_times},   
+        {'status': 'done', **merge_status},   
         'processed',   
         alert,  
         merged_biorempp_data,  
@@ -4,6 +4,7 @@ from dash import html, dcc, callback, callback_context, dash_table  # Core Dash
 from dash.dependencies import Input, Output, State  # Input, Output, and State dependencies for callbacks
 from dash.exceptions import PreventUpdate  # To prevent unnecessary updates
 from utils.core.table_utils import create_table_from_dataframe  # Utility function for table creation
+from utils.core.upload_handlers import load_input_data  # Input table of the 'stored-data' store
 
 def update_table(stored_data):
     """
@@ -18,7 +19,7 @@ def update_table(stored_data):
     if stored_data is None:
         return html.Div('Nenhum dado para exibir.')  # No data message
 
-    df = pd.DataFrame(stored_data)
+    df = load_input_data(stored_data)
     table = create_table_from_dataframe(df, 'data-upload-table')  # Creates a Dash table
     return html.Div(table)
 
@@ -57,7 +58,7 @@ def update_ko_count_table(n_clicks, stored_data):
     if stored_data is None:
         return html.Div('Nenhum dado para exibir.')  # No data message
 
-    input_df = pd.DataFrame(stored_data)
+    input_df = load_input_data(stored_data)
     merged_df = merge_input_with_database(input_df)  # Merge input with database
     table = dash_table.DataTable(
         data=merged_df.to_dict('records'),
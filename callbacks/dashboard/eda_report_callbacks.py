@@ -1,9 +1,9 @@
-import pandas as pd
 import io
 from dash import callback, Output, Input, State, dcc, html
 from dash.exceptions import PreventUpdate
 from ydata_profiling import ProfileReport
 from utils.core.data_processing import merge_input_with_database
+from utils.core.upload_handlers import load_input_data
 import dash
 
 
@@ -18,7 +18,7 @@ def generate_eda_report(n_clicks, stored_data):
         raise PreventUpdate
 
     try:
-        df_input = pd.DataFrame(stored_data)
+        df_input = load_input_data(stored_data)
         df_merged = merge_input_with_database(df_input)
         profile = ProfileReport(df_merged, minimal=True, explorative=True)
         html_str = profile.to_html()
@@ -15,7 +15,10 @@ def handle_progress(contents, n_clicks_example, n_clicks_submit, n_intervals, me
 
     if triggered_id == 'progress-interval':
         if merge_status and merge_status.get('status') == 'done':
-            total_time = sum(merge_status.get('merge_times', {}).values())
+            # Merges run concurrently: prefer the measured end-to-end time
+            total_time = merge_status.get('total_time')
+            if total_time is None:
+                total_time = sum(merge_status.get('merge_times', {}).values())
             total_time = max(total_time, 1.0)  # mínimo 1s
             step = 100 / (total_time * 2)  # Simula duas atualizações por segundo
 
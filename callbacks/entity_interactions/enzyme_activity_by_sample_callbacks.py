@@ -19,9 +19,9 @@ Callbacks:
 from dash import callback, html, dcc  # Dash components for UI and callbacks
 from dash.dependencies import Input, Output, State  # Input/Output/State for callback handling
 from dash.exceptions import PreventUpdate  # Exception to stop unnecessary updates
-import pandas as pd  # Data manipulation
 
 from app import app  # Dash app instance
+from utils.core.store_codec import decode_store_data
 
 # Modular imports via public API exposed by utils
 from utils.entity_interactions import (
@@ -53,7 +53,7 @@ def initialize_sample_dropdown(biorempp_data):
         return [], None  
   
     # Convert stored processed data into a DataFrame (dados já processados)  
-    merged_df = pd.DataFrame(biorempp_data)  
+    merged_df = decode_store_data(biorempp_data)  
   
     # Retrieve unique sample names and prepare dropdown options  
     samples = sorted(merged_df['sample'].unique())  
@@ -90,7 +90,7 @@ def update_enzyme_activity_chart(selected_sample, biorempp_data):
         )  
   
     # Convert stored processed data into a DataFrame (dados já processados)  
-    merged_df = pd.DataFrame(biorempp_data)  
+    merged_df = decode_store_data(biorempp_data)  
   
     # Count unique enzyme activities for the selected sample  
     enzyme_count_df = count_unique_enzyme_activities(merged_df, selected_sample)  
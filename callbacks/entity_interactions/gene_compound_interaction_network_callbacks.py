@@ -6,12 +6,12 @@ Callback para atualização da visualização da Rede Gene-Compound na aplicaç
 
 from dash import callback, Output, Input
 from app import app
+from utils.core.store_codec import decode_store_data
 
 # Importa apenas a função de interface do módulo de plot
 from utils.entity_interactions.gene_compound_interaction_network_plot import generate_gene_compound_network
 
 import plotly.graph_objects as go
-import pandas as pd
 
 @app.callback(
     Output("gene-compound-network-graph", "figure"),
@@ -41,7 +41,7 @@ def update_gene_compound_network(biorempp_data):
         )
 
     # Monta DataFrame e garante colunas obrigatórias
-    merged_df = pd.DataFrame(biorempp_data)
+    merged_df = decode_store_data(biorempp_data)
     if not {'genesymbol', 'compoundname'}.issubset(merged_df.columns):
         return go.Figure(
             layout=go.Layout(
@@ -21,11 +21,10 @@ from dash import html, dcc
 from dash.dependencies import Input, Output, State
 from dash.exceptions import PreventUpdate
 
-# Pandas for data manipulation
-import pandas as pd
-
 # App instance
 from app import app
+from utils.core.aggregate_bundle import get_aggregate
+from utils.core.store_codec import decode_store_data
 
 # Core data utilities
 from utils.core.data_processing import merge_with_kegg
@@ -36,7 +35,6 @@ from utils.gene_pathway_analysis.distribution_of_ko_in_pathways_plot import (
     plot_sample_ko_counts
 )
 from utils.gene_pathway_analysis.distribution_of_ko_in_pathways_processing import (
-    count_ko_per_pathway,
     count_ko_per_sample_for_pathway
 )
 
@@ -64,7 +62,7 @@ def initialize_pathway_sample_dropdown(kegg_data):
         return [], None  
   
     # Convert stored processed data into a DataFrame (dados já processados)  
-    merged_df = pd.DataFrame(kegg_data)  
+    merged_df = decode_store_data(kegg_data)  
     samples = sorted(merged_df['sample'].unique())  # Get unique sample names  
   
     dropdown_options = [{'label': sample, 'value': sample} for sample in samples]  
@@ -106,17 +104,8 @@ def update_pathway_ko_chart(selected_sample, kegg_data):
             style={"textAlign": "center", "color": "gray"}  
         )  
   
-    # Convert stored processed data into a DataFrame (dados já processados)  
-    merged_df = pd.DataFrame(kegg_data)  
-  
-    if merged_df.empty:  
-        return html.P(  
-            "The processed data is empty. Please check the input data",   
-            id="empty-data-message",   
-            style={"textAlign": "center", "color": "gray"}  
-        )  
-  
-    pathway_count_df = count_ko_per_pathway(merged_df)  
+    # KO counts per sample and pathway, precomputed once after the merge  
+    pathway_count_df = get_aggregate(kegg_data, 'kegg', 'ko_per_pathway')  
   
     if pathway_count_df.empty or selected_sample not in pathway_count_df['sample'].unique():  
         return html.P(  
@@ -154,7 +143,7 @@ def initialize_via_dropdown(kegg_data):
         return [], None  
   
     # Convert stored processed data into a DataFrame (dados já processados)  
-    merged_df = pd.DataFrame(kegg_data)  
+    merged_df = decode_store_data(kegg_data)  
     pathways = sorted(merged_df['pathname'].unique())  # Get unique pathways  
   
     dropdown_options = [{'label': pathway, 'value': pathway} for pathway in pathways]  
@@ -193,7 +182,7 @@ def update_via_ko_chart(selected_via, kegg_data):
         )  
   
     # Convert stored processed data into a DataFrame (dados já processados)  
-    merged_df = pd.DataFrame(kegg_data)  
+    merged_df = decode_store_data(kegg_data)  
   
     if merged_df.empty:  
         return html.P(  
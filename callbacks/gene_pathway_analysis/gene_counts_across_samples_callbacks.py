@@ -25,18 +25,16 @@ from dash import callback, dash_table, html
 from dash.dependencies import Input, Output, State
 from dash.exceptions import PreventUpdate
 
-# Base libraries
-import pandas as pd
-
 # App instance
 from app import app
+from utils.core.aggregate_bundle import get_aggregate
 
 # Core processing
 from utils.core.data_processing import merge_input_with_database
+from utils.core.upload_handlers import load_input_data
 
 # Gene Pathway Analysis – Data processing
 from utils.gene_pathway_analysis.gene_counts_across_samples_processing import (
-    process_ko_data,
     process_ko_data_violin,
 )
 
@@ -70,9 +68,8 @@ def update_ko_count_chart(range_slider_values, biorempp_data):
     if not biorempp_data:  
         raise PreventUpdate  
   
-    # Convert stored processed data into a DataFrame (dados já processados)  
-    merged_df = pd.DataFrame(biorempp_data)  
-    ko_count_df = process_ko_data(merged_df)  # Process KO data  
+    # KO counts per sample, precomputed once after the merge  
+    ko_count_df = get_aggregate(biorempp_data, 'biorempp', 'ko_count')  
   
     # Filter KO counts based on RangeSlider values  
     min_value, max_value = range_slider_values  
@@ -105,9 +102,8 @@ def update_range_slider_values(biorempp_data):
     if not biorempp_data:  
         raise PreventUpdate  
   
-    # Convert stored processed data into a DataFrame (dados já processados)  
-    merged_df = pd.DataFrame(biorempp_data)  
-    ko_count_df = process_ko_data(merged_df)  # Process KO data  
+    # KO counts per sample, precomputed once after the merge  
+    ko_count_df = get_aggregate(biorempp_data, 'biorempp', 'ko_count')  
   
     max_ko_count = ko_count_df['ko_count'].max()  # Determine max KO count  
     marks = {i: str(i) for i in range(0, max_ko_count + 1, max(1, max_ko_count // 10))}  # Generate tick marks  
@@ -149,8 +145,9 @@ def update_ko_violin_boxplot_chart(n_clicks, stored_data):
         raise PreventUpdate
 
     # Load and merge data
-    input_df = pd.DataFrame(stored_data)
-    merged_df = merge_input_with_database(input_df)
+    input_df = load_input_data(stored_data)
+    # Only distinct sample/KO pairs are needed to count KOs per sample
+    merged_df = merge_input_with_database(input_df, columns=['sample', 'ko'], distinct=True)
 
     # Use all available samples
     filtered_df = merged_df.copy()
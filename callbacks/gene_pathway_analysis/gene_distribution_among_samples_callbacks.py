@@ -19,14 +19,12 @@ The callbacks use Dash's callback mechanism to handle user interactions and upda
 from dash import callback, Output, Input, State, html, dcc
 from dash.exceptions import PreventUpdate
 
-# Core libraries
-import pandas as pd
-
 # App instance
 from app import app
 
 # Utils – modular imports via __init__.py
 from utils.core import merge_with_kegg
+from utils.core.upload_handlers import load_input_data
 from utils.gene_pathway_analysis import (
     plot_sample_ko_scatter,
     get_ko_per_sample_for_pathway
@@ -63,8 +61,8 @@ def initialize_pathway_dropdown(n_clicks, stored_data):
         raise PreventUpdate
 
     # Convert stored data to a DataFrame
-    input_df = pd.DataFrame(stored_data)
-    merged_df = merge_with_kegg(input_df)
+    input_df = load_input_data(stored_data)
+    merged_df = merge_with_kegg(input_df, columns=['pathname'], distinct=True)
 
     # Extract and sort unique pathway names
     pathways = sorted(merged_df['pathname'].unique())
@@ -106,8 +104,8 @@ def update_scatter_plot(selected_pathway, stored_data):
         )
 
     # Convert stored data to a DataFrame
-    input_df = pd.DataFrame(stored_data)
-    merged_df = merge_with_kegg(input_df)
+    input_df = load_input_data(stored_data)
+    merged_df = merge_with_kegg(input_df, columns=['sample', 'pathname', 'genesymbol'], distinct=True)
 
     # Retrieve scatter plot data for the selected pathway
     scatter_data = get_ko_per_sample_for_pathway(merged_df, selected_pathway)
@@ -19,14 +19,14 @@ Dependencies:
 from dash import callback, html, dcc
 from dash.dependencies import Input, Output, State
 from dash.exceptions import PreventUpdate
-import pandas as pd
 
 # Application-specific imports
 from app import app
+from utils.core.aggregate_bundle import get_aggregate
+from utils.core.store_codec import decode_store_data
 from utils import setup_logger
 from utils.heatmaps import (
     plot_sample_gene_heatmap,
-    process_gene_sample_data,
 )
 
 
@@ -54,7 +54,7 @@ def initialize_compound_pathway_dropdown(hadeg_data):
         return [], None  # Return empty options if no processed data is available  
   
     # Convert stored processed data into a DataFrame (dados já processados)  
-    merged_df = pd.DataFrame(hadeg_data)  
+    merged_df = decode_store_data(hadeg_data)  
   
     # Extract unique compound pathways and sort them alphabetically  
     compound_pathways = sorted(merged_df['compound_pathway'].unique())  
@@ -87,7 +87,7 @@ def initialize_pathway_dropdown(selected_compound_pathway, hadeg_data):
         return [], None  # Empty options and no selection if conditions are not met  
   
     # Convert stored processed data into a DataFrame (dados já processados)  
-    merged_df = pd.DataFrame(hadeg_data)  
+    merged_df = decode_store_data(hadeg_data)  
   
     # Extract unique pathways within the selected compound pathway  
     pathways = sorted(merged_df[merged_df['compound_pathway'] == selected_compound_pathway]['Pathway'].unique())  
@@ -124,14 +124,11 @@ def update_gene_sample_heatmap(selected_pathway, hadeg_data):
             style={"textAlign": "center", "color": "gray"}  
         )  
   
-    # Convert stored processed data into a DataFrame (dados já processados)  
-    merged_df = pd.DataFrame(hadeg_data)  
-  
-    # Process data to group by genes and samples  
-    grouped_df = process_gene_sample_data(merged_df)  
+    # KO counts per gene and sample, precomputed once after the merge  
+    grouped_df = get_aggregate(hadeg_data, 'hadeg', 'gene_sample')  
   
     # Filter the data for the selected pathway  
-    filtered_df = grouped_df[grouped_df['Pathway'] == selected_pathway].fillna(0)  
+    filtered_df = grouped_df[grouped_df['Pathway'] == selected_pathway].fillna({'ko_count': 0})  
   
     if filtered_df.empty:  
         # Return a message if no data exists for the selected pathway  
@@ -20,13 +20,14 @@ Callbacks:
 from dash import callback, html, dcc  # Core Dash components
 from dash.dependencies import Input, Output, State  # Input, Output, and State for callbacks
 from dash.exceptions import PreventUpdate  # Exception to stop callback updates
-import pandas as pd  # Data manipulation
 
 from app import app  # Dash app instance
+from utils.core.aggregate_bundle import get_aggregate
+from utils.core.store_codec import decode_store_data
 
 # Utilitários da aplicação (ajustados para a nova estrutura)
 from utils import setup_logger
-from utils.heatmaps import process_pathway_data, plot_pathway_heatmap
+from utils.heatmaps import plot_pathway_heatmap
 
 
 # ----------------------------------------
@@ -53,7 +54,7 @@ def initialize_sample_dropdown(hadeg_data):
         return [], None  
   
     # Convert stored processed data into a DataFrame (dados já processados)  
-    merged_df = pd.DataFrame(hadeg_data)  
+    merged_df = decode_store_data(hadeg_data)  
   
     # Retrieve unique samples and prepare dropdown options  
     samples = sorted(merged_df['sample'].unique())  
@@ -90,11 +91,8 @@ def update_pathway_heatmap(selected_sample, hadeg_data):
             style={"textAlign": "center", "color": "gray"}  # Centered gray text for clarity  
         )  
   
-    # Convert stored processed data into a DataFrame (dados já processados)  
-    merged_df = pd.DataFrame(hadeg_data)  
-  
-    # Process data for heatmap generation  
-    grouped_df = process_pathway_data(merged_df)  
+    # KO counts per pathway and sample, precomputed once after the merge  
+    grouped_df = get_aggregate(hadeg_data, 'hadeg', 'pathway_data')  
     if grouped_df.empty or selected_sample not in grouped_df['sample'].unique():  
         # Display a message if the selected sample has no associated data  
         return html.P(  
@@ -17,13 +17,12 @@ The main components include:
 from dash import callback
 from dash.dependencies import Input, Output, State
 from dash.exceptions import PreventUpdate
-import pandas as pd
 
 from app import app
+from utils.core.aggregate_bundle import get_aggregate
 
 
 # Heatmap: Sample x Reference Agency
-from utils.heatmaps.sample_reference_agency_heatmap_processing import process_sample_reference_heatmap
 from utils.heatmaps.sample_reference_agency_heatmap_plot import plot_sample_reference_heatmap
 
 
@@ -41,9 +40,9 @@ def update_sample_reference_heatmap(biorempp_data):
   
     Workflow:  
     1. Verifies if processed data is available.  
-    2. Converts the stored processed data into a pandas DataFrame.  
-    3. Processes the merged data into a format suitable for a heatmap using `process_sample_reference_heatmap`.  
-    4. Generates and returns the heatmap figure using `plot_sample_reference_heatmap`.  
+    2. Reads the heatmap matrix from the aggregate bundle computed after the merge  
+       (same result as `process_sample_reference_heatmap`).  
+    3. Generates and returns the heatmap figure using `plot_sample_reference_heatmap`.  
   
     Parameters:  
     - biorempp_data (list of dict): Pre-processed data from BioRemPP store.  
@@ -58,11 +57,8 @@ def update_sample_reference_heatmap(biorempp_data):
     if not biorempp_data:  
         raise PreventUpdate  
   
-    # Convert stored processed data into a DataFrame (dados já processados)  
-    merged_df = pd.DataFrame(biorempp_data)  
-      
-    # Process the merged data for heatmap generation  
-    heatmap_data = process_sample_reference_heatmap(merged_df)  
+    # Compounds per reference agency and sample, precomputed once after the merge  
+    heatmap_data = get_aggregate(biorempp_data, 'biorempp', 'sample_reference')  
       
     # Generate the heatmap figure  
     fig = plot_sample_reference_heatmap(heatmap_data)  
@@ -19,12 +19,12 @@ from dash import callback, html
 from dash.dependencies import Input, Output, State
 from dash.exceptions import PreventUpdate
 
-import pandas as pd
 
 from app import app
+from utils.core.incidence import get_incidence
 
 # Utils: Clustering processing and plotting
-from utils.intersections_and_groups.clustering_dendrogram_processing import calculate_sample_clustering
+from utils.intersections_and_groups.clustering_dendrogram_processing import calculate_profile_clustering
 from utils.intersections_and_groups.clustering_dendrogram_plot import plot_dendrogram
 
 # ----------------------------------------
@@ -58,14 +58,14 @@ def update_sample_clustering_graph(distance_metric, method, biorempp_data):
     if not distance_metric or not method or not biorempp_data:  
         raise PreventUpdate  # Prevent updates if inputs are invalid or missing  
   
-    # Convert stored processed data into a pandas DataFrame (dados já processados)  
-    input_df = pd.DataFrame(biorempp_data)  
+    # Sample x KO incidence matrix of the stored table (built once per table)  
+    incidence = get_incidence(biorempp_data, 'sample', 'ko')  
   
     # Calculate the clustering matrix based on user-selected parameters  
-    clustering_matrix = calculate_sample_clustering(input_df, distance_metric, method)  
+    clustering_matrix = calculate_profile_clustering(incidence.to_frame(), distance_metric, method)  
   
-    # Extract sample names from the DataFrame  
-    sample_labels = input_df['sample'].unique().tolist()  
+    # Sample names in the order of the matrix rows (the dendrogram leaves)  
+    sample_labels = incidence.rows.tolist()  
   
     # Create the dendrogram with a dynamic title  
     dendrogram_image = plot_dendrogram(clustering_matrix, sample_labels, distance_metric, method)  
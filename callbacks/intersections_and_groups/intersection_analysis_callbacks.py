@@ -23,11 +23,11 @@ from dash.dependencies import Input, Output, State  # Input, Output, and State f
 from dash.exceptions import PreventUpdate  # Exception to prevent unnecessary updates
 
 from app import app  # Application instance
+from utils.core.store_codec import decode_store_data
 
 # Custom utilities
 from utils.intersections_and_groups.intersection_analysis_plot import render_upsetplot  # Function to render UpSet plot
 
-import pandas as pd  # Pandas for data manipulation
 
 # ----------------------------------------
 # Callback: Initialize Dropdown Options
@@ -55,7 +55,7 @@ def initialize_upsetplot_dropdown(biorempp_data):
         return [], None  # Return empty options if no processed data is available  
   
     # Convert stored processed data into a DataFrame (dados já processados)  
-    merged_df = pd.DataFrame(biorempp_data)  
+    merged_df = decode_store_data(biorempp_data)  
     unique_samples = merged_df['sample'].unique()  
     options = [{'label': sample, 'value': sample} for sample in unique_samples]  
   
@@ -76,7 +76,7 @@ def update_upsetplot(selected_samples, biorempp_data):
   
     Parameters:  
     - selected_samples (list): List of selected sample names from the dropdown.  
-    - biorempp_data (list of dict): Pre-processed data from BioRemPP store.  
+    - biorempp_data (dict): Store payload of the merged BioRemPP table.  
   
     Returns:  
     - dash.html.Img: An image element displaying the rendered UpSet plot.  
@@ -90,11 +90,8 @@ def update_upsetplot(selected_samples, biorempp_data):
             style={"textAlign": "center", "color": "gray"}  # Styling for the message  
         )  
   
-    # Convert stored processed data into a DataFrame (dados já processados)  
-    merged_df = pd.DataFrame(biorempp_data)  
-  
-    # Render the UpSet plot using the processed data and selected samples  
-    image_src = render_upsetplot(merged_df.to_dict('records'), selected_samples)  
+    # Render the UpSet plot from the sample/KO pairs of the stored table  
+    image_src = render_upsetplot(biorempp_data, selected_samples)  
   
     # Return the UpSet plot as an image  
     return html.Img(  
@@ -21,9 +21,9 @@ from dash import callback, html, dcc
 from dash.dependencies import Input, Output, State
 from dash.exceptions import PreventUpdate
 
-import pandas as pd
 
 from app import app
+from utils.core.store_codec import decode_store_data
 
 # Utils: Merge + Grouping by compound class
 from utils.core.data_processing import merge_input_with_database
@@ -54,7 +54,7 @@ def initialize_compound_class_dropdown(biorempp_data):
         return [], None  
   
     # Convert stored processed data into a DataFrame (dados já processados)  
-    merged_df = pd.DataFrame(biorempp_data)  
+    merged_df = decode_store_data(biorempp_data)  
     compound_classes = sorted(merged_df['compoundclass'].unique())  # Get unique compound classes  
   
     # Prepare dropdown options  
@@ -91,7 +91,7 @@ def update_sample_groups_plot(compound_class, biorempp_data):
         )  
   
     # Convert stored processed data into a DataFrame (dados já processados)  
-    merged_df = pd.DataFrame(biorempp_data)  
+    merged_df = decode_store_data(biorempp_data)  
   
     # Group data by the selected compound class  
     grouped_df = group_by_class(compound_class, merged_df)  
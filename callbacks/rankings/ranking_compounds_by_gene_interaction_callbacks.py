@@ -17,13 +17,11 @@ The callbacks handle user interactions, such as processing data after a button c
 from dash import callback, html, dcc
 from dash.dependencies import Input, Output, State
 from dash.exceptions import PreventUpdate
-import pandas as pd
 
 from app import app
-from utils.rankings import (
-    process_compound_gene_ranking,
-    plot_compound_gene_ranking
-)
+from utils.core.aggregate_bundle import get_aggregate, slice_ranking
+from utils.core.store_codec import decode_store_data
+from utils.rankings import plot_compound_gene_ranking
 
 # ----------------------------------------
 # Callback: Initialize Dropdown for Compound Classes
@@ -42,7 +40,7 @@ def initialize_compound_class_dropdown(biorempp_data):
         return [], None  
       
     # Dados já estão processados - não precisa fazer merge novamente  
-    merged_df = pd.DataFrame(biorempp_data)  
+    merged_df = decode_store_data(biorempp_data)  
     compound_classes = sorted(merged_df['compoundclass'].unique())  
     dropdown_options = [{'label': cls, 'value': cls} for cls in compound_classes]  
     return dropdown_options, None  
@@ -63,13 +61,12 @@ def update_compound_gene_ranking_plot(selected_class, biorempp_data):
     if not selected_class or not biorempp_data:  
         return html.P("No data available. Please select a compound class")  
       
-    # Dados já estão processados - não precisa fazer merge novamente  
-    merged_df = pd.DataFrame(biorempp_data)  
-    filtered_df = merged_df[merged_df['compoundclass'] == selected_class]  
+    # Ranking da classe selecionada, a partir do ranking pré-calculado após o merge  
+    compound_gene_ranking = get_aggregate(biorempp_data, 'biorempp', 'compound_gene_ranking')  
+    compound_gene_ranking_df = slice_ranking(compound_gene_ranking, 'compoundclass', selected_class, 'num_genes')  
       
-    if filtered_df.empty:  
+    if compound_gene_ranking_df.empty:  
         return html.P("No data available for the selected compound class")  
       
-    compound_gene_ranking_df = process_compound_gene_ranking(filtered_df)  
     fig = plot_compound_gene_ranking(compound_gene_ranking_df)  
     return dcc.Graph(figure=fig, id="p6-rank-compounds-bar-plot")
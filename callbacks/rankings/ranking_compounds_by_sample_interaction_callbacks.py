@@ -17,13 +17,11 @@ The script uses Dash callbacks to manage interactivity and relies on utility fun
 from dash import callback, html, dcc
 from dash.dependencies import Input, Output, State
 from dash.exceptions import PreventUpdate
-import pandas as pd
 
 from app import app
-from utils.rankings import (
-    process_compound_ranking,
-    plot_compound_ranking
-)
+from utils.core.aggregate_bundle import get_aggregate, slice_ranking
+from utils.core.store_codec import decode_store_data
+from utils.rankings import plot_compound_ranking
 
 # ----------------------------------------
 # Callback: Initialize Dropdown for Compound Classes
@@ -50,7 +48,7 @@ def initialize_compound_class_dropdown(biorempp_data):
         return [], None  
   
     # Convert stored processed data into a DataFrame (dados já processados)  
-    merged_df = pd.DataFrame(biorempp_data)  
+    merged_df = decode_store_data(biorempp_data)  
   
     # Extract unique compound classes and sort them alphabetically  
     compound_classes = sorted(merged_df['compoundclass'].unique())  
@@ -89,23 +87,18 @@ def update_compound_ranking_plot(selected_class, biorempp_data):
             style={"textAlign": "center", "color": "gray"}  # Centered and gray text  
         )  
   
-    # Convert stored processed data into a DataFrame (dados já processados)  
-    merged_df = pd.DataFrame(biorempp_data)  
-  
-    # Filter data by the selected compound class  
-    filtered_df = merged_df[merged_df['compoundclass'] == selected_class]  
+    # Compound ranking of the selected class, sliced from the precomputed ranking  
+    compound_ranking = get_aggregate(biorempp_data, 'biorempp', 'compound_ranking')  
+    compound_ranking_df = slice_ranking(compound_ranking, 'compoundclass', selected_class, 'num_samples')  
   
     # If no data is available for the selected class, display a warning message  
-    if filtered_df.empty:  
+    if compound_ranking_df.empty:  
         return html.P(  
             "No data available for the selected compound class",  # Warning message  
             id="p5-no-data-message",  # ID for CSS styling or testing  
             style={"textAlign": "center", "color": "gray"}  # Centered and gray text  
         )  
   
-    # Process the filtered data to create the compound ranking  
-    compound_ranking_df = process_compound_ranking(filtered_df)  
-  
     # Generate a bar chart with the processed data  
     fig = plot_compound_ranking(compound_ranking_df)  
   
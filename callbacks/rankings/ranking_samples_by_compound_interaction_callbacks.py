@@ -20,13 +20,10 @@ Functions:
 from dash import callback
 from dash.dependencies import Input, Output, State
 from dash.exceptions import PreventUpdate
-import pandas as pd
 
 from app import app
-from utils.rankings import (
-    process_sample_ranking,
-    plot_sample_ranking
-)
+from utils.core.aggregate_bundle import get_aggregate
+from utils.rankings import plot_sample_ranking
 
 # ----------------------------------------
 # Callback: Update Sample Ranking Plot
@@ -51,9 +48,8 @@ def update_sample_ranking_plot(range_slider_values, biorempp_data):
     if not biorempp_data:  
         raise PreventUpdate  # Stops the callback if no processed data is available  
   
-    # Convert stored processed data into a DataFrame (dados já processados)  
-    merged_df = pd.DataFrame(biorempp_data)  
-    sample_ranking_df = process_sample_ranking(merged_df)  # Processes the sample ranking data  
+    # Sample ranking, precomputed once after the merge  
+    sample_ranking_df = get_aggregate(biorempp_data, 'biorempp', 'sample_ranking')  
   
     # Filter the data based on the range slider values  
     min_value, max_value = range_slider_values  
@@ -92,9 +88,8 @@ def update_range_slider_values(biorempp_data):
     if not biorempp_data:  
         raise PreventUpdate  # Stops the callback if no processed data is available  
   
-    # Convert stored processed data into a DataFrame (dados já processados)  
-    merged_df = pd.DataFrame(biorempp_data)  
-    sample_ranking_df = process_sample_ranking(merged_df)  # Processes the sample ranking data  
+    # Sample ranking, precomputed once after the merge  
+    sample_ranking_df = get_aggregate(biorempp_data, 'biorempp', 'sample_ranking')  
   
     # Define the maximum value for the range slider  
     max_value = sample_ranking_df['num_compounds'].max()  
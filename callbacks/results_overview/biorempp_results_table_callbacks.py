@@ -15,11 +15,11 @@ The callback:
 # ----------------------------------------
 
 from dash import Input, Output, State, callback, html  # Dash components for callbacks and HTML rendering
-import pandas as pd  # Pandas for data manipulation
 
 # Utility functions for table creation and data processing
 from utils.core.table_utils import create_table_from_dataframe
 from utils.core.data_processing import merge_input_with_database
+from utils.core.upload_handlers import load_input_data
 
 # ----------------------------------------
 # Callback: Render BioRemPP Results Table
@@ -50,7 +50,7 @@ def render_biorempp_table(n_clicks, stored_data):
     """
     # Condition: Button is clicked, and valid data is available
     if n_clicks > 0 and stored_data:
-        input_df = pd.DataFrame(stored_data)  # Convert stored data to a DataFrame
+        input_df = load_input_data(stored_data)  # Convert stored data to a DataFrame
         merged_df = merge_input_with_database(input_df)  # Merge input data with the KEGG database
 
         # If the resulting table is empty
@@ -15,11 +15,11 @@ The script uses utility functions to process input data and generate the results
 # ----------------------------------------
 
 from dash import Input, Output, State, callback, html  # Dash components and callback utilities
-import pandas as pd  # For data manipulation with DataFrame
 
 # Funções expostas via utils.core.__init__.py
 from utils.core.table_utils import create_table_from_dataframe
 from utils.core.data_processing import merge_input_with_database_hadegDB
+from utils.core.upload_handlers import load_input_data
 
 
 # ----------------------------------------
@@ -56,7 +56,7 @@ def render_hadeg_table(n_clicks, stored_data):
     # Condition: Button is clicked and valid data is available
     if n_clicks > 0 and stored_data:
         # Convert stored data to a pandas DataFrame
-        input_df = pd.DataFrame(stored_data)
+        input_df = load_input_data(stored_data)
         
         # Merge the input data with the HADEG database
         merged_df = merge_input_with_database_hadegDB(input_df)
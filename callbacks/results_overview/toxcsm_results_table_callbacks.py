@@ -16,11 +16,11 @@ Key Features:
 # ----------------------------------------
 
 from dash import Input, Output, State, callback, html  # Componentes do Dash para interatividade e UI
-import pandas as pd  # Manipulação de dados
 
 # Funções utilitárias da camada core
 from utils.core.table_utils import create_table_from_dataframe
 from utils.core.data_processing import merge_input_with_database, merge_with_toxcsm
+from utils.core.upload_handlers import load_input_data
 
 
 
@@ -59,7 +59,7 @@ def render_toxcsm_table(n_clicks, stored_data):
     """
     # Condition: Button clicked and valid data available
     if n_clicks > 0 and stored_data:
-        input_df = pd.DataFrame(stored_data)  # Converts stored data to a DataFrame
+        input_df = load_input_data(stored_data)  # Converts stored data to a DataFrame
         merged_df = merge_input_with_database(input_df)  # Merges input data with the database
         final_merged_df = merge_with_toxcsm(merged_df)  # Merges results with the TOXCSM database
 
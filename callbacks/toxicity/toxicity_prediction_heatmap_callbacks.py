@@ -20,11 +20,9 @@ Functions:
 from dash import callback, Input, Output, State
 from dash.exceptions import PreventUpdate
 
-# Data manipulation
-import pandas as pd
-
 # Dash app instance
 from app import app
+from utils.core.store_codec import decode_store_data
 
 # Toxicity utilities (from utils.toxicity subpackage __init__.py)
 from utils.toxicity import process_heatmap_data, plot_heatmap_faceted
@@ -59,7 +57,7 @@ def update_heatmap_faceted(toxcsm_data):
         raise PreventUpdate  
   
     # Step 2: Convert stored processed data into a DataFrame (dados já processados)  
-    merged_data = pd.DataFrame(toxcsm_data)  
+    merged_data = decode_store_data(toxcsm_data)  
     if merged_data.empty:  # Check if the merged data is empty  
         return {}  
   
@@ -136,8 +136,9 @@ def get_dataAnalysis_page():
                                             id='upload-data',
                                             children=html.Div([
                                                 "📁 ", html.Span("Drag and Drop", style={'color': '#28a745'}), " or ",
-                                                html.A("Select a File", style={'color': '#28a745'})
+                                                html.A("Select Files", style={'color': '#28a745'})
                                             ]),
+                                            multiple=True,  # one file per genome: parsed in parallel
                                             className='upload-button-style p-3 border border-success rounded',
                                             style={
                                                 'cursor': 'pointer',
@@ -157,6 +158,25 @@ def get_dataAnalysis_page():
                                     ]
                                 ),
 
+                                # Large files: sent in chunks by assets/stream_upload.js
+                                html.Div(
+                                    className='text-center mt-3',
+                                    children=[
+                                        html.Span(
+                                            [
+                                                "📦 Large file (over 5 MB)? ",
+                                                html.A(
+                                                    "Upload it in chunks",
+                                                    id='stream-upload-trigger',
+                                                    style={'color': '#28a745', 'cursor': 'pointer'}
+                                                )
+                                            ],
+                                            className='help-message small'
+                                        ),
+                                        html.Div(id='stream-upload-status', className='help-message small text-muted')
+                                    ]
+                                ),
+
                                 
                                 html.Div(id='alert-container', className='alert-container my-3'),
     
@@ -50,6 +50,14 @@ from callbacks.dashboard.analysis_suggestions_callbacks import register_analysis
 # Import the application instance
 from app import app, server
 register_analysis_suggestions_callbacks(app)
+
+# Load the reference databases once per process
+from utils.core.data_processing import preload_reference_databases
+preload_reference_databases()
+
+# Chunked uploads of large input files, outside of the dcc.Upload size limit
+from utils.core.streaming_upload import register_streaming_upload
+register_streaming_upload(server)
 # ----------------------------------------
 # Main Layout Configuration
 # ----------------------------------------
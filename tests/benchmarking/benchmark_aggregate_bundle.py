@@ -0,0 +1,110 @@
+"""
+Benchmark: precomputed aggregate bundle vs. per-callback processing.
+
+Merges the parsed `data/genomasBD.txt` input with every reference database
+(as the merge callback does), stores the merged tables as compact payloads
+and, for each aggregate, compares:
+- the time of the processing function the callbacks used to run on every
+  update (on the decoded table);
+- the one-off time to build the bundle of the table (all its aggregates);
+- the time for a callback to read the aggregate from the cached bundle.
+
+Aggregates are checked against the processing functions before timing.
+
+Usage:
+    python tests/benchmarking/benchmark_aggregate_bundle.py
+"""
+
+import os
+import sys
+
+import pandas as pd
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, "../../"))
+sys.path.insert(0, BASE_DIR)
+
+from tests.benchmarking.utils.timing_utils import best_of  # noqa: E402
+from utils.core import aggregate_bundle  # noqa: E402
+from utils.core.aggregate_bundle import get_aggregate, get_aggregate_bundle  # noqa: E402
+from utils.core.data_validator import process_content_lines  # noqa: E402
+from utils.core.merge_scheduler import run_reference_merges  # noqa: E402
+from utils.core.store_codec import decode_store_data, encode_compact  # noqa: E402
+from utils.gene_pathway_analysis.distribution_of_ko_in_pathways_processing import (  # noqa: E402
+    count_ko_per_pathway,
+)
+from utils.gene_pathway_analysis.gene_counts_across_samples_processing import process_ko_data  # noqa: E402
+from utils.heatmaps.gene_sample_heatmap_processing import process_gene_sample_data  # noqa: E402
+from utils.heatmaps.pathway_compound_interaction_processing import process_pathway_data  # noqa: E402
+from utils.heatmaps.sample_reference_agency_heatmap_processing import (  # noqa: E402
+    process_sample_reference_heatmap,
+)
+from utils.rankings.ranking_samples_by_compound_interaction_processing import (  # noqa: E402
+    process_sample_ranking,
+)
+
+DATA_FILE = os.path.join(BASE_DIR, "data", "genomasBD.txt")
+REPEATS = 5
+
+# (table, aggregate, processing function it replaces)
+AGGREGATES = [
+    ("biorempp", "ko_count", process_ko_data),
+    ("biorempp", "sample_ranking", process_sample_ranking),
+    ("biorempp", "sample_reference", process_sample_reference_heatmap),
+    ("kegg", "ko_per_pathway", count_ko_per_pathway),
+    ("hadeg", "pathway_data", process_pathway_data),
+    ("hadeg", "gene_sample", process_gene_sample_data),
+]
+
+
+def load_payloads():
+    """Returns the compact payloads of the merged tables for the example input."""
+    with open(DATA_FILE, "r", encoding="utf-8") as f:
+        df_input, error = process_content_lines(f.read())
+    if error:
+        raise ValueError(error)
+    outcome = run_reference_merges(df_input)
+    if outcome.errors:
+        raise RuntimeError(f"Merge failed: {outcome.errors}")
+    return {name: encode_compact(df) for name, df in outcome.results.items()}
+
+
+def build_time(payload, table):
+    """Returns the best time (ms) to build the bundle of a table from scratch."""
+    def build():
+        aggregate_bundle._bundle_cache.clear()
+        get_aggregate_bundle(payload, table)
+    return best_of(build, repeats=REPEATS)
+
+
+def run_benchmark():
+    payloads = load_payloads()
+    build_ms = {table: round(build_time(payloads[table], table), 1) for table in ("biorempp", "kegg", "hadeg")}
+
+    rows = []
+    for table, name, process in AGGREGATES:
+        payload = payloads[table]
+        merged = decode_store_data(payload)
+        expected = process(merged)
+        result = get_aggregate(payload, table, name)
+        pd.testing.assert_frame_equal(
+            result.astype(object).reset_index(drop=True),
+            expected.astype(object).reset_index(drop=True),
+            check_names=False,
+            check_column_type=False,
+        )
+
+        rows.append({
+            "table": table,
+            "aggregate": name,
+            "rows": len(result),
+            "process_ms": round(best_of(lambda: process(decode_store_data(payload)), repeats=REPEATS), 1),
+            "bundle_build_ms": build_ms[table],
+            "cached_ms": round(best_of(lambda: get_aggregate(payload, table, name), repeats=REPEATS), 3),
+        })
+
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,99 @@
+"""
+Benchmark: sample x KO incidence matrix against long-form pandas operations.
+
+Builds cohorts by repeating the samples of `data/genomasBD.txt` under new
+names, merges them with the BioRemPP database and, for every cohort size,
+times:
+- building the incidence matrix of the merged table;
+- unique KOs per sample: ``groupby(...).nunique()`` against `row_counts`;
+- the sample x KO count matrix: ``pivot_table`` against `to_frame`;
+- the UpSet memberships of 8 samples: ``groupby(...).apply(set)`` against
+  `column_memberships`;
+- pairwise shared KOs: a self-merge of the sample/KO pairs against
+  `intersection_counts`.
+
+Every result is checked against the pandas one.
+
+Usage:
+    python tests/benchmarking/benchmark_incidence.py
+"""
+
+import os
+import sys
+
+import pandas as pd
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, "../../"))
+sys.path.insert(0, BASE_DIR)
+os.chdir(BASE_DIR)
+
+from tests.benchmarking.utils.cohort_utils import build_cohort  # noqa: E402
+from tests.benchmarking.utils.timing_utils import timed  # noqa: E402
+from utils.core.data_processing import merge_input_with_database  # noqa: E402
+from utils.core.incidence import (  # noqa: E402
+    build_incidence,
+    column_memberships,
+    intersection_counts,
+    row_counts,
+)
+
+COPIES = [1, 4, 16]
+UPSET_SAMPLES = 8
+
+
+def shared_kos(merged):
+    """Pairwise shared KOs of the samples with a self-merge of the pairs."""
+    pairs = merged[["sample", "ko"]].drop_duplicates()
+    joined = pairs.merge(pairs, on="ko")
+    return joined.groupby(["sample_x", "sample_y"], observed=True).size().unstack(fill_value=0)
+
+
+def run_benchmark():
+    rows = []
+    for copies in COPIES:
+        merged = merge_input_with_database(build_cohort(copies))
+        selected = merged["sample"].cat.categories[:UPSET_SAMPLES].tolist()
+        upset_rows = merged[merged["sample"].isin(selected)]
+
+        incidence, build_ms = timed(build_incidence, merged, "sample", "ko")
+
+        expected, groupby_ms = timed(lambda: merged.groupby("sample", observed=True)["ko"].nunique())
+        counts, counts_ms = timed(row_counts, incidence)
+        assert counts.tolist() == expected.tolist()
+
+        pivot, pivot_ms = timed(
+            lambda: merged.pivot_table(index="sample", columns="ko", aggfunc="size", fill_value=0, observed=True)
+        )
+        frame, frame_ms = timed(incidence.to_frame)
+        assert (frame.to_numpy() == pivot.to_numpy()).all()
+
+        expected, apply_ms = timed(
+            lambda: upset_rows.groupby("ko", observed=True)["sample"].apply(lambda x: list(set(x)))
+        )
+        memberships, members_ms = timed(lambda: column_memberships(build_incidence(upset_rows, "sample", "ko")))
+        assert [set(m) for m in memberships] == [set(m) for m in expected]
+
+        expected, merge_ms = timed(shared_kos, merged)
+        shared, shared_ms = timed(intersection_counts, incidence)
+        assert (shared.to_numpy() == expected.to_numpy()).all()
+
+        rows.append({
+            "samples": incidence.shape[0],
+            "merged_rows": len(merged),
+            "build_ms": round(build_ms, 1),
+            "nunique_ms": round(groupby_ms, 1),
+            "row_counts_ms": round(counts_ms, 2),
+            "pivot_ms": round(pivot_ms, 1),
+            "to_frame_ms": round(frame_ms, 1),
+            "upset_apply_ms": round(apply_ms, 1),
+            "memberships_ms": round(members_ms, 1),
+            "self_merge_ms": round(merge_ms, 1),
+            "intersections_ms": round(shared_ms, 1),
+        })
+
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,94 @@
+"""
+Benchmark: precomputed KO/cpd index join vs. pd.merge.
+
+For each reference database, joins the parsed `data/genomasBD.txt` input
+(BioRemPP result for KEGG and ToxCSM, as in the application) with:
+- pd.merge on the aligned categorical key (previous implementation);
+- index_join with the cached KeyIndex of the reference table.
+
+Both results are checked with `pd.testing.assert_frame_equal` before timing.
+
+Usage:
+    python tests/benchmarking/benchmark_index_join.py
+"""
+
+import os
+import sys
+
+import pandas as pd
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, "../../"))
+sys.path.insert(0, BASE_DIR)
+
+from tests.benchmarking.utils.timing_utils import best_of  # noqa: E402
+from utils.core.data_processing import _load_reference  # noqa: E402
+from utils.core.data_validator import process_content_lines  # noqa: E402
+from utils.core.optimize_dtypes import (  # noqa: E402
+    optimize_dtypes,
+    optimize_hadeg_dtypes,
+    optimize_kegg_dtypes,
+    optimize_toxcsm_dtypes,
+)
+from utils.core.reference_index import build_key_index, index_join  # noqa: E402
+from utils.core.vocabulary import align_shared_categories  # noqa: E402
+
+DATA_FILE = os.path.join(BASE_DIR, "data", "genomasBD.txt")
+DATABASES = {
+    "BioRemPP": ("database.csv", optimize_dtypes, "ko"),
+    "KEGG": ("kegg_degradation_pathways.csv", optimize_kegg_dtypes, "ko"),
+    "HADEG": ("database_hadegDB.csv", optimize_hadeg_dtypes, "ko"),
+    "ToxCSM": ("database_toxcsm.csv", optimize_toxcsm_dtypes, "cpd"),
+}
+REPEATS = 20
+
+
+def load_inputs():
+    """Returns the left table used for each database join."""
+    with open(DATA_FILE, "r", encoding="utf-8") as f:
+        df_input, error = process_content_lines(f.read())
+    if error:
+        raise ValueError(error)
+
+    df_input = optimize_dtypes(df_input)
+    biorempp = _load_reference(os.path.join(BASE_DIR, "data", "database.csv"), optimize_dtypes, True)
+    df_input, biorempp = align_shared_categories(df_input, biorempp)
+    merged = pd.merge(df_input, biorempp, on="ko", how="inner")
+    toxcsm_input = merged[["sample", "compoundclass", "cpd", "ko"]].drop_duplicates()
+    return {"BioRemPP": df_input, "KEGG": merged, "HADEG": df_input, "ToxCSM": toxcsm_input}
+
+
+def run_benchmark():
+    inputs = load_inputs()
+    rows = []
+    for name, (filename, optimizer, key) in DATABASES.items():
+        reference = _load_reference(os.path.join(BASE_DIR, "data", filename), optimizer, True)
+        left, reference = align_shared_categories(inputs[name], reference)
+
+        build_ms = best_of(lambda: build_key_index(reference, key), repeats=5)
+        index = build_key_index(reference, key)
+
+        def with_merge():
+            return pd.merge(left, reference, on=key, how="inner")
+
+        def with_index():
+            return index_join(left, reference, index)
+
+        pd.testing.assert_frame_equal(with_index(), with_merge())
+        merge_ms = best_of(with_merge, repeats=REPEATS)
+        index_ms = best_of(with_index, repeats=REPEATS)
+        rows.append({
+            "database": name,
+            "input_rows": len(left),
+            "output_rows": len(with_index()),
+            "pd_merge_ms": round(merge_ms, 2),
+            "index_build_ms": round(build_ms, 2),
+            "index_join_ms": round(index_ms, 2),
+            "speedup": round(merge_ms / index_ms, 2),
+        })
+
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+if __name__ == "__main__":
+    run_benchmark()
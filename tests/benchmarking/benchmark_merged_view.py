@@ -0,0 +1,68 @@
+"""
+Benchmark: lazy merged view against the materialized BioRemPP merge.
+
+Builds cohorts by repeating the samples of `data/genomasBD.txt` under new
+names and, for every cohort size, compares:
+- the materialized merge (`merge_input_with_database`) and the aggregate
+  bundle computed on it;
+- the `MergedView` of the same input and the bundle computed from its
+  sample/KO pairs by sparse products.
+
+It reports the number of pairs and joined rows, the memory held by the
+merged table and by the view (deep, reference table excluded: it is shared
+with the registry) and the build and bundle times. Every bundle of the view
+is checked against the bundle of the materialized table.
+
+Usage:
+    python tests/benchmarking/benchmark_merged_view.py
+"""
+
+import os
+import sys
+
+import pandas as pd
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, "../../"))
+sys.path.insert(0, BASE_DIR)
+os.chdir(BASE_DIR)
+
+from tests.benchmarking.utils.cohort_utils import build_cohort  # noqa: E402
+from tests.benchmarking.utils.timing_utils import timed  # noqa: E402
+from utils.core.aggregate_bundle import build_aggregate_bundle  # noqa: E402
+from utils.core.data_processing import merge_input_with_database, preload_reference_databases  # noqa: E402
+from utils.core.merged_view import build_merged_view  # noqa: E402
+
+COPIES = [1, 4, 16, 32]
+
+
+def run_benchmark():
+    preload_reference_databases()
+    rows = []
+    for copies in COPIES:
+        cohort = build_cohort(copies)
+
+        merged, merge_ms = timed(merge_input_with_database, cohort)
+        expected, merged_bundle_ms = timed(build_aggregate_bundle, merged, "biorempp")
+        view, view_ms = timed(build_merged_view, cohort)
+        bundle, view_bundle_ms = timed(view.aggregate_bundle)
+        for name, df in expected.items():
+            pd.testing.assert_frame_equal(bundle[name], df, obj=name)
+
+        rows.append({
+            "samples": cohort["sample"].nunique(),
+            "pairs": len(view.pairs),
+            "joined_rows": len(merged),
+            "merged_MiB": round(merged.memory_usage(index=True, deep=True).sum() / 2 ** 20, 1),
+            "view_MiB": round(view.memory_usage() / 2 ** 20, 1),
+            "merge_ms": round(merge_ms, 1),
+            "view_ms": round(view_ms, 1),
+            "merged_bundle_ms": round(merged_bundle_ms, 1),
+            "view_bundle_ms": round(view_bundle_ms, 1),
+        })
+
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,99 @@
+"""
+Benchmark: bulk parser vs. line-by-line parsing of the sample/KO input format.
+
+Builds inputs of increasing size by repeating the samples of
+`data/genomasBD.txt` (with renamed sample ids) up to about one million lines
+and, for each size, compares:
+- the previous line-by-line parser (two regexes and one dict per line,
+  reproduced below as `parse_line_by_line`);
+- `process_content_lines`, which parses the whole buffer with array
+  operations.
+
+Both outputs are checked to hold the same rows before timing.
+
+Usage:
+    python tests/benchmarking/benchmark_parse_content.py
+"""
+
+import os
+import re
+import sys
+
+import pandas as pd
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, "../../"))
+sys.path.insert(0, BASE_DIR)
+
+from tests.benchmarking.utils.timing_utils import best_of  # noqa: E402
+from utils.core.data_validator import process_content_lines  # noqa: E402
+
+DATA_FILE = os.path.join(BASE_DIR, "data", "genomasBD.txt")
+TARGET_LINES = [10_000, 100_000, 250_000, 500_000, 1_000_000]
+REPEATS = 3
+
+
+def parse_line_by_line(content):
+    """Previous implementation of `process_content_lines` (without logging)."""
+    identifier_pattern = re.compile(r'^>([^\n]+)')
+    ko_pattern = re.compile(r'^(K\d+)$')
+    data = []
+    current_sample = None
+    for line_num, line in enumerate(content.strip().split('\n'), start=1):
+        line = line.strip()
+        if not line:
+            continue
+        id_match = identifier_pattern.match(line)
+        ko_match = ko_pattern.match(line)
+        if id_match:
+            current_sample = id_match.group(1).strip()
+        elif ko_match and current_sample:
+            data.append({'sample': current_sample, 'ko': ko_match.group(1).strip()})
+        else:
+            return None, f"Invalid format at line {line_num}: '{line}'."
+    return pd.DataFrame(data), None
+
+
+def scaled_input(lines, n_lines):
+    """Repeats the example input, renaming samples, until ``n_lines`` lines."""
+    out = []
+    copy = 0
+    while len(out) < n_lines:
+        out.extend(f"{line}_{copy}" if line.startswith(">") else line for line in lines)
+        copy += 1
+    # Cut at a sample header so the last sample is complete
+    cut = n_lines
+    while cut < len(out) and not out[cut].startswith(">"):
+        cut += 1
+    return "\n".join(out[:cut])
+
+
+def run_benchmark():
+    with open(DATA_FILE, "r", encoding="utf-8") as f:
+        lines = f.read().strip().split("\n")
+
+    rows = []
+    for n_lines in TARGET_LINES:
+        content = scaled_input(lines, n_lines)
+        expected, _ = parse_line_by_line(content)
+        parsed, error = process_content_lines(content)
+        if error:
+            raise ValueError(error)
+        pd.testing.assert_frame_equal(parsed.astype(object), expected.astype(object))
+
+        legacy_ms = best_of(lambda: parse_line_by_line(content), repeats=REPEATS)
+        bulk_ms = best_of(lambda: process_content_lines(content), repeats=REPEATS)
+        rows.append({
+            "lines": content.count("\n") + 1,
+            "ko_rows": len(parsed),
+            "line_by_line_ms": round(legacy_ms, 1),
+            "bulk_ms": round(bulk_ms, 1),
+            "speedup": round(legacy_ms / bulk_ms, 1),
+            "lines_per_s_M": round((content.count("\n") + 1) / bulk_ms / 1000, 2),
+        })
+
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,75 @@
+"""
+Benchmark: sample-level counts as sparse products with the reference
+incidence matrices, against counts on the materialized merged tables.
+
+Builds cohorts of up to ~15 000 samples by repeating the sample/KO pairs of
+`data/genomasBD.txt` under new names, and computes two aggregates:
+- unique compounds per sample (``sample_ranking``, `process_sample_ranking`);
+- KOs per pathway per sample (``ko_per_pathway``, `count_ko_per_pathway`).
+
+The materialized path merges the cohort with the BioRemPP (resp. KEGG)
+database and counts on the merged table (`count_distinct`). The incidence
+path builds the `MergedView` of the cohort and projects its sample x KO
+matrix through the precompiled KO x compound (resp. KO x pathway) matrix.
+The reference matrices are built by `preload_reference_databases`, before
+the timings. Both results are checked to be identical.
+
+Usage:
+    python tests/benchmarking/benchmark_reference_incidence.py
+"""
+
+import os
+import sys
+
+import pandas as pd
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, "../../"))
+sys.path.insert(0, BASE_DIR)
+os.chdir(BASE_DIR)
+
+from tests.benchmarking.utils.cohort_utils import build_cohort  # noqa: E402
+from tests.benchmarking.utils.timing_utils import timed  # noqa: E402
+from utils.core.aggregate_bundle import count_distinct  # noqa: E402
+from utils.core.data_processing import merge_with_reference, preload_reference_databases  # noqa: E402
+from utils.core.merged_view import build_merged_view  # noqa: E402
+
+COPIES = [16, 64, 256]
+AGGREGATES = [
+    ("sample_ranking", "biorempp", ["sample"], "compoundname"),
+    ("ko_per_pathway", "kegg", ["sample", "pathname"], "ko"),
+]
+
+
+def run_benchmark():
+    preload_reference_databases()
+    rows = []
+    for copies in COPIES:
+        cohort = build_cohort(copies, distinct=True)
+        for aggregate, name, by, value in AGGREGATES:
+            merged, merge_ms = timed(merge_with_reference, cohort, name)
+            expected, count_ms = timed(count_distinct, merged, by, value, aggregate)
+            rows_merged = len(merged)
+            del merged
+
+            view, view_ms = timed(build_merged_view, cohort, name)
+            counts, product_ms = timed(view.count_distinct, by, value, aggregate)
+            pd.testing.assert_frame_equal(counts, expected)
+
+            rows.append({
+                "aggregate": aggregate,
+                "samples": cohort["sample"].nunique(),
+                "pairs": len(view.pairs),
+                "merged_rows": rows_merged,
+                "merge_ms": round(merge_ms, 1),
+                "count_ms": round(count_ms, 1),
+                "view_ms": round(view_ms, 1),
+                "product_ms": round(product_ms, 1),
+                "speedup": round((merge_ms + count_ms) / (view_ms + product_ms), 1),
+            })
+
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+if __name__ == "__main__":
+    run_benchmark()
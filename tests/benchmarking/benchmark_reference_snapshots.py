@@ -0,0 +1,78 @@
+"""
+Benchmark: binary reference snapshots vs. pd.read_csv.
+
+Compares, for each reference database, the time to:
+- parse the CSV with pd.read_csv and optimize dtypes (current cold path);
+- build the snapshot (one-off cost paid when the CSV changes);
+- load the memory-mapped snapshot and optimize dtypes (new cold path).
+
+Usage:
+    python tests/benchmarking/benchmark_reference_snapshots.py
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+
+import pandas as pd
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, "../../"))
+sys.path.insert(0, BASE_DIR)
+
+from tests.benchmarking.utils.timing_utils import best_of  # noqa: E402
+from utils.core.optimize_dtypes import (  # noqa: E402
+    optimize_dtypes,
+    optimize_hadeg_dtypes,
+    optimize_kegg_dtypes,
+    optimize_toxcsm_dtypes,
+)
+from utils.core.reference_snapshots import build_snapshot, load_snapshot  # noqa: E402
+
+DATABASES = {
+    "BioRemPP": ("database.csv", optimize_dtypes),
+    "KEGG": ("kegg_degradation_pathways.csv", optimize_kegg_dtypes),
+    "HADEG": ("database_hadegDB.csv", optimize_hadeg_dtypes),
+    "ToxCSM": ("database_toxcsm.csv", optimize_toxcsm_dtypes),
+}
+REPEATS = 20
+
+
+def run_benchmark():
+    # Work on copies so the benchmark never touches data/.snapshots
+    work_dir = tempfile.mkdtemp(prefix="snapshot-bench-")
+    rows = []
+    try:
+        for name, (filename, optimizer) in DATABASES.items():
+            source = os.path.join(work_dir, filename)
+            shutil.copy2(os.path.join(BASE_DIR, "data", filename), source)
+
+            def read_csv_path():
+                return optimizer(pd.read_csv(source, encoding="utf-8", sep=";"))
+
+            def build():
+                build_snapshot(pd.read_csv(source, encoding="utf-8", sep=";"), source)
+
+            def snapshot_path():
+                return optimizer(load_snapshot(source, as_categorical=True))
+
+            build_ms = best_of(build, repeats=3)
+            csv_ms = best_of(read_csv_path, repeats=REPEATS)
+            snap_ms = best_of(snapshot_path, repeats=REPEATS)
+            pd.testing.assert_frame_equal(read_csv_path(), snapshot_path(), check_categorical=False)
+            rows.append({
+                "database": name,
+                "read_csv_ms": round(csv_ms, 2),
+                "snapshot_build_ms": round(build_ms, 2),
+                "snapshot_load_ms": round(snap_ms, 2),
+                "speedup": round(csv_ms / snap_ms, 2),
+            })
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+if __name__ == "__main__":
+    run_benchmark()
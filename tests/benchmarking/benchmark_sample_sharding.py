@@ -0,0 +1,90 @@
+"""
+Benchmark: sample-sharded pipeline on 1, 2, 4 and 8 worker processes.
+
+Builds a cohort by repeating the samples of `data/genomasBD.txt` under new
+names, preloads the reference tables and key indexes once, and runs the
+partitioned `run_pipeline` (merged tables and the toxicity heatmap written
+as CSV) with every job count. For each run it reports:
+- the wall time, the speedup over one process and the parallel efficiency;
+- the number of sample partitions (the same for every run).
+
+Tables and written files of every run are checked against the run on one
+process. Speedups are bounded by the CPUs of the machine (reported).
+
+Usage:
+    python tests/benchmarking/benchmark_sample_sharding.py
+"""
+
+import filecmp
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, "../../"))
+sys.path.insert(0, BASE_DIR)
+os.chdir(BASE_DIR)
+
+from tests.benchmarking.utils.cohort_utils import build_cohort  # noqa: E402
+from utils.core.batch_pipeline import run_pipeline  # noqa: E402
+from utils.core.data_processing import preload_reference_databases  # noqa: E402
+from utils.core.partitioned_merge import (  # noqa: E402
+    _SHARDS_PER_JOB,
+    PartitionWriter,
+    estimate_merged_rows,
+    partition_samples,
+)
+
+COPIES = 4
+JOBS = [1, 2, 4, 8]
+
+
+def run_sharded(cohort, max_rows, jobs, output_dir):
+    """Returns the tables, the writer and the wall time (s) of one run."""
+    writer = PartitionWriter(output_dir)
+    t0 = time.perf_counter()
+    tables = run_pipeline(cohort, partition_rows=max_rows, writer=writer, jobs=jobs)
+    return tables, writer, time.perf_counter() - t0
+
+
+def run_benchmark():
+    cohort = build_cohort(COPIES)
+    preload_reference_databases()
+    # Same partitions for every job count (as many as the largest count uses)
+    weights = estimate_merged_rows(cohort)
+    max_rows = int(weights.sum() // (max(JOBS) * _SHARDS_PER_JOB)) + 1
+    partitions = len(partition_samples(cohort, max_rows, weights))
+    print(f"{cohort['sample'].nunique()} samples, {len(cohort)} KO rows, {os.cpu_count()} CPUs")
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline = None
+        for jobs in JOBS:
+            output_dir = os.path.join(tmp, f"jobs{jobs}")
+            tables, writer, seconds = run_sharded(cohort, max_rows, jobs, output_dir)
+            if baseline is None:
+                baseline = (tables, writer, seconds)
+            expected, expected_writer, base_seconds = baseline
+            for name, df in tables.items():
+                pd.testing.assert_frame_equal(df, expected[name])
+            assert writer.rows == expected_writer.rows
+            for name, path in expected_writer.paths.items():
+                assert filecmp.cmp(path, writer.paths[name], shallow=False), name
+
+            speedup = base_seconds / seconds
+            rows.append({
+                "jobs": jobs,
+                "partitions": partitions,
+                "wall_s": round(seconds, 2),
+                "speedup": round(speedup, 2),
+                "efficiency": round(speedup / jobs, 2),
+            })
+
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+if __name__ == "__main__":
+    run_benchmark()
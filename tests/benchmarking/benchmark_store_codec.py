@@ -0,0 +1,80 @@
+"""
+Benchmark: compact columnar store payloads vs. to_dict('records').
+
+Merges the parsed `data/genomasBD.txt` input with every reference database
+(as the merge callback does) and, for each merged table, compares:
+- the JSON payload size of ``to_dict('records')`` and of the compact columnar
+  format (base64-packed and plain JSON lists);
+- the time to serialize each payload to JSON;
+- the time for a consumer to go from the JSON text to a DataFrame
+  (``json.loads`` + ``pd.DataFrame`` vs. ``json.loads`` + ``decode_compact``).
+
+Decoded compact tables are checked against the merged table before timing.
+
+Usage:
+    python tests/benchmarking/benchmark_store_codec.py
+"""
+
+import json
+import os
+import sys
+
+import pandas as pd
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, "../../"))
+sys.path.insert(0, BASE_DIR)
+
+from tests.benchmarking.utils.timing_utils import best_of  # noqa: E402
+from utils.core.data_validator import process_content_lines  # noqa: E402
+from utils.core.merge_scheduler import run_reference_merges  # noqa: E402
+from utils.core.store_codec import decode_compact, encode_compact  # noqa: E402
+
+DATA_FILE = os.path.join(BASE_DIR, "data", "genomasBD.txt")
+REPEATS = 5
+
+
+def load_merged_tables():
+    """Returns the merged tables produced for the example input."""
+    with open(DATA_FILE, "r", encoding="utf-8") as f:
+        df_input, error = process_content_lines(f.read())
+    if error:
+        raise ValueError(error)
+    outcome = run_reference_merges(df_input)
+    if outcome.errors:
+        raise RuntimeError(f"Merge failed: {outcome.errors}")
+    return outcome.results
+
+
+def run_benchmark():
+    rows = []
+    for name, merged in load_merged_tables().items():
+        records_json = json.dumps(merged.to_dict("records"), default=str)
+        packed_json = json.dumps(encode_compact(merged))
+        lists_json = json.dumps(encode_compact(merged, pack=False))
+
+        decoded = decode_compact(json.loads(packed_json))
+        pd.testing.assert_frame_equal(
+            decoded.astype(object), merged.reset_index(drop=True).astype(object), check_dtype=False
+        )
+
+        rows.append({
+            "table": name,
+            "rows": len(merged),
+            "records_kb": round(len(records_json) / 1024),
+            "compact_kb": round(len(packed_json) / 1024),
+            "lists_kb": round(len(lists_json) / 1024),
+            "size_ratio": round(len(records_json) / len(packed_json), 1),
+            "records_encode_ms": round(best_of(
+                lambda: json.dumps(merged.to_dict("records"), default=str), repeats=REPEATS), 1),
+            "compact_encode_ms": round(best_of(lambda: json.dumps(encode_compact(merged)), repeats=REPEATS), 1),
+            "records_decode_ms": round(best_of(lambda: pd.DataFrame(json.loads(records_json)), repeats=REPEATS), 1),
+            "compact_decode_ms": round(best_of(lambda: decode_compact(json.loads(packed_json)), repeats=REPEATS), 1),
+            "lists_decode_ms": round(best_of(lambda: decode_compact(json.loads(lists_json)), repeats=REPEATS), 1),
+        })
+
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,32 @@
+"""
+cohort_utils.py
+---------------
+Large synthetic inputs for the benchmark scripts, built from the example
+input `data/genomasBD.txt`.
+
+Functions:
+- build_cohort: Renamed copies of the example samples as one input table.
+"""
+
+import os
+
+from utils.core.compressed_input import load_input_file
+from utils.core.input_batch import concat_input_frames
+
+DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "data", "genomasBD.txt")
+
+
+def build_cohort(copies, distinct=False):
+    """
+    Returns ``copies`` renamed copies (``<sample>_<copy>``) of the example
+    samples, or of their distinct sample/KO pairs when ``distinct``.
+    """
+    df = load_input_file(os.path.normpath(DATA_FILE))
+    if distinct:
+        df = df.drop_duplicates(ignore_index=True)
+    frames = []
+    for copy in range(copies):
+        frame = df.copy()
+        frame["sample"] = frame["sample"].cat.rename_categories(lambda name: f"{name}_{copy}")
+        frames.append(frame)
+    return concat_input_frames(frames)
@@ -0,0 +1,28 @@
+"""
+timing_utils.py
+---------------
+Wall-clock timers shared by the benchmark scripts.
+
+Functions:
+- best_of: Best wall time (ms) of repeated calls to a function.
+- timed: Result and wall time (ms) of one call to a function.
+"""
+
+import time
+
+
+def best_of(func, repeats=5):
+    """Returns the best wall time (ms) of ``repeats`` calls to ``func``."""
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def timed(func, *args):
+    """Returns the result and the wall time (ms) of ``func(*args)``."""
+    t0 = time.perf_counter()
+    result = func(*args)
+    return result, (time.perf_counter() - t0) * 1000
@@ -0,0 +1,170 @@
+"""
+test_aggregate_bundle.py: Unit tests for the precomputed merge aggregates.
+
+This script validates `count_distinct`, `get_aggregate_bundle`,
+`get_aggregate` and `slice_ranking` from `utils.core.aggregate_bundle`: the
+integer-coded distinct counts, the equality of every aggregate with the
+corresponding processing function and the caching per table, under keys the
+client cannot forge.
+
+Dependencies
+------------
+- pytest >= 7.0
+- pandas >= 1.0
+
+Examples
+--------
+$ pytest test_aggregate_bundle.py
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.core import aggregate_bundle
+from utils.core.aggregate_bundle import (
+    count_distinct,
+    get_aggregate,
+    get_aggregate_bundle,
+    slice_ranking,
+)
+from utils.core.store_codec import encode_compact
+from utils.gene_pathway_analysis.distribution_of_ko_in_pathways_processing import count_ko_per_pathway
+from utils.gene_pathway_analysis.gene_counts_across_samples_processing import process_ko_data
+from utils.heatmaps.gene_sample_heatmap_processing import process_gene_sample_data
+from utils.heatmaps.pathway_compound_interaction_processing import process_pathway_data
+from utils.heatmaps.sample_reference_agency_heatmap_processing import process_sample_reference_heatmap
+from utils.rankings.ranking_compounds_by_sample_interaction_processing import process_compound_ranking
+from utils.rankings.ranking_samples_by_compound_interaction_processing import process_sample_ranking
+
+
+@pytest.fixture
+def merged_biorempp():
+    """
+    Provides a small BioRemPP merge result with the columns the aggregates use.
+    """
+    return pd.DataFrame({
+        "sample": ["S1", "S1", "S1", "S2", "S2", "S3", "S3"],
+        "ko": ["K00001", "K00002", "K00002", "K00001", "K00003", "K00003", "K00004"],
+        "genesymbol": ["adh", "ald", "ald", "adh", "cat", "cat", "xyl"],
+        "compoundname": ["Toluene", "Benzene", "Phenol", "Toluene", "Phenol", "Phenol", "Lead"],
+        "compoundclass": ["Aromatic", "Aromatic", "Aromatic", "Aromatic", "Aromatic", "Aromatic", "Metal"],
+        "referenceAG": ["EPA", "EPA", "IARC", "EPA", "IARC", "EPA", "ATSDR"],
+    })
+
+
+@pytest.fixture(autouse=True)
+def empty_bundle_cache():
+    """
+    Starts every test with an empty bundle cache.
+    """
+    aggregate_bundle._bundle_cache.clear()
+    yield
+    aggregate_bundle._bundle_cache.clear()
+
+
+def assert_same_values(result, expected):
+    """
+    Compares two tables by value, ignoring categorical dtypes and the index.
+    """
+    pd.testing.assert_frame_equal(
+        result.astype(object).reset_index(drop=True),
+        expected.astype(object).reset_index(drop=True),
+    )
+
+
+@pytest.mark.parametrize("categorical", [False, True])
+def test_count_distinct_matches_groupby_nunique(categorical):
+    """
+    Tests that missing keys are dropped and missing values are not counted.
+    """
+    df = pd.DataFrame({
+        "sample": ["S2", "S1", "S2", None, "S1", "S2", "S3"],
+        "group": ["b", "a", "a", "a", "a", "b", "a"],
+        "ko": ["K1", "K1", "K2", "K3", "K1", None, None],
+    })
+    if categorical:
+        df = df.astype("category")
+
+    result = count_distinct(df, ["sample", "group"], "ko", "n")
+    expected = df.groupby(["sample", "group"], observed=True)["ko"].nunique().reset_index(name="n")
+
+    assert_same_values(result, expected)
+    assert result["n"].dtype == np.int64
+
+
+def test_biorempp_aggregates_match_processing(merged_biorempp):
+    """
+    Tests the BioRemPP aggregates against the processing functions.
+    """
+    df = merged_biorempp
+    bundle = get_aggregate_bundle(df.to_dict("records"), "biorempp")
+
+    assert_same_values(bundle["ko_count"], process_ko_data(df))
+    assert_same_values(bundle["sample_ranking"], process_sample_ranking(df))
+    for compound_class in df["compoundclass"].unique():
+        assert_same_values(
+            slice_ranking(bundle["compound_ranking"], "compoundclass", compound_class, "num_samples"),
+            process_compound_ranking(df[df["compoundclass"] == compound_class]),
+        )
+    heatmap = bundle["sample_reference"]
+    expected = process_sample_reference_heatmap(df)
+    assert list(heatmap.index) == list(expected.index)
+    assert list(heatmap.columns) == list(expected.columns)
+    np.testing.assert_array_equal(heatmap.to_numpy(), expected.to_numpy())
+
+
+def test_kegg_and_hadeg_aggregates_match_processing(get_mock_KEGG, get_mock_HADEG):
+    """
+    Tests the KEGG and HADEG aggregates against the processing functions.
+    """
+    kegg = get_aggregate_bundle(get_mock_KEGG, "kegg")
+    hadeg = get_aggregate_bundle(get_mock_HADEG, "hadeg")
+
+    assert_same_values(kegg["ko_per_pathway"], count_ko_per_pathway(get_mock_KEGG))
+    assert_same_values(hadeg["pathway_data"], process_pathway_data(get_mock_HADEG))
+    assert_same_values(hadeg["gene_sample"], process_gene_sample_data(get_mock_HADEG))
+
+
+def test_bundle_is_computed_once_per_content(get_mock_KEGG):
+    """
+    Tests that equal payloads share the cached bundle.
+    """
+    payload = encode_compact(get_mock_KEGG)
+    first = get_aggregate_bundle(payload, "kegg")
+    second = get_aggregate_bundle(encode_compact(get_mock_KEGG.copy()), "kegg")
+
+    assert first is second
+    assert aggregate_bundle._bundle_cache.hits == 1
+
+
+def test_forged_hash_does_not_poison_bundle(merged_biorempp):
+    """
+    Tests that a payload carrying another table's hash gets its own bundle.
+    """
+    payload = encode_compact(merged_biorempp)
+    forged = dict(encode_compact(merged_biorempp.assign(sample="EVIL", ko="K99999")), hash=payload["hash"])
+
+    assert get_aggregate(forged, "biorempp", "ko_count")["sample"].tolist() == ["EVIL"]
+    assert get_aggregate(payload, "biorempp", "ko_count")["ko_count"].tolist() == [2, 2, 2]
+
+
+def test_get_aggregate_returns_read_only_copy(merged_biorempp):
+    """
+    Tests that callbacks get a copy they can extend but not modify in place.
+    """
+    ko_count = get_aggregate(merged_biorempp, "biorempp", "ko_count")
+    ko_count["extra"] = 1
+
+    with pytest.raises(ValueError):
+        ko_count.iloc[0, ko_count.columns.get_loc("ko_count")] = 0
+    assert "extra" not in get_aggregate(merged_biorempp, "biorempp", "ko_count").columns
+
+
+def test_unknown_tables_have_no_aggregates(get_mock_ToxCSM):
+    """
+    Tests that tables without registered aggregates give an empty bundle.
+    """
+    assert get_aggregate_bundle(get_mock_ToxCSM, "toxcsm") == {}
+    with pytest.raises(KeyError):
+        get_aggregate(get_mock_ToxCSM, "toxcsm", "ko_count")
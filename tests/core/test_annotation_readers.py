@@ -0,0 +1,129 @@
+"""
+test_annotation_readers.py: Unit tests for the annotation table readers.
+
+This script validates `read_kofamkoala`, `read_eggnog_annotations`,
+`detect_annotation_format` and `annotation_sample_name` from
+`utils.core.annotation_readers`, and annotation uploads through
+`ingest_upload`: KO extraction, multi-KO cells, thresholds, compressed files
+and lines split between read pieces.
+
+Dependencies
+------------
+- pytest >= 7.0
+- pandas >= 1.0
+
+Examples
+--------
+$ pytest test_annotation_readers.py
+"""
+
+import base64
+import gzip
+import io
+
+import pandas as pd
+import pytest
+
+from utils.core import compressed_input
+from utils.core.annotation_readers import (
+    annotation_sample_name,
+    detect_annotation_format,
+    read_eggnog_annotations,
+    read_kofamkoala,
+)
+from utils.core.upload_handlers import ingest_upload
+from utils.core.vocabulary import KO_VOCABULARY
+
+KOFAM_DETAIL = (
+    "#  gene name           KO     thrshld  score   E-value KO definition\n"
+    "#  ------------------- ------ ------- ------ --------- ---------------------\n"
+    "*  gene_1              K00001  300.00  410.2  1.2e-120 alcohol dehydrogenase\n"
+    "   gene_1              K00002  500.00  120.5   3.4e-30 alcohol dehydrogenase (NADP+)\n"
+    "*  gene_2              K00003  100.00  150.0   2.0e-40 homoserine dehydrogenase\n"
+    "   gene_3              K00004       -   90.0   1.0e-20 no threshold\n"
+)
+
+KOFAM_TSV = (
+    "#\tgene name\tKO\tthrshld\tscore\tE-value\t\"KO definition\"\n"
+    "*\tgene_1\tK00001\t300.00\t410.2\t1.2e-120\t\"alcohol dehydrogenase\"\n"
+    "\tgene_1\tK00002\t500.00\t120.5\t3.4e-30\t\"alcohol dehydrogenase (NADP+)\"\n"
+    "*\tgene_2\tK00003\t100.00\t150.0\t2.0e-40\t\"homoserine dehydrogenase\"\n"
+)
+
+EGGNOG = (
+    "## emapper-2.1.9\n"
+    "## command: emapper.py -i bin1.faa\n"
+    "#query\tseed_ortholog\tevalue\tscore\teggNOG_OGs\tDescription\tKEGG_ko\tKEGG_Pathway\n"
+    "gene_1\t511145.b0001\t1e-100\t350.0\tCOG1\tdehydrogenase #1\tko:K00001,ko:K00002\tmap00010\n"
+    "gene_2\t511145.b0002\t1e-05\t40.0\tCOG2\t-\tko:K00003\t-\n"
+    "gene_3\t511145.b0003\t1e-50\t200.0\tCOG3\t-\t-\t-\n"
+    "## 3 queries scanned\n"
+)
+
+
+def kos(df: pd.DataFrame) -> list:
+    """
+    Returns the KO labels of a parsed table.
+    """
+    return df["ko"].astype(str).tolist()
+
+
+@pytest.mark.parametrize("table", [KOFAM_DETAIL, KOFAM_TSV])
+def test_kofamkoala_significant_hits(table):
+    """
+    Tests that only flagged hits are kept by default, in the shared vocabulary.
+    """
+    df = read_kofamkoala(io.BytesIO(table.encode()), sample="bin1")
+
+    assert kos(df) == ["K00001", "K00003"]
+    assert df["sample"].astype(str).unique().tolist() == ["bin1"]
+    assert KO_VOCABULARY.is_shared(df["ko"].dtype)
+
+
+def test_kofamkoala_thresholds():
+    """
+    Tests the score and E-value thresholds on all hits.
+    """
+    table = io.BytesIO(KOFAM_DETAIL.encode())
+    assert kos(read_kofamkoala(table, significant_only=False, min_score=100)) == ["K00001", "K00002", "K00003"]
+
+    table = io.BytesIO(KOFAM_DETAIL.encode())
+    assert kos(read_kofamkoala(table, significant_only=False, max_evalue=1e-35)) == ["K00001", "K00003"]
+
+
+def test_eggnog_multi_ko_cells_and_thresholds(tmp_path, monkeypatch):
+    """
+    Tests multi-KO cells, thresholds and a gzip file read in small pieces.
+    """
+    monkeypatch.setattr(compressed_input, "_READ_BYTES", 16)
+    path = tmp_path / "bin1.emapper.annotations.gz"
+    path.write_bytes(gzip.compress(EGGNOG.encode()))
+
+    df = read_eggnog_annotations(str(path))
+    assert kos(df) == ["K00001", "K00002", "K00003"]
+    assert df["sample"].astype(str).unique().tolist() == ["bin1"]
+    assert kos(read_eggnog_annotations(str(path), max_evalue=1e-10)) == ["K00001", "K00002"]
+
+
+def test_format_detection_and_sample_names():
+    """
+    Tests the recognition of annotation tables and the default sample names.
+    """
+    assert detect_annotation_format(KOFAM_DETAIL.encode()) == "kofamkoala"
+    assert detect_annotation_format(KOFAM_TSV.encode()) == "kofamkoala"
+    assert detect_annotation_format(EGGNOG.encode()) == "eggnog"
+    assert detect_annotation_format(b">Sample1\nK00001\n") is None
+    assert annotation_sample_name("data/bin1.emapper.annotations.gz") == "bin1"
+    assert annotation_sample_name("bin2_kofam.txt") == "bin2_kofam"
+
+
+def test_annotation_upload_is_parsed():
+    """
+    Tests that `ingest_upload` reads an eggNOG-mapper file as one sample.
+    """
+    contents = "data:application/octet-stream;base64," + base64.b64encode(EGGNOG.encode()).decode("ascii")
+    df, error, warnings = ingest_upload(contents, "bin1.emapper.annotations")
+
+    assert error is None
+    assert kos(df) == ["K00001", "K00002", "K00003"]
+    assert df["sample"].astype(str).unique().tolist() == ["bin1"]
@@ -0,0 +1,111 @@
+"""
+test_batch_pipeline.py: Unit tests for the headless batch pipeline.
+
+This script validates `collect_inputs`, `run_pipeline` and the command-line
+entry point `main` from `utils.core.batch_pipeline`: directories and glob
+patterns expand to input files, every input gets its merged tables and
+aggregations written as CSV files, a bad input is reported in the summary
+without stopping the batch, and `--combine` analyses all inputs together.
+
+Dependencies
+------------
+- pytest >= 7.0
+- pandas >= 1.0
+
+Examples
+--------
+$ pytest test_batch_pipeline.py
+"""
+
+import gzip
+
+import pandas as pd
+import pytest
+
+from utils.core.aggregate_bundle import build_aggregate_bundle
+from utils.core.batch_pipeline import collect_inputs, main, run_pipeline
+from utils.core.compressed_input import load_input_file
+from utils.core.data_processing import merge_input_with_database
+
+GENOMES = {
+    "genome_a.txt": b">GenomeA\nK00001\nK00002\nK00003\nK00004\nK00005\nK00006\n",
+    "genome_b.txt.gz": gzip.compress(b">GenomeB\nK00002\nK00004\nK00006\nK00008\nK00010\n"),
+}
+
+
+@pytest.fixture
+def input_dir(tmp_path):
+    """
+    Provides a directory of valid inputs, an invalid input and a file that is
+    not an input.
+    """
+    directory = tmp_path / "inputs"
+    directory.mkdir()
+    for name, content in GENOMES.items():
+        (directory / name).write_bytes(content)
+    (directory / "bad.txt").write_bytes(b">GenomeX\nnot a KO\n")
+    (directory / "notes.md").write_text("not an input")
+    return directory
+
+
+def test_collect_inputs_expands_directories_and_globs(input_dir):
+    """
+    Tests directory and glob expansion, ordering and deduplication.
+    """
+    assert collect_inputs([str(input_dir)]) == [
+        str(input_dir / name) for name in ("bad.txt", "genome_a.txt", "genome_b.txt.gz")
+    ]
+    assert collect_inputs([str(input_dir / "genome_*"), str(input_dir / "genome_a.txt")]) == [
+        str(input_dir / "genome_a.txt"), str(input_dir / "genome_b.txt.gz"),
+    ]
+    with pytest.raises(FileNotFoundError):
+        collect_inputs([str(input_dir / "*.npz")])
+
+
+def test_run_pipeline_tables():
+    """
+    Tests that the pipeline gives the merged tables, the aggregate bundles and
+    the extra aggregations.
+    """
+    input_df = load_input_file("data/sample_data.txt")
+    tables = run_pipeline(input_df, include_merged=False)
+
+    assert "biorempp" not in tables
+    biorempp = merge_input_with_database(input_df)
+    for name, df in build_aggregate_bundle(biorempp, "biorempp").items():
+        pd.testing.assert_frame_equal(tables[name], df)
+    assert len(tables["sample_clustering"]) == input_df["sample"].nunique() - 1
+    assert tables["sample_ko_pairs"].duplicated().sum() == 0
+    assert set(tables["enzyme_activity"].columns) == {"sample", "enzyme_activity", "unique_ko_count"}
+
+
+def test_main_writes_tables_per_input(input_dir, tmp_path):
+    """
+    Tests a batch on a process pool with a bad input.
+    """
+    output = tmp_path / "results"
+    status = main([str(input_dir), "-o", str(output), "--jobs", "2"])
+
+    assert status == 1
+    summary = pd.read_csv(output / "summary.csv").set_index("input")
+    assert summary["error"].notna().tolist() == [True, False, False]
+    assert "Invalid format at line 2" in summary.loc[str(input_dir / "bad.txt"), "error"]
+
+    for name, sample in (("genome_a", "GenomeA"), ("genome_b", "GenomeB")):
+        ko_count = pd.read_csv(output / name / "ko_count.csv")
+        assert ko_count["sample"].tolist() == [sample]
+        assert (output / name / "biorempp.csv").exists()
+        assert not (output / name / "sample_clustering.csv").exists()
+
+
+def test_main_combines_inputs(input_dir, tmp_path):
+    """
+    Tests `--combine` and `--aggregates-only`.
+    """
+    output = tmp_path / "results"
+    status = main([str(input_dir / "genome_*"), "-o", str(output), "--combine", "--aggregates-only"])
+
+    assert status == 0
+    assert sorted(pd.read_csv(output / "ko_count.csv")["sample"]) == ["GenomeA", "GenomeB"]
+    assert len(pd.read_csv(output / "sample_clustering.csv")) == 1
+    assert not (output / "biorempp.csv").exists()
@@ -0,0 +1,146 @@
+"""
+test_columnar_input.py: Unit tests for the columnar sample/KO inputs.
+
+This script validates `columnar_format`, `parse_columnar_pieces` and
+`read_columnar_file` from `utils.core.columnar_input`, the headless
+`load_input_file` from `utils.core.compressed_input`, and columnar uploads
+through `ingest_upload`: tab-separated, `.npz` and Parquet pairs give the
+table of the text format, and invalid pairs are reported by row.
+
+Dependencies
+------------
+- pytest >= 7.0
+- pandas >= 1.0
+- numpy >= 1.20
+
+Examples
+--------
+$ pytest test_columnar_input.py
+"""
+
+import base64
+import gzip
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.core import compressed_input
+from utils.core.columnar_input import columnar_format, read_columnar_file
+from utils.core.compressed_input import load_input_file, parse_input_file
+from utils.core.data_validator import parse_content_bytes
+from utils.core.upload_handlers import ingest_upload
+from utils.core.vocabulary import KO_VOCABULARY
+
+CONTENT = b">Sample2\nK00001\nK00002\nK00003\n>Sample1\nK00001\nK00006\n>Sample2\nK00007\n"
+
+SAMPLES = ["Sample2", "Sample2", "Sample2", "Sample1", "Sample1", "Sample2"]
+KOS = ["K00001", "K00002", "K00003", "K00001", "K00006", "K00007"]
+
+TSV = ("Sample\tgene\tKO\n" + "".join(
+    f"{sample}\tgene_{i}\t{ko}\n" for i, (sample, ko) in enumerate(zip(SAMPLES, KOS))
+)).encode()
+
+
+def npz_archive(**arrays) -> bytes:
+    """
+    Returns a `.npz` archive of the given arrays.
+    """
+    buffer = io.BytesIO()
+    np.savez(buffer, **arrays)
+    return buffer.getvalue()
+
+
+def test_columnar_format_from_file_name():
+    """
+    Tests the binary columnar formats given by the file suffix.
+    """
+    assert columnar_format("pairs.npz") == "npz"
+    assert columnar_format("PAIRS.PARQUET") == "parquet"
+    assert columnar_format("pairs.tsv") is None
+
+
+@pytest.mark.parametrize("compression", [None, "gzip"])
+def test_tsv_pairs_parse_like_text(compression, monkeypatch):
+    """
+    Tests that a tab-separated table, read in small pieces, gives the text table.
+    """
+    monkeypatch.setattr(compressed_input, "_READ_BYTES", 7)
+    content = gzip.compress(TSV) if compression else TSV
+    parsed = parse_input_file(io.BytesIO(content), compression)
+
+    pd.testing.assert_frame_equal(parsed.df, parse_content_bytes(CONTENT).df)
+    assert (parsed.sample_count, parsed.ko_count) == (2, 6)
+
+
+@pytest.mark.parametrize("dtype", ["U", "S", object])
+def test_npz_pairs_parse_like_text(dtype):
+    """
+    Tests `.npz` archives of text, byte string and object arrays.
+    """
+    archive = npz_archive(sample=np.array(SAMPLES, dtype=dtype), ko=np.array(KOS, dtype=dtype))
+    if dtype is object:
+        with pytest.raises(ValueError):
+            read_columnar_file(io.BytesIO(archive), "npz")
+        return
+
+    df = read_columnar_file(io.BytesIO(archive), "npz").df
+    pd.testing.assert_frame_equal(df, parse_content_bytes(CONTENT).df)
+    assert KO_VOCABULARY.is_shared(df["ko"].dtype)
+
+
+def test_invalid_pairs_are_reported_by_row():
+    """
+    Tests that an invalid KO or an empty sample stops parsing at its row,
+    without adding the label to the shared vocabulary.
+    """
+    parsed = read_columnar_file(io.BytesIO(npz_archive(
+        sample=np.array(["Sample1", "Sample1", "Sample1"]), ko=np.array(["K00001", "Kxyz01", "K00002"]),
+    )), "npz")
+    assert (parsed.df, parsed.error_line, parsed.ko_count) == (None, 2, 1)
+    assert "Kxyz01" not in KO_VOCABULARY
+
+    parsed = parse_input_file(io.BytesIO(b"sample\tko\nSample1\tK00001\n \tK00002\n"))
+    assert parsed.error_message().startswith("Invalid sample/KO pair at row 2")
+
+    with pytest.raises(ValueError, match="no ko column"):
+        read_columnar_file(io.BytesIO(npz_archive(sample=np.array(SAMPLES))), "npz")
+
+
+def test_columnar_uploads_and_headless_loading(tmp_path):
+    """
+    Tests `.npz` and tab-separated uploads and `load_input_file` on paths.
+    """
+    archive = npz_archive(sample=np.array(SAMPLES), ko=np.array(KOS))
+    expected = parse_content_bytes(CONTENT).df
+
+    contents = "data:application/octet-stream;base64," + base64.b64encode(archive).decode("ascii")
+    df, error, warnings = ingest_upload(contents, "pairs.npz")
+    assert error is None
+    pd.testing.assert_frame_equal(df, expected)
+
+    invalid = TSV.replace(b"K00006", b"K0000X")
+    contents = "data:text/tab-separated-values;base64," + base64.b64encode(invalid).decode("ascii")
+    assert ingest_upload(contents, "pairs.tsv")[1].startswith("Invalid sample/KO pair at row 5")
+
+    (tmp_path / "pairs.npz").write_bytes(archive)
+    (tmp_path / "pairs.tsv.gz").write_bytes(gzip.compress(TSV))
+    (tmp_path / "bins.txt").write_bytes(CONTENT)
+    for name in ("pairs.npz", "pairs.tsv.gz", "bins.txt"):
+        pd.testing.assert_frame_equal(load_input_file(tmp_path / name), expected)
+
+    (tmp_path / "bad.txt").write_bytes(b">Sample1\nnot a KO\n")
+    with pytest.raises(ValueError, match="Invalid format at line 2"):
+        load_input_file(tmp_path / "bad.txt")
+
+
+def test_parquet_pairs_parse_like_text(tmp_path):
+    """
+    Tests Parquet files, when a Parquet engine is installed.
+    """
+    pytest.importorskip("pyarrow")
+    path = tmp_path / "pairs.parquet"
+    pd.DataFrame({"sample": SAMPLES, "KO": KOS}).to_parquet(path)
+
+    pd.testing.assert_frame_equal(read_columnar_file(str(path), "parquet").df, parse_content_bytes(CONTENT).df)
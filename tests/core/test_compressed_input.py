@@ -0,0 +1,110 @@
+"""
+test_compressed_input.py: Unit tests for the streaming decompression of inputs.
+
+This script validates `input_compression`, `iter_input_pieces` and
+`parse_input_file` from `utils.core.compressed_input`, and compressed uploads
+through `ingest_upload`: gzip, bz2, xz and multi-member zip files parse like
+the plain text, corrupt files and decompression bombs are rejected.
+
+Dependencies
+------------
+- pytest >= 7.0
+- pandas >= 1.0
+
+Examples
+--------
+$ pytest test_compressed_input.py
+"""
+
+import base64
+import bz2
+import gzip
+import io
+import lzma
+import zipfile
+
+import pandas as pd
+import pytest
+
+from utils.core import compressed_input
+from utils.core.compressed_input import input_compression, iter_input_pieces, parse_input_file
+from utils.core.data_validator import parse_content_bytes
+from utils.core.upload_handlers import ingest_upload
+
+CONTENT = b">Sample1\nK00001\nK00002\nK00003\nK00004\nK00005\n>Sample2\nK00001\nK00006\nK00007\nK00008\nK00009\n"
+
+COMPRESSORS = {
+    "gzip": gzip.compress,
+    "bz2": bz2.compress,
+    "xz": lzma.compress,
+}
+
+
+def zip_archive(members: dict) -> bytes:
+    """
+    Returns a zip archive holding the given name -> content members.
+    """
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, content in members.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+def test_input_compression_from_file_name():
+    """
+    Tests the compression given by the file suffix.
+    """
+    assert input_compression("bins.txt") is None
+    assert input_compression("bins.txt.gz") == "gzip"
+    assert input_compression("BINS.BZ2") == "bz2"
+    assert input_compression("bins.xz") == "xz"
+    assert input_compression("bins.zip") == "zip"
+
+
+@pytest.mark.parametrize("compression", sorted(COMPRESSORS))
+def test_compressed_files_parse_like_plain_text(compression, monkeypatch):
+    """
+    Tests that streamed decompression, in small pieces, gives the plain table.
+    """
+    monkeypatch.setattr(compressed_input, "_READ_BYTES", 7)
+    parsed = parse_input_file(io.BytesIO(COMPRESSORS[compression](CONTENT)), compression)
+
+    pd.testing.assert_frame_equal(parsed.df, parse_content_bytes(CONTENT).df)
+
+
+def test_zip_members_are_parsed_in_order():
+    """
+    Tests that zip members are concatenated, skipping directories and metadata.
+    """
+    first, second = CONTENT.split(b">Sample2")
+    archive = zip_archive({
+        "bins/a.txt": first.rstrip(b"\n"),
+        "bins/b.txt": b">Sample2" + second,
+        "__MACOSX/bins/._a.txt": b"\x00\x01",
+    })
+    parsed = parse_input_file(io.BytesIO(archive), "zip")
+
+    pd.testing.assert_frame_equal(parsed.df, parse_content_bytes(CONTENT).df)
+
+
+def test_corrupt_and_oversized_content_is_rejected():
+    """
+    Tests the errors on corrupt files and beyond the decompressed size limit.
+    """
+    with pytest.raises(ValueError, match="Could not decompress"):
+        parse_input_file(io.BytesIO(gzip.compress(CONTENT)[:20]), "gzip")
+    with pytest.raises(ValueError, match="exceeds"):
+        list(iter_input_pieces(io.BytesIO(gzip.compress(CONTENT * 100)), "gzip", max_bytes=1024))
+
+
+def test_compressed_upload_is_accepted():
+    """
+    Tests that `ingest_upload` accepts a gzip data URI with a binary content type.
+    """
+    contents = "data:application/gzip;base64," + base64.b64encode(gzip.compress(CONTENT)).decode("ascii")
+    df, error, warnings = ingest_upload(contents, "bins.txt.gz")
+
+    assert error is None
+    assert len(df) == 10
+    assert ingest_upload(contents, "bins.rar")[1].startswith("Apenas arquivos .txt")
@@ -35,11 +35,16 @@ import os
 import pandas as pd
 import pytest
 from utils.core.data_processing import (
+    get_indexed_reference,
+    get_reference_incidence,
     merge_input_with_database,
     merge_input_with_database_hadegDB,
     merge_with_kegg,
     merge_with_toxcsm,
+    preload_reference_databases,
 )
+from utils.core.incidence import row_counts
+from utils.core.reference_specs import get_reference_spec
 
 class DummyOptimize:
     """Dummy optimize_dtypes for patching if needed."""
@@ -240,3 +245,77 @@ def test_merge_with_toxcsm_missing_required_column(tmp_path, get_mock_ToxCSM, mo
     monkeypatch.setattr("utils.core.data_processing.optimize_toxcsm_dtypes", DummyOptimize())
     with pytest.raises(KeyError):
         merge_with_toxcsm(input_df, str(db_path))
+
+def test_merge_input_with_database_projection(tmp_path):
+    """
+    Test merges projected on some columns, with and without distinct rows.
+
+    Parameters
+    ----------
+    tmp_path : pathlib.Path
+        Temporary directory for test files.
+
+    Returns
+    -------
+    None
+
+    Validates
+    ---------
+    - Only the projected columns are returned, in the requested order.
+    - Distinct projections equal the deduplicated projection of the full merge.
+    - Unknown projected columns raise KeyError.
+    """
+    db_path = tmp_path / "database.csv"
+    pd.DataFrame({
+        "ko": ["K00001", "K00001", "K00002", "K00003"],
+        "genesymbol": ["adh", "adh", "alk", "xyl"],
+        "genename": ["alcohol dehydrogenase", "alcohol dehydrogenase", "alkane monooxygenase", "xylene"],
+        "cpd": ["C1", "C2", "C1", "C3"],
+        "compoundname": ["Lead", "Lead", "Toluene", "Xylene"],
+    }).to_csv(db_path, sep=";", index=False, encoding="utf-8")
+    input_df = pd.DataFrame({
+        "sample": ["S1", "S1", "S2", "S2", "S2"],
+        "ko": ["K00001", "K00002", "K00001", "K00002", "K00009"],
+    })
+    full = merge_input_with_database(input_df, str(db_path))
+
+    for columns in (["genesymbol", "compoundname"], ["sample", "ko", "compoundname"]):
+        projected = merge_input_with_database(input_df, str(db_path), columns=columns)
+        pd.testing.assert_frame_equal(projected, full[columns])
+        distinct = merge_input_with_database(input_df, str(db_path), columns=columns, distinct=True)
+        pd.testing.assert_frame_equal(distinct, full[columns].drop_duplicates(ignore_index=True))
+        assert len(distinct) < len(full)
+
+    with pytest.raises(KeyError):
+        merge_input_with_database(input_df, str(db_path), columns=["pathname"])
+
+
+@pytest.mark.parametrize("name, column", [("biorempp", "compoundname"), ("kegg", "pathname"), ("hadeg", "Pathway")])
+def test_reference_incidence_is_precompiled(name, column):
+    """
+    Test the key x entity incidence matrices of the registered databases.
+
+    Parameters
+    ----------
+    name : str
+        Registered database.
+    column : str
+        Entity column.
+
+    Returns
+    -------
+    None
+
+    Validates
+    ---------
+    - Preloading builds the matrix once; later calls share it.
+    - Entities per key equal the distinct values per key of the database.
+    """
+    preload_reference_databases()
+    incidence = get_reference_incidence(name, column)
+    assert get_reference_incidence(name, column) is incidence
+
+    reference_df, _ = get_indexed_reference(name)
+    spec = get_reference_spec(name)
+    expected = reference_df.groupby(spec.key, observed=True)[column].nunique()
+    assert row_counts(incidence).loc[expected.index].tolist() == expected.tolist()
@@ -38,6 +38,7 @@ import pytest
 from utils.core.data_validator import process_content_lines, decode_content_if_base64
 import pandas as pd
 from utils.core.data_validator import validate_and_process_input, process_content_lines, decode_content_if_base64
+from utils.core.data_validator import ContentParser, decode_content_bytes, parse_content_bytes
 
 # -------------------- process_content_lines Tests --------------------
 
@@ -386,6 +387,160 @@ def test_process_content_lines_with_irrelevant_lines(get_mock_ToxCSM):
         assert error is not None
         assert "Invalid format" in error
 
+def test_process_content_lines_error_message_and_line_number():
+    """
+    Tests that the first invalid line is reported with its stripped text and number.
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    None
+        Asserts the exact error message, counting blank lines.
+    """
+    content = ">Sample1\nK00001\n\n  Bad line \nK0000X"
+    df, error = process_content_lines(content)
+    assert df is None
+    assert error == (
+        "Invalid format at line 4: 'Bad line'. "
+        "Expected '>' for sample ID or 'Kxxxxx' for KO entries."
+    )
+
+
+def test_process_content_lines_ko_before_first_header_line_number():
+    """
+    Tests that a KO line before any sample header is reported at its own line.
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    None
+        Asserts the line number of the orphan KO entry.
+    """
+    df, error = process_content_lines("\n\nK00001\n>Sample1\nK00002")
+    assert df is None
+    assert error.startswith("Invalid format at line 1: 'K00001'.")
+
+
+def test_process_content_lines_mixed_line_forms():
+    """
+    Tests CRLF line endings, padded lines, leading zeros and long identifiers.
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    None
+        Asserts the parsed rows and the categorical output columns.
+    """
+    content = ">S2\r\nK1\r\nK001\r\n  K00002  \r\n> S1 \r\nK0000000000000000000001\r\nK001"
+    df, error = process_content_lines(content)
+    assert error is None
+    assert df.astype(object).values.tolist() == [
+        ['S2', 'K1'],
+        ['S2', 'K001'],
+        ['S2', 'K00002'],
+        ['S1', 'K0000000000000000000001'],
+        ['S1', 'K001'],
+    ]
+    assert isinstance(df['sample'].dtype, pd.CategoricalDtype)
+    assert list(df['sample'].cat.categories) == ['S1', 'S2']
+    assert isinstance(df['ko'].dtype, pd.CategoricalDtype)
+
+
+def test_parse_content_bytes_counts_and_leading_lines():
+    """
+    Tests the counts and raw line offset gathered by the single-pass parser.
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    None
+        Asserts sample/KO counts, KOs per sample and stripped leading lines.
+    """
+    parsed = parse_content_bytes(b"\n \n>Sample1\nK00001\nK00002\n>Sample1\nK00003\n")
+    assert parsed.error_message() is None
+    assert parsed.sample_count == 2
+    assert parsed.ko_count == 3
+    assert parsed.kos_per_sample == 1.5
+    assert parsed.leading_lines == 2
+    assert list(parsed.df['sample'].cat.categories) == ['Sample1']
+
+
+def test_content_parser_matches_whole_buffer_parse(monkeypatch):
+    """
+    Tests that content fed in pieces, parsed in small blocks, gives the same
+    result as the whole buffer, including pieces that split a character.
+
+    Parameters
+    ----------
+    monkeypatch : pytest.MonkeyPatch
+        Used to shrink the parser block size.
+
+    Returns
+    -------
+    None
+        Asserts equal tables, counts and error lines.
+    """
+    raw = ">Sampleé\nK00001\nK00002\r\n\n>S2\nK00001\n K00003 \n>Sampleé\nK00004".encode("utf-8")
+    expected = parse_content_bytes(raw)
+
+    monkeypatch.setattr("utils.core.data_validator._BLOCK_BYTES", 8)
+    for size in (1, 3, 7, len(raw)):
+        parser = ContentParser()
+        for start in range(0, len(raw), size):
+            parser.feed(raw[start:start + size])
+        parsed = parser.close()
+        pd.testing.assert_frame_equal(parsed.df, expected.df)
+        assert (parsed.sample_count, parsed.ko_count) == (3, 5)
+
+    parser = ContentParser()
+    parser.feed(b">S1\nK00001\n>S2\nK0")
+    parser.feed(b"0002x\nK00003\n")
+    parsed = parser.close()
+    assert parsed.error_line == 4
+    assert parsed.error_kind == 'malformed'
+    assert parsed.structure_line is None
+    assert (parsed.sample_count, parsed.ko_count) == (2, 3)
+
+    parser = ContentParser()
+    parser.feed(b">S1\nK00001x\nK0")
+    parser.feed(b"0002\nBad line\nK00003\n")
+    parsed = parser.close()
+    assert (parsed.error_line, parsed.error_kind) == (2, 'malformed')
+    assert (parsed.structure_line, parsed.structure_kind) == (4, 'invalid')
+    assert (parsed.sample_count, parsed.ko_count) == (1, 2)
+
+
+def test_decode_content_bytes_rejects_invalid_utf8():
+    """
+    Tests that base64 payloads that are not UTF-8 are rejected.
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    None
+        Asserts that a ValueError is raised.
+    """
+    contents = "data:text/plain;base64," + base64.b64encode(b">S\xff\nK00001").decode("ascii")
+    with pytest.raises(ValueError):
+        decode_content_bytes(contents)
+    assert decode_content_bytes(">S\nK00001") == b">S\nK00001"
+
+
 # -------------------- decode_content_if_base64 Tests --------------------
 
 def test_decode_content_if_base64_plain_text():
@@ -0,0 +1,103 @@
+"""
+test_download_tables.py: Unit tests for the CSV download callbacks.
+
+This script validates `download_merged_csv`, `download_hadeg_csv` and
+`download_toxcsm_csv` from `callbacks.core.download_tables`: the 'stored-data'
+store may hold the records of a `dcc.Upload` or the session-store handle of a
+chunked upload or of a multi-file batch, and every download gives the same
+CSV for the same input.
+
+Dependencies
+------------
+- pytest >= 7.0
+- pandas >= 1.0
+- dash >= 2.0
+
+Notes
+-----
+- The module is loaded from its file: importing the `callbacks` package
+  registers every callback of the app (and needs all of its dependencies).
+
+Examples
+--------
+$ pytest test_download_tables.py
+"""
+
+import base64
+import importlib.util
+import io
+import os
+
+import pandas as pd
+import pytest
+
+from utils.core.session_store import SessionStore
+from utils.core.streaming_upload import StreamingUploads
+from utils.core.upload_handlers import handle_multiple_uploads
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+GENOMES = {
+    "genome_a.txt": b">GenomeA\nK00019\nK00055\nK00128\nK00141\nK00152\n",
+    "genome_b.txt": b">GenomeB\nK00128\nK00362\nK00363\nK00382\nK00406\n",
+}
+
+
+def load_download_tables():
+    """
+    Loads `callbacks/core/download_tables.py` without the `callbacks` package.
+    """
+    path = os.path.join(BASE_DIR, "callbacks", "core", "download_tables.py")
+    spec = importlib.util.spec_from_file_location("download_tables_under_test", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def data_uri(content: bytes) -> str:
+    """
+    Returns the data URI of a text upload.
+    """
+    return "data:text/plain;base64," + base64.b64encode(content).decode("ascii")
+
+
+@pytest.fixture
+def session_store(tmp_path, monkeypatch):
+    """
+    Provides a session store in a temporary directory.
+    """
+    monkeypatch.setattr("utils.core.session_store._store", SessionStore(spill_dir=str(tmp_path / "store")))
+
+
+@pytest.fixture
+def records():
+    """
+    Provides the records a `dcc.Upload` of both genomes puts in 'stored-data'.
+    """
+    return [
+        {"sample": line[1:], "ko": ko}
+        for content in GENOMES.values()
+        for line, *kos in [content.decode().split()]
+        for ko in kos
+    ]
+
+
+@pytest.mark.parametrize("name", ["download_merged_csv", "download_hadeg_csv", "download_toxcsm_csv"])
+def test_downloads_accept_session_store_handles(session_store, tmp_path, records, name):
+    """
+    Tests each download with the handle of a chunked upload and of a
+    multi-file batch, against the records of the same input.
+    """
+    download = getattr(load_download_tables(), name)
+
+    uploads = StreamingUploads(upload_dir=str(tmp_path / "uploads"))
+    upload_id = uploads.create("genomes.txt")
+    uploads.append(upload_id, 0, io.BytesIO(b"".join(GENOMES.values())))
+    streamed, error, _ = uploads.complete(upload_id)
+    batch, disabled, _, _ = handle_multiple_uploads([data_uri(c) for c in GENOMES.values()], list(GENOMES))
+    assert error is None and not disabled
+
+    expected = download(1, records)
+    assert set(pd.read_csv(io.StringIO(expected["content"]))["sample"]) == {"GenomeA", "GenomeB"}
+    assert download(1, streamed) == expected
+    assert download(1, batch) == expected
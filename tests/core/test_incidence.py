@@ -0,0 +1,138 @@
+"""
+test_incidence.py: Unit tests for the sparse incidence matrices.
+
+This script validates `build_incidence`, `get_incidence` and the operations
+of `utils.core.incidence`: the matrix reproduces ``pivot_table`` counts and
+``groupby(...).nunique()`` results, intersections, Jaccard similarities and
+projections through a reference matrix match their set definitions, and the
+matrix of a store payload is built once per table, under keys the client
+cannot forge.
+
+Dependencies
+------------
+- pytest >= 7.0
+- pandas >= 1.0
+- numpy >= 1.20
+- scipy
+
+Examples
+--------
+$ pytest test_incidence.py
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.core import incidence as incidence_module
+from utils.core.store_codec import encode_compact
+from utils.core.incidence import (
+    build_incidence,
+    column_counts,
+    column_memberships,
+    get_incidence,
+    identical_row_groups,
+    intersection_counts,
+    jaccard_similarity,
+    project,
+    row_counts,
+)
+
+
+@pytest.fixture
+def records():
+    """
+    Provides sample/KO records with duplicates, missing values and an
+    unused category.
+    """
+    return pd.DataFrame({
+        "sample": pd.Categorical(
+            ["S2", "S1", "S1", "S1", "S3", "S3", None, "S4"], categories=["S1", "S2", "S3", "S4", "S5"]
+        ),
+        "ko": ["K1", "K1", "K2", "K2", "K1", "K2", "K3", None],
+    })
+
+
+@pytest.mark.parametrize("categorical", [True, False])
+def test_incidence_matches_pivot_and_nunique(records, categorical):
+    """
+    Tests the axes and counts against ``pivot_table`` and ``groupby``.
+    """
+    if not categorical:
+        records = records.astype({"sample": object})
+    incidence = build_incidence(records)
+
+    pivot = records.pivot_table(index="sample", columns="ko", aggfunc="size", fill_value=0, observed=True)
+    expected = records.groupby("sample", observed=True)["ko"].nunique()
+
+    assert incidence.rows.tolist() == ["S1", "S2", "S3", "S4"]
+    assert incidence.columns.tolist() == ["K1", "K2", "K3"]
+    pd.testing.assert_frame_equal(incidence.to_frame().loc[pivot.index, pivot.columns], pivot, check_names=False)
+    pd.testing.assert_series_equal(row_counts(incidence), expected.rename("ko"))
+    assert column_counts(incidence).tolist() == [3, 2, 0]
+
+
+def test_set_operations(records):
+    """
+    Tests intersections, Jaccard similarities, identical rows and memberships.
+    """
+    incidence = build_incidence(records).select_rows(["S1", "S2", "S3"])
+
+    assert intersection_counts(incidence).to_numpy().tolist() == [[2, 1, 2], [1, 1, 1], [2, 1, 2]]
+    np.testing.assert_allclose(jaccard_similarity(incidence).to_numpy(), [[1, 0.5, 1], [0.5, 1, 0.5], [1, 0.5, 1]])
+    assert identical_row_groups(incidence).tolist() == [0, 1, 0]
+    memberships = column_memberships(incidence)
+    assert memberships.to_dict() == {"K1": ["S1", "S2", "S3"], "K2": ["S1", "S3"]}
+
+
+def test_projection_counts_distinct_entities(records):
+    """
+    Tests a projection through a KO x compound reference matrix.
+    """
+    reference = build_incidence(
+        pd.DataFrame({"ko": ["K1", "K1", "K2", "K9"], "compound": ["C1", "C2", "C2", "C3"]}),
+        "ko", "compound",
+    )
+    projected = project(build_incidence(records), reference)
+
+    merged = records.dropna().merge(
+        pd.DataFrame({"ko": ["K1", "K1", "K2", "K9"], "compound": ["C1", "C2", "C2", "C3"]}), on="ko"
+    )
+    expected = merged.groupby("sample", observed=True)["compound"].nunique()
+    assert projected.columns.tolist() == ["C1", "C2", "C3"]
+    assert row_counts(projected).loc[expected.index].tolist() == expected.tolist()
+    # Entry (S1, C2): reached through K1 and K2
+    assert projected.to_frame().loc["S1", "C2"] == 2
+
+
+def test_store_payload_is_built_once(records, monkeypatch):
+    """
+    Tests that a payload's matrix is cached by content.
+    """
+    calls = []
+
+    def counting_build(df, row, column):
+        calls.append((row, column))
+        return build_incidence(df, row, column)
+
+    monkeypatch.setattr(incidence_module, "build_incidence", counting_build)
+    incidence_module._incidence_cache.clear()
+
+    first = get_incidence(records.to_dict("records"))
+    second = get_incidence(records.to_dict("records"))
+
+    assert first is second
+    assert calls == [("sample", "ko")]
+    assert row_counts(first).tolist() == [2, 1, 2, 0]
+
+
+def test_forged_hash_does_not_poison_matrix(records):
+    """
+    Tests that a payload carrying another table's hash gets its own matrix.
+    """
+    incidence_module._incidence_cache.clear()
+    payload = encode_compact(records)
+    forged = dict(encode_compact(records.assign(sample="EVIL", ko="K99999")), hash=payload["hash"])
+
+    assert get_incidence(forged).rows.tolist() == ["EVIL"]
+    assert get_incidence(payload).rows.tolist() == ["S1", "S2", "S3", "S4"]
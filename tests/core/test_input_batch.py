@@ -0,0 +1,133 @@
+"""
+test_input_batch.py: Unit tests for multi-file input batches.
+
+This script validates `combine_input_batch` and `concat_input_frames` from
+`utils.core.input_batch`, and multi-file uploads through
+`handle_upload_or_example`: files parsed in parallel are combined in order,
+invalid files and files repeating a sample name are reported per file
+without blocking the others.
+
+Dependencies
+------------
+- pytest >= 7.0
+- pandas >= 1.0
+
+Examples
+--------
+$ pytest test_input_batch.py
+"""
+
+import base64
+
+import pandas as pd
+import pytest
+
+from utils.core import upload_handlers
+from utils.core.data_validator import parse_content_bytes
+from utils.core.input_batch import combine_input_batch, concat_input_frames
+from utils.core.session_store import SessionStore, is_store_handle, load_dataframe
+from utils.core.upload_handlers import ingest_upload, ingest_uploads
+from utils.core.vocabulary import KO_VOCABULARY
+
+GENOMES = {
+    "genome_b.txt": b">GenomeB\nK00001\nK00002\nK00003\nK00004\nK00005\n",
+    "genome_a.txt": b">GenomeA\nK00002\nK00006\nK00007\nK00008\nK00009\n",
+    "genome_c.txt": b">GenomeC1\nK00010\nK00011\n>GenomeC2\nK00012\nK00013\nK00014\n",
+}
+
+
+def data_uri(content: bytes) -> str:
+    """
+    Returns the data URI of a text upload.
+    """
+    return "data:text/plain;base64," + base64.b64encode(content).decode("ascii")
+
+
+@pytest.fixture
+def session_store(tmp_path, monkeypatch):
+    """
+    Provides a session store in a temporary directory.
+    """
+    monkeypatch.setattr("utils.core.session_store._store", SessionStore(spill_dir=str(tmp_path)))
+
+
+def test_batch_matches_concatenated_content():
+    """
+    Tests that files parsed in parallel combine into the table of their concatenation.
+    """
+    batch = ingest_uploads([data_uri(content) for content in GENOMES.values()], list(GENOMES), max_workers=3)
+
+    assert batch.errors == []
+    assert batch.accepted == list(GENOMES)
+    assert batch.samples == {"genome_b.txt": 1, "genome_a.txt": 1, "genome_c.txt": 2}
+    pd.testing.assert_frame_equal(batch.df, parse_content_bytes(b"".join(GENOMES.values())).df)
+
+
+def test_bad_files_are_reported_without_blocking_the_others():
+    """
+    Tests per-file errors for invalid content, duplicate samples, exceptions
+    and files without a table.
+    """
+    def parse(contents, filename):
+        if filename == "broken.txt":
+            raise RuntimeError("disk error")
+        if filename == "empty.txt":
+            return None, None, []
+        return ingest_upload(contents, filename)
+
+    items = [
+        ("genome_b.txt", data_uri(GENOMES["genome_b.txt"])),
+        ("invalid.txt", data_uri(b">GenomeX\nnot a KO\n")),
+        ("again_b.txt", data_uri(b">GenomeD\nK00001\n>GenomeB\nK00002\n")),
+        ("broken.txt", data_uri(GENOMES["genome_a.txt"])),
+        ("empty.txt", data_uri(b"")),
+        ("genome_c.txt", data_uri(GENOMES["genome_c.txt"])),
+    ]
+    batch = combine_input_batch(items, parse, max_workers=2)
+    errors = dict(batch.errors)
+
+    assert batch.accepted == ["genome_b.txt", "genome_c.txt"]
+    assert errors["invalid.txt"].startswith("Linha 2:")
+    assert errors["again_b.txt"] == "Amostras duplicadas (já presentes em genome_b.txt): GenomeB"
+    assert errors["broken.txt"] == "disk error"
+    assert errors["empty.txt"] == "Nenhuma amostra encontrada no arquivo."
+    assert batch.df["sample"].astype(str).unique().tolist() == ["GenomeB", "GenomeC1", "GenomeC2"]
+
+
+def test_concat_keeps_the_shared_ko_dtype():
+    """
+    Tests tables encoded at different vocabulary sizes and a plain 'ko' column.
+    """
+    first = parse_content_bytes(b">S1\nK00001\n").df
+    second = parse_content_bytes(b">S2\nK91001\n").df
+    plain = pd.DataFrame({"sample": ["S3"], "ko": ["K91002"]})
+
+    df = concat_input_frames([second, first, plain])
+
+    assert KO_VOCABULARY.is_shared(df["ko"].dtype)
+    assert df.astype(str).values.tolist() == [["S2", "K91001"], ["S1", "K00001"], ["S3", "K91002"]]
+    assert df["sample"].cat.categories.tolist() == ["S1", "S2", "S3"]
+
+
+def test_multiple_upload_is_stored_with_per_file_errors(session_store):
+    """
+    Tests the multi-file branch of `handle_upload_or_example`.
+    """
+    class DummyContext:
+        triggered = [{'prop_id': 'upload-data.contents'}]
+    upload_handlers.dash.callback_context = DummyContext()
+
+    contents = [data_uri(GENOMES["genome_a.txt"]), data_uri(b"K00001\n"), data_uri(GENOMES["genome_b.txt"])]
+    filenames = ["genome_a.txt", "orphan.txt", "genome_b.txt"]
+    stored, disabled, alert, state = upload_handlers.handle_upload_or_example(contents, 0, filenames)
+
+    assert is_store_handle(stored) and not disabled and state == "loaded"
+    assert alert.color == "warning"
+    assert "orphan.txt" in str(alert.children)
+    assert sorted(load_dataframe(stored)["sample"].unique()) == ["GenomeA", "GenomeB"]
+
+    stored, disabled, alert, state = upload_handlers.handle_upload_or_example(
+        [data_uri(b"K00001\n"), data_uri(b"")], 0, ["orphan.txt", "empty.txt"]
+    )
+    assert stored is None and disabled and state == "initial"
+    assert alert.color == "danger"
@@ -0,0 +1,126 @@
+"""
+test_merge_scheduler.py: Unit tests for the concurrent merge DAG.
+
+This script validates `run_merge_dag` and `run_reference_merges` from
+`utils.core.merge_scheduler`: dependency ordering, concurrent execution of
+independent stages, propagation of failures to dependent stages, timing, and
+the KEGG merge on the distinct sample/KO pairs of the BioRemPP result.
+
+Dependencies
+------------
+- pytest >= 7.0
+- pandas >= 1.0
+
+Examples
+--------
+$ pytest test_merge_scheduler.py
+"""
+
+import threading
+
+import pandas as pd
+import pytest
+
+from utils.core.compressed_input import load_input_file
+from utils.core.data_processing import merge_with_reference
+from utils.core.merge_scheduler import MergeStage, run_merge_dag, run_reference_merges
+from utils.gene_pathway_analysis.distribution_of_ko_in_pathways_processing import count_ko_per_pathway
+
+
+def test_dependent_stage_receives_upstream_result():
+    """
+    Tests that a stage receives the result of its dependency.
+    """
+    stages = [
+        MergeStage("a", lambda x: x + 1),
+        MergeStage("b", lambda x: x * 10, depends_on="a"),
+    ]
+    outcome = run_merge_dag(stages, 1)
+
+    assert outcome.results == {"a": 2, "b": 20}
+    assert set(outcome.wall_times) == {"a", "b"}
+    assert all(value >= 0 for value in outcome.cpu_times.values())
+
+
+def test_independent_stages_run_concurrently():
+    """
+    Tests that independent stages overlap: each waits for the other to start.
+    """
+    started = {"a": threading.Event(), "b": threading.Event()}
+
+    def stage(name, other):
+        def func(_):
+            started[name].set()
+            return started[other].wait(timeout=5)
+        return func
+
+    stages = [MergeStage("a", stage("a", "b")), MergeStage("b", stage("b", "a"))]
+    outcome = run_merge_dag(stages, None, max_workers=2)
+
+    assert outcome.results == {"a": True, "b": True}
+
+
+def test_failure_skips_dependent_stages():
+    """
+    Tests that a failed stage skips its whole downstream chain only.
+    """
+    def fail(_):
+        raise ValueError("boom")
+
+    stages = [
+        MergeStage("root", fail),
+        MergeStage("child", lambda x: x, depends_on="root"),
+        MergeStage("grandchild", lambda x: x, depends_on="child"),
+        MergeStage("other", lambda x: "ok"),
+    ]
+    outcome = run_merge_dag(stages, None)
+
+    assert isinstance(outcome.errors["root"], ValueError)
+    assert outcome.skipped == {"child": "root", "grandchild": "root"}
+    assert outcome.results == {"other": "ok"}
+
+
+def test_unknown_dependency_raises():
+    """
+    Tests that a stage depending on a missing stage is reported.
+    """
+    with pytest.raises(ValueError):
+        run_merge_dag([MergeStage("a", lambda x: x, depends_on="missing")], None)
+
+
+def test_run_reference_merges_follows_specs(monkeypatch):
+    """
+    Tests that the reference merges are wired according to the spec dependencies.
+    """
+    calls = []
+
+    def fake_merge(df, name):
+        calls.append(name)
+        return df.assign(**{name: True})
+
+    monkeypatch.setattr("utils.core.merge_scheduler.merge_with_reference", fake_merge)
+    input_df = pd.DataFrame({"sample": ["S1"], "ko": ["K00001"]})
+    outcome = run_reference_merges(input_df)
+
+    assert sorted(calls) == ["biorempp", "hadeg", "kegg", "toxcsm"]
+    assert "biorempp" in outcome.results["toxcsm"].columns
+    assert "biorempp" not in outcome.results["hadeg"].columns
+
+
+def test_kegg_is_merged_on_distinct_sample_ko_pairs():
+    """
+    Tests that KEGG pathways are joined on the distinct sample/KO pairs of the
+    BioRemPP result, with the KO counts of a join on the whole result.
+    """
+    input_df = load_input_file("data/sample_data.txt")
+    outcome = run_reference_merges(input_df, ["kegg"])
+    kegg = outcome.results["kegg"]
+    expanded = merge_with_reference(outcome.results["biorempp"].copy(), "kegg")
+
+    assert list(kegg.columns) == ["sample", "ko", "pathname", "genesymbol"]
+    assert not kegg.duplicated().any()
+    assert len(kegg) < len(expanded)
+    pd.testing.assert_frame_equal(
+        count_ko_per_pathway(kegg).astype(str).sort_values(["sample", "pathname"], ignore_index=True),
+        count_ko_per_pathway(expanded).astype(str).sort_values(["sample", "pathname"], ignore_index=True),
+    )
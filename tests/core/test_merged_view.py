@@ -0,0 +1,143 @@
+"""
+test_merged_view.py: Unit tests for the lazy merged view.
+
+This script validates `MergedView` and `build_merged_view` from
+`utils.core.merged_view`: the view stores only the distinct sample/KO pairs,
+materializes the join of `merge_with_reference` on request, and computes
+distinct combinations, counts read from the incidence matrix products and
+aggregate bundles identical to those of the materialized merged tables.
+
+Dependencies
+------------
+- pytest >= 7.0
+- pandas >= 1.0
+- numpy >= 1.20
+- scipy
+
+Examples
+--------
+$ pytest test_merged_view.py
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.core.aggregate_bundle import build_aggregate_bundle, count_distinct
+from utils.core.compressed_input import load_input_file
+from utils.core.merged_view import MergedView, build_merged_view
+from utils.core.merge_scheduler import run_reference_merges
+from utils.core.reference_index import build_key_index
+
+
+@pytest.fixture(scope="module")
+def input_df():
+    """
+    Provides the parsed sample input.
+    """
+    return load_input_file("data/sample_data.txt")
+
+
+@pytest.fixture(scope="module")
+def full_merge(input_df):
+    """
+    Provides the merged tables of the whole input.
+    """
+    return run_reference_merges(input_df, ["biorempp", "kegg", "hadeg"]).results
+
+
+@pytest.mark.parametrize("name", ["biorempp", "kegg", "hadeg"])
+def test_view_bundle_matches_materialized_bundle(input_df, full_merge, name):
+    """
+    Tests that the aggregates of the view are those of the merged table.
+    """
+    # KEGG is merged on the BioRemPP result, as in the pipeline
+    source = full_merge["biorempp"] if name == "kegg" else input_df
+    view = build_merged_view(source, name)
+    expected = build_aggregate_bundle(full_merge[name], name)
+    bundle = view.aggregate_bundle()
+
+    assert bundle.keys() == expected.keys()
+    for aggregate, df in expected.items():
+        pd.testing.assert_frame_equal(bundle[aggregate], df, obj=aggregate)
+
+
+def test_view_stores_pairs_and_materializes_the_join(input_df, full_merge):
+    """
+    Tests the pairs, the joined row count and `to_frame`.
+    """
+    view = build_merged_view(input_df)
+    merged = full_merge["biorempp"]
+    distinct = merged.drop_duplicates(ignore_index=True)
+
+    assert len(view.pairs) == len(merged[["sample", "ko"]].drop_duplicates())
+    assert len(view) == len(distinct)
+    assert view.columns == list(merged.columns)
+    pd.testing.assert_frame_equal(view.to_frame().astype(str), distinct.astype(str))
+    pd.testing.assert_frame_equal(
+        view.to_frame(["sample", "compoundname"], distinct=True).astype(str),
+        merged[["sample", "compoundname"]].drop_duplicates(ignore_index=True).astype(str),
+    )
+
+
+@pytest.mark.parametrize("columns", [
+    ["sample", "referenceAG", "compoundname"],
+    ["compoundclass", "sample"],
+    ["compoundname", "genesymbol"],
+    ["sample"],
+])
+def test_distinct_combinations_match_the_join(input_df, columns):
+    """
+    Tests the sparse-product and reference-only paths against the materialized join.
+    """
+    view = build_merged_view(input_df)
+
+    def normalized(df):
+        return df.astype(str).sort_values(columns).reset_index(drop=True)
+
+    combinations = view.distinct_combinations(columns)
+    assert list(combinations.columns) == columns
+    pd.testing.assert_frame_equal(normalized(combinations), normalized(view.to_frame(columns, distinct=True)))
+
+
+@pytest.mark.parametrize("by, value", [
+    (["sample"], "compoundname"),
+    (["sample"], "ko"),
+    (["sample", "referenceAG"], "ko"),
+    (["sample"], "enzyme_activity"),
+])
+def test_sample_counts_from_incidence_products(input_df, full_merge, by, value):
+    """
+    Tests the counts read from the sample x entity incidence matrices.
+    """
+    view = build_merged_view(input_df)
+    expected = count_distinct(full_merge["biorempp"], by, value, "n")
+
+    assert view._sample_counts(by, value, "n") is not None
+    pd.testing.assert_frame_equal(view.count_distinct(by, value, "n"), expected)
+
+
+def test_view_keeps_missing_values():
+    """
+    Tests missing samples, unmatched keys and missing reference values.
+    """
+    reference = pd.DataFrame({
+        "ko": ["K1", "K2", "K1", "K3"],
+        "cpd": ["C1", "C2", np.nan, "C1"],
+    })
+    pairs = pd.DataFrame({
+        "sample": pd.Categorical(["S1", "S1", np.nan, "S2", "S2"]),
+        "ko": ["K1", "K2", "K1", "K3", "K9"],
+    })
+    view = MergedView(pairs, reference, build_key_index(reference, "ko"))
+    expected = pd.merge(pairs, reference, on="ko")
+
+    assert len(view.pairs) == 4 and len(view) == len(expected)
+    counts = view.count_distinct(["sample"], "cpd", "n")
+    assert counts.astype(str).values.tolist() == [["S1", "2"], ["S2", "1"]]
+    pd.testing.assert_frame_equal(
+        view.distinct_combinations(["sample", "cpd"]).astype(str).sort_values(["sample", "cpd"]).reset_index(drop=True),
+        expected[["sample", "cpd"]].drop_duplicates().astype(str).sort_values(["sample", "cpd"]).reset_index(drop=True),
+    )
+    with pytest.raises(KeyError):
+        view.distinct_combinations(["pathname"])
@@ -0,0 +1,140 @@
+"""
+test_partitioned_merge.py: Unit tests for the out-of-core partitioned merge.
+
+This script validates `partition_samples`, `run_partitioned_merges` and
+`PartitionWriter` from `utils.core.partitioned_merge`, and partitioned runs of
+`run_pipeline`: partitions hold whole samples within the row budget, the
+merged rows streamed to disk are those of the full merge, the aggregates
+folded across partitions are identical to the aggregates of the full merged
+tables, and partitions sharded across worker processes give the outputs of
+a run in one process.
+
+Dependencies
+------------
+- pytest >= 7.0
+- pandas >= 1.0
+- numpy >= 1.20
+
+Examples
+--------
+$ pytest test_partitioned_merge.py
+"""
+
+import multiprocessing
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.core.aggregate_bundle import build_aggregate_bundle
+from utils.core.batch_pipeline import run_pipeline
+from utils.core.compressed_input import load_input_file
+from utils.core.merge_scheduler import run_reference_merges
+from utils.core.partitioned_merge import (
+    PartitionWriter,
+    estimate_merged_rows,
+    partition_samples,
+    run_partitioned_merges,
+)
+from utils.intersections_and_groups.clustering_dendrogram_processing import calculate_sample_clustering
+
+
+@pytest.fixture(scope="module")
+def input_df():
+    """
+    Provides the parsed sample input.
+    """
+    return load_input_file("data/sample_data.txt")
+
+
+@pytest.fixture(scope="module")
+def full_merge(input_df):
+    """
+    Provides the merged tables of the whole input.
+    """
+    return run_reference_merges(input_df).results
+
+
+def test_partitions_hold_whole_samples_within_budget(input_df):
+    """
+    Tests the greedy partitioning on estimated merged rows.
+    """
+    weights = estimate_merged_rows(input_df, ["biorempp"])
+    assert weights.sum() == len(run_reference_merges(input_df, ["biorempp"]).results["biorempp"])
+
+    partitions = partition_samples(input_df, 2000, weights)
+    assert 1 < len(partitions) < input_df["sample"].nunique()
+    assert np.array_equal(np.sort(np.concatenate(partitions)), np.arange(len(input_df)))
+    samples = [set(input_df["sample"].iloc[rows]) for rows in partitions]
+    assert sum(len(s) for s in samples) == len(set().union(*samples))
+    for rows, sample_set in zip(partitions, samples):
+        assert weights[rows].sum() <= 2000 or len(sample_set) == 1
+
+    assert len(partition_samples(input_df, 1)) == input_df["sample"].nunique()
+
+
+@pytest.mark.parametrize("max_rows", [1, 3000])
+def test_folded_aggregates_match_full_merge(input_df, full_merge, max_rows, tmp_path):
+    """
+    Tests the streamed merged rows and the folded aggregate bundles.
+    """
+    writer = PartitionWriter(str(tmp_path))
+    outcome = run_partitioned_merges(input_df, max_rows, writer=writer)
+
+    assert outcome.partitions > 1
+    assert outcome.peak_rows < sum(len(df) for df in full_merge.values())
+    for table, df in full_merge.items():
+        assert outcome.rows[table] == writer.rows[table] == len(df)
+        with open(writer.paths[table]) as written:
+            assert written.read() == df.to_csv(index=False)
+
+        for name, aggregate in build_aggregate_bundle(df, table).items():
+            pd.testing.assert_frame_equal(outcome.aggregates[table][name], aggregate)
+
+
+def test_partitioned_pipeline_matches_in_memory_pipeline(input_df, full_merge, tmp_path):
+    """
+    Tests that a partitioned `run_pipeline` gives the in-memory tables and
+    streams the merged and row-wise tables.
+    """
+    expected = run_pipeline(input_df)
+    writer = PartitionWriter(str(tmp_path))
+    tables = run_pipeline(input_df, partition_rows=2000, writer=writer)
+
+    assert set(writer.paths) == {"biorempp", "kegg", "hadeg", "toxcsm", "toxicity_heatmap"}
+    assert set(tables) | set(writer.paths) == set(expected)
+    for name, df in tables.items():
+        pd.testing.assert_frame_equal(df, expected[name])
+    assert writer.rows["toxicity_heatmap"] == len(expected["toxicity_heatmap"])
+    with open(writer.paths["toxicity_heatmap"]) as written:
+        assert written.read() == expected["toxicity_heatmap"].to_csv(index=False)
+
+    linkage = calculate_sample_clustering(full_merge["biorempp"], "euclidean", "ward")
+    np.testing.assert_allclose(tables["sample_clustering"].to_numpy(dtype=float), linkage)
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs the 'fork' start method")
+def test_sharded_runs_match_single_process(input_df, tmp_path):
+    """
+    Tests that partitions merged by worker processes give the folded
+    aggregates, the written files and the pipeline tables of one process.
+    """
+    single = PartitionWriter(str(tmp_path / "single"))
+    expected = run_pipeline(input_df, partition_rows=1500, writer=single)
+    sharded = PartitionWriter(str(tmp_path / "sharded"))
+    tables = run_pipeline(input_df, partition_rows=1500, writer=sharded, jobs=2)
+
+    assert sharded.rows == single.rows
+    for name, path in single.paths.items():
+        with open(path) as first, open(sharded.paths[name]) as second:
+            assert first.read() == second.read()
+    assert set(tables) == set(expected)
+    for name, df in tables.items():
+        pd.testing.assert_frame_equal(df, expected[name])
+
+    outcome = run_partitioned_merges(input_df, 1500, jobs=2)
+    for table, bundle in run_partitioned_merges(input_df, 1500).aggregates.items():
+        for name, aggregate in bundle.items():
+            pd.testing.assert_frame_equal(outcome.aggregates[table][name], aggregate)
+    assert not any(entry.startswith(".shards-") for entry in os.listdir(tmp_path / "sharded"))
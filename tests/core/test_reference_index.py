@@ -0,0 +1,147 @@
+"""
+test_reference_index.py: Unit tests for the precomputed join-key index.
+
+This script validates `build_key_index`, `index_join` and `distinct_rows` from
+`utils.core.reference_index`, checking that the index join reproduces
+`pd.merge(..., how="inner")` exactly (row order, dtypes, suffixes and missing keys),
+also when it is projected on some columns and restricted to distinct rows.
+
+Dependencies
+------------
+- pytest >= 7.0
+- pandas >= 1.0
+- numpy
+
+Notes
+-----
+- Test fixtures for mock data are provided in `tests/conftest.py`.
+
+Examples
+--------
+$ pytest test_reference_index.py
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.core.reference_index import build_key_index, distinct_rows, index_join
+
+
+@pytest.fixture
+def left():
+    return pd.DataFrame({
+        "sample": ["S1", "S1", "S2", "S3", "S3"],
+        "ko": ["K00002", "K00001", "K00002", "K99999", np.nan],
+    })
+
+
+@pytest.fixture
+def right():
+    return pd.DataFrame({
+        "ko": ["K00001", "K00002", "K00002", np.nan, "K00001"],
+        "cpd": ["C1", "C2", "C3", "C4", "C5"],
+        "sample": ["r1", "r2", "r3", "r4", "r5"],
+    })
+
+
+def test_build_key_index_groups_rows(right):
+    """
+    Tests that rows are grouped by key in their original order.
+    """
+    index = build_key_index(right, "ko")
+
+    ranges = {
+        key: index.order[index.offsets[i]:index.offsets[i + 1]].tolist()
+        for i, key in enumerate(index.keys)
+    }
+    assert ranges["K00001"] == [0, 4]
+    assert ranges["K00002"] == [1, 2]
+    assert len(index) == 3
+    assert index.row_slots().tolist() == [0, 1, 1, 2, 0]
+
+
+def test_index_join_matches_pd_merge(left, right):
+    """
+    Tests row order, missing-key matching and column suffixes against pd.merge.
+    """
+    index = build_key_index(right, "ko")
+    result = index_join(left, right, index)
+    expected = pd.merge(left, right, on="ko", how="inner")
+
+    pd.testing.assert_frame_equal(result, expected)
+    assert list(result.columns) == ["sample_x", "ko", "cpd", "sample_y"]
+
+
+@pytest.mark.parametrize("left_category, right_category", [
+    (True, True), (True, False), (False, True),
+])
+def test_index_join_categorical_keys(left, right, left_category, right_category):
+    """
+    Tests that key dtypes follow pd.merge for categorical inputs.
+    """
+    dtype = pd.CategoricalDtype(["K00001", "K00002", "K99999"])
+    if left_category:
+        left = left.astype({"ko": dtype})
+    if right_category:
+        right = right.astype({"ko": dtype, "cpd": "category"})
+
+    result = index_join(left, right, build_key_index(right, "ko"))
+    expected = pd.merge(left, right, on="ko", how="inner")
+
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_index_join_no_match(left, right):
+    """
+    Tests that an input without matching keys returns an empty frame.
+    """
+    left = left[left["ko"] == "K99999"]
+    result = index_join(left, right, build_key_index(right, "ko"))
+
+    assert result.empty
+    assert list(result.columns) == list(pd.merge(left, right, on="ko").columns)
+
+
+def test_index_join_validates_inputs(left, right):
+    """
+    Tests the errors raised for a missing key column or a stale index.
+    """
+    index = build_key_index(right, "ko")
+
+    with pytest.raises(KeyError):
+        index_join(left.drop(columns="ko"), right, index)
+    with pytest.raises(ValueError):
+        index_join(left, right.head(2), index)
+    with pytest.raises(KeyError):
+        build_key_index(right, "missing")
+
+
+@pytest.mark.parametrize("categorical", [False, True])
+@pytest.mark.parametrize("columns", [["cpd", "sample_y"], ["sample_x"], ["ko", "sample_x"], ["sample_x", "cpd"]])
+def test_index_join_projection(left, right, categorical, columns):
+    """
+    Tests projected and distinct joins against a projection of pd.merge.
+    """
+    left = pd.concat([left, left], ignore_index=True)
+    if categorical:
+        left, right = left.astype("category"), right.astype("category")
+    expected = pd.merge(left, right, on="ko", how="inner")[columns]
+    index = build_key_index(right, "ko")
+
+    pd.testing.assert_frame_equal(index_join(left, right, index, columns=columns), expected)
+    pd.testing.assert_frame_equal(
+        index_join(left, right, index, columns=columns, distinct=True),
+        expected.drop_duplicates(ignore_index=True),
+    )
+    with pytest.raises(KeyError):
+        index_join(left, right, index, columns=["sample"])
+
+
+def test_distinct_rows_matches_drop_duplicates(left):
+    """
+    Tests distinct rows of categorical (with missing values) and object tables.
+    """
+    df = pd.concat([left, left.iloc[::-1]], ignore_index=True)
+    for frame in (df, df.astype("category")):
+        pd.testing.assert_frame_equal(distinct_rows(frame), frame.drop_duplicates(ignore_index=True))
@@ -0,0 +1,177 @@
+"""
+test_reference_registry.py: Unit tests for the process-wide reference database registry.
+
+This script validates `get_reference_table`, `freeze_dataframe` and `file_fingerprint`
+from `utils.core.reference_registry`, and checks that the merge functions in
+`utils.core.data_processing` read each reference file only once per process.
+
+Dependencies
+------------
+- pytest >= 7.0
+- pandas >= 1.0
+
+Notes
+-----
+- Temporary files are created using pytest's `tmp_path` fixture.
+- Test fixtures for mock data are provided in `tests/conftest.py`.
+
+Examples
+--------
+$ pytest test_reference_registry.py
+"""
+
+import os
+
+import pandas as pd
+import pytest
+
+from utils.core.data_processing import merge_input_with_database
+from utils.core.reference_registry import (
+    ReferenceRegistry,
+    file_fingerprint,
+    freeze_dataframe,
+)
+
+
+def test_registry_loads_once(tmp_path, get_mock_BioRemPP):
+    """
+    Tests that repeated requests for an unchanged file hit the cache.
+    """
+    db_path = tmp_path / "biorempp.csv"
+    get_mock_BioRemPP.to_csv(db_path, sep=";", index=False)
+    calls = []
+
+    def loader(path):
+        calls.append(path)
+        return pd.read_csv(path, sep=";")
+
+    registry = ReferenceRegistry()
+    first = registry.get(str(db_path), loader)
+    second = registry.get(str(db_path), loader)
+
+    assert len(calls) == 1
+    pd.testing.assert_frame_equal(first, second)
+
+
+def test_registry_reloads_when_fingerprint_changes(tmp_path, get_mock_BioRemPP):
+    """
+    Tests that a changed file (different size/mtime) is reloaded.
+    """
+    db_path = tmp_path / "biorempp.csv"
+    get_mock_BioRemPP.to_csv(db_path, sep=";", index=False)
+    registry = ReferenceRegistry()
+    loader = lambda path: pd.read_csv(path, sep=";")
+
+    assert len(registry.get(str(db_path), loader)) == 5
+
+    get_mock_BioRemPP.head(2).to_csv(db_path, sep=";", index=False)
+    stat = os.stat(db_path)
+    os.utime(db_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert len(registry.get(str(db_path), loader)) == 2
+
+
+def test_registry_variants_are_cached_separately(tmp_path, get_mock_KEGG):
+    """
+    Tests that different loader variants of the same file do not collide.
+    """
+    db_path = tmp_path / "kegg.csv"
+    get_mock_KEGG.to_csv(db_path, sep=";", index=False)
+    registry = ReferenceRegistry()
+
+    raw = registry.get(str(db_path), lambda p: pd.read_csv(p, sep=";"), variant="raw")
+    typed = registry.get(
+        str(db_path),
+        lambda p: pd.read_csv(p, sep=";").astype({"ko": "category"}),
+        variant="typed",
+    )
+
+    assert raw["ko"].dtype == object
+    assert isinstance(typed["ko"].dtype, pd.CategoricalDtype)
+
+
+def test_registry_derived_objects_follow_table_version(tmp_path, get_mock_BioRemPP):
+    """
+    Tests that derived objects are built once and rebuilt when the file changes.
+    """
+    db_path = tmp_path / "biorempp.csv"
+    get_mock_BioRemPP.to_csv(db_path, sep=";", index=False)
+    registry = ReferenceRegistry()
+    loader = lambda path: pd.read_csv(path, sep=";")
+    builds = []
+
+    def builder(df):
+        builds.append(len(df))
+        return len(df)
+
+    assert registry.get_derived(str(db_path), loader, "rows", builder) == 5
+    assert registry.get_derived(str(db_path), loader, "rows", builder) == 5
+
+    get_mock_BioRemPP.head(2).to_csv(db_path, sep=";", index=False)
+    stat = os.stat(db_path)
+    os.utime(db_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert registry.get_derived(str(db_path), loader, "rows", builder) == 2
+    assert builds == [5, 2]
+
+
+def test_registry_returns_read_only_frames(tmp_path, get_mock_ToxCSM):
+    """
+    Tests that cached frames cannot be modified in place by callers.
+    """
+    db_path = tmp_path / "toxcsm.csv"
+    get_mock_ToxCSM.to_csv(db_path, sep=";", index=False)
+    registry = ReferenceRegistry()
+    loader = lambda path: pd.read_csv(path, sep=";")
+
+    df = registry.get(str(db_path), loader)
+    with pytest.raises(ValueError):
+        df.loc[0, "value_score"] = 99.0
+
+    # Replacing a column only affects the caller's copy
+    df["value_score"] = 0.0
+    assert registry.get(str(db_path), loader)["value_score"].iloc[0] == pytest.approx(0.1)
+
+
+def test_freeze_dataframe_keeps_values_and_dtypes(get_mock_HADEG):
+    """
+    Tests that freezing preserves values, categorical dtypes and the index.
+    """
+    df = get_mock_HADEG.astype({"Pathway": "category"})
+    frozen = freeze_dataframe(df)
+
+    pd.testing.assert_frame_equal(frozen, df)
+    with pytest.raises(ValueError):
+        frozen.loc[0, "Pathway"] = "Catechol degradation"
+
+
+def test_file_fingerprint_missing_file(tmp_path):
+    """
+    Tests that fingerprinting a missing file raises FileNotFoundError.
+    """
+    with pytest.raises(FileNotFoundError):
+        file_fingerprint(str(tmp_path / "missing.csv"))
+
+
+def test_merge_reads_reference_once(tmp_path, get_mock_BioRemPP, monkeypatch):
+    """
+    Tests that consecutive merges against the same file parse it only once.
+    """
+    db_path = tmp_path / "biorempp.csv"
+    get_mock_BioRemPP.drop(columns=["sample"]).to_csv(db_path, sep=";", index=False)
+    read_calls = []
+    original_read_csv = pd.read_csv
+
+    def counting_read_csv(*args, **kwargs):
+        read_calls.append(args[0])
+        return original_read_csv(*args, **kwargs)
+
+    monkeypatch.setattr("utils.core.data_processing.pd.read_csv", counting_read_csv)
+    input_df = pd.DataFrame({"sample": ["S1", "S2"], "ko": ["K00001", "K00003"]})
+
+    first = merge_input_with_database(input_df, str(db_path))
+    second = merge_input_with_database(input_df, str(db_path))
+
+    assert len(read_calls) == 1
+    pd.testing.assert_frame_equal(first, second)
+    assert set(first["ko"]) == {"K00001", "K00003"}
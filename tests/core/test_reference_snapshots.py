@@ -0,0 +1,137 @@
+"""
+test_reference_snapshots.py: Unit tests for the binary reference database snapshots.
+
+This script validates `build_snapshot`, `load_snapshot` and `load_with_snapshot` from
+`utils.core.reference_snapshots`: lossless round trips, memory-mapped loading,
+automatic rebuild when the source changes, and graceful fallback on errors.
+
+Dependencies
+------------
+- pytest >= 7.0
+- pandas >= 1.0
+- numpy
+
+Notes
+-----
+- Temporary files are created using pytest's `tmp_path` fixture.
+- Test fixtures for mock data are provided in `tests/conftest.py`.
+
+Examples
+--------
+$ pytest test_reference_snapshots.py
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.core.reference_snapshots import (
+    build_snapshot,
+    load_snapshot,
+    load_with_snapshot,
+    snapshot_dir_for,
+)
+
+
+def _read(path):
+    return pd.read_csv(path, sep=";", encoding="utf-8")
+
+
+def _write(df, path):
+    df.to_csv(path, sep=";", index=False, encoding="utf-8-sig")
+
+
+def test_snapshot_round_trip_matches_read_csv(tmp_path, get_mock_ToxCSM):
+    """
+    Tests that a snapshot reproduces the parsed CSV exactly (text, float and NaN values).
+    """
+    df = get_mock_ToxCSM.copy()
+    df.loc[1, "SMILES"] = np.nan
+    source = tmp_path / "toxcsm.csv"
+    _write(df, source)
+
+    build_snapshot(_read(source), str(source))
+    loaded = load_snapshot(str(source))
+
+    pd.testing.assert_frame_equal(loaded, _read(source))
+
+
+def test_snapshot_as_categorical(tmp_path, get_mock_BioRemPP):
+    """
+    Tests that text columns can be loaded directly as categoricals.
+    """
+    source = tmp_path / "biorempp.csv"
+    _write(get_mock_BioRemPP, source)
+    build_snapshot(_read(source), str(source))
+
+    loaded = load_snapshot(str(source), as_categorical=True)
+
+    assert isinstance(loaded["ko"].dtype, pd.CategoricalDtype)
+    assert list(loaded["ko"].astype(str)) == list(get_mock_BioRemPP["ko"])
+
+
+def test_snapshot_is_stale_after_source_change(tmp_path, get_mock_KEGG):
+    """
+    Tests that a snapshot is ignored once its source file changes.
+    """
+    source = tmp_path / "kegg.csv"
+    _write(get_mock_KEGG, source)
+    build_snapshot(_read(source), str(source))
+
+    _write(get_mock_KEGG.head(2), source)
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert load_snapshot(str(source)) is None
+
+
+def test_load_with_snapshot_builds_then_reuses(tmp_path, get_mock_HADEG):
+    """
+    Tests that the reader runs only when the snapshot is missing or stale.
+    """
+    source = tmp_path / "hadeg.csv"
+    _write(get_mock_HADEG, source)
+    calls = []
+
+    def reader(path):
+        calls.append(path)
+        return _read(path)
+
+    first = load_with_snapshot(str(source), reader)
+    second = load_with_snapshot(str(source), reader)
+
+    assert len(calls) == 1
+    assert os.path.isdir(snapshot_dir_for(str(source)))
+    pd.testing.assert_frame_equal(first, second)
+
+
+def test_load_with_snapshot_falls_back_when_build_fails(tmp_path, monkeypatch, get_mock_HADEG):
+    """
+    Tests that a failing snapshot write still returns the parsed table.
+    """
+    source = tmp_path / "hadeg.csv"
+    _write(get_mock_HADEG, source)
+
+    def failing_build(df, path):
+        raise OSError("read-only file system")
+
+    monkeypatch.setattr("utils.core.reference_snapshots.build_snapshot", failing_build)
+    df = load_with_snapshot(str(source), _read, as_categorical=True)
+
+    assert len(df) == len(get_mock_HADEG)
+    assert isinstance(df["Gene"].dtype, pd.CategoricalDtype)
+
+
+def test_build_snapshot_rejects_non_string_categories(tmp_path):
+    """
+    Tests that columns needing pickling are rejected with TypeError.
+    """
+    source = tmp_path / "numbers.csv"
+    df = pd.DataFrame({"code": pd.Categorical([1, 2, 1])})
+    df.to_csv(source, sep=";", index=False)
+
+    with pytest.raises(TypeError):
+        build_snapshot(df, str(source))
+    assert not os.path.exists(snapshot_dir_for(str(source)))
@@ -0,0 +1,128 @@
+"""
+test_reference_specs.py: Unit tests for the declarative reference database specs.
+
+This script validates the spec registry from `utils.core.reference_specs` and the
+generic `merge_with_reference` engine from `utils.core.data_processing`, including
+registering an additional reference database without writing a dedicated merge.
+
+Dependencies
+------------
+- pytest >= 7.0
+- pandas >= 1.0
+
+Notes
+-----
+- Temporary files are created using pytest's `tmp_path` fixture.
+- Test fixtures for mock data are provided in `tests/conftest.py`.
+
+Examples
+--------
+$ pytest test_reference_specs.py
+"""
+
+import pandas as pd
+import pytest
+
+from utils.core.data_processing import merge_with_reference
+from utils.core.optimize_dtypes import get_spec_optimizer, optimize_with_spec
+from utils.core.reference_specs import (
+    REFERENCE_SPECS,
+    ReferenceSpec,
+    get_reference_spec,
+    merge_plan,
+    register_reference_spec,
+)
+
+
+@pytest.fixture
+def extra_spec(tmp_path, monkeypatch):
+    """
+    Registers a temporary 'enzymes' database joined on the BioRemPP result.
+    """
+    db_path = tmp_path / "enzymes.csv"
+    pd.DataFrame({
+        "cpd": ["C00001", "C00002", "C00002"],
+        "enzyme": ["E1", "E2", "E3"],
+        "score": ["0.5", "x", "1.5"],
+    }).to_csv(db_path, sep=",", index=False)
+
+    monkeypatch.setattr(
+        "utils.core.reference_specs.REFERENCE_SPECS", dict(REFERENCE_SPECS)
+    )
+    return register_reference_spec(ReferenceSpec(
+        name="enzymes",
+        label="Enzymes",
+        path=str(db_path),
+        key="cpd",
+        categorical_columns=["cpd", "enzyme"],
+        numeric_prefixes=["score"],
+        sep=",",
+        depends_on="biorempp",
+    ))
+
+
+def test_builtin_specs_are_registered():
+    """
+    Tests the built-in databases and their dependencies.
+    """
+    assert list(REFERENCE_SPECS)[:4] == ["biorempp", "kegg", "hadeg", "toxcsm"]
+    assert get_reference_spec("toxcsm").depends_on == "biorempp"
+    assert get_reference_spec("hadeg").depends_on is None
+
+    with pytest.raises(KeyError):
+        get_reference_spec("unknown")
+
+
+def test_merge_plan_puts_dependencies_first():
+    """
+    Tests that requesting a dependent merge also schedules its dependency first.
+    """
+    names = [spec.name for spec in merge_plan(["toxcsm", "hadeg"])]
+    assert names == ["biorempp", "toxcsm", "hadeg"]
+
+
+def test_register_rejects_unknown_dependency(monkeypatch):
+    """
+    Tests that a spec cannot depend on an unregistered database.
+    """
+    monkeypatch.setattr("utils.core.reference_specs.REFERENCE_SPECS", dict(REFERENCE_SPECS))
+    with pytest.raises(ValueError):
+        register_reference_spec(ReferenceSpec("x", "X", "x.csv", "ko", [], depends_on="missing"))
+
+
+def test_optimize_with_spec(extra_spec):
+    """
+    Tests categorical and numeric conversions declared by a spec.
+    """
+    df = pd.DataFrame({"enzyme": ["E1", "E1"], "score": ["1.5", "bad"]})
+    result = optimize_with_spec(df, extra_spec)
+
+    assert isinstance(result["enzyme"].dtype, pd.CategoricalDtype)
+    assert result["score"].dtype == "float32"
+    assert pd.isna(result["score"][1])
+    assert get_spec_optimizer(extra_spec).__name__ == "optimize_enzymes_dtypes"
+
+
+def test_merge_with_registered_reference(extra_spec):
+    """
+    Tests that a newly registered database is merged by the generic engine.
+    """
+    input_df = pd.DataFrame({
+        "sample": ["S1", "S2", "S3"],
+        "cpd": ["C00002", "C00001", "C09999"],
+    })
+    result = merge_with_reference(input_df, "enzymes")
+
+    assert result["enzyme"].astype(str).tolist() == ["E2", "E3", "E1"]
+    assert result["sample"].astype(str).tolist() == ["S1", "S1", "S2"]
+    assert result["score"].dtype == "float32"
+
+
+def test_merge_with_reference_errors(extra_spec, tmp_path):
+    """
+    Tests the errors raised for a missing file or a missing input column.
+    """
+    with pytest.raises(FileNotFoundError):
+        merge_with_reference(pd.DataFrame({"cpd": ["C00001"]}), "enzymes", str(tmp_path / "no.csv"))
+    with pytest.raises(KeyError):
+        merge_with_reference(pd.DataFrame({"ko": ["K00001"]}), "enzymes")
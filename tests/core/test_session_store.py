@@ -0,0 +1,139 @@
+"""
+test_session_store.py: Unit tests for the server-side session table store.
+
+This script validates `SessionStore` and `content_hash` from
+`utils.core.session_store`: handles, LRU eviction under a memory limit,
+transparent reload from disk, handle verification, disk pruning and session
+cleanup.
+
+Dependencies
+------------
+- pytest >= 7.0
+- pandas >= 1.0
+
+Notes
+-----
+- Temporary files are created using pytest's `tmp_path` fixture.
+- Test fixtures for mock data are provided in `tests/conftest.py`.
+
+Examples
+--------
+$ pytest test_session_store.py
+"""
+
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from utils.core.session_store import (
+    SessionStore,
+    content_hash,
+    is_store_handle,
+    new_session_token,
+)
+
+
+def test_put_returns_small_json_handle(tmp_path, get_mock_BioRemPP):
+    """
+    Tests that the handle is JSON-serializable and describes the table.
+    """
+    store = SessionStore(spill_dir=str(tmp_path))
+    handle = store.put(new_session_token(), "biorempp", get_mock_BioRemPP)
+
+    assert is_store_handle(handle)
+    assert handle["rows"] == len(get_mock_BioRemPP)
+    assert handle["hash"] == content_hash(get_mock_BioRemPP)
+    assert len(json.dumps(handle)) < 500
+    pd.testing.assert_frame_equal(store.get(handle), get_mock_BioRemPP)
+
+
+def test_content_hash_tracks_values_and_dtypes(get_mock_KEGG):
+    """
+    Tests that equal tables share a hash and any change alters it.
+    """
+    same = get_mock_KEGG.copy()
+    changed = get_mock_KEGG.copy()
+    changed.loc[0, "ko"] = "K99999"
+
+    assert content_hash(same) == content_hash(get_mock_KEGG)
+    assert content_hash(changed) != content_hash(get_mock_KEGG)
+    assert content_hash(get_mock_KEGG.astype({"ko": "category"})) != content_hash(get_mock_KEGG)
+
+
+def test_lru_eviction_reloads_from_disk(tmp_path, get_mock_HADEG):
+    """
+    Tests that tables evicted from memory are reloaded from the spill directory.
+    """
+    store = SessionStore(memory_limit=1, spill_dir=str(tmp_path))
+    session = new_session_token()
+    first = store.put(session, "first", get_mock_HADEG)
+    second = store.put(session, "second", get_mock_HADEG.head(2))
+
+    assert store.memory_used == int(get_mock_HADEG.head(2).memory_usage(index=True, deep=True).sum())
+    pd.testing.assert_frame_equal(store.get(first), get_mock_HADEG)
+    pd.testing.assert_frame_equal(store.get(second), get_mock_HADEG.head(2))
+
+
+def test_handles_are_shared_through_disk(tmp_path, get_mock_ToxCSM):
+    """
+    Tests that a second store (e.g. another worker) resolves the same handle.
+    """
+    handle = SessionStore(spill_dir=str(tmp_path)).put(new_session_token(), "toxcsm", get_mock_ToxCSM)
+    other_worker = SessionStore(spill_dir=str(tmp_path))
+
+    pd.testing.assert_frame_equal(other_worker.get(handle), get_mock_ToxCSM)
+
+
+def test_stored_tables_are_read_only(tmp_path, get_mock_BioRemPP):
+    """
+    Tests that callers cannot modify a stored table in place.
+    """
+    store = SessionStore(spill_dir=str(tmp_path))
+    df = store.get(store.put(new_session_token(), "biorempp", get_mock_BioRemPP))
+
+    with pytest.raises(ValueError):
+        df.loc[0, "ko"] = "K99999"
+
+
+def test_discard_session_and_disk_limit(tmp_path, get_mock_BioRemPP):
+    """
+    Tests session cleanup and pruning of the spill directory.
+    """
+    store = SessionStore(spill_dir=str(tmp_path))
+    session = new_session_token()
+    handle = store.put(session, "biorempp", get_mock_BioRemPP)
+    store.discard_session(session)
+
+    with pytest.raises(KeyError):
+        store.get(handle)
+    assert os.listdir(tmp_path) == []
+
+    small_disk = SessionStore(memory_limit=1, spill_dir=str(tmp_path), disk_limit=0)
+    small_disk.put(new_session_token(), "biorempp", get_mock_BioRemPP)
+    assert os.listdir(tmp_path) == []
+
+
+def test_invalid_handle_values_are_rejected(tmp_path):
+    """
+    Tests that handle fields cannot be used to escape the spill directory.
+    """
+    store = SessionStore(spill_dir=str(tmp_path))
+    with pytest.raises(ValueError):
+        store.get({"format": "session-store", "session": "../x", "key": "k", "hash": "0"})
+
+
+def test_verify_checks_the_stored_hash(tmp_path, get_mock_KEGG):
+    """
+    Tests that a handle is only verified for a table the store holds.
+    """
+    store = SessionStore(spill_dir=str(tmp_path))
+    handle = store.put("session", "kegg", get_mock_KEGG)
+
+    assert store.verify(handle) == ("session", "kegg", handle["hash"])
+    assert SessionStore(spill_dir=str(tmp_path)).verify(handle) == ("session", "kegg", handle["hash"])
+    with pytest.raises(KeyError):
+        store.verify(dict(handle, hash="0" * 40))
+    with pytest.raises(KeyError):
+        store.verify(dict(handle, session="other"))
@@ -0,0 +1,215 @@
+"""
+test_store_codec.py: Unit tests for the memoized store decode layer.
+
+This script validates `decode_store_data`, `to_typed_frame`, `DecodeCache`,
+the compact columnar codec and `encode_store_data` from
+`utils.core.store_codec`: typed categorical decoding, memoization per table
+under keys the client cannot forge, read-only shared frames, the bounded cache
+and lossless compact payloads.
+
+Dependencies
+------------
+- pytest >= 7.0
+- pandas >= 1.0
+
+Examples
+--------
+$ pytest test_store_codec.py
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.core import store_codec
+from utils.core.session_store import SessionStore
+from utils.core.store_codec import (
+    DecodeCache,
+    clear_decode_cache,
+    decode_compact,
+    decode_store_data,
+    encode_compact,
+    encode_store_data,
+    store_cache_key,
+    to_typed_frame,
+)
+
+
+@pytest.fixture
+def session_store(tmp_path, monkeypatch):
+    """
+    Replaces the process-wide session store with one in a temporary directory.
+    """
+    store = SessionStore(spill_dir=str(tmp_path))
+    monkeypatch.setattr("utils.core.session_store._store", store)
+    clear_decode_cache()
+    yield store
+    clear_decode_cache()
+
+
+def test_empty_payloads_give_empty_frames():
+    """
+    Tests that empty payloads decode to empty DataFrames.
+    """
+    assert decode_store_data(None).empty
+    assert decode_store_data([]).empty
+
+
+def test_records_are_decoded_as_typed_frame(get_mock_BioRemPP):
+    """
+    Tests that repeated text columns become categoricals with the same values.
+    """
+    records = pd.concat([get_mock_BioRemPP] * 3, ignore_index=True)
+    df = decode_store_data(records.to_dict("records"))
+
+    assert isinstance(df["sample"].dtype, pd.CategoricalDtype)
+    pd.testing.assert_frame_equal(df.astype(object), records.astype(object))
+
+
+def test_to_typed_frame_sorts_observed_categories():
+    """
+    Tests that categories are limited to observed values, in sorted order.
+    """
+    df = pd.DataFrame({
+        "sample": pd.Categorical(["S2", "S1", "S2", "S1"], categories=["S2", "S9", "S1"]),
+        "ko": ["K2", "K1", "K2", "K1"],
+        "value": [1, 2, 3, 4],
+        "unique": ["a", "b", "c", "d"],
+    })
+    typed = to_typed_frame(df)
+
+    assert list(typed["sample"].cat.categories) == ["S1", "S2"]
+    assert list(typed["ko"].cat.categories) == ["K1", "K2"]
+    assert typed["value"].dtype == df["value"].dtype
+    assert typed["unique"].dtype == object
+    assert list(typed.sort_values("ko")["ko"]) == ["K1", "K1", "K2", "K2"]
+
+
+def test_handles_are_decoded_once(session_store, get_mock_KEGG):
+    """
+    Tests that repeated decodes of the same table share the cached frame.
+    """
+    handle = session_store.put("session", "kegg", get_mock_KEGG)
+    first = decode_store_data(handle)
+    second = decode_store_data(dict(handle))
+
+    assert store_codec._decode_cache.misses == 1
+    assert store_codec._decode_cache.hits == 1
+    assert first is not second
+    pd.testing.assert_frame_equal(second.astype(object), get_mock_KEGG.astype(object))
+
+
+def test_decoded_handles_are_read_only(session_store, get_mock_HADEG):
+    """
+    Tests that callbacks can add columns but not modify the shared frame.
+    """
+    handle = session_store.put("session", "hadeg", get_mock_HADEG)
+    df = decode_store_data(handle)
+    df["extra"] = 1
+
+    with pytest.raises(ValueError):
+        df.loc[0, "Gene"] = df.loc[1, "Gene"]
+    assert "extra" not in decode_store_data(handle).columns
+
+
+def test_decode_cache_is_bounded():
+    """
+    Tests that the least recently used table is evicted beyond the limit.
+    """
+    cache = DecodeCache(max_entries=2)
+    cache.put("a", pd.DataFrame())
+    cache.put("b", pd.DataFrame())
+    cache.get("a")
+    cache.put("c", pd.DataFrame())
+
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+
+
+@pytest.mark.parametrize("pack", [True, False])
+def test_compact_payload_round_trip(pack):
+    """
+    Tests that compact payloads survive JSON and decode to the typed table.
+    """
+    df = pd.DataFrame({
+        "sample": ["S1", "S1", "S2", "S2", "S1", "S2"],
+        "name": ["a", "b", None, "d", "e", "f"],
+        "chebi": [10, 10, 20, 20, 10, 20],
+        "score": [0.5, np.nan, 1.5, 2.0, 0.0, -1.0],
+        "flag": [True, False, True, True, False, False],
+    })
+    payload = json.loads(json.dumps(encode_compact(df, pack=pack)))
+
+    pd.testing.assert_frame_equal(decode_compact(payload), to_typed_frame(df))
+
+
+def test_compact_payload_is_smaller_than_records(get_mock_ToxCSM):
+    """
+    Tests that the compact payload is smaller than the records orientation.
+    """
+    df = pd.concat([get_mock_ToxCSM] * 20, ignore_index=True)
+    compact = json.dumps(encode_compact(df))
+    records = json.dumps(df.to_dict("records"))
+
+    assert len(compact) < len(records) / 2
+
+
+def test_compact_payloads_are_decoded_once(get_mock_KEGG):
+    """
+    Tests that compact payloads are memoized by content.
+    """
+    clear_decode_cache()
+    payload = json.loads(json.dumps(encode_compact(get_mock_KEGG)))
+    first = decode_store_data(payload)
+    decode_store_data(json.loads(json.dumps(payload)))
+
+    assert store_codec._decode_cache.hits == 1
+    pd.testing.assert_frame_equal(first.astype(object), get_mock_KEGG.astype(object))
+    clear_decode_cache()
+
+
+def test_encode_store_data_backends(session_store, monkeypatch, get_mock_HADEG):
+    """
+    Tests the session and inline backends and the inline fallback.
+    """
+    assert encode_store_data(get_mock_HADEG, "session", "hadeg")["format"] == "session-store"
+    assert encode_store_data(get_mock_HADEG, "session", "hadeg", backend="inline")["format"] == "columnar"
+
+    def unavailable(*args):
+        raise OSError("read-only file system")
+
+    monkeypatch.setattr(store_codec, "store_dataframe", unavailable)
+    assert encode_store_data(get_mock_HADEG, "session", "hadeg")["format"] == "columnar"
+    with pytest.raises(ValueError):
+        encode_store_data(get_mock_HADEG, "session", "hadeg", backend="browser")
+
+
+def test_forged_compact_hash_does_not_poison_cache(get_mock_KEGG, get_mock_HADEG):
+    """
+    Tests that a compact payload carrying another table's hash decodes as its
+    own content, and does not replace the other table in the cache.
+    """
+    clear_decode_cache()
+    payload = json.loads(json.dumps(encode_compact(get_mock_KEGG)))
+    forged = dict(json.loads(json.dumps(encode_compact(get_mock_HADEG))), hash=payload["hash"])
+
+    pd.testing.assert_frame_equal(decode_store_data(forged).astype(object), get_mock_HADEG.astype(object))
+    pd.testing.assert_frame_equal(decode_store_data(payload).astype(object), get_mock_KEGG.astype(object))
+    clear_decode_cache()
+
+
+def test_handle_with_foreign_hash_is_rejected(session_store, get_mock_KEGG, get_mock_HADEG):
+    """
+    Tests that a handle of one session cannot reference the table of another
+    session through its hash, even once that table is cached.
+    """
+    victim = session_store.put("victim", "kegg", get_mock_KEGG)
+    session_store.put("attacker", "kegg", get_mock_HADEG)
+    decode_store_data(victim)
+
+    with pytest.raises(KeyError):
+        decode_store_data(dict(victim, session="attacker"))
+    assert store_cache_key(victim)[0] == ("handle", "victim", "kegg", victim["hash"])
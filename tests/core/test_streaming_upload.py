@@ -0,0 +1,226 @@
+"""
+test_streaming_upload.py: Unit tests for the chunked upload routes.
+
+This script validates `StreamingUploads` and the routes added by
+`register_streaming_upload` from `utils.core.streaming_upload`: resumable
+pieces, offset checks, the size and disk limits, the removal of stale
+uploads, incremental parsing of the received file, concurrent completions and
+the session-store handle used by the Submit flow.
+
+Dependencies
+------------
+- pytest >= 7.0
+- flask >= 2.0
+
+Examples
+--------
+$ pytest test_streaming_upload.py
+"""
+
+import io
+import os
+import threading
+import time
+
+import pytest
+from flask import Flask
+
+from utils.core import data_validator
+from utils.core import streaming_upload
+from utils.core.session_store import SessionStore
+from utils.core.streaming_upload import StreamingUploads, register_streaming_upload
+from utils.core.upload_handlers import handle_streamed_upload, load_input_data
+
+CONTENT = b">Sample1\nK00001\nK00002\nK00003\nK00004\nK00005\n>Sample2\nK00001\nK00006\nK00007\nK00008\nK00009\n"
+
+
+@pytest.fixture
+def uploads(tmp_path, monkeypatch):
+    """
+    Provides upload storage and a session store in temporary directories.
+    """
+    monkeypatch.setattr("utils.core.session_store._store", SessionStore(spill_dir=str(tmp_path / "store")))
+    storage = StreamingUploads(upload_dir=str(tmp_path / "uploads"), max_bytes=1024)
+    monkeypatch.setattr("utils.core.streaming_upload._uploads", storage)
+    return storage
+
+
+@pytest.fixture
+def client(uploads):
+    """
+    Provides a test client of a Flask server with the upload routes.
+    """
+    server = Flask(__name__)
+    register_streaming_upload(server, uploads)
+    return server.test_client()
+
+
+def send(client, upload_id, offset, data):
+    """
+    Sends one piece of an upload.
+    """
+    return client.put(f"/upload/stream/{upload_id}", data=data, headers={"Upload-Offset": str(offset)})
+
+
+def test_chunked_upload_is_parsed_into_session_table(client, uploads, monkeypatch):
+    """
+    Tests an upload sent in pieces, parsed in blocks and loaded from its handle.
+    """
+    monkeypatch.setattr(data_validator, "_BLOCK_BYTES", 16)
+    upload_id = client.post("/upload/stream", json={"filename": "bins.txt"}).get_json()["upload_id"]
+    for offset in range(0, len(CONTENT), 10):
+        response = send(client, upload_id, offset, CONTENT[offset:offset + 10])
+        assert response.get_json()["received"] == min(offset + 10, len(CONTENT))
+
+    result = client.post(f"/upload/stream/{upload_id}/complete").get_json()
+    df = load_input_data(result["handle"])
+
+    assert df.astype(str).values.tolist() == (
+        [["Sample1", f"K0000{i}"] for i in range(1, 6)]
+        + [["Sample2", f"K0000{i}"] for i in (1, 6, 7, 8, 9)]
+    )
+    stored, disabled, _, state = handle_streamed_upload(f"?upload={upload_id}")
+    assert stored == result["handle"] and not disabled and state == "loaded"
+    # The metadata is removed once the page has loaded the handle
+    assert os.listdir(uploads.upload_dir) == []
+
+
+def test_pieces_at_another_offset_are_rejected(client):
+    """
+    Tests that a piece is only accepted at the current offset, for resuming.
+    """
+    upload_id = client.post("/upload/stream", json={"filename": "bins.txt"}).get_json()["upload_id"]
+    send(client, upload_id, 0, CONTENT[:20])
+
+    response = send(client, upload_id, 0, CONTENT[:20])
+    assert response.status_code == 409
+    assert response.get_json()["received"] == 20
+    assert client.get(f"/upload/stream/{upload_id}").get_json() == {"received": 20}
+    assert send(client, upload_id, 20, CONTENT[20:]).status_code == 200
+
+
+def test_size_limit_and_file_type(client, uploads):
+    """
+    Tests that non-.txt files and pieces beyond the size limit are rejected.
+    """
+    assert client.post("/upload/stream", json={"filename": "bins.csv"}).status_code == 400
+
+    upload_id = uploads.create("bins.txt")
+    uploads.append(upload_id, 0, io.BytesIO(CONTENT))
+    response = send(client, upload_id, len(CONTENT), b"K00001\n" * 200)
+
+    assert response.status_code == 413
+    assert uploads.received(upload_id) == len(CONTENT)
+
+
+def test_invalid_upload_reports_line_and_is_discarded(client, uploads):
+    """
+    Tests that validation errors use the messages of the upload handlers.
+    """
+    upload_id = uploads.create("bins.txt")
+    uploads.append(upload_id, 0, io.BytesIO(b"\n>Sample1\nK00001\nnot a KO\n"))
+
+    response = client.post(f"/upload/stream/{upload_id}/complete")
+
+    assert response.status_code == 422
+    assert response.get_json()["error"].startswith("Linha 4:")
+    assert client.get(f"/upload/stream/{upload_id}").status_code == 404
+
+
+def test_stale_uploads_are_removed_and_open_uploads_limited(client, uploads):
+    """
+    Tests the removal of inactive uploads and the limits on uploads in progress.
+    """
+    uploads.max_uploads = 2
+    stale = uploads.create("bins.txt")
+    completed = uploads.create("bins.txt")
+    uploads.append(completed, 0, io.BytesIO(CONTENT))
+    uploads.complete(completed)
+    uploads.create("bins.txt")
+    assert client.post("/upload/stream", json={"filename": "bins.txt"}).status_code == 503
+
+    past = time.time() - uploads.ttl - 1
+    for name in os.listdir(uploads.upload_dir):
+        if name.startswith((stale, completed)):
+            os.utime(os.path.join(uploads.upload_dir, name), (past, past))
+    assert client.post("/upload/stream", json={"filename": "bins.txt"}).status_code == 201
+    assert not any(name.startswith((stale, completed)) for name in os.listdir(uploads.upload_dir))
+
+    uploads.max_total_bytes = len(CONTENT)
+    first, second = [name.split(".")[0] for name in os.listdir(uploads.upload_dir) if name.endswith(".part")]
+    uploads.append(first, 0, io.BytesIO(CONTENT))
+    assert send(client, second, 0, b"K00001\n").status_code == 413
+
+
+def test_concurrent_completions_store_the_table_once(uploads, monkeypatch):
+    """
+    Tests that simultaneous completions of an upload parse and store it once.
+    """
+    upload_id = uploads.create("bins.txt")
+    uploads.append(upload_id, 0, io.BytesIO(CONTENT))
+    stored = []
+    store = streaming_upload.store_dataframe
+
+    def slow_store(df, session, key):
+        stored.append(session)
+        time.sleep(0.05)
+        return store(df, session, key)
+
+    monkeypatch.setattr(streaming_upload, "store_dataframe", slow_store)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(uploads.complete(upload_id))) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert stored == [upload_id]
+    assert results[0] == results[1] and results[0][1] is None
+
+
+def test_stalled_piece_does_not_block_other_uploads(uploads):
+    """
+    Tests that copying a slow piece leaves the other uploads available, and
+    that its reserved quota is released once it is written.
+    """
+    uploads.max_total_bytes = 2 * len(CONTENT)
+    slow_id = uploads.create("bins.txt")
+    other_id = uploads.create("bins.txt")
+    resume = threading.Event()
+
+    class StalledStream(io.BytesIO):
+        def read(self, size=-1):
+            resume.wait(5)
+            return super().read(size)
+
+    thread = threading.Thread(target=uploads.append, args=(slow_id, 0, StalledStream(CONTENT), len(CONTENT)))
+    thread.start()
+    try:
+        start = time.perf_counter()
+        assert uploads.received(slow_id) == 0
+        assert uploads.append(other_id, 0, io.BytesIO(CONTENT), len(CONTENT)) == len(CONTENT)
+        # The stalled piece holds its share of the quota
+        with pytest.raises(ValueError):
+            uploads.append(other_id, len(CONTENT), io.BytesIO(b"K00001\n"), 7)
+        assert time.perf_counter() - start < 1
+    finally:
+        resume.set()
+        thread.join()
+
+    assert uploads.received(slow_id) == len(CONTENT)
+    assert uploads._reserved == {}
+
+
+def test_upload_removed_during_a_rejected_piece(client, uploads, monkeypatch):
+    """
+    Tests that an upload removed while its piece is rejected gives 404, not 500.
+    """
+    upload_id = uploads.create("bins.txt")
+
+    def rejected(upload_id, offset, stream, length=None):
+        uploads.discard(upload_id)
+        raise ValueError("Espaço para envios esgotado. Tente novamente em alguns minutos.")
+
+    monkeypatch.setattr(uploads, "append", rejected)
+
+    assert send(client, upload_id, 0, CONTENT).status_code == 404
@@ -251,6 +251,102 @@ def test_process_uploaded_file_invalid_content(get_mock_HADEG):
     assert df is None
     assert error is not None
 
+def test_process_uploaded_file_base64_data_uri():
+    """
+    Test process_uploaded_file decodes a base64 data URI once and parses it.
+
+    Returns
+    -------
+    None
+        Asserts that the parsed rows are returned without error.
+    """
+    text = ">Sample1\nK00001\nK00002\n>Sample2\nK00003\n"
+    contents = "data:text/plain;base64," + base64.b64encode(text.encode("utf-8")).decode("ascii")
+    df, error = process_uploaded_file(contents, "test.txt")
+    assert error is None
+    assert df.astype(object).values.tolist() == [
+        ["Sample1", "K00001"], ["Sample1", "K00002"], ["Sample2", "K00003"]
+    ]
+
+def test_ingest_upload_counts_and_warnings():
+    """
+    Test ingest_upload returns the DataFrame and the warnings of the same pass.
+
+    Returns
+    -------
+    None
+        Asserts the parsed rows and the low KO per sample warning.
+    """
+    df, error, warnings = upload_handlers.ingest_upload(">Sample1\nK00001\n>Sample2\nK00002\n", "test.txt")
+    assert error is None
+    assert len(df) == 2
+    assert warnings == ["Poucas entradas KO por amostra. Verifique se o arquivo está completo."]
+
+def test_ingest_upload_line_numbers_of_raw_file():
+    """
+    Test ingest_upload numbers lines from the start of the raw file.
+
+    Returns
+    -------
+    None
+        Asserts that leading blank lines are counted in the error message.
+    """
+    df, error, warnings = upload_handlers.ingest_upload("\n\n>Sample1\nK00001\nINVALID\n", "test.txt")
+    assert df is None
+    assert error == "Linha 5: Formato inválido. Esperado identificador de amostra (>) ou KO (K...)."
+
+def test_ingest_upload_malformed_ko_line():
+    """
+    Test ingest_upload reports a KO identifier followed by other characters.
+
+    Returns
+    -------
+    None
+        Asserts the parser error message for the malformed KO line.
+    """
+    df, error, warnings = upload_handlers.ingest_upload(">Sample1\nK00001abc\n", "test.txt")
+    assert df is None
+    assert error.startswith("Invalid format at line 2: 'K00001abc'.")
+
+def test_ingest_upload_structure_error_after_malformed_ko_line():
+    """
+    Test ingest_upload reports a later invalid line before a malformed KO line.
+
+    Returns
+    -------
+    None
+        Asserts the structure error of the invalid line, as the structure
+        check (which accepts the malformed KO line) comes first.
+    """
+    contents = ">Sample1\nK00001abc\nK00002\nINVALID\n"
+    df, error, warnings = upload_handlers.ingest_upload(contents, "test.txt")
+    assert df is None
+    assert error == "Linha 4: Formato inválido. Esperado identificador de amostra (>) ou KO (K...)."
+
+    is_valid, error, warnings = validate_upload_comprehensive(contents, "test.txt")
+    assert not is_valid
+    assert error.startswith("Linha 4: Formato inválido.")
+
+def test_validate_upload_comprehensive_accepts_malformed_ko_line():
+    """
+    Test validate_upload_comprehensive counts a KO identifier followed by other
+    characters as a KO line, leaving its rejection to the processing step.
+
+    Returns
+    -------
+    None
+        Asserts a valid structure with the KO count of the warnings.
+    """
+    contents = ">Sample1\nK00001abc\n" + "".join(f"K{i:05d}\n" for i in range(2, 6))
+    is_valid, error, warnings = validate_upload_comprehensive(contents, "test.txt")
+    assert is_valid
+    assert error is None
+    assert warnings == []
+
+    df, error, warnings = upload_handlers.ingest_upload(contents, "test.txt")
+    assert df is None
+    assert error.startswith("Invalid format at line 2: 'K00001abc'.")
+
 # -------------------------------
 # Upload/Example Data Handling Tests
 # -------------------------------
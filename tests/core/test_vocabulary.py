@@ -0,0 +1,87 @@
+"""
+test_vocabulary.py: Unit tests for the shared KO and compound dictionaries.
+
+This script validates `Vocabulary` and the helpers that encode join keys from
+`utils.core.vocabulary`: stable codes, shared categorical dtypes across
+frames, and merges running on aligned categories.
+
+Dependencies
+------------
+- pytest >= 7.0
+- pandas >= 1.0
+- numpy
+
+Notes
+-----
+- Test fixtures for mock data are provided in `tests/conftest.py`.
+
+Examples
+--------
+$ pytest test_vocabulary.py
+"""
+
+import numpy as np
+import pandas as pd
+
+from utils.core.vocabulary import (
+    Vocabulary,
+    align_shared_categories,
+    apply_shared_vocabularies,
+    to_shared_categorical,
+)
+
+
+def test_encode_is_stable_and_append_only():
+    """
+    Tests that a label keeps its code and unseen labels are appended.
+    """
+    vocab = Vocabulary("test")
+    first = vocab.encode(["K00001", "K00002", "K00001"])
+    second = vocab.encode(["K00003", "K00001", None])
+
+    assert first.tolist() == [0, 1, 0]
+    assert second.tolist() == [2, 0, -1]
+    assert list(vocab.decode(np.array([2, 1, 0]))) == ["K00003", "K00002", "K00001"]
+
+
+def test_lookup_does_not_insert():
+    """
+    Tests that lookup returns -1 for unknown labels without growing the dictionary.
+    """
+    vocab = Vocabulary("test")
+    vocab.encode(["K00001"])
+
+    assert vocab.lookup(["K00001", "K99999"]).tolist() == [0, -1]
+    assert len(vocab) == 1
+
+
+def test_earlier_dtypes_remain_shared():
+    """
+    Tests that a dtype issued before the dictionary grew is still recognized.
+    """
+    vocab = Vocabulary("test")
+    old = vocab.categorical(["K00001", "K00002"])
+    vocab.encode(["K00003"])
+
+    assert vocab.is_shared(old.dtype)
+    assert not vocab.is_shared(pd.CategoricalDtype(["K00002", "K00001"]))
+
+    realigned = to_shared_categorical(pd.Series(old), vocab)
+    assert realigned.dtype == vocab.dtype
+    assert list(realigned) == ["K00001", "K00002"]
+
+
+def test_aligned_frames_share_categories(get_mock_BioRemPP):
+    """
+    Tests that frames encoded separately share categories and merge like strings.
+    """
+    reference = apply_shared_vocabularies(get_mock_BioRemPP.copy())
+    user = pd.DataFrame({"sample": ["S1", "S2"], "ko": ["K00001", "K00002"]})
+    user = apply_shared_vocabularies(user)
+
+    user, reference = align_shared_categories(user, reference)
+    assert user["ko"].dtype == reference["ko"].dtype
+
+    merged = pd.merge(user, reference, on="ko").astype(str)
+    expected = pd.merge(user.astype({"ko": str}), get_mock_BioRemPP, on="ko").astype(str)
+    pd.testing.assert_frame_equal(merged, expected)
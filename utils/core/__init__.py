@@ -13,6 +13,16 @@ or metagenomic datasets.
 
 Available Modules
 -----------------
+aggregate_bundle : module
+    Aggregates of the merged tables, computed once after the merge and sliced by callbacks.
+annotation_readers : module
+    Streaming readers of KofamKOALA and eggNOG-mapper tables into the parsed input table.
+batch_pipeline : module
+    Headless ``python -m`` batch runs of the full pipeline over many input files.
+columnar_input : module
+    Columnar sample/KO inputs (tab-separated, npz, Parquet) encoded directly into the parsed input table.
+compressed_input : module
+    Streaming decompression of gzip, bz2, xz and zip input files into the bulk parser.
 data_loader : module
     Functions to load datasets (CSV, Excel) into pandas DataFrames.
 data_processing : module
@@ -21,37 +31,99 @@ data_validator : module
     Validates and parses uploaded `.txt` files, including base64 decoding and structure checks.
 feedback_alerts : module
     Creates reusable Bootstrap alerts for displaying user feedback in the frontend.
+incidence : module
+    Sparse incidence matrices (sample x KO, ...) and vectorized set operations on them.
+input_batch : module
+    Parses batches of input files in parallel and combines them into one input table.
+merge_scheduler : module
+    Runs the reference database merges concurrently as a dependency DAG.
+merged_view : module
+    Lazy merged tables kept as sample/KO pairs over the indexed reference tables.
 optimize_dtypes : module
     Utilities for memory-efficient optimization of categorical and numerical data types.
+partitioned_merge : module
+    Out-of-core merges in sample partitions streamed to disk, with folded aggregates.
+reference_index : module
+    Precomputed key indexes of the reference tables and the vectorized join using them.
+reference_registry : module
+    Process-wide cache of the reference databases, reloaded only when files change.
+reference_snapshots : module
+    Memory-mapped binary snapshots of the reference CSVs, rebuilt when a CSV changes.
+reference_specs : module
+    Declarative specs of the reference databases driving the generic merge engine.
+session_store : module
+    Server-side store of the merged session tables referenced by handles in ``dcc.Store``.
+store_codec : module
+    Compact columnar store payloads and the memoized decode of ``dcc.Store`` content.
+streaming_upload : module
+    Flask routes receiving large input files in resumable chunks, parsed incrementally.
 table_utils : module
     Functions to convert DataFrames into interactive AG Grid tables for Dash dashboards.
 upload_handlers : module
     Handles file upload events, validation logic, and example data retrieval.
+vocabulary : module
+    Process-wide integer dictionaries shared by the KO and compound join keys.
 
 Public Objects
 --------------
 The following functions and objects are re-exported at the package level
 for convenience and are accessible as ``utils.core.<function>``.
 
+- get_aggregate
+- get_aggregate_bundle
 - load_database
 - merge_input_with_database
 - merge_with_kegg
 - merge_input_with_database_hadegDB
 - merge_with_toxcsm
+- preload_reference_databases
+- merge_with_reference
 - validate_and_process_input
 - decode_content_if_base64
 - process_content_lines
+- parse_content_bytes
+- ContentParser
+- read_columnar_file
+- parse_input_file
+- load_input_file
+- read_kofamkoala
+- read_eggnog_annotations
 - create_alert
+- IncidenceMatrix
+- build_incidence
+- get_incidence
+- combine_input_batch
+- concat_input_frames
+- run_reference_merges
+- MergedView
+- build_merged_view
 - optimize_dtypes
 - optimize_kegg_dtypes
 - optimize_hadeg_dtypes
 - optimize_toxcsm_dtypes
+- run_partitioned_merges
+- PartitionWriter
+- get_reference_table
+- clear_reference_cache
+- ReferenceSpec
+- register_reference_spec
+- store_dataframe
+- load_dataframe
+- encode_store_data
+- decode_store_data
 - create_table_from_dataframe
 - validate_upload_size
 - load_example_data
 - process_uploaded_file
 - handle_upload_or_example
 - validate_upload_comprehensive
+- ingest_upload
+- ingest_uploads
+- load_input_data
+- register_streaming_upload
+- get_upload_handle
+- KO_VOCABULARY
+- CPD_VOCABULARY
 """
 
 
@@ -59,6 +131,12 @@ for convenience and are accessible as ``utils.core.<function>``.
 # Public imports
 # -------------------------------
 
+# aggregate_bundle.py
+from .aggregate_bundle import (
+    get_aggregate,
+    get_aggregate_bundle
+)
+
 # data_loader.py
 from .data_loader import load_database
 
@@ -67,19 +145,63 @@ from .data_processing import (
     merge_input_with_database,
     merge_with_kegg,
     merge_input_with_database_hadegDB,
-    merge_with_toxcsm
+    merge_with_toxcsm,
+    preload_reference_databases,
+    merge_with_reference
+)
+
+# annotation_readers.py
+from .annotation_readers import (
+    read_kofamkoala,
+    read_eggnog_annotations
+)
+
+# batch_pipeline.py is not imported here: it runs as ``python -m
+# utils.core.batch_pipeline``, which must be its first import
+
+# columnar_input.py
+from .columnar_input import read_columnar_file
+
+# compressed_input.py
+from .compressed_input import (
+    parse_input_file,
+    load_input_file
 )
 
 # data_validator.py
 from .data_validator import (
     validate_and_process_input,
     decode_content_if_base64,
-    process_content_lines
+    process_content_lines,
+    parse_content_bytes,
+    ContentParser
 )
 
 # feedback_alerts.py
 from .feedback_alerts import create_alert
 
+# incidence.py
+from .incidence import (
+    IncidenceMatrix,
+    build_incidence,
+    get_incidence
+)
+
+# input_batch.py
+from .input_batch import (
+    combine_input_batch,
+    concat_input_frames
+)
+
+# merge_scheduler.py
+from .merge_scheduler import run_reference_merges
+
+# merged_view.py
+from .merged_view import (
+    MergedView,
+    build_merged_view
+)
+
 # optimize_dtypes.py
 from .optimize_dtypes import (
     optimize_dtypes,
@@ -88,6 +210,36 @@ from .optimize_dtypes import (
     optimize_toxcsm_dtypes
 )
 
+# partitioned_merge.py
+from .partitioned_merge import (
+    run_partitioned_merges,
+    PartitionWriter
+)
+
+# reference_registry.py
+from .reference_registry import (
+    get_reference_table,
+    clear_reference_cache
+)
+
+# reference_specs.py
+from .reference_specs import (
+    ReferenceSpec,
+    register_reference_spec
+)
+
+# session_store.py
+from .session_store import (
+    store_dataframe,
+    load_dataframe
+)
+
+# store_codec.py
+from .store_codec import (
+    encode_store_data,
+    decode_store_data
+)
+
 # table_utils.py
 from .table_utils import create_table_from_dataframe
 
@@ -98,6 +250,21 @@ from .upload_handlers import (
     process_uploaded_file,
     handle_upload_or_example,
     validate_upload_comprehensive,
+    ingest_upload,
+    ingest_uploads,
+    load_input_data,
+)
+
+# streaming_upload.py
+from .streaming_upload import (
+    register_streaming_upload,
+    get_upload_handle,
+)
+
+# vocabulary.py
+from .vocabulary import (
+    KO_VOCABULARY,
+    CPD_VOCABULARY
 )
 
 # -------------------------------
@@ -105,6 +272,10 @@ from .upload_handlers import (
 # -------------------------------
 
 __all__ = [
+    # aggregate_bundle
+    "get_aggregate",
+    "get_aggregate_bundle",
+
     # data_loader
     "load_database",
 
@@ -113,21 +284,63 @@ __all__ = [
     "merge_with_kegg",
     "merge_input_with_database_hadegDB",
     "merge_with_toxcsm",
+    "preload_reference_databases",
+    "merge_with_reference",
+
+    # annotation_readers
+    "read_kofamkoala",
+    "read_eggnog_annotations",
+
+    # columnar_input
+    "read_columnar_file",
+
+    # compressed_input
+    "parse_input_file",
+    "load_input_file",
 
     # data_validator
     "validate_and_process_input",
     "decode_content_if_base64",
     "process_content_lines",
+    "parse_content_bytes",
+    "ContentParser",
 
     # feedback_alerts
     "create_alert",
 
+    # input_batch
+    "combine_input_batch",
+    "concat_input_frames",
+
+    # merge_scheduler
+    "run_reference_merges",
+
     # optimize_dtypes
     "optimize_dtypes",
     "optimize_kegg_dtypes",
     "optimize_hadeg_dtypes",
     "optimize_toxcsm_dtypes",
 
+    # partitioned_merge
+    "run_partitioned_merges",
+    "PartitionWriter",
+
+    # reference_registry
+    "get_reference_table",
+    "clear_reference_cache",
+
+    # reference_specs
+    "ReferenceSpec",
+    "register_reference_spec",
+
+    # session_store
+    "store_dataframe",
+    "load_dataframe",
+
+    # store_codec
+    "encode_store_data",
+    "decode_store_data",
+
     # table_utils
     "create_table_from_dataframe",
 
@@ -137,4 +350,15 @@ __all__ = [
     "process_uploaded_file",
     "handle_upload_or_example",
     "validate_upload_comprehensive",
+    "ingest_upload",
+    "ingest_uploads",
+    "load_input_data",
+
+    # streaming_upload
+    "register_streaming_upload",
+    "get_upload_handle",
+
+    # vocabulary
+    "KO_VOCABULARY",
+    "CPD_VOCABULARY",
 ]
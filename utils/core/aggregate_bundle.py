@@ -0,0 +1,289 @@
+"""
+aggregate_bundle.py
+-------------------
+Aggregates of the merged tables, computed once per table right after the merge.
+
+Most analysis callbacks start by counting distinct values per group of the
+same merged table (KOs per sample, compounds per sample, KOs per pathway,
+...). The aggregate bundle computes all the aggregates of a table together,
+on the integer codes of its categorical columns, and caches them per table
+(see `store_cache_key`) in the worker process. Callbacks then only slice the precomputed
+results, so a dropdown change does not regroup the full table.
+
+Every aggregate is identical to the output of the corresponding processing
+function (e.g. ``ko_count`` and `process_ko_data`) on the decoded table.
+
+Functions:
+- count_distinct: Integer-coded ``groupby(by)[value].nunique()``.
+- DistinctCount: Declarative distinct-count aggregate of a merged table.
+- build_aggregate_bundle: Computes every aggregate registered for a table.
+- get_aggregate_bundle: Returns the cached bundle of a store payload.
+- get_aggregate: Returns one aggregate of a store payload.
+- slice_ranking: Returns one group of a ranking aggregate, sorted.
+"""
+
+import numpy as np
+import pandas as pd
+
+from utils.core.reference_registry import freeze_dataframe
+from utils.core.store_codec import DecodeCache, decode_store_data, store_cache_key
+from utils.logger_config import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def _column_codes(series: pd.Series) -> tuple:
+    """
+    Returns ``(codes, n_values, rebuild)`` for a column: integer codes in
+    sorted value order (-1 for missing) and a function turning codes back
+    into a column of the original type.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        dtype = series.dtype
+        return (
+            series.cat.codes.to_numpy(),
+            len(dtype.categories),
+            lambda codes: pd.Categorical.from_codes(codes, dtype=dtype),
+        )
+    codes, uniques = pd.factorize(series, sort=True)
+    return codes, len(uniques), lambda codes: uniques.take(codes).to_numpy()
+
+
+def count_distinct(df: pd.DataFrame, by: list, value: str, name: str) -> pd.DataFrame:
+    """
+    Counts the distinct values of a column per group, on integer codes.
+
+    Equivalent to ``df.groupby(by, observed=True)[value].nunique()
+    .reset_index(name=name)``: groups are sorted, rows with a missing key are
+    ignored and missing values are not counted.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Table to aggregate.
+    by : list of str
+        Grouping columns.
+    value : str
+        Column whose distinct values are counted.
+    name : str
+        Name of the count column.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per group: the ``by`` columns (same types as in ``df``) and
+        the int64 count column.
+    """
+    keys = [_column_codes(df[col]) for col in by]
+    value_codes, n_values, _ = _column_codes(df[value])
+
+    dims = tuple(max(n, 1) for _, n, _ in keys)
+    valid = np.ones(len(df), dtype=bool)
+    for codes, _, _ in keys:
+        valid &= codes >= 0
+    group_keys = np.ravel_multi_index(
+        tuple(codes[valid].astype(np.int64) for codes, _, _ in keys), dims
+    )
+    groups = np.unique(group_keys)
+
+    # Distinct (group, value) pairs, then the number of pairs per group
+    has_value = value_codes[valid] >= 0
+    pairs = np.unique(group_keys[has_value] * max(n_values, 1) + value_codes[valid][has_value])
+    counts = np.bincount(
+        np.searchsorted(groups, pairs // max(n_values, 1)), minlength=len(groups)
+    ).astype(np.int64)
+
+    data = {
+        col: rebuild(codes)
+        for col, (_, _, rebuild), codes in zip(by, keys, np.unravel_index(groups, dims))
+    }
+    data[name] = counts
+    return pd.DataFrame(data)
+
+
+class DistinctCount:
+    """
+    Aggregate counting the distinct values of a column per group (see
+    `count_distinct`), then finished into the shape the callbacks use.
+
+    Parameters
+    ----------
+    by : list of str
+        Grouping columns.
+    value : str
+        Column whose distinct values are counted.
+    name : str
+        Name of the count column.
+    finish : callable, optional
+        Applied to the count table (sorting, pivoting).
+    """
+
+    def __init__(self, by: list, value: str, name: str, finish=None):
+        self.by = list(by)
+        self.value = value
+        self.name = name
+        self.finish = finish
+
+    def count(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Returns the count table of ``df``, before `finish`.
+        """
+        return count_distinct(df, self.by, self.value, self.name)
+
+    def build(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Returns the finished aggregate of ``df``.
+        """
+        counts = self.count(df)
+        return self.finish(counts) if self.finish is not None else counts
+
+
+def _sort_descending(column: str):
+    """
+    Returns a finisher sorting a count table by ``column``, descending.
+    """
+    return lambda counts: counts.sort_values(column, ascending=False)
+
+
+def _pivot_references(counts: pd.DataFrame) -> pd.DataFrame:
+    """
+    Pivots compound counts per (sample, referenceAG) into the heatmap matrix.
+    """
+    return counts.pivot(index="referenceAG", columns="sample", values="compoundname").fillna(0)
+
+
+# Aggregates per merged table (reference spec name)
+AGGREGATE_SPECS = {
+    "biorempp": {
+        # process_ko_data
+        "ko_count": DistinctCount(["sample"], "ko", "ko_count", _sort_descending("ko_count")),
+        # process_sample_ranking
+        "sample_ranking": DistinctCount(
+            ["sample"], "compoundname", "num_compounds", _sort_descending("num_compounds")
+        ),
+        # process_sample_reference_heatmap
+        "sample_reference": DistinctCount(
+            ["sample", "referenceAG"], "compoundname", "compoundname", _pivot_references
+        ),
+        # process_compound_ranking, per compound class
+        "compound_ranking": DistinctCount(["compoundclass", "compoundname"], "sample", "num_samples"),
+        # process_compound_gene_ranking, per compound class
+        "compound_gene_ranking": DistinctCount(["compoundclass", "compoundname"], "genesymbol", "num_genes"),
+    },
+    "kegg": {
+        # count_ko_per_pathway
+        "ko_per_pathway": DistinctCount(["sample", "pathname"], "ko", "unique_ko_count"),
+    },
+    "hadeg": {
+        # process_pathway_data
+        "pathway_data": DistinctCount(["Pathway", "compound_pathway", "sample"], "ko", "ko_count"),
+        # process_gene_sample_data
+        "gene_sample": DistinctCount(["sample", "Gene", "compound_pathway", "Pathway"], "ko", "ko_count"),
+    },
+}
+
+# Process-wide bundle cache, keyed by table and `store_cache_key`
+_bundle_cache = DecodeCache()
+
+
+def build_aggregate_bundle(df: pd.DataFrame, table: str) -> dict:
+    """
+    Computes every aggregate registered for a merged table.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Decoded merged table.
+    table : str
+        Name of the table ('biorempp', 'kegg' or 'hadeg').
+
+    Returns
+    -------
+    dict
+        Aggregate name -> read-only DataFrame. Empty for tables without
+        registered aggregates.
+    """
+    specs = AGGREGATE_SPECS.get(table)
+    if specs is None or df.empty:
+        return {}
+    return {name: freeze_dataframe(spec.build(df)) for name, spec in specs.items()}
+
+
+def get_aggregate_bundle(payload, table: str) -> dict:
+    """
+    Returns the aggregate bundle of a store payload, computing it at most once
+    per table (see `store_cache_key`).
+
+    Parameters
+    ----------
+    payload : dict, list of dict or pd.DataFrame
+        Store payload of a merged table (see `decode_store_data`).
+    table : str
+        Name of the table ('biorempp', 'kegg' or 'hadeg').
+
+    Returns
+    -------
+    dict
+        Aggregate name -> read-only DataFrame.
+    """
+    table_key, df = store_cache_key(payload)
+    key = (table,) + table_key
+    bundle = _bundle_cache.get(key)
+    if bundle is None:
+        if df is None:
+            df = decode_store_data(payload)
+        bundle = build_aggregate_bundle(df, table)
+        _bundle_cache.put(key, bundle)
+        logger.info(f"Aggregate bundle computed for {table}: {sorted(bundle)}")
+    return bundle
+
+
+def get_aggregate(payload, table: str, name: str) -> pd.DataFrame:
+    """
+    Returns one aggregate of a store payload.
+
+    Parameters
+    ----------
+    payload : dict, list of dict or pd.DataFrame
+        Store payload of a merged table.
+    table : str
+        Name of the table.
+    name : str
+        Aggregate name (e.g. 'ko_count').
+
+    Returns
+    -------
+    pd.DataFrame
+        Shallow copy of the cached aggregate.
+
+    Raises
+    ------
+    KeyError
+        If the table has no such aggregate.
+    """
+    return get_aggregate_bundle(payload, table)[name].copy(deep=False)
+
+
+def slice_ranking(ranking: pd.DataFrame, column: str, value, sort_by: str) -> pd.DataFrame:
+    """
+    Returns the rows of a ranking aggregate for one group, sorted descending.
+
+    Parameters
+    ----------
+    ranking : pd.DataFrame
+        Ranking aggregate (e.g. 'compound_ranking').
+    column : str
+        Column identifying the group (e.g. 'compoundclass').
+    value : object
+        Selected group.
+    sort_by : str
+        Count column to sort by.
+
+    Returns
+    -------
+    pd.DataFrame
+        Ranking of the group without the group column, as returned by the
+        processing function applied to the rows of that group.
+    """
+    selected = ranking[ranking[column] == value].drop(columns=column).reset_index(drop=True)
+    return selected.sort_values(by=sort_by, ascending=False)
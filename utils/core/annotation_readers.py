@@ -0,0 +1,346 @@
+"""
+annotation_readers.py
+---------------------
+Streaming readers of KO annotation tools outputs: KofamKOALA ``detail``
+tables and eggNOG-mapper ``.annotations`` files.
+
+Instead of converting an annotation table into the ``>sample`` / ``Kxxxxx``
+text format, the readers go straight to the parsed input table: one row per
+(gene, KO) hit that passes the score thresholds, with a categorical 'sample'
+column and the 'ko' column encoded with the shared KO vocabulary, as returned
+by `process_content_lines`. Only the KO column (and the columns used by the
+thresholds) is split out of each line; multi-KO cells (eggNOG-mapper
+``ko:K00001,ko:K00002``) give one row per KO.
+
+Files are read in pieces of about 1 MiB (plain or compressed, see
+`compressed_input`) and the KOs of every piece are encoded right away, so
+memory stays bounded by the piece size and the int32 codes of the hits,
+also for multi-GB annotation files.
+
+Supported layouts:
+- KofamKOALA ``exec_annotation -f detail`` (space aligned) and
+  ``-f detail-tsv``: significant hits are flagged with ``*``.
+- eggNOG-mapper 1.x and 2.x ``.emapper.annotations``: ``##`` comment lines,
+  a ``#query`` header row and the ``KEGG_ko`` column.
+
+Every file holds the hits of one sample, named after the file by default.
+
+Functions:
+- detect_annotation_format: Recognizes an annotation table from its first bytes.
+- annotation_sample_name: Default sample name of an annotation file.
+- read_kofamkoala: Reads a KofamKOALA detail table.
+- read_eggnog_annotations: Reads an eggNOG-mapper annotations file.
+- parse_annotation_pieces: Parses an annotation table into a `ParsedContent`.
+"""
+
+import codecs
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from utils.core.compressed_input import FORMAT_HEAD_BYTES, input_compression, iter_input_pieces
+from utils.core.data_validator import ParsedContent
+from utils.core.vocabulary import KO_VOCABULARY
+from utils.logger_config import setup_logger
+
+logger = setup_logger(__name__)
+
+KOFAMKOALA = "kofamkoala"
+EGGNOG = "eggnog"
+
+_KO_PATTERN = re.compile(r"K\d+")
+
+# Header names of the eggNOG-mapper columns (2.x, 1.x)
+_EGGNOG_EVALUE = ("evalue", "seed_ortholog_evalue")
+_EGGNOG_SCORE = ("score", "seed_ortholog_score")
+_EGGNOG_KO = ("KEGG_ko", "KEGG_KOs")
+
+# File name suffixes removed to name the sample of an annotation file
+_ANNOTATION_SUFFIXES = (".emapper.annotations", ".annotations", ".tsv", ".txt")
+
+
+def detect_annotation_format(head: bytes):
+    """
+    Recognizes an annotation table from the first bytes of a file.
+
+    Parameters
+    ----------
+    head : bytes
+        Beginning of the (decompressed) file.
+
+    Returns
+    -------
+    str or None
+        'kofamkoala', 'eggnog', or None for the sample/KO text format.
+    """
+    text = head[:FORMAT_HEAD_BYTES].decode("utf-8", errors="replace").lstrip()
+    first_line = text.split("\n", 1)[0]
+    if first_line.startswith("#") and "gene name" in first_line and "thrshld" in first_line:
+        return KOFAMKOALA
+    if first_line.startswith("##") or first_line.startswith("#query"):
+        for line in text.split("\n"):
+            if line.startswith("#query"):
+                return EGGNOG
+            if not line.startswith("##"):
+                break
+    return None
+
+
+def annotation_sample_name(filename: str) -> str:
+    """
+    Returns the default sample name of an annotation file: its base name
+    without compression and annotation suffixes (``bin1.emapper.annotations.gz``
+    gives ``bin1``).
+    """
+    name = os.path.basename(filename)
+    if input_compression(name) is not None:
+        name = name[:-len(os.path.splitext(name)[1])]
+    for suffix in _ANNOTATION_SUFFIXES:
+        if name.lower().endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+
+def _iter_line_chunks(pieces):
+    """
+    Yields the text lines of UTF-8 byte pieces, one list per piece (a line
+    split between pieces is completed in the next list).
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = ""
+    for piece in pieces:
+        lines = (pending + decoder.decode(piece)).split("\n")
+        pending = lines.pop()
+        yield lines
+    yield [pending + decoder.decode(b"", final=True)]
+
+
+def _passes(score: str, evalue: str, min_score, max_evalue) -> bool:
+    """
+    Applies the score and E-value thresholds to the text fields of a hit.
+    """
+    try:
+        if min_score is not None and float(score) < min_score:
+            return False
+        if max_evalue is not None and float(evalue) > max_evalue:
+            return False
+    except ValueError:
+        return False
+    return True
+
+
+def _kofamkoala_kos(lines, significant_only: bool, min_score, max_evalue) -> list:
+    """
+    Returns the KOs of the hits of KofamKOALA detail lines that pass the filters.
+    """
+    kos = []
+    for line in lines:
+        if not line or line.startswith("#"):
+            continue
+        if significant_only and not line.startswith("*"):
+            continue
+        if "\t" in line:
+            # detail-tsv: flag, gene, KO, threshold, score, E-value, definition
+            fields = line.rstrip("\r").split("\t", 6)[1:]
+        else:
+            # detail: flag column, then space separated fields
+            fields = line[1:].split(None, 5)
+        if len(fields) < 5:
+            continue
+        _, ko, _, score, evalue = fields[:5]
+        if _KO_PATTERN.fullmatch(ko) and _passes(score, evalue, min_score, max_evalue):
+            kos.append(ko)
+    return kos
+
+
+def _eggnog_kos(lines, columns: dict, min_score, max_evalue) -> list:
+    """
+    Returns the KOs of eggNOG-mapper annotation lines that pass the filters,
+    one per KO of multi-KO cells.
+    """
+    ko_index = columns["ko"]
+    kos = []
+    for line in lines:
+        if not line or line.startswith("#"):
+            continue
+        fields = line.rstrip("\r").split("\t")
+        if len(fields) <= ko_index or fields[ko_index] in ("", "-"):
+            continue
+        if (min_score is not None or max_evalue is not None) and not _passes(
+            fields[columns["score"]] if min_score is not None else None,
+            fields[columns["evalue"]] if max_evalue is not None else None,
+            min_score, max_evalue,
+        ):
+            continue
+        for ko in fields[ko_index].split(","):
+            ko = ko.strip()
+            if ko.startswith("ko:"):
+                ko = ko[3:]
+            if _KO_PATTERN.fullmatch(ko):
+                kos.append(ko)
+    return kos
+
+
+def _eggnog_columns(header: str) -> dict:
+    """
+    Returns the positions of the KO, E-value and score columns of an
+    eggNOG-mapper header row.
+
+    Raises
+    ------
+    ValueError
+        If the header has no KEGG KO column.
+    """
+    names = [name.strip() for name in header.lstrip("#").rstrip("\r").split("\t")]
+
+    def position(candidates):
+        return next((names.index(name) for name in candidates if name in names), None)
+
+    columns = {"ko": position(_EGGNOG_KO), "evalue": position(_EGGNOG_EVALUE), "score": position(_EGGNOG_SCORE)}
+    if columns["ko"] is None:
+        raise ValueError("The eggNOG-mapper header has no KEGG_ko column.")
+    return columns
+
+
+def _read_codes(pieces, annotation_format: str, significant_only: bool, min_score, max_evalue) -> np.ndarray:
+    """
+    Reads the KO vocabulary codes of the hits of an annotation table.
+    """
+    codes = []
+    columns = None
+    for lines in _iter_line_chunks(pieces):
+        if annotation_format == KOFAMKOALA:
+            kos = _kofamkoala_kos(lines, significant_only, min_score, max_evalue)
+        else:
+            if columns is None:
+                header = next((line for line in lines if line.startswith("#query")), None)
+                if header is None:
+                    continue
+                columns = _eggnog_columns(header)
+                if (min_score is not None and columns["score"] is None) or (
+                    max_evalue is not None and columns["evalue"] is None
+                ):
+                    raise ValueError("The eggNOG-mapper header has no score or E-value column.")
+            kos = _eggnog_kos(lines, columns, min_score, max_evalue)
+        if kos:
+            codes.append(KO_VOCABULARY.encode(kos))
+    return np.concatenate(codes) if codes else np.empty(0, dtype=np.int32)
+
+
+def _coded_frame(codes: np.ndarray, sample: str) -> pd.DataFrame:
+    """
+    Returns the parsed input table of the KO codes of one sample.
+    """
+    return pd.DataFrame({
+        "sample": pd.Categorical.from_codes(np.zeros(len(codes), dtype=np.int8), categories=[sample]),
+        "ko": pd.Categorical.from_codes(codes, dtype=KO_VOCABULARY.dtype, validate=False),
+    })
+
+
+def _read_table(source, annotation_format: str, sample, compression, significant_only=True,
+                min_score=None, max_evalue=None) -> pd.DataFrame:
+    """
+    Reads an annotation table from a path or a binary file object.
+    """
+    name = source if isinstance(source, (str, os.PathLike)) else getattr(source, "name", None)
+    if sample is None:
+        sample = annotation_sample_name(os.fspath(name)) if name else "sample"
+    if compression is None and isinstance(name, (str, os.PathLike)):
+        compression = input_compression(os.fspath(name))
+
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            codes = _read_codes(iter_input_pieces(f, compression), annotation_format,
+                                significant_only, min_score, max_evalue)
+    else:
+        codes = _read_codes(iter_input_pieces(source, compression), annotation_format,
+                            significant_only, min_score, max_evalue)
+    logger.info(f"{annotation_format} annotations read for sample {sample}: {len(codes)} KO hits")
+    return _coded_frame(codes, sample)
+
+
+def read_kofamkoala(source, sample: str = None, significant_only: bool = True, min_score: float = None,
+                    max_evalue: float = None, compression: str = None) -> pd.DataFrame:
+    """
+    Reads the KO hits of a KofamKOALA ``detail`` or ``detail-tsv`` table.
+
+    Parameters
+    ----------
+    source : str, os.PathLike or file-like
+        Path or binary file object of the table (plain or compressed).
+    sample : str, optional
+        Sample name; by default the file name without suffixes.
+    significant_only : bool
+        Keep only the hits flagged with ``*`` (score above the KO threshold).
+    min_score : float, optional
+        Minimum hit score.
+    max_evalue : float, optional
+        Maximum hit E-value.
+    compression : str, optional
+        'gzip', 'bz2', 'xz' or 'zip'; by default given by the file name.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per kept hit: categorical 'sample' and 'ko' (shared KO
+        vocabulary) columns.
+    """
+    return _read_table(source, KOFAMKOALA, sample, compression, significant_only, min_score, max_evalue)
+
+
+def read_eggnog_annotations(source, sample: str = None, min_score: float = None, max_evalue: float = None,
+                            compression: str = None) -> pd.DataFrame:
+    """
+    Reads the KEGG KOs of an eggNOG-mapper ``.annotations`` file.
+
+    Parameters
+    ----------
+    source : str, os.PathLike or file-like
+        Path or binary file object of the file (plain or compressed).
+    sample : str, optional
+        Sample name; by default the file name without suffixes.
+    min_score : float, optional
+        Minimum score of the seed ortholog hit.
+    max_evalue : float, optional
+        Maximum E-value of the seed ortholog hit.
+    compression : str, optional
+        'gzip', 'bz2', 'xz' or 'zip'; by default given by the file name.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per KO of every annotated query: categorical 'sample' and
+        'ko' (shared KO vocabulary) columns.
+    """
+    return _read_table(source, EGGNOG, sample, compression, min_score=min_score, max_evalue=max_evalue)
+
+
+def parse_annotation_pieces(pieces, annotation_format: str, sample: str) -> ParsedContent:
+    """
+    Parses an annotation table given as byte pieces into a `ParsedContent`
+    (one sample header, one KO entry per kept hit), with the default
+    thresholds of the readers.
+
+    Parameters
+    ----------
+    pieces : iterable of bytes
+        Content of the table.
+    annotation_format : str
+        'kofamkoala' or 'eggnog' (see `detect_annotation_format`).
+    sample : str
+        Sample name.
+
+    Returns
+    -------
+    ParsedContent
+        Parsed table and counts (``df`` is None without any KO hit).
+    """
+    parsed = ParsedContent()
+    codes = _read_codes(pieces, annotation_format, True, None, None)
+    parsed.sample_count = 1
+    parsed.ko_count = len(codes)
+    if len(codes):
+        parsed.df = _coded_frame(codes, sample)
+    return parsed
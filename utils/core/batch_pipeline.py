@@ -0,0 +1,573 @@
+"""
+batch_pipeline.py
+-----------------
+Headless batch runs of the full BioRemPP pipeline over many input files,
+without the web UI::
+
+    python -m utils.core.batch_pipeline data/genomes/ -o results/ --jobs 8
+    python -m utils.core.batch_pipeline "runs/*/bins.txt.gz" -o results/ --format parquet
+
+Every input file (directories are expanded to their supported input files,
+glob patterns to the matching files) goes through the same steps as a Submit
+in the web UI: parsing (any format of `load_input_file`), the four reference
+merges (`run_reference_merges`) and the aggregations of the analysis pages
+(`PIPELINE_AGGREGATES`). The tables are written to
+``<output>/<input name>/<table>.csv`` (or ``.parquet``), and a
+``summary.csv`` lists every input with its status.
+
+Input files are processed by a pool of ``--jobs`` worker processes. A single
+input, or all the inputs with ``--combine`` (parsed into one table and run
+as a single pipeline over every sample), is instead sharded by sample across
+the worker processes. The reference tables and their key indexes are loaded
+once in the parent process before the pool starts, so forked workers share
+them. A file that fails is reported in the summary and does not stop the
+batch.
+
+With ``--partition-rows N``, the merges run on partitions of whole samples of
+about N merged rows (see `partitioned_merge`): the merged tables are streamed
+to their output files and the aggregations are folded across partitions, so
+inputs whose merged tables do not fit in memory can still be processed.
+
+Functions:
+- PipelineAggregate: Aggregation computed per sample partition and finished once.
+- collect_inputs: Expands directories and glob patterns into input files.
+- run_pipeline: Merges an input table and computes every aggregation.
+- write_tables: Writes tables as CSV or Parquet files.
+- process_input_file: Runs the pipeline on one input file.
+- run_batch: Runs the pipeline over many input files on a process pool.
+- main: Command-line entry point.
+"""
+
+import argparse
+import glob
+import importlib.util
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from utils.core.aggregate_bundle import build_aggregate_bundle, count_distinct
+from utils.core.annotation_readers import annotation_sample_name
+from utils.core.columnar_input import columnar_format
+from utils.core.compressed_input import is_supported_input, load_input_file
+from utils.core.data_processing import preload_reference_databases
+from utils.core.input_batch import combine_input_batch
+from utils.core.merge_scheduler import run_reference_merges
+from utils.core.partitioned_merge import OUTPUT_FORMATS, PartitionWriter, concat_partitions, run_partitioned_merges
+from utils.intersections_and_groups.clustering_dendrogram_processing import calculate_profile_clustering
+from utils.intersections_and_groups.intersection_analysis_processing import prepare_upsetplot_data
+from utils.intersections_and_groups.sample_grouping_by_compound_class_processing import (
+    group_by_class,
+    minimize_groups,
+)
+from utils.logger_config import setup_logger
+from utils.toxicity.toxicity_prediction_heatmap_processing import process_heatmap_data
+
+logger = setup_logger(__name__)
+
+# Defaults of the dendrogram of the analysis page
+DEFAULT_DISTANCE_METRIC = "euclidean"
+DEFAULT_CLUSTERING_METHOD = "ward"
+
+SUMMARY_FILE = "summary"
+
+
+class PipelineAggregate:
+    """
+    Aggregation of the pipeline, computed on the merged rows of every sample
+    partition and finished once over all of them.
+
+    Parameters
+    ----------
+    table : str
+        Merged table read ('biorempp' or 'toxcsm').
+    partial : callable
+        ``partial(df)``: partial result of the rows of one partition.
+    finish : callable, optional
+        ``finish(partials, options)``: result from the concatenated partial
+        results (None to skip the table). Without it the partial results are
+        rows of the final table, streamed to the output in partitioned runs.
+    """
+
+    def __init__(self, table: str, partial, finish=None):
+        self.table = table
+        self.partial = partial
+        self.finish = finish
+
+
+def _sort_by(*columns):
+    """
+    Returns a finisher sorting the concatenated partial results by
+    ``columns`` (category order for categorical columns).
+    """
+    return lambda partials, options: partials.sort_values(list(columns), kind="stable").reset_index(drop=True)
+
+
+def _sample_ko_pairs(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Distinct sample/KO pairs of the UpSet plot (`prepare_upsetplot_data`).
+    """
+    return prepare_upsetplot_data(df, df["sample"].unique().tolist())[["sample", "ko"]]
+
+
+def _heatmap_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Rows of the toxicity heatmap (`process_heatmap_data`) in merged row order,
+    the rows of every toxicity endpoint of a merged row together. Unlike the
+    endpoint blocks of `process_heatmap_data`, this order does not depend on
+    the sample partitions, so streamed and in-memory tables are the same.
+    """
+    blocks = process_heatmap_data(df)
+    if df.empty:
+        return blocks
+    order = np.arange(len(blocks)).reshape(-1, len(df)).T.ravel()
+    return blocks.take(order).reset_index(drop=True)
+
+
+def _compound_class_groups(partials: pd.DataFrame, options: dict) -> pd.DataFrame:
+    """
+    Sample groups of every compound class (`group_by_class`), with the groups
+    of the minimal cover of each class (`minimize_groups`). Groups are
+    numbered in sample order.
+    """
+    rows = partials.drop_duplicates().sort_values(["compoundclass", "sample", "compoundname"], kind="stable")
+    groups = []
+    for compound_class in rows["compoundclass"].dropna().unique():
+        grouped = group_by_class(compound_class, rows)
+        grouped = grouped.dropna(subset=["grupo"])[["compoundclass", "grupo", "sample", "compoundname"]]
+        if grouped.empty:
+            continue
+        grouped = grouped.drop_duplicates().astype({"compoundclass": str, "sample": str, "compoundname": str})
+        grouped["minimal_cover"] = grouped["grupo"].isin(minimize_groups(grouped))
+        groups.append(grouped)
+    if not groups:
+        return pd.DataFrame(columns=["compoundclass", "grupo", "sample", "compoundname", "minimal_cover"])
+    return pd.concat(groups, ignore_index=True)
+
+
+def _sample_clustering(partials: pd.DataFrame, options: dict):
+    """
+    Linkage matrix of the sample dendrogram (`calculate_sample_clustering`)
+    from the rows per sample and KO, one row per merge; leaves are the
+    samples in sorted order. None with fewer than two samples.
+    """
+    profiles = partials.pivot_table(
+        index="sample", columns="ko", values="size", aggfunc="sum", fill_value=0, observed=True
+    )
+    if profiles.shape[0] < 2:
+        return None
+    linkage = calculate_profile_clustering(profiles, options["distance_metric"], options["method"])
+    return pd.DataFrame(linkage, columns=["cluster_1", "cluster_2", "distance", "size"]).astype(
+        {"cluster_1": "int64", "cluster_2": "int64", "size": "int64"}
+    )
+
+
+# Aggregations computed on top of the aggregate bundles
+PIPELINE_AGGREGATES = {
+    # count_unique_enzyme_activities, for every sample
+    "enzyme_activity": PipelineAggregate(
+        "biorempp",
+        lambda df: count_distinct(df, ["sample", "enzyme_activity"], "ko", "unique_ko_count"),
+        _sort_by("sample", "enzyme_activity"),
+    ),
+    "sample_ko_pairs": PipelineAggregate("biorempp", _sample_ko_pairs, _sort_by("sample")),
+    "compound_class_groups": PipelineAggregate(
+        "biorempp",
+        lambda df: df[["compoundclass", "compoundname", "sample"]].drop_duplicates(),
+        _compound_class_groups,
+    ),
+    "sample_clustering": PipelineAggregate(
+        "biorempp",
+        lambda df: df.groupby(["sample", "ko"], observed=True).size().reset_index(name="size"),
+        _sample_clustering,
+    ),
+    # process_heatmap_data, streamed in merged row order
+    "toxicity_heatmap": PipelineAggregate("toxcsm", _heatmap_rows),
+}
+
+
+def collect_inputs(patterns) -> list:
+    """
+    Expands directories and glob patterns into the list of input files.
+
+    Parameters
+    ----------
+    patterns : iterable of str
+        Files, directories (their supported input files, not recursive) or
+        glob patterns (``**`` is recursive).
+
+    Returns
+    -------
+    list of str
+        Input files in argument order, sorted within each argument, without
+        duplicates.
+
+    Raises
+    ------
+    FileNotFoundError
+        If an argument matches no file.
+    """
+    inputs = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = [
+                os.path.join(pattern, name) for name in sorted(os.listdir(pattern))
+                if os.path.isfile(os.path.join(pattern, name)) and is_supported_input(name)
+            ]
+        elif os.path.isfile(pattern):
+            matches = [pattern]
+        else:
+            matches = sorted(path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path))
+        if not matches:
+            raise FileNotFoundError(f"No input file matches {pattern!r}")
+        inputs.extend(matches)
+    return list(dict.fromkeys(inputs))
+
+
+def _output_name(path: str) -> str:
+    """
+    Name of the output directory of an input file: the file name without
+    compression and input suffixes.
+    """
+    name = annotation_sample_name(path)
+    return os.path.splitext(name)[0] if columnar_format(name) else name
+
+
+def run_pipeline(input_df: pd.DataFrame, distance_metric: str = DEFAULT_DISTANCE_METRIC,
+                 method: str = DEFAULT_CLUSTERING_METHOD, merge_workers: int = None,
+                 include_merged: bool = True, partition_rows: int = None,
+                 writer: PartitionWriter = None, jobs: int = 1) -> dict:
+    """
+    Merges an input table with the reference databases and computes every
+    aggregation of the analysis pages.
+
+    With ``partition_rows``, the merges run on partitions of whole samples
+    (see `run_partitioned_merges`) and the aggregations are folded across
+    partitions, so memory is bounded by the partition size. With ``jobs``,
+    the partitions are sharded across worker processes. In both cases the
+    merged tables and the row-wise aggregations are streamed to ``writer``
+    instead of being returned.
+
+    Parameters
+    ----------
+    input_df : pd.DataFrame
+        Parsed input with 'sample' and 'ko' columns.
+    distance_metric : str
+        Distance metric of the sample clustering.
+    method : str
+        Linkage method of the sample clustering.
+    merge_workers : int, optional
+        Threads running the merges (see `run_reference_merges`).
+    include_merged : bool
+        Whether the merged tables are part of the result (or written to
+        ``writer`` in partitioned runs).
+    partition_rows : int, optional
+        Estimated merged rows per partition; None merges the whole input at
+        once.
+    writer : PartitionWriter, optional
+        Output of the streamed tables of partitioned runs. Without it the
+        merged tables are dropped and the row-wise aggregations are returned.
+    jobs : int
+        Worker processes merging sample shards (see `run_partitioned_merges`);
+        without ``partition_rows``, the input is split into a few shards per
+        process.
+
+    Returns
+    -------
+    dict
+        Table name -> DataFrame: the merged tables ('biorempp', 'kegg',
+        'hadeg', 'toxcsm'), the aggregate bundles (see `aggregate_bundle`)
+        and `PIPELINE_AGGREGATES`, except the streamed tables. Tables whose
+        input is empty are left out.
+
+    Raises
+    ------
+    RuntimeError
+        If a merge fails.
+    """
+    options = {"distance_metric": distance_metric, "method": method}
+
+    def partition_partials(merged, partition_writer):
+        partials = {}
+        for name, aggregate in PIPELINE_AGGREGATES.items():
+            if aggregate.table not in merged:
+                continue
+            partial = aggregate.partial(merged[aggregate.table])
+            if aggregate.finish is None and partition_writer is not None:
+                partition_writer.write(name, partial)
+            else:
+                partials[name] = partial
+        return partials
+
+    if partition_rows is None and jobs <= 1:
+        outcome = run_reference_merges(input_df, max_workers=merge_workers)
+        if outcome.errors:
+            name, error = next(iter(outcome.errors.items()))
+            raise RuntimeError(f"Merge with {name} failed: {error}") from error
+        merged = {name: df for name, df in outcome.results.items() if not df.empty}
+
+        tables = dict(merged) if include_merged else {}
+        for name, df in merged.items():
+            tables.update(build_aggregate_bundle(df, name))
+        partials = [partition_partials(merged, None)]
+    else:
+        outcome = run_partitioned_merges(
+            input_df, partition_rows, writer=writer, max_workers=merge_workers,
+            on_partition=partition_partials, write_merged=include_merged, jobs=jobs,
+        )
+        tables = {}
+        for bundle in outcome.aggregates.values():
+            tables.update(bundle)
+        partials = outcome.partials
+
+    for name, aggregate in PIPELINE_AGGREGATES.items():
+        frames = [partial[name] for partial in partials if name in partial]
+        if not frames:
+            continue
+        combined = concat_partitions(frames)
+        result = aggregate.finish(combined, options) if aggregate.finish is not None else combined
+        if result is not None:
+            tables[name] = result
+    return tables
+
+
+def _parquet_available() -> bool:
+    """
+    Returns True if pandas can write Parquet files.
+    """
+    return any(importlib.util.find_spec(engine) is not None for engine in ("pyarrow", "fastparquet"))
+
+
+def write_tables(tables: dict, output_dir: str, output_format: str = "csv") -> list:
+    """
+    Writes tables as ``<output_dir>/<name>.csv`` or ``.parquet`` files.
+
+    Named indexes (e.g. the rows of pivoted tables) are written as columns.
+
+    Parameters
+    ----------
+    tables : dict
+        Table name -> DataFrame.
+    output_dir : str
+        Directory of the files (created if needed).
+    output_format : str
+        'csv' or 'parquet'.
+
+    Returns
+    -------
+    list of str
+        Paths of the written files.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for name, df in tables.items():
+        if any(level is not None for level in df.index.names):
+            df = df.reset_index()
+        else:
+            df = df.reset_index(drop=True)
+        path = os.path.join(output_dir, f"{name}.{output_format}")
+        if output_format == "parquet":
+            df.columns = [str(column) for column in df.columns]
+            df.to_parquet(path, index=False)
+        else:
+            df.to_csv(path, index=False)
+        paths.append(path)
+    return paths
+
+
+def process_input_file(path: str, output_dir: str, output_format: str = "csv", options: dict = None) -> dict:
+    """
+    Runs the pipeline on one input file and writes its tables to
+    ``<output_dir>/<input name>/``. Errors are returned, not raised, so a
+    bad file does not stop a batch.
+
+    Parameters
+    ----------
+    path : str
+        Input file.
+    output_dir : str
+        Root output directory.
+    output_format : str
+        'csv' or 'parquet'.
+    options : dict, optional
+        Keyword arguments of `run_pipeline`.
+
+    Returns
+    -------
+    dict
+        Summary row: 'input', 'output', 'samples', 'ko_entries', 'tables',
+        'seconds' and 'error' (None on success).
+    """
+    start = time.perf_counter()
+    summary = {"input": path, "output": os.path.join(output_dir, _output_name(path)),
+               "samples": 0, "ko_entries": 0, "tables": 0, "seconds": 0.0, "error": None}
+    try:
+        input_df = load_input_file(path)
+        summary["samples"] = input_df["sample"].nunique()
+        summary["ko_entries"] = len(input_df)
+        writer = PartitionWriter(summary["output"], output_format)
+        tables = run_pipeline(input_df, writer=writer, **(options or {}))
+        summary["tables"] = len(write_tables(tables, summary["output"], output_format)) + len(writer.paths)
+    except (ValueError, UnicodeError) as e:
+        logger.error(f"Invalid input {path}: {e}")
+        summary["error"] = str(e)
+    except Exception as e:
+        logger.exception(f"Pipeline failed for {path}")
+        summary["error"] = f"{type(e).__name__}: {e}"
+    summary["seconds"] = round(time.perf_counter() - start, 3)
+    logger.info(f"{path}: {summary['tables']} tables in {summary['seconds']:.2f}s")
+    return summary
+
+
+def _load_for_batch(path: str, name: str) -> tuple:
+    """
+    `combine_input_batch` parser of input files.
+    """
+    try:
+        return load_input_file(path), None, []
+    except (ValueError, UnicodeError) as e:
+        return None, str(e), []
+
+
+def run_batch(inputs: list, output_dir: str, output_format: str = "csv", jobs: int = 1,
+              combine: bool = False, options: dict = None) -> pd.DataFrame:
+    """
+    Runs the pipeline over many input files and writes a ``summary.csv``.
+
+    Parameters
+    ----------
+    inputs : list of str
+        Input files (see `collect_inputs`).
+    output_dir : str
+        Root output directory.
+    output_format : str
+        'csv' or 'parquet'.
+    jobs : int
+        Number of worker processes: one input file per process, or sample
+        shards of a single input (and of the combined inputs).
+    combine : bool
+        Parse every input into one table and run a single pipeline, written
+        to ``output_dir``.
+    options : dict, optional
+        Keyword arguments of `run_pipeline`.
+
+    Returns
+    -------
+    pd.DataFrame
+        Summary: one row per input file.
+    """
+    options = dict(options or {})
+    start = time.perf_counter()
+    preload_reference_databases()
+
+    if combine:
+        batch = combine_input_batch(((path, path) for path in inputs), _load_for_batch, max_workers=jobs)
+        rows = [{"input": path, "error": error} for path, error in batch.errors]
+        if batch.df is not None:
+            writer = PartitionWriter(output_dir, output_format)
+            tables = run_pipeline(batch.df, writer=writer, jobs=jobs, **options)
+            written = len(write_tables(tables, output_dir, output_format)) + len(writer.paths)
+            rows += [{"input": path, "samples": batch.samples[path], "tables": written, "error": None}
+                     for path in batch.accepted]
+        summary = pd.DataFrame(rows, columns=["input", "samples", "tables", "error"])
+    else:
+        # Merges of concurrent workers run on one thread each
+        if jobs > 1:
+            options.setdefault("merge_workers", 1)
+        if jobs > 1 and len(inputs) > 1:
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                rows = list(pool.map(process_input_file, inputs, [output_dir] * len(inputs),
+                                     [output_format] * len(inputs), [options] * len(inputs)))
+        else:
+            # A single input is sharded by sample across the worker processes
+            options["jobs"] = jobs
+            rows = [process_input_file(path, output_dir, output_format, options) for path in inputs]
+        summary = pd.DataFrame(rows)
+
+    os.makedirs(output_dir, exist_ok=True)
+    summary.to_csv(os.path.join(output_dir, f"{SUMMARY_FILE}.csv"), index=False)
+    failed = int(summary["error"].notna().sum())
+    logger.info(
+        f"Batch of {len(inputs)} inputs finished in {time.perf_counter() - start:.1f}s "
+        f"({jobs} jobs): {len(inputs) - failed} succeeded, {failed} failed"
+    )
+    return summary
+
+
+def _parse_args(argv) -> argparse.Namespace:
+    """
+    Parses the command-line arguments of `main`.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m utils.core.batch_pipeline",
+        description="Run the BioRemPP pipeline (parse, merges, aggregations) over input files.",
+    )
+    parser.add_argument("inputs", nargs="+", help="input files, directories or glob patterns")
+    parser.add_argument("-o", "--output", required=True, help="output directory")
+    parser.add_argument("-f", "--format", choices=OUTPUT_FORMATS, default="csv", help="table format (default: csv)")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="worker processes, one input per process or sample shards of a single "
+                             "(or --combine'd) input (default: 1, 0 for the CPU count)")
+    parser.add_argument("--combine", action="store_true",
+                        help="analyse all inputs together as one dataset")
+    parser.add_argument("--aggregates-only", action="store_true", help="do not write the merged tables")
+    parser.add_argument("--partition-rows", type=int, default=None, metavar="N",
+                        help="merge in sample partitions of about N merged rows, streaming the merged "
+                             "tables to disk (for inputs whose merged tables do not fit in memory)")
+    parser.add_argument("--distance-metric", default=DEFAULT_DISTANCE_METRIC,
+                        help=f"sample clustering distance (default: {DEFAULT_DISTANCE_METRIC})")
+    parser.add_argument("--clustering-method", default=DEFAULT_CLUSTERING_METHOD,
+                        help=f"sample clustering linkage (default: {DEFAULT_CLUSTERING_METHOD})")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    """
+    Command-line entry point (see the module docstring).
+
+    Returns
+    -------
+    int
+        Exit status: 0 if every input succeeded, 1 if any failed, 2 for
+        invalid arguments.
+    """
+    args = _parse_args(argv)
+    if args.partition_rows is not None and args.partition_rows < 1:
+        print("--partition-rows must be a positive number of rows.", file=sys.stderr)
+        return 2
+    if args.format == "parquet" and not _parquet_available():
+        print("Parquet output requires pyarrow or fastparquet.", file=sys.stderr)
+        return 2
+    try:
+        inputs = collect_inputs(args.inputs)
+    except FileNotFoundError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    if not args.combine:
+        names = pd.Series([_output_name(path) for path in inputs])
+        duplicates = sorted(set(names[names.duplicated()]))
+        if duplicates:
+            print(f"Several inputs would write to the same output directory: {', '.join(duplicates)}",
+                  file=sys.stderr)
+            return 2
+
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    options = {
+        "distance_metric": args.distance_metric,
+        "method": args.clustering_method,
+        "include_merged": not args.aggregates_only,
+        "partition_rows": args.partition_rows,
+    }
+    summary = run_batch(inputs, args.output, args.format, jobs, args.combine, options)
+    failed = summary[summary["error"].notna()]
+    for row in failed.itertuples():
+        print(f"FAILED {row.input}: {row.error}", file=sys.stderr)
+    return 1 if len(failed) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
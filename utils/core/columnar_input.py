@@ -0,0 +1,313 @@
+"""
+columnar_input.py
+-----------------
+Columnar sample/KO inputs: tables of (sample, KO) pairs produced by
+pipelines, loaded directly into the parsed input table.
+
+Instead of rendering the pairs to the ``>sample`` / ``Kxxxxx`` text format
+and parsing it back line by line, the 'sample' and 'ko' columns are encoded
+with array operations: each distinct value is validated (KO pattern, non
+empty sample name) and encoded once, and the rows get its code. The result is
+the table returned by `process_content_lines`: a categorical 'sample' column
+(sorted names) and the 'ko' column encoded with the shared KO vocabulary.
+
+Supported layouts (other columns are ignored, names are case insensitive):
+- Tab-separated text with a header row holding 'sample' and 'ko' columns,
+  plain or compressed (see `compressed_input`), read in chunks of rows.
+- NumPy ``.npz`` archives with 'sample' and 'ko' string arrays.
+- Parquet files with 'sample' and 'ko' columns, if pyarrow or fastparquet is
+  installed.
+
+Functions:
+- columnar_format: Returns the columnar format of a binary input file name.
+- is_columnar_header: Tells whether content starts with a sample/KO header row.
+- parse_columnar_pieces: Parses tab-separated sample/KO pairs given as byte pieces.
+- read_columnar_file: Parses a `.npz` or Parquet sample/KO file.
+"""
+
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils.core.data_validator import ParsedContent
+from utils.core.vocabulary import KO_VOCABULARY
+from utils.logger_config import setup_logger
+
+logger = setup_logger(__name__)
+
+NPZ = "npz"
+PARQUET = "parquet"
+
+# File name suffix -> binary columnar format
+COLUMNAR_SUFFIXES = {
+    ".npz": NPZ,
+    ".parquet": PARQUET,
+}
+
+COLUMNS = ("sample", "ko")
+
+_KO_REGEX = r"K\d+"
+
+# Rows of tab-separated text encoded at once
+_CHUNK_ROWS = 1 << 20
+
+
+def columnar_format(filename: str):
+    """
+    Returns the columnar format of a binary input file from its name.
+
+    Parameters
+    ----------
+    filename : str
+        Name of the file.
+
+    Returns
+    -------
+    str or None
+        'npz' or 'parquet', or None for other files.
+    """
+    if not isinstance(filename, str):
+        return None
+    return COLUMNAR_SUFFIXES.get(os.path.splitext(filename.lower())[1])
+
+
+def is_columnar_header(head: bytes) -> bool:
+    """
+    Returns True if the first non-blank line of the content is a tab-separated
+    header row with 'sample' and 'ko' columns.
+    """
+    first_line = head.lstrip().split(b"\n", 1)[0]
+    names = {name.strip().lower() for name in first_line.split(b"\t")}
+    return b"\t" in first_line and {name.encode() for name in COLUMNS} <= names
+
+
+def _factorize_labels(values) -> tuple:
+    """
+    Factorizes an array of labels into ``(codes, uniques)`` (missing values
+    get the code -1).
+
+    Fixed-width ASCII strings of up to 8 characters (such as KO identifiers
+    from a `.npz` archive) are packed into one uint64 each and factorized as
+    integers, without a Python string per row.
+    """
+    values = np.asarray(values)
+    if values.dtype.kind == "U" and 0 < values.dtype.itemsize <= 32 and len(values):
+        chars = values.view(np.uint32).reshape(len(values), -1)
+        if chars.max() < 128:
+            packed = np.zeros((len(values), 8), dtype=np.uint8)
+            packed[:, :chars.shape[1]] = chars
+            codes, keys = pd.factorize(packed.view(np.uint64).ravel())
+            chars = keys.view(np.uint8).reshape(-1, 8)[:, :chars.shape[1]].astype(np.uint32)
+            return codes, np.ascontiguousarray(chars).view(values.dtype).ravel().astype(object)
+    return pd.factorize(np.asarray(values, dtype=object))
+
+
+def _factorize_runs(values) -> tuple:
+    """
+    Factorizes an array of labels that is mostly made of runs of equal values
+    (pairs grouped by sample): only the first value of every run is hashed.
+    """
+    values = np.asarray(values)
+    if len(values) < 2:
+        return _factorize_labels(values)
+    heads = np.flatnonzero(np.concatenate(([True], values[1:] != values[:-1])))
+    codes, uniques = _factorize_labels(values[heads])
+    return np.repeat(codes, np.diff(np.append(heads, len(values)))), uniques
+
+
+class _PairEncoder:
+    """
+    Encodes chunks of (sample, KO) pairs into sample indices and KO
+    vocabulary codes, stopping at the first invalid pair.
+    """
+
+    def __init__(self):
+        self._parsed = ParsedContent()
+        self._rows = 0
+        self._sample_index = {}
+        self._ko_codes = []
+        self._ko_samples = []
+
+    def add(self, samples, kos) -> bool:
+        """
+        Encodes a chunk of pairs. Returns False once an invalid pair is found.
+        """
+        if self._parsed.error_line is not None:
+            return False
+        sample_local, sample_values = _factorize_runs(samples)
+        ko_local, ko_values = _factorize_labels(kos)
+        sample_names = pd.Index(sample_values, dtype=object).astype(str).str.strip()
+        ko_labels = pd.Index(ko_values, dtype=object).astype(str).str.strip()
+
+        # Validate the distinct values, then the rows through their codes
+        valid_sample = np.append(np.asarray(sample_names.str.len()) > 0, False)
+        valid_ko = np.append(np.asarray(ko_labels.str.fullmatch(_KO_REGEX), dtype=bool), False)
+        invalid = np.flatnonzero(~(valid_sample[sample_local] & valid_ko[ko_local]))
+        count = len(sample_local) if not len(invalid) else int(invalid[0])
+        if len(invalid):
+            row = int(invalid[0])
+            self._parsed.error_kind = "pair"
+            self._parsed.error_line = self._rows + row + 1
+            self._parsed.error_text = f"{samples[row]}\t{kos[row]}"
+
+        sample_map = np.fromiter(
+            (self._sample_index.setdefault(name, len(self._sample_index)) for name in sample_names),
+            dtype=np.int32, count=len(sample_names),
+        )
+        # Only valid identifiers enter the shared vocabulary
+        ko_map = KO_VOCABULARY.encode(np.where(valid_ko[:-1], np.asarray(ko_labels, dtype=object), None))
+        self._ko_samples.append(sample_map[sample_local[:count]])
+        self._ko_codes.append(ko_map[ko_local[:count]])
+        self._rows += count
+        return not len(invalid)
+
+    def close(self) -> ParsedContent:
+        """
+        Builds the result: the table, or the first invalid pair.
+        """
+        parsed = self._parsed
+        parsed.ko_count = self._rows
+        sample_indices = np.concatenate(self._ko_samples) if self._ko_samples else np.empty(0, dtype=np.int32)
+        parsed.sample_count = len(np.unique(sample_indices))
+        if parsed.error_line is not None or not self._rows:
+            return parsed
+
+        sample_codes, samples = pd.factorize(pd.Index(list(self._sample_index), dtype=object), sort=True)
+        parsed.df = pd.DataFrame({
+            "sample": pd.Categorical.from_codes(
+                sample_codes.astype(np.int32)[sample_indices], categories=samples, validate=False
+            ),
+            "ko": pd.Categorical.from_codes(
+                np.concatenate(self._ko_codes), dtype=KO_VOCABULARY.dtype, validate=False
+            ),
+        })
+        logger.info(f"Columnar input parsed: {self._rows} KO entries for {parsed.sample_count} samples")
+        return parsed
+
+
+class _PiecesReader(io.RawIOBase):
+    """
+    Read-only binary stream over an iterable of byte pieces.
+    """
+
+    def __init__(self, pieces):
+        self._pieces = iter(pieces)
+        self._piece = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._piece:
+            self._piece = next(self._pieces, None)
+            if self._piece is None:
+                self._piece = b""
+                return 0
+        size = min(len(buffer), len(self._piece))
+        buffer[:size] = self._piece[:size]
+        self._piece = self._piece[size:]
+        return size
+
+
+def _column_names(columns) -> dict:
+    """
+    Returns the 'sample' and 'ko' column names of a table (case insensitive).
+
+    Raises
+    ------
+    ValueError
+        If a column is missing.
+    """
+    names = {str(column).strip().lower(): column for column in columns}
+    missing = [name for name in COLUMNS if name not in names]
+    if missing:
+        raise ValueError(f"Columnar input has no {' or '.join(missing)} column.")
+    return {name: names[name] for name in COLUMNS}
+
+
+def parse_columnar_pieces(pieces) -> ParsedContent:
+    """
+    Parses tab-separated sample/KO pairs with a header row, given as byte
+    pieces, in chunks of rows.
+
+    Parameters
+    ----------
+    pieces : iterable of bytes
+        Content of the table (see `is_columnar_header`).
+
+    Returns
+    -------
+    ParsedContent
+        Parsed table and counts; for an invalid pair, ``error_line`` is its
+        1-based data row.
+
+    Raises
+    ------
+    ValueError
+        If the header has no 'sample' or 'ko' column.
+    """
+    encoder = _PairEncoder()
+    reader = pd.read_csv(
+        io.BufferedReader(_PiecesReader(pieces)), sep="\t", dtype=str, na_filter=False,
+        usecols=lambda name: name.strip().lower() in COLUMNS, chunksize=_CHUNK_ROWS,
+    )
+    with reader:
+        columns = None
+        for chunk in reader:
+            columns = columns or _column_names(chunk.columns)
+            if not encoder.add(chunk[columns["sample"]].to_numpy(), chunk[columns["ko"]].to_numpy()):
+                break
+    return encoder.close()
+
+
+def read_columnar_file(fileobj, columnar: str) -> ParsedContent:
+    """
+    Parses a `.npz` or Parquet file of sample/KO pairs.
+
+    Parameters
+    ----------
+    fileobj : str or file-like
+        Path or seekable binary file.
+    columnar : str
+        'npz' or 'parquet' (see `columnar_format`).
+
+    Returns
+    -------
+    ParsedContent
+        Parsed table and counts; for an invalid pair, ``error_line`` is its
+        1-based row.
+
+    Raises
+    ------
+    ValueError
+        If the file cannot be read, has no 'sample' or 'ko' column, or no
+        Parquet engine is installed.
+    """
+    if columnar == NPZ:
+        try:
+            with np.load(fileobj, allow_pickle=False) as archive:
+                columns = _column_names(archive.files)
+                samples, kos = archive[columns["sample"]], archive[columns["ko"]]
+        except (OSError, KeyError) as e:
+            raise ValueError(f"Could not read the npz archive: {e}") from e
+        if samples.shape != kos.shape or samples.ndim != 1:
+            raise ValueError("The npz 'sample' and 'ko' arrays must be one-dimensional and of the same length.")
+        # Byte strings are read as ASCII text
+        samples = samples.astype(str) if samples.dtype.kind == "S" else samples
+        kos = kos.astype(str) if kos.dtype.kind == "S" else kos
+    elif columnar == PARQUET:
+        try:
+            table = pd.read_parquet(fileobj)
+        except ImportError as e:
+            raise ValueError("Parquet input requires pyarrow or fastparquet.") from e
+        columns = _column_names(table.columns)
+        samples = table[columns["sample"]].to_numpy(dtype=object)
+        kos = table[columns["ko"]].to_numpy(dtype=object)
+    else:
+        raise ValueError(f"Unknown columnar format: {columnar!r}")
+
+    encoder = _PairEncoder()
+    encoder.add(samples, kos)
+    return encoder.close()
@@ -0,0 +1,296 @@
+"""
+compressed_input.py
+-------------------
+Compressed input files (gzip, bz2, xz and zip), decompressed as a stream into
+the bulk parser.
+
+KO lists compress about 10x. Instead of decompressing an upload into one
+buffer, the compressed bytes are read through a decompressing file object in
+pieces of `_READ_BYTES`, and every piece is fed to a `ContentParser`: memory
+stays bounded by the piece size and the parsed table. The members of a zip
+archive are parsed one after the other, as if they were concatenated.
+
+The compression is given by the file name (``.gz``, ``.bz2``, ``.xz`` or
+``.zip``, e.g. ``bins.txt.gz``). Annotation tables (KofamKOALA, eggNOG-mapper)
+and tab-separated sample/KO tables are recognized from their first bytes and
+read by `annotation_readers` and `columnar_input`. The decompressed size is
+limited to ``BIOREMPP_MAX_DECOMPRESSED_MB`` (default 2048) against
+decompression bombs.
+
+`load_input_file` is the headless entry point: it reads any supported input
+file from a path into the parsed input table, without the Dash app.
+
+Functions:
+- input_compression: Returns the compression of an input file name.
+- is_supported_input: Tells whether a file name is an accepted input.
+- iter_input_pieces: Yields the decompressed content of a file in pieces.
+- parse_input_file: Parses a plain or compressed input file in one pass.
+- load_input_file: Reads an input file of any supported format from a path.
+"""
+
+import bz2
+import gzip
+import itertools
+import lzma
+import os
+import zipfile
+import zlib
+
+from utils.core.columnar_input import columnar_format, is_columnar_header, parse_columnar_pieces, read_columnar_file
+from utils.core.data_validator import ContentParser, ParsedContent, parsed_result
+
+DEFAULT_MAX_DECOMPRESSED_BYTES = int(os.environ.get("BIOREMPP_MAX_DECOMPRESSED_MB", 2048)) * 1024 ** 2
+
+# File name suffix -> compression
+COMPRESSION_SUFFIXES = {
+    ".gz": "gzip",
+    ".bz2": "bz2",
+    ".xz": "xz",
+    ".zip": "zip",
+}
+
+# Uncompressed input files: sample/KO text and annotation tables
+PLAIN_SUFFIXES = (".txt", ".tsv", ".annotations")
+
+# Error message of the upload handlers for other files
+UNSUPPORTED_FILE_MESSAGE = (
+    "Apenas arquivos .txt, .tsv, .annotations, .npz ou .parquet "
+    "(ou compactados: .gz, .bz2, .xz, .zip) são suportados."
+)
+
+# Decompressing file objects of the single-stream formats
+_OPENERS = {
+    "gzip": gzip.open,
+    "bz2": bz2.open,
+    "xz": lzma.open,
+}
+
+# Errors raised by the decompressors on corrupt or truncated input
+_DECOMPRESSION_ERRORS = (OSError, EOFError, zlib.error, lzma.LZMAError, zipfile.BadZipFile)
+
+_READ_BYTES = 1024 ** 2
+
+# Bytes inspected to recognize annotation tables
+FORMAT_HEAD_BYTES = 64 * 1024
+
+
+def input_compression(filename: str):
+    """
+    Returns the compression of an input file from its name.
+
+    Parameters
+    ----------
+    filename : str
+        Name of the file.
+
+    Returns
+    -------
+    str or None
+        'gzip', 'bz2', 'xz' or 'zip', or None for an uncompressed file.
+    """
+    return COMPRESSION_SUFFIXES.get(os.path.splitext(filename.lower())[1])
+
+
+def is_supported_input(filename: str) -> bool:
+    """
+    Returns True for `.txt`, `.tsv`, `.annotations`, `.npz` and `.parquet`
+    files and compressed files.
+    """
+    return isinstance(filename, str) and (
+        filename.lower().endswith(PLAIN_SUFFIXES)
+        or input_compression(filename) is not None
+        or columnar_format(filename) is not None
+    )
+
+
+def _zip_members(archive: zipfile.ZipFile) -> list:
+    """
+    Returns the members of a zip archive holding input data, in archive order
+    (directories and macOS metadata are skipped).
+    """
+    return [
+        info for info in archive.infolist()
+        if not info.is_dir()
+        and not info.filename.startswith("__MACOSX/")
+        and not os.path.basename(info.filename).startswith(".")
+    ]
+
+
+def _read_pieces(stream):
+    """
+    Yields the content of a binary stream in pieces of `_READ_BYTES`.
+    """
+    for piece in iter(lambda: stream.read(_READ_BYTES), b""):
+        yield piece
+
+
+def iter_input_pieces(fileobj, compression=None, max_bytes: int = DEFAULT_MAX_DECOMPRESSED_BYTES):
+    """
+    Yields the decompressed content of an input file in pieces.
+
+    Parameters
+    ----------
+    fileobj : file-like
+        Binary file (seekable for zip archives).
+    compression : str, optional
+        'gzip', 'bz2', 'xz', 'zip' or None (see `input_compression`).
+    max_bytes : int
+        Maximum decompressed size.
+
+    Yields
+    ------
+    bytes
+        Next piece of the content. Members of a zip archive are separated by
+        a line break.
+
+    Raises
+    ------
+    ValueError
+        If the file cannot be decompressed, a zip archive has no member or
+        the content exceeds ``max_bytes``.
+    """
+    def limited(pieces):
+        total = 0
+        for piece in pieces:
+            total += len(piece)
+            if total > max_bytes:
+                raise ValueError(f"Decompressed content exceeds {max_bytes // 1024 ** 2} MB.")
+            yield piece
+
+    if compression is None:
+        yield from limited(_read_pieces(fileobj))
+        return
+
+    try:
+        if compression == "zip":
+            with zipfile.ZipFile(fileobj) as archive:
+                members = _zip_members(archive)
+                if not members:
+                    raise ValueError("The zip archive has no file.")
+
+                def member_pieces():
+                    for info in members:
+                        with archive.open(info) as member:
+                            last = b""
+                            for piece in _read_pieces(member):
+                                last = piece
+                                yield piece
+                        if last and not last.endswith(b"\n"):
+                            yield b"\n"
+
+                yield from limited(member_pieces())
+        else:
+            with _OPENERS[compression](fileobj, "rb") as stream:
+                yield from limited(_read_pieces(stream))
+    except _DECOMPRESSION_ERRORS as e:
+        raise ValueError(f"Could not decompress {compression} content: {e}") from e
+
+
+def parse_input_file(fileobj, compression=None, max_bytes: int = DEFAULT_MAX_DECOMPRESSED_BYTES,
+                     sample: str = "sample") -> ParsedContent:
+    """
+    Parses a plain or compressed input file in one pass, feeding the
+    decompressed pieces to a `ContentParser`, to the annotation reader of a
+    KofamKOALA or eggNOG-mapper table, or to the columnar reader of a
+    tab-separated sample/KO table.
+
+    Parameters
+    ----------
+    fileobj : file-like
+        Binary file (seekable for zip archives).
+    compression : str, optional
+        'gzip', 'bz2', 'xz', 'zip' or None (see `input_compression`).
+    max_bytes : int
+        Maximum decompressed size.
+    sample : str
+        Sample name of an annotation table (see `annotation_sample_name`).
+
+    Returns
+    -------
+    ParsedContent
+        Parsed table, counts and the first invalid line, if any.
+
+    Raises
+    ------
+    ValueError
+        If the file cannot be decompressed or is too large.
+    UnicodeDecodeError
+        If the content is not valid UTF-8.
+    """
+    # Imported here: annotation_readers imports this module
+    from utils.core.annotation_readers import detect_annotation_format, parse_annotation_pieces
+
+    pieces = iter_input_pieces(fileobj, compression, max_bytes)
+    head = []
+    for piece in pieces:
+        head.append(piece)
+        if sum(map(len, head)) >= FORMAT_HEAD_BYTES:
+            break
+    head_bytes = b"".join(head)
+    annotation_format = detect_annotation_format(head_bytes)
+    pieces = itertools.chain(head, pieces)
+    if annotation_format is not None:
+        return parse_annotation_pieces(pieces, annotation_format, sample)
+    if is_columnar_header(head_bytes):
+        return parse_columnar_pieces(pieces)
+
+    parser = ContentParser()
+    for piece in pieces:
+        parser.feed(piece)
+    return parser.close()
+
+
+def load_input_file(path, sample: str = None, max_bytes: int = DEFAULT_MAX_DECOMPRESSED_BYTES):
+    """
+    Reads an input file of any supported format into the parsed input table,
+    without the Dash app (headless pipelines, scripts).
+
+    The format is given by the file name (``.npz``, ``.parquet``, compression
+    suffixes) and by the first bytes of the content: sample/KO text,
+    tab-separated sample/KO table with a header row, KofamKOALA or
+    eggNOG-mapper table.
+
+    Parameters
+    ----------
+    path : str or os.PathLike
+        Path of the file.
+    sample : str, optional
+        Sample name of an annotation table; by default the file name without
+        suffixes.
+    max_bytes : int
+        Maximum decompressed size.
+
+    Returns
+    -------
+    pd.DataFrame
+        Table with a categorical 'sample' column and the 'ko' column encoded
+        with the shared KO vocabulary.
+
+    Raises
+    ------
+    ValueError
+        If the file is not a supported input, cannot be read or is invalid.
+    UnicodeDecodeError
+        If a text file is not valid UTF-8.
+    """
+    # Imported here: annotation_readers imports this module
+    from utils.core.annotation_readers import annotation_sample_name
+
+    filename = os.fspath(path)
+    if not is_supported_input(filename):
+        raise ValueError(f"Unsupported input file: {filename}")
+
+    columnar = columnar_format(filename)
+    if columnar is not None:
+        parsed = read_columnar_file(filename, columnar)
+    else:
+        with open(filename, "rb") as f:
+            parsed = parse_input_file(
+                f, input_compression(filename), max_bytes,
+                sample=sample if sample is not None else annotation_sample_name(filename),
+            )
+
+    df, error = parsed_result(parsed)
+    if error:
+        raise ValueError(f"{filename}: {error}")
+    return df
@@ -22,6 +22,11 @@ Modules and Tools Used:
     - plotly (optional): placeholder for future data visualization components
 
 Main Functions:
+    - preload_reference_databases: Loads the registered reference databases into the registry.
+    - merge_with_reference: Generic merge with any database registered in `reference_specs`.
+    - reference_match_counts: Number of reference rows matching each join key value.
+    - get_indexed_reference: Registered reference database with its cached key index.
+    - get_reference_incidence: Key x entity incidence matrix of a registered reference database.
     - merge_input_with_database: Merges input data with the main reference database (BioRemPP).
     - merge_input_with_database_hadegDB: Merges with the HADEG enzyme database.
     - merge_with_kegg: Integrates KEGG degradation pathway metadata.
@@ -48,6 +53,9 @@ License:
 Notes:
     Ensure that all required input columns are present before using these functions.
     File paths should point to valid CSV or Excel files.
+    Reference databases are cached per process by `utils.core.reference_registry`
+    and only re-read when the file changes on disk. Joins use the precomputed
+    key indexes of `utils.core.reference_index` instead of `pd.merge`.
 
 """
 
@@ -60,16 +68,349 @@ Notes:
 # Functions for Data Merging
 # -------------------------------
 import os
+import numpy as np
 import pandas as pd
 import logging
 
-from utils.core.optimize_dtypes import optimize_dtypes, optimize_kegg_dtypes, optimize_hadeg_dtypes, optimize_toxcsm_dtypes
+from utils.core.incidence import build_incidence
+from utils.core.optimize_dtypes import (
+    get_spec_optimizer,
+    optimize_dtypes,
+    optimize_hadeg_dtypes,
+    optimize_kegg_dtypes,
+    optimize_toxcsm_dtypes,
+)
+from utils.core.reference_index import build_key_index, distinct_rows, index_join, join_input_columns
+from utils.core.reference_registry import get_reference_derived, get_reference_table
+from utils.core.reference_snapshots import load_with_snapshot
+from utils.core.reference_specs import get_reference_spec, merge_plan
+from utils.core.vocabulary import align_shared_categories
 from utils.logger_config import setup_logger
 logger = setup_logger(__name__)
 
 
+def _read_reference_file(filepath: str, optimizer=None, sep: str = ";") -> pd.DataFrame:
+    """
+    Reads a reference database file (CSV or Excel) and optionally optimizes
+    its dtypes. Used as the loader for the reference registry.
+
+    CSV files are read through their binary snapshot (see
+    `utils.core.reference_snapshots`), which is rebuilt when the CSV changes.
+
+    Parameters
+    ----------
+    filepath : str
+        Path to the reference file (.csv or .xlsx).
+    optimizer : callable, optional
+        One of the ``optimize_*_dtypes`` functions, applied after loading.
+    sep : str, optional
+        Field separator of CSV files. Defaults to ';'.
+
+    Returns
+    -------
+    pd.DataFrame
+        The loaded (and optionally optimized) reference table.
+
+    Raises
+    ------
+    ValueError
+        If the file extension is unsupported (.csv or .xlsx expected).
+    """
+    if filepath.endswith(".csv"):
+        df = load_with_snapshot(
+            filepath,
+            lambda path: pd.read_csv(path, encoding="utf-8", sep=sep),
+            as_categorical=optimizer is not None,
+        )
+    elif filepath.endswith(".xlsx"):
+        df = pd.read_excel(filepath, engine="openpyxl")
+    else:
+        raise ValueError("Unsupported file format. Use .csv or .xlsx")
+
+    if optimizer is not None:
+        df = optimizer(df)
+    return df
+
+
+def _reference_loader(optimizer, optimize_types: bool, sep: str = ";") -> tuple:
+    """
+    Returns the ``(loader, variant)`` pair identifying a reference table in the registry.
+    """
+    if not optimize_types:
+        return (lambda path: _read_reference_file(path, sep=sep)), ("raw", sep)
+    return (
+        lambda path: _read_reference_file(path, optimizer, sep),
+        (getattr(optimizer, "__name__", type(optimizer).__name__), sep),
+    )
+
+
+def _load_reference(filepath: str, optimizer, optimize_types: bool, sep: str = ";") -> pd.DataFrame:
+    """
+    Returns a reference table from the process-wide registry, loading and
+    optimizing it only on the first call or when the file changes on disk.
+    """
+    if not filepath.endswith((".csv", ".xlsx")):
+        raise ValueError("Unsupported file format. Use .csv or .xlsx")
+
+    loader, variant = _reference_loader(optimizer, optimize_types, sep)
+    return get_reference_table(filepath, loader, variant=variant)
+
+
+def _join_reference(input_df: pd.DataFrame, reference_df: pd.DataFrame, filepath: str,
+                    optimizer, optimize_types: bool, key: str, sep: str = ";",
+                    columns=None, distinct: bool = False) -> pd.DataFrame:
+    """
+    Inner-joins ``input_df`` with a registry reference table on ``key`` through
+    the table's cached key index (built once per table version), projected on
+    ``columns``.
+    """
+    loader, variant = _reference_loader(optimizer, optimize_types, sep)
+    index = get_reference_derived(
+        filepath, loader, ("key_index", key), lambda df: build_key_index(df, key), variant=variant
+    )
+    return index_join(input_df, reference_df, index, columns=columns, distinct=distinct)
+
+
+def _reference_key_index(spec):
+    """
+    Returns the cached key index of a registered reference database, loaded
+    as `merge_with_reference` loads it by default.
+    """
+    loader, variant = _reference_loader(get_spec_optimizer(spec), spec.optimize_by_default, spec.sep)
+    return get_reference_derived(
+        spec.path, loader, ("key_index", spec.key), lambda df: build_key_index(df, spec.key), variant=variant
+    )
+
+
+def get_indexed_reference(name: str) -> tuple:
+    """
+    Returns a registered reference database, loaded as `merge_with_reference`
+    loads it by default, with its cached key index.
+
+    Parameters
+    ----------
+    name : str
+        Name of the registered spec.
+
+    Returns
+    -------
+    tuple
+        ``(reference table, KeyIndex)``. The table is the read-only registry
+        table shared by every merge of the process.
+
+    Raises
+    ------
+    FileNotFoundError
+        If the database file does not exist.
+    KeyError
+        If the spec is unknown.
+    """
+    spec = get_reference_spec(name)
+    if not os.path.exists(spec.path):
+        logger.error(f"{spec.label} database file not found: {spec.path}")
+        raise FileNotFoundError(f"{spec.label} database file not found: {spec.path}")
+    reference_df = _load_reference(spec.path, get_spec_optimizer(spec), spec.optimize_by_default, spec.sep)
+    return reference_df, _reference_key_index(spec)
+
+
+def get_reference_incidence(name: str, column: str):
+    """
+    Returns the key x entity incidence matrix of a registered reference
+    database (e.g. KO x compound), built once per table version.
+
+    Parameters
+    ----------
+    name : str
+        Name of the registered spec.
+    column : str
+        Entity column of the database (e.g. 'compoundname', 'pathname').
+
+    Returns
+    -------
+    IncidenceMatrix
+        Shared matrix (not to be modified): one row per key of the database,
+        one column per entity, counting the database rows of every pair.
+
+    Raises
+    ------
+    FileNotFoundError
+        If the database file does not exist.
+    KeyError
+        If the spec is unknown.
+    ValueError
+        If ``column`` is not a column of the database.
+    """
+    spec = get_reference_spec(name)
+    if not os.path.exists(spec.path):
+        logger.error(f"{spec.label} database file not found: {spec.path}")
+        raise FileNotFoundError(f"{spec.label} database file not found: {spec.path}")
+    loader, variant = _reference_loader(get_spec_optimizer(spec), spec.optimize_by_default, spec.sep)
+    return get_reference_derived(
+        spec.path, loader, ("incidence", spec.key, column),
+        lambda df: build_incidence(df, spec.key, column), variant=variant
+    )
+
+
+def preload_reference_databases() -> None:
+    """
+    Loads every registered reference database (see `utils.core.reference_specs`)
+    into the process-wide registry, with its key index and its key x entity
+    incidence matrices, so that the first
+    Submit does not pay the parsing cost and forked worker processes share
+    the loaded tables.
+
+    Failures are logged and ignored; the merge functions will raise the usual
+    errors when the corresponding database is requested.
+    """
+    for spec in merge_plan():
+        try:
+            _load_reference(spec.path, get_spec_optimizer(spec), spec.optimize_by_default, spec.sep)
+            _reference_key_index(spec)
+            for column in spec.incidence_columns:
+                get_reference_incidence(spec.name, column)
+        except Exception as e:
+            logger.warning(f"Could not preload reference database {spec.path}: {e}")
+
+
+def reference_match_counts(values: pd.Series, name: str) -> np.ndarray:
+    """
+    Returns the number of rows of a registered reference database matching
+    each value of its join key, through the cached key index (the database
+    is loaded and indexed as for `merge_with_reference`).
+
+    Parameters
+    ----------
+    values : pd.Series
+        Join key values (e.g. the 'ko' column of the input).
+    name : str
+        Name of the registered spec.
+
+    Returns
+    -------
+    np.ndarray
+        int64 count per value; 0 for values absent from the database.
+    """
+    return _reference_key_index(get_reference_spec(name)).match_counts(values)
+
+
+def merge_with_reference(input_df: pd.DataFrame, name: str, filepath: str = None,
+                         optimize_types: bool = None, optimizer=None, columns=None,
+                         distinct: bool = False) -> pd.DataFrame:
+    """
+    Merges input data with a registered reference database.
+
+    Every step is driven by the database's `ReferenceSpec`: the file is loaded
+    and typed once per process (registry and snapshot), indexed once on its
+    join key, and joined with the index-based engine.
+
+    A projection (``columns``) is pushed down into the join: the input is
+    reduced to the columns the projection needs before it is typed, and only
+    the projected reference columns are materialized. With ``distinct`` the
+    reduced input is deduplicated before its rows are expanded, and the
+    joined rows before they are materialized (see `index_join`).
+
+    Parameters
+    ----------
+    input_df : pd.DataFrame
+        Input DataFrame. Must contain the spec's ``input_columns``.
+    name : str
+        Name of the registered spec (e.g. 'biorempp', 'kegg', 'hadeg', 'toxcsm').
+    filepath : str, optional
+        Path to the database file. Defaults to the spec's path.
+    optimize_types : bool, optional
+        Whether to optimize DataFrame types using categorical data. Defaults
+        to the spec's ``optimize_by_default``.
+    optimizer : callable, optional
+        Dtype optimizer. Defaults to the spec's optimizer.
+    columns : list of str, optional
+        Result columns to materialize, in this order, named as in the full
+        result (e.g. ``['sample', 'ko', 'compoundname']``). Defaults to every
+        column.
+    distinct : bool, optional
+        If True, only the distinct result rows are returned.
+
+    Returns
+    -------
+    pd.DataFrame
+        Inner join of the input with the database on the spec's key.
+
+    Raises
+    ------
+    FileNotFoundError
+        If the database file does not exist.
+    ValueError
+        If the file extension is unsupported (.csv or .xlsx expected).
+    KeyError
+        If the spec is unknown, a required column is missing or a projected
+        column is not a column of the result.
+    """
+    spec = get_reference_spec(name)
+    if filepath is None:
+        filepath = spec.path
+        logger.info(f"No {spec.label} path provided. Using default: {filepath}")
+    if optimize_types is None:
+        optimize_types = spec.optimize_by_default
+    if optimizer is None:
+        optimizer = get_spec_optimizer(spec)
+
+    if not os.path.exists(filepath):
+        logger.error(f"{spec.label} database file not found: {filepath}")
+        raise FileNotFoundError(f"{spec.label} database file not found: {filepath}")
+
+    # Load database (cached per process, typed on first load)
+    try:
+        reference_df = _load_reference(filepath, optimizer, optimize_types, spec.sep)
+        logger.info(f"{spec.label} database loaded from reference registry.")
+    except Exception:
+        logger.exception(f"Failed to load {spec.label} database.")
+        raise
+
+    # Validate required columns
+    for col in spec.input_columns:
+        if col not in input_df.columns:
+            logger.error(f"Column '{col}' is missing from input DataFrame.")
+            raise KeyError(f"Required column '{col}' is missing in the input DataFrame.")
+    if spec.key not in reference_df.columns:
+        logger.error(f"Column '{spec.key}' is missing in {spec.label} database.")
+        raise KeyError(f"Column '{spec.key}' is required in the {spec.label} database.")
+
+    if spec.reduce_input:
+        logger.info("Reducing and deduplicating input DataFrame...")
+        input_df = input_df[spec.input_columns].drop_duplicates()
+    if columns is not None:
+        # Only the input columns of the projection reach the join, once each
+        needed = join_input_columns(input_df.columns, reference_df.columns, spec.key, columns)
+        if distinct and len(needed) < len(input_df.columns):
+            input_df = distinct_rows(input_df[needed])
+        else:
+            input_df = input_df[needed]
+
+    # Optimize input types if requested
+    if optimize_types:
+        input_df = optimizer(input_df.copy())
+        logger.info(f"{spec.label} input optimized with categorical types.")
+
+    # Join on shared integer codes through the cached key index
+    try:
+        if optimize_types or spec.always_encode_key:
+            input_df, reference_df = align_shared_categories(input_df, reference_df)
+        merged_df = _join_reference(input_df, reference_df, filepath, optimizer, optimize_types,
+                                    spec.key, spec.sep, columns=columns, distinct=distinct)
+
+        # Optimize final result if requested
+        if optimize_types:
+            merged_df = optimizer(merged_df)
+    except Exception:
+        logger.exception(f"Merge with {spec.label} failed.")
+        raise
+
+    logger.info(f"{spec.label} merge completed. Resulting shape: {merged_df.shape}")
+    return merged_df
+
+
 def merge_input_with_database(input_data: pd.DataFrame, database_filepath: str = None,   
-                            optimize_types: bool = True) -> pd.DataFrame:  
+                            optimize_types: bool = True, columns=None,  
+                            distinct: bool = False) -> pd.DataFrame:  
     """  
     Merges input data with a reference database file (CSV or Excel format),   
     using a default path if none is provided.  
@@ -82,6 +423,10 @@ def merge_input_with_database(input_data: pd.DataFrame, database_filepath: str =
         Path to the database file (CSV or XLSX). Defaults to 'data/database.csv'.  
     optimize_types : bool, optional  
         Whether to optimize DataFrame types using categorical data. Defaults to True.  
+    columns : list of str, optional  
+        Result columns to materialize (see `merge_with_reference`). Defaults to all.  
+    distinct : bool, optional  
+        Whether only distinct result rows are returned. Defaults to False.  
   
     Returns  
     -------  
@@ -103,57 +448,16 @@ def merge_input_with_database(input_data: pd.DataFrame, database_filepath: str =
     --------  
     >>> df = pd.DataFrame({"ko": ["K00001"]})  
     >>> merge_input_with_database(df)  
+    >>> merge_input_with_database(df, columns=["genesymbol", "compoundname"], distinct=True)  
     """  
-    try:  
-        # Set default path if none provided  
-        if database_filepath is None:  
-            database_filepath = os.path.join("data", "database.csv")  
-        logging.info(f"Using database file at: {database_filepath}")  
-  
-        # Check if file exists  
-        if not os.path.exists(database_filepath):  
-            logging.error("Database file not found.")  
-            raise FileNotFoundError(f"Database file not found: {database_filepath}")  
-  
-        # Load database  
-        if database_filepath.endswith(".csv"):  
-            database_df = pd.read_csv(database_filepath, encoding="utf-8", sep=";")  
-            logging.info("Database loaded from CSV.")  
-        elif database_filepath.endswith(".xlsx"):  
-            database_df = pd.read_excel(database_filepath, engine="openpyxl")  
-            logging.info("Database loaded from Excel.")  
-        else:  
-            logging.error("Unsupported file extension.")  
-            raise ValueError("Unsupported file format. Use .csv or .xlsx")  
-  
-        # Optimize types after loading if requested  
-        if optimize_types:  
-            database_df = optimize_dtypes(database_df)  
-            input_data = optimize_dtypes(input_data.copy())  
-            logging.info("DataFrames optimized with categorical types.")  
-  
-        # Validate presence of 'ko' column  
-        for df_name, df in {"input_data": input_data, "database_df": database_df}.items():  
-            if "ko" not in df.columns:  
-                logging.error(f"Missing 'ko' column in {df_name}.")  
-                raise KeyError(f"Column 'ko' must be present in both input and database DataFrames.")  
-  
-        # Merge operation  
-        merged_df = pd.merge(input_data, database_df, on="ko", how="inner")  
-          
-        # Optimize final result if requested  
-        if optimize_types:  
-            merged_df = optimize_dtypes(merged_df)  
-              
-        logging.info(f"Merged DataFrame shape: {merged_df.shape}")  
-        return merged_df  
-  
-    except Exception as e:  
-        logging.exception("An error occurred during merging.")  
-        raise
+    return merge_with_reference(input_data, "biorempp", database_filepath,  
+                                optimize_types, optimizer=optimize_dtypes,  
+                                columns=columns, distinct=distinct)  
+
 
 def merge_with_kegg(input_df: pd.DataFrame, kegg_filepath: str = None,   
-                   optimize_types: bool = True) -> pd.DataFrame:  
+                   optimize_types: bool = True, columns=None,  
+                   distinct: bool = False) -> pd.DataFrame:  
     """  
     Merges input data with KEGG degradation pathway information from a CSV or Excel file.  
   
@@ -166,6 +470,10 @@ def merge_with_kegg(input_df: pd.DataFrame, kegg_filepath: str = None,
         'data/kegg_degradation_pathways.csv'.  
     optimize_types : bool, optional  
         Whether to optimize DataFrame types using categorical data. Defaults to True.  
+    columns : list of str, optional  
+        Result columns to materialize (see `merge_with_reference`). Defaults to all.  
+    distinct : bool, optional  
+        Whether only distinct result rows are returned. Defaults to False.  
   
     Returns  
     -------  
@@ -192,64 +500,14 @@ def merge_with_kegg(input_df: pd.DataFrame, kegg_filepath: str = None,
     The 'ko' column must be present in both DataFrames for merging.  
     The KEGG file must be encoded in UTF-8 if CSV, and use 'openpyxl' engine if Excel.  
     """  
-    # Define default file path  
-    if kegg_filepath is None:  
-        kegg_filepath = os.path.join("data", "kegg_degradation_pathways.csv")  
-        logger.info(f"No filepath provided. Using default: {kegg_filepath}")  
-  
-    # Validate file existence  
-    if not os.path.exists(kegg_filepath):  
-        logger.error(f"KEGG file not found at path: {kegg_filepath}")  
-        raise FileNotFoundError(f"KEGG file not found: {kegg_filepath}")  
-  
-    # Load KEGG data  
-    try:  
-        if kegg_filepath.endswith(".csv"):  
-            logger.info("Reading KEGG data from CSV file.")  
-            kegg_df = pd.read_csv(kegg_filepath, encoding="utf-8", sep=";")  
-        elif kegg_filepath.endswith(".xlsx"):  
-            logger.info("Reading KEGG data from Excel file.")  
-            kegg_df = pd.read_excel(kegg_filepath, engine="openpyxl")  
-        else:  
-            logger.error("Unsupported file format provided.")  
-            raise ValueError("Unsupported file format. Use .csv or .xlsx")  
-    except Exception as e:  
-        logger.exception("Failed to read KEGG file.")  
-        raise e  
-  
-    # Optimize types after loading if requested  
-    if optimize_types:  
-        kegg_df = optimize_kegg_dtypes(kegg_df)  
-        input_df = optimize_kegg_dtypes(input_df.copy())  
-        logger.info("KEGG DataFrames optimized with categorical types.")  
-  
-    # Check required columns  
-    if "ko" not in input_df.columns:  
-        logger.error("Column 'ko' missing in input DataFrame.")  
-        raise KeyError("Column 'ko' must be present in the input DataFrame.")  
-  
-    if "ko" not in kegg_df.columns:  
-        logger.error("Column 'ko' missing in KEGG DataFrame.")  
-        raise KeyError("Column 'ko' must be present in the KEGG DataFrame.")  
-  
-    # Perform the merge  
-    try:  
-        logger.info("Merging input data with KEGG degradation pathways.")  
-        merged_df = pd.merge(input_df, kegg_df, on="ko", how="inner")  
-          
-        # Optimize final result if requested  
-        if optimize_types:  
-            merged_df = optimize_kegg_dtypes(merged_df)  
-              
-        logger.info(f"Merge successful. Resulting shape: {merged_df.shape}")  
-        return merged_df  
-    except Exception as e:  
-        logger.exception("Error occurred during merge.")  
-        raise e
-    
+    return merge_with_reference(input_df, "kegg", kegg_filepath,  
+                                optimize_types, optimizer=optimize_kegg_dtypes,  
+                                columns=columns, distinct=distinct)  
+
 
 def merge_input_with_database_hadegDB(input_data: pd.DataFrame, database_filepath: str = None,   
-                                    optimize_types: bool = True) -> pd.DataFrame:  
+                                    optimize_types: bool = True, columns=None,  
+                                    distinct: bool = False) -> pd.DataFrame:  
     """  
     Merges input data with the HADEG database using a common 'ko' column.  
   
@@ -264,6 +522,11 @@ def merge_input_with_database_hadegDB(input_data: pd.DataFrame, database_filepat
       
     optimize_types : bool, optional  
         Whether to optimize DataFrame types using categorical data. Defaults to True.  
+      
+    columns : list of str, optional  
+        Result columns to materialize (see `merge_with_reference`). Defaults to all.  
+    distinct : bool, optional  
+        Whether only distinct result rows are returned. Defaults to False.  
   
     Returns  
     -------  
@@ -292,64 +555,14 @@ def merge_input_with_database_hadegDB(input_data: pd.DataFrame, database_filepat
     This function performs an inner join on the 'ko' column. Ensure both input and  
     database contain this column.  
     """  
-    logger.info("Starting merge with HADEG database.")  
-  
-    if database_filepath is None:  
-        database_filepath = os.path.join("data", "database_hadegDB.csv")  
-        logger.info(f"No path provided. Using default path: {database_filepath}")  
-  
-    if not os.path.exists(database_filepath):  
-        logger.error(f"Database file not found: {database_filepath}")  
-        raise FileNotFoundError(f"HADEG database file not found: {database_filepath}")  
-  
-    try:  
-        if database_filepath.endswith(".csv"):  
-            database_df = pd.read_csv(database_filepath, encoding="utf-8", sep=";")  
-            logger.info("HADEG database loaded from CSV.")  
-        elif database_filepath.endswith(".xlsx"):  
-            database_df = pd.read_excel(database_filepath, engine="openpyxl")  
-            logger.info("HADEG database loaded from Excel.")  
-        else:  
-            logger.error("Unsupported file format.")  
-            raise ValueError("Unsupported file format. Use .csv or .xlsx.")  
-    except Exception as e:  
-        logger.exception(f"Failed to load HADEG database: {e}")  
-        raise  
-  
-    # Optimize types after loading if requested  
-    if optimize_types:  
-        database_df = optimize_hadeg_dtypes(database_df)  
-        input_data = optimize_hadeg_dtypes(input_data.copy())  
-        logger.info("HADEG DataFrames optimized with categorical types.")  
-  
-    # Check if required columns exist  
-    if "ko" not in input_data.columns:  
-        logger.error("Missing 'ko' column in input data.")  
-        raise KeyError("Column 'ko' must be present in the input DataFrame.")  
-  
-    if "ko" not in database_df.columns:  
-        logger.error("Missing 'ko' column in HADEG database.")  
-        raise KeyError("Column 'ko' must be present in the HADEG database.")  
-  
-    # Perform merge  
-    try:  
-        merged_df = pd.merge(input_data, database_df, on="ko", how="inner")  
-          
-        # Optimize final result if requested  
-        if optimize_types:  
-            merged_df = optimize_hadeg_dtypes(merged_df)  
-              
-        logger.info(f"Merge successful. Resulting rows: {len(merged_df)}")  
-    except Exception as e:  
-        logger.exception(f"Merge operation failed: {e}")  
-        raise  
-  
-    return merged_df
-
+    return merge_with_reference(input_data, "hadeg", database_filepath,  
+                                optimize_types, optimizer=optimize_hadeg_dtypes,  
+                                columns=columns, distinct=distinct)  
 
 
 def merge_with_toxcsm(merged_df: pd.DataFrame, toxcsm_filepath: str = None,   
-                     optimize_types: bool = False) -> pd.DataFrame:  
+                     optimize_types: bool = False, columns=None,  
+                     distinct: bool = False) -> pd.DataFrame:  
     """  
     Merges a previously merged DataFrame with the ToxCSM database, based on the 'cpd' column.  
   
@@ -364,6 +577,11 @@ def merge_with_toxcsm(merged_df: pd.DataFrame, toxcsm_filepath: str = None,
           
     optimize_types : bool, optional  
         Whether to optimize DataFrame types using categorical data. Defaults to True.  
+          
+    columns : list of str, optional  
+        Result columns to materialize (see `merge_with_reference`). Defaults to all.  
+    distinct : bool, optional  
+        Whether only distinct result rows are returned. Defaults to False.  
   
     Returns  
     -------  
@@ -397,60 +615,6 @@ def merge_with_toxcsm(merged_df: pd.DataFrame, toxcsm_filepath: str = None,
     -----  
     The merge is performed as an inner join on the 'cpd' column.  
     """  
-    logging.info("Starting merge_with_toxcsm process...")  
-  
-    # Set default path if not provided  
-    if toxcsm_filepath is None:  
-        toxcsm_filepath = os.path.join("data", "database_toxcsm.csv")  
-        logging.info(f"No file path provided. Using default: {toxcsm_filepath}")  
-  
-    # Check if file exists  
-    if not os.path.exists(toxcsm_filepath):  
-        logging.error(f"ToxCSM database file not found at: {toxcsm_filepath}")  
-        raise FileNotFoundError(f"ToxCSM database file not found: {toxcsm_filepath}")  
-  
-    # Load ToxCSM data based on file extension  
-    try:  
-        if toxcsm_filepath.endswith('.csv'):  
-            toxcsm_df = pd.read_csv(toxcsm_filepath, encoding='utf-8', sep=';')  
-        elif toxcsm_filepath.endswith('.xlsx'):  
-            toxcsm_df = pd.read_excel(toxcsm_filepath, engine='openpyxl')  
-        else:  
-            raise ValueError("Unsupported file format. Use .csv or .xlsx")  
-        logging.info(f"ToxCSM data loaded from: {toxcsm_filepath}")  
-    except Exception as e:  
-        logging.exception("Failed to read ToxCSM file.")  
-        raise  
-  
-    # Optimize types after loading if requested  
-    if optimize_types:  
-        toxcsm_df = optimize_toxcsm_dtypes(toxcsm_df)  
-        merged_df = optimize_toxcsm_dtypes(merged_df.copy())  
-        logging.info("ToxCSM DataFrames optimized with categorical and numeric types.")  
-  
-    # Validate required columns in merged_df  
-    required_cols = ['sample', 'compoundclass', 'cpd', 'ko']  
-    for col in required_cols:  
-        if col not in merged_df.columns:  
-            logging.error(f"Column '{col}' is missing from input DataFrame.")  
-            raise KeyError(f"Required column '{col}' is missing in the input DataFrame.")  
-  
-    # Validate presence of 'cpd' in ToxCSM data  
-    if 'cpd' not in toxcsm_df.columns:  
-        logging.error("Column 'cpd' is missing in ToxCSM database.")  
-        raise KeyError("Column 'cpd' is required in the ToxCSM database.")  
-  
-    # Reduce and deduplicate input before merge  
-    logging.info("Reducing and deduplicating input DataFrame...")  
-    merged_df_reduced = merged_df[required_cols].drop_duplicates()  
-  
-    # Perform inner join on 'cpd'  
-    logging.info("Merging input data with ToxCSM database...")  
-    final_merged_df = pd.merge(merged_df_reduced, toxcsm_df, on='cpd', how='inner')  
-      
-    # Optimize final result if requested  
-    if optimize_types:  
-        final_merged_df = optimize_toxcsm_dtypes(final_merged_df)  
-  
-    logging.info(f"Merge completed. Final DataFrame shape: {final_merged_df.shape}")  
-    return final_merged_df
+    return merge_with_reference(merged_df, "toxcsm", toxcsm_filepath,  
+                                optimize_types, optimizer=optimize_toxcsm_dtypes,  
+                                columns=columns, distinct=distinct)  
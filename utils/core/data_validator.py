@@ -5,17 +5,26 @@ This script provides utilities for validating and processing `.txt` file inputs.
 It includes functionality to:
 
 - Validate the file type.
-- Decode base64-encoded content.
-- Parse the content using regular expressions.
-- Convert the structured content into a pandas DataFrame.
+- Decode base64-encoded content (to bytes, parsed without a decoded copy).
+- Parse the content in bulk, incrementally (`ContentParser`): KO lines are
+  recognized with array operations over blocks of the buffer and sample
+  identifiers are forward-filled from the header offsets.
+- Convert the structured content into a pandas DataFrame with categorical
+  columns.
 - Provide internal logging for debugging and validation feedback.
 """
 
 import re
 import base64
+import codecs
 import logging
+import threading
+
+import numpy as np
 import pandas as pd
 
+from utils.core.vocabulary import KO_VOCABULARY
+
 # Configure logger
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -27,8 +36,8 @@ def validate_and_process_input(contents: str, filename: str) -> tuple:
 
     Steps:
     1. Verify the file format is valid (must be a `.txt` file).
-    2. Decode the content if it is base64-encoded.
-    3. Split the content into lines and extract structured data.
+    2. Decode the content to bytes if it is base64-encoded.
+    3. Parse the bytes into structured data in a single pass.
     4. Return the data as a pandas DataFrame or an error message.
 
     Parameters
@@ -55,7 +64,7 @@ def validate_and_process_input(contents: str, filename: str) -> tuple:
 
     # 2. Attempt to decode content
     try:
-        decoded_content = decode_content_if_base64(contents)
+        raw = decode_content_bytes(contents)
         logger.info("File content decoded successfully.")
     except Exception as e:
         error_msg = f"Failed to decode file content: {e}"
@@ -64,7 +73,7 @@ def validate_and_process_input(contents: str, filename: str) -> tuple:
 
     # 3. Parse content into structured format
     try:
-        df, error = process_content_lines(decoded_content)
+        df, error = parsed_result(parse_content_bytes(raw))
         if error:
             logger.warning("Content processing returned a validation error: %s", error)
             return None, error
@@ -108,6 +117,469 @@ def decode_content_if_base64(contents: str) -> str:
         return contents
 
 
+def decode_content_bytes(contents: str) -> bytes:
+    """
+    Returns the UTF-8 bytes of the file content, decoding the base64 payload
+    of a data URI without building a decoded string of the whole file.
+
+    Parameters
+    ----------
+    contents : str
+        The file content, potentially base64-encoded.
+
+    Returns
+    -------
+    bytes
+        The raw UTF-8 content.
+
+    Raises
+    ------
+    ValueError
+        If decoding fails or the content is not valid UTF-8.
+    """
+    if not contents.startswith('data'):
+        return contents.encode('utf-8')
+    try:
+        _, content_string = contents.split(',', 1)
+        decoded_bytes = base64.b64decode(content_string)
+        if not decoded_bytes.isascii():
+            decoded_bytes.decode('utf-8')  # only checks the encoding
+        return decoded_bytes
+    except Exception as e:
+        logger.exception("Failed to decode base64 content.")
+        raise ValueError("Could not decode base64 content.") from e
+
+
+# ASCII codes used by the bulk parser
+_NEWLINE = ord('\n')
+_CARRIAGE_RETURN = ord('\r')
+_KO_PREFIX = ord('K')
+_ZERO = ord('0')
+_NINE = ord('9')
+
+# KO identifiers parsed on the fast path have at most this many digits
+_MAX_KO_DIGITS = 17
+
+_IDENTIFIER_PATTERN = re.compile(r'^>([^\n]+)')
+_KO_PATTERN = re.compile(r'^(K\d+)$')
+_KO_PREFIX_PATTERN = re.compile(r'^(K\d+)')
+
+def _line_bounds(buffer: np.ndarray) -> tuple:
+    """
+    Returns the start and end offsets of the '\\n'-separated lines of a byte buffer.
+    """
+    offset_dtype = np.int32 if len(buffer) < np.iinfo(np.int32).max else np.int64
+    newlines = np.flatnonzero(buffer == _NEWLINE).astype(offset_dtype)
+    starts = np.concatenate((np.zeros(1, dtype=offset_dtype), newlines + 1))
+    ends = np.concatenate((newlines, np.array([len(buffer)], dtype=offset_dtype)))
+    return starts, ends
+
+
+def _scan_ko_lines(buffer: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> tuple:
+    """
+    Finds the lines that are exactly a KO identifier ('K' and ASCII digits,
+    optionally followed by '\\r'), with array operations over the buffer.
+
+    Returns
+    -------
+    tuple
+        ``(is_ko, keys)``: boolean mask of the KO lines and, for each of them
+        in line order, an int64 key identifying the exact identifier (numeric
+        value of the digits and number of digits, to keep leading zeros).
+    """
+    lengths = ends - starts
+    if len(buffer):
+        lengths -= (buffer[np.maximum(ends - 1, 0)] == _CARRIAGE_RETURN) & (lengths > 0)
+
+    candidates = np.flatnonzero((lengths >= 2) & (lengths <= _MAX_KO_DIGITS + 1))
+    candidates = candidates[buffer[starts[candidates]] == _KO_PREFIX]
+    n_digits = lengths[candidates] - 1
+
+    # One pass per digit position; positions that every candidate has (all of
+    # them for the usual fixed-width identifiers) need no row selection
+    first_digit = starts[candidates] + 1
+    valid = np.ones(len(candidates), dtype=bool)
+    values = np.zeros(len(candidates), dtype=np.int64)
+    shortest = int(n_digits.min()) if len(candidates) else 0
+    longest = int(n_digits.max()) if len(candidates) else 0
+    for position in range(shortest):
+        digits = buffer[first_digit + position] - np.uint8(_ZERO)
+        valid &= digits <= 9
+        values = values * 10 + digits
+    for position in range(shortest, longest):
+        rows = np.flatnonzero(n_digits > position)
+        digits = buffer[first_digit[rows] + position] - np.uint8(_ZERO)
+        valid[rows] &= digits <= 9
+        values[rows] = values[rows] * 10 + digits
+
+    is_ko = np.zeros(len(starts), dtype=bool)
+    is_ko[candidates[valid]] = True
+    keys = values[valid] * 32 + n_digits[valid]
+    return is_ko, keys
+
+
+class ParsedContent:
+    """
+    Result of parsing an input buffer in one pass.
+
+    Attributes
+    ----------
+    df : pd.DataFrame or None
+        Parsed 'sample'/'ko' table, or None if the content is invalid or has
+        no KO entry.
+    sample_count : int
+        Number of sample header lines (up to the first structure error).
+    ko_count : int
+        Number of lines starting with a KO identifier (up to the first
+        structure error).
+    error_line : int or None
+        1-based number of the first invalid line, counted from the first
+        non-blank character of the content.
+    error_text : str or None
+        Stripped text of the first invalid line.
+    error_kind : str or None
+        'orphan' for a KO line before any sample header, 'malformed' for a
+        line starting with a KO identifier followed by other characters,
+        'invalid' for any other line, 'pair' for an invalid row of a columnar
+        input (see `columnar_input`; ``error_line`` is then the row).
+    structure_line : int or None
+        Number (as ``error_line``) of the first line failing the structure
+        check of an upload: an 'orphan' or 'invalid' line. Malformed KO lines
+        pass it, so it may come after ``error_line``.
+    structure_kind : str or None
+        'orphan' or 'invalid', the kind of ``structure_line``.
+    leading_lines : int
+        Number of line breaks in the blank characters stripped from the start
+        of the content (to number lines of the raw file).
+    """
+
+    def __init__(self):
+        self.df = None
+        self.sample_count = 0
+        self.ko_count = 0
+        self.error_line = None
+        self.error_text = None
+        self.error_kind = None
+        self.structure_line = None
+        self.structure_kind = None
+        self.leading_lines = 0
+
+    @property
+    def kos_per_sample(self) -> float:
+        """
+        Average number of KO lines per sample header (0 without headers).
+        """
+        return self.ko_count / self.sample_count if self.sample_count else 0.0
+
+    def error_message(self):
+        """
+        Returns the parse error message of `process_content_lines`, or None.
+        """
+        if self.error_kind == 'pair':
+            return (
+                f"Invalid sample/KO pair at row {self.error_line}: '{self.error_text}'. "
+                "Expected a sample name and a 'Kxxxxx' KO identifier."
+            )
+        if self.error_line is not None:
+            return (
+                f"Invalid format at line {self.error_line}: '{self.error_text}'. "
+                "Expected '>' for sample ID or 'Kxxxxx' for KO entries."
+            )
+        if self.df is None:
+            return "No valid sample or KO entries found in the file."
+        return None
+
+
+# KO keys (see `_scan_ko_lines`) already formatted and their vocabulary codes,
+# shared by every parser of the process: the vocabulary is append-only, so a
+# code never changes. Replaced as a whole under the lock, read without it.
+_ko_key_cache = (pd.Index([], dtype=np.int64), np.empty(0, dtype=np.int32))
+_ko_key_lock = threading.Lock()
+
+
+def _cache_ko_keys(keys: np.ndarray, codes: np.ndarray) -> None:
+    """
+    Adds formatted KO keys and their codes to the process-wide key cache.
+    """
+    global _ko_key_cache
+    with _ko_key_lock:
+        known_keys, known_codes = _ko_key_cache
+        # Keys added meanwhile by another parser are skipped
+        unseen = known_keys.get_indexer(keys) < 0
+        _ko_key_cache = (
+            known_keys.append(pd.Index(keys[unseen])),
+            np.concatenate((known_codes, codes[unseen])),
+        )
+
+
+# Size of the blocks parsed at once: the per-line arrays of `_scan_ko_lines`
+# only exist for one block at a time
+_BLOCK_BYTES = 1 << 18
+
+
+class ContentParser:
+    """
+    Incremental single-pass parser of the sample/KO input format.
+
+    Content is fed as UTF-8 bytes, in pieces of any size (e.g. as they are
+    decoded or received). Complete lines are parsed in blocks of about
+    ``_BLOCK_BYTES``: KO lines are recognized with array operations and the
+    sample of each KO line is the last header above it. Only the sample and
+    KO codes of the entries are kept between blocks, so the memory used on
+    top of the content is proportional to the result. Entries are no longer
+    kept after the first invalid line, and parsing stops at the first
+    structure error (see `ParsedContent.structure_line`).
+
+    Examples
+    --------
+    >>> parser = ContentParser()
+    >>> parser.feed(b'>Sample1\\nK000')
+    >>> parser.feed(b'01\\n')
+    >>> parser.close().df['ko'].tolist()
+    ['K00001']
+    """
+
+    def __init__(self):
+        self._parsed = ParsedContent()
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self._pending = b''
+        self._line_index = 0
+        self._first_line = None
+        self._sample_names = []
+        self._ko_codes = []
+        self._ko_samples = []
+        self._closed = False
+
+    def feed(self, data: bytes) -> None:
+        """
+        Parses the complete lines of a piece of content. The last line of the
+        piece is kept until the next piece or `close`.
+
+        Parameters
+        ----------
+        data : bytes
+            Next piece of the UTF-8 content.
+
+        Raises
+        ------
+        UnicodeDecodeError
+            If the content fed so far is not valid UTF-8 (checked even after
+            an invalid line, as a whole-file decode would).
+        """
+        if self._closed:
+            raise ValueError("The parser is closed.")
+        view = memoryview(data)
+        if self._utf8.getstate()[0] or not data.isascii():
+            for offset in range(0, len(view), _BLOCK_BYTES):
+                self._utf8.decode(view[offset:offset + _BLOCK_BYTES])
+        if self._parsed.structure_line is not None:
+            return
+
+        start = 0
+        if self._pending:
+            end = data.find(b'\n')
+            if end < 0:
+                self._pending += bytes(data)
+                return
+            self._parse_block(self._pending + view[:end + 1].tobytes())
+            start = end + 1
+        last = data.rfind(b'\n')
+        while start <= last and self._parsed.structure_line is None:
+            end = data.find(b'\n', start + _BLOCK_BYTES - 1, last + 1)
+            end = last if end < 0 else end
+            self._parse_block(view[start:end + 1])
+            start = end + 1
+        self._pending = view[max(start, last + 1):].tobytes()
+
+    def close(self) -> ParsedContent:
+        """
+        Parses the last line and builds the result.
+
+        Returns
+        -------
+        ParsedContent
+            Parsed table, counts and the first invalid line, if any.
+
+        Raises
+        ------
+        UnicodeDecodeError
+            If the content ends inside a multi-byte character.
+        """
+        if self._closed:
+            return self._parsed
+        self._closed = True
+        self._utf8.decode(b'', final=True)
+        if self._pending and self._parsed.structure_line is None:
+            self._parse_block(self._pending, final=True)
+        self._pending = b''
+        if self._parsed.error_line is not None or not self._ko_codes:
+            return self._parsed
+
+        sample_codes, samples = pd.factorize(pd.Index(self._sample_names, dtype=object), sort=True)
+        sample_codes = sample_codes.astype(np.int32)
+        ko = pd.Categorical.from_codes(
+            np.concatenate(self._ko_codes), dtype=KO_VOCABULARY.dtype, validate=False
+        )
+        self._ko_codes = []
+        sample = pd.Categorical.from_codes(
+            sample_codes[np.concatenate(self._ko_samples)], categories=samples, validate=False
+        )
+        self._ko_samples = []
+        self._parsed.df = pd.DataFrame({'sample': sample, 'ko': ko})
+        logger.debug("Parsed %d KO entries for %d samples.", len(ko), len(samples))
+        return self._parsed
+
+    def _encode_ko_keys(self, keys: np.ndarray) -> np.ndarray:
+        """
+        Returns the KO vocabulary codes of KO keys (see `_scan_ko_lines`),
+        formatting each distinct identifier once per process (see
+        `_ko_key_cache`), in order of first appearance.
+        """
+        local_codes, uniques = pd.factorize(keys)
+        known_keys, known_codes = _ko_key_cache
+        positions = known_keys.get_indexer(uniques)
+        new = positions < 0
+        codes = np.empty(len(uniques), dtype=np.int32)
+        codes[~new] = known_codes[positions[~new]]
+        if new.any():
+            labels = [f"K{key // 32:0{key % 32}d}" for key in uniques[new].tolist()]
+            codes[new] = KO_VOCABULARY.encode(labels)
+            _cache_ko_keys(uniques[new], codes[new])
+        return codes[local_codes]
+
+    def _parse_block(self, block, final: bool = False) -> None:
+        """
+        Parses a block of complete lines (ending with '\\n' unless ``final``).
+        """
+        parsed = self._parsed
+        buffer = np.frombuffer(block, dtype=np.uint8)
+        starts, ends = _line_bounds(buffer)
+        if not final:
+            # Drop the empty line after the final '\n'
+            starts, ends = starts[:-1], ends[:-1]
+        is_ko, ko_keys = _scan_ko_lines(buffer, starts, ends)
+
+        # Lines other than bare KO identifiers: empty lines are skipped, the rest
+        # is classified with the line-by-line patterns
+        other_lines = np.flatnonzero(~is_ko & (ends > starts))
+        header_lines = []
+        sample_names = []
+        other_ko_lines = {}
+        malformed_lines = []
+        first_text_line = None
+        structure_line = None
+        structure_kind = None
+        for index in other_lines.tolist():
+            line = buffer[starts[index]:ends[index]].tobytes().decode('utf-8').strip()
+            if not line:
+                continue
+            if first_text_line is None:
+                first_text_line = index
+            id_match = _IDENTIFIER_PATTERN.match(line)
+            if id_match:
+                header_lines.append(index)
+                sample_names.append(id_match.group(1).strip())
+            elif _KO_PATTERN.match(line):
+                other_ko_lines[index] = line
+            elif not _KO_PREFIX_PATTERN.match(line):
+                structure_line, structure_kind = index, 'invalid'
+                break
+            elif header_lines or self._sample_names:
+                # Passes the structure check, but is not a KO entry
+                malformed_lines.append(index)
+            else:
+                structure_line, structure_kind = index, 'orphan'
+                break
+
+        # Sample of every KO line: the last header above it, counting the
+        # headers of the previous blocks (-1 before the first one)
+        header_lines = np.asarray(header_lines, dtype=np.int64)
+        is_ko[list(other_ko_lines)] = True
+        ko_lines = np.flatnonzero(is_ko)
+        ko_sample = np.searchsorted(header_lines, ko_lines, side='right') - 1 + len(self._sample_names)
+        orphans = ko_lines[ko_sample < 0]
+        if len(orphans) and (structure_line is None or orphans[0] < structure_line):
+            structure_line, structure_kind = int(orphans[0]), 'orphan'
+
+        if self._first_line is None:
+            candidates = [i for i in (first_text_line, ko_lines[0] if len(ko_lines) else None) if i is not None]
+            if candidates:
+                self._first_line = self._line_index + int(min(candidates))
+                parsed.leading_lines = self._first_line
+
+        # First invalid line: the first malformed KO line or structure error
+        error_candidates = [i for i in (structure_line, malformed_lines[0] if malformed_lines else None) if i is not None]
+        if parsed.error_line is None and error_candidates:
+            error_line = min(error_candidates)
+            parsed.error_kind = structure_kind if error_line == structure_line else 'malformed'
+            parsed.error_line = self._line_index + error_line - self._first_line + 1
+            parsed.error_text = buffer[starts[error_line]:ends[error_line]].tobytes().decode('utf-8').strip()
+            # The entries are dropped; only the structure is still checked
+            self._ko_codes = []
+            self._ko_samples = []
+
+        if structure_line is not None:
+            parsed.structure_kind = structure_kind
+            parsed.structure_line = self._line_index + structure_line - self._first_line + 1
+            parsed.sample_count += int(np.count_nonzero(header_lines < structure_line))
+            parsed.ko_count += int(np.count_nonzero(ko_lines < structure_line))
+            parsed.ko_count += sum(index < structure_line for index in malformed_lines)
+            return
+
+        parsed.sample_count += len(header_lines)
+        parsed.ko_count += len(ko_lines) + len(malformed_lines)
+        self._line_index += len(starts)
+        self._sample_names.extend(sample_names)
+        if not len(ko_lines) or parsed.error_line is not None:
+            return
+
+        # Encode KOs with the shared dictionary used by the reference databases
+        ko_codes = self._encode_ko_keys(ko_keys)
+        if other_ko_lines:
+            other = np.fromiter(other_ko_lines, dtype=np.int64, count=len(other_ko_lines))
+            is_other = np.isin(ko_lines, other)
+            codes = np.empty(len(ko_lines), dtype=np.int32)
+            codes[~is_other] = ko_codes
+            codes[is_other] = KO_VOCABULARY.encode(list(other_ko_lines.values()))
+            ko_codes = codes
+        self._ko_codes.append(ko_codes.astype(np.int32, copy=False))
+        self._ko_samples.append(ko_sample.astype(np.int32))
+
+
+def parse_content_bytes(raw: bytes) -> ParsedContent:
+    """
+    Parses a UTF-8 input buffer into sample/KO entries in a single pass.
+
+    Expected format:
+    - Lines beginning with `>` denote sample identifiers.
+    - Lines matching "K\\d+" are associated KO entries.
+
+    The buffer is parsed in place (no decoded copy of the whole content) by a
+    `ContentParser`: KO lines are recognized with array operations and only
+    headers, blank lines and lines that are not a bare KO identifier are
+    inspected one by one. The structure checks and the sample/KO counts come
+    out of the same pass.
+
+    Parameters
+    ----------
+    raw : bytes
+        UTF-8 content of the input file.
+
+    Returns
+    -------
+    ParsedContent
+        Parsed table, counts and the first invalid line, if any.
+
+    Raises
+    ------
+    UnicodeDecodeError
+        If the content is not valid UTF-8.
+    """
+    parser = ContentParser()
+    parser.feed(raw)
+    return parser.close()
+
+
 def process_content_lines(content: str) -> tuple:
     """
     Parses lines from the file content to extract sample identifiers and KO entries.
@@ -116,6 +588,8 @@ def process_content_lines(content: str) -> tuple:
     - Lines beginning with `>` denote sample identifiers.
     - Lines matching "K\d+" are associated KO entries.
 
+    See `parse_content_bytes` for the parsing itself.
+
     Parameters
     ----------
     content : str
@@ -125,42 +599,19 @@ def process_content_lines(content: str) -> tuple:
     -------
     tuple
         A tuple containing:
-        - pd.DataFrame: Extracted data with 'sample' and 'ko' columns.
+        - pd.DataFrame: Extracted data with a categorical 'sample' column and
+          the 'ko' column encoded with the shared KO vocabulary.
         - str: An error message if applicable, otherwise None.
     """
-    lines = content.strip().split('\n')
-
-    identifier_pattern = re.compile(r'^>([^\n]+)')
-    ko_pattern = re.compile(r'^(K\d+)$')
-
-    data = []
-    current_sample = None
-
-    for line_num, line in enumerate(lines, start=1):
-        line = line.strip()
-
-        if not line:
-            continue  # skip empty lines
+    return parsed_result(parse_content_bytes(content.encode('utf-8')))
 
-        id_match = identifier_pattern.match(line)
-        ko_match = ko_pattern.match(line)
 
-        if id_match:
-            current_sample = id_match.group(1).strip()
-            logger.debug("Sample identified at line %d: %s", line_num, current_sample)
-        elif ko_match and current_sample:
-            ko_value = ko_match.group(1).strip()
-            data.append({'sample': current_sample, 'ko': ko_value})
-            logger.debug("KO entry added: sample=%s, ko=%s", current_sample, ko_value)
-        else:
-            logger.warning("Invalid line at %d: '%s'", line_num, line)
-            return None, (
-                f"Invalid format at line {line_num}: '{line}'. "
-                "Expected '>' for sample ID or 'Kxxxxx' for KO entries."
-            )
-
-    if not data:
-        return None, "No valid sample or KO entries found in the file."
-
-    df = pd.DataFrame(data)
-    return df, None
+def parsed_result(parsed: ParsedContent) -> tuple:
+    """
+    Returns the ``(DataFrame, error message)`` pair of a parse result, as
+    returned by `process_content_lines`.
+    """
+    error = parsed.error_message()
+    if parsed.error_line is not None:
+        logger.warning("Invalid line at %d: '%s'", parsed.error_line, parsed.error_text)
+    return (None, error) if error else (parsed.df, None)
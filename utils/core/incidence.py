@@ -0,0 +1,288 @@
+"""
+incidence.py
+------------
+Sparse incidence matrices between two categorical columns of a table
+(sample x KO, KO x compound, ...) and the vectorized operations the
+analyses run on them.
+
+Many analyses reduce to the presence of KOs per sample (KO counts, UpSet
+intersections, sample clustering, samples sharing a compound profile) and
+used to rebuild that matrix from the long-form records with ``groupby`` or
+``pivot_table`` on every call. An `IncidenceMatrix` holds it once as a
+``scipy.sparse`` CSR matrix with its two axis dictionaries: entry ``(i, j)``
+is the number of records pairing row label ``i`` with column label ``j``.
+Axes list the observed labels in sorted order (category order for
+categorical columns) and keep the column's dtype, so results line up with
+those of ``groupby(..., observed=True)``. Records with a missing label are
+ignored.
+
+Set operations use the binary matrix: counts per row or column, pairwise
+intersections and Jaccard similarities are sparse products, and a matrix is
+projected onto other entities (compounds, pathways, ...) through a reference
+incidence matrix whose rows are its columns.
+
+Functions:
+- IncidenceMatrix: Sparse incidence matrix with its row and column labels.
+- build_incidence: Builds the incidence matrix of two columns of a table.
+- get_incidence: Returns the cached incidence matrix of a store payload.
+- row_counts: Number of distinct column labels per row label.
+- column_counts: Number of distinct row labels per column label.
+- intersection_counts: Pairwise numbers of shared column labels.
+- jaccard_similarity: Pairwise Jaccard similarities of the rows.
+- project: Projects an incidence matrix through a reference incidence matrix.
+- identical_row_groups: Groups the rows with the same set of column labels.
+- column_memberships: Row labels of every column label.
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from utils.core.store_codec import DecodeCache, decode_store_data, store_cache_key
+from utils.logger_config import setup_logger
+
+logger = setup_logger(__name__)
+
+# Process-wide incidence cache, keyed by (row, column) and `store_cache_key`
+_incidence_cache = DecodeCache()
+
+
+class IncidenceMatrix:
+    """
+    Sparse incidence matrix with its row and column labels.
+
+    Parameters
+    ----------
+    matrix : scipy.sparse.csr_matrix
+        int32 matrix of shape ``(len(rows), len(columns))``: number of
+        records per row/column label pair.
+    rows : pd.Index
+        Row labels, named after the row column.
+    columns : pd.Index
+        Column labels, named after the column column.
+    """
+
+    def __init__(self, matrix, rows: pd.Index, columns: pd.Index):
+        if matrix.shape != (len(rows), len(columns)):
+            raise ValueError("The matrix shape does not match its labels.")
+        self.matrix = sparse.csr_matrix(matrix)
+        self.matrix.sum_duplicates()
+        self.rows = rows
+        self.columns = columns
+
+    def __repr__(self) -> str:
+        return (
+            f"IncidenceMatrix({self.rows.name!r} x {self.columns.name!r}, "
+            f"shape={self.shape}, nnz={self.matrix.nnz})"
+        )
+
+    @property
+    def shape(self) -> tuple:
+        return self.matrix.shape
+
+    def binary(self) -> "IncidenceMatrix":
+        """
+        Returns the presence matrix (every nonzero entry set to 1).
+        """
+        matrix = self.matrix.copy()
+        matrix.data = np.ones_like(matrix.data)
+        return IncidenceMatrix(matrix, self.rows, self.columns)
+
+    def select_rows(self, labels) -> "IncidenceMatrix":
+        """
+        Returns the rows whose label is in ``labels``, in axis order.
+        """
+        mask = self.rows.isin(list(labels))
+        return IncidenceMatrix(self.matrix[mask], self.rows[mask], self.columns)
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Returns the dense matrix as a DataFrame (rows x columns), as
+        ``pivot_table(index=row, columns=column, aggfunc='size', fill_value=0)``.
+        """
+        return pd.DataFrame(self.matrix.toarray().astype(np.int64), index=self.rows, columns=self.columns)
+
+
+def _axis_codes(series: pd.Series) -> tuple:
+    """
+    Returns ``(codes, labels)``: the position of every value in the sorted
+    observed labels (-1 for missing values) and those labels as an index of
+    the column's dtype.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        used = np.unique(codes[codes >= 0])
+        # Unused categories are dropped from the axis; code -1 reads the trailing -1
+        remap = np.full(len(series.cat.categories) + 1, -1, dtype=np.int64)
+        remap[used] = np.arange(len(used))
+        labels = pd.CategoricalIndex(pd.Categorical.from_codes(used, dtype=series.dtype), name=series.name)
+        return remap[codes], labels
+    codes, uniques = pd.factorize(series, sort=True)
+    return codes.astype(np.int64), pd.Index(uniques, name=series.name)
+
+
+def build_incidence(df: pd.DataFrame, row: str = "sample", column: str = "ko") -> IncidenceMatrix:
+    """
+    Builds the incidence matrix of two columns of a table.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Long-form records (e.g. a parsed input or merged table).
+    row : str, optional
+        Column giving the row labels. Defaults to 'sample'.
+    column : str, optional
+        Column giving the column labels. Defaults to 'ko'.
+
+    Returns
+    -------
+    IncidenceMatrix
+        Number of records per label pair. Every observed label of each
+        column is on its axis, also when its records miss the other label.
+
+    Raises
+    ------
+    ValueError
+        If a column is missing.
+    """
+    missing = [col for col in (row, column) if col not in df.columns]
+    if missing:
+        raise ValueError(f"Missing required columns: {missing}")
+
+    row_codes, rows = _axis_codes(df[row])
+    column_codes, columns = _axis_codes(df[column])
+    valid = (row_codes >= 0) & (column_codes >= 0)
+    matrix = sparse.csr_matrix(
+        (np.ones(int(valid.sum()), dtype=np.int32), (row_codes[valid], column_codes[valid])),
+        shape=(len(rows), len(columns)),
+    )
+    return IncidenceMatrix(matrix, rows, columns)
+
+
+def get_incidence(payload, row: str = "sample", column: str = "ko") -> IncidenceMatrix:
+    """
+    Returns the incidence matrix of a store payload, building it at most once
+    per table (see `store_cache_key`).
+
+    Parameters
+    ----------
+    payload : dict, list of dict or pd.DataFrame
+        Store payload of a table (see `decode_store_data`).
+    row, column : str, optional
+        Columns of the matrix axes. Default to 'sample' and 'ko'.
+
+    Returns
+    -------
+    IncidenceMatrix
+        Shared cached matrix (not to be modified).
+    """
+    table_key, df = store_cache_key(payload)
+    key = (row, column) + table_key
+    incidence = _incidence_cache.get(key)
+    if incidence is None:
+        if df is None:
+            df = decode_store_data(payload)
+        incidence = build_incidence(df, row, column)
+        _incidence_cache.put(key, incidence)
+        logger.info(f"Incidence matrix built: {incidence}")
+    return incidence
+
+
+def row_counts(incidence: IncidenceMatrix) -> pd.Series:
+    """
+    Returns the number of distinct column labels of every row label, as
+    ``groupby(row, observed=True)[column].nunique()``.
+    """
+    counts = np.diff(incidence.matrix.indptr).astype(np.int64)
+    return pd.Series(counts, index=incidence.rows, name=incidence.columns.name)
+
+
+def column_counts(incidence: IncidenceMatrix) -> pd.Series:
+    """
+    Returns the number of distinct row labels of every column label.
+    """
+    counts = np.bincount(incidence.matrix.indices, minlength=incidence.shape[1]).astype(np.int64)
+    return pd.Series(counts, index=incidence.columns, name=incidence.rows.name)
+
+
+def intersection_counts(incidence: IncidenceMatrix) -> pd.DataFrame:
+    """
+    Returns the number of column labels shared by every pair of rows (the
+    diagonal holds the row counts).
+    """
+    presence = incidence.binary().matrix
+    shared = (presence @ presence.T).toarray().astype(np.int64)
+    return pd.DataFrame(shared, index=incidence.rows, columns=incidence.rows)
+
+
+def jaccard_similarity(incidence: IncidenceMatrix) -> pd.DataFrame:
+    """
+    Returns the Jaccard similarity of the column label sets of every pair of
+    rows (0 between two empty rows).
+    """
+    shared = intersection_counts(incidence).to_numpy()
+    sizes = np.diag(shared)
+    union = sizes[:, None] + sizes[None, :] - shared
+    similarity = np.divide(shared, union, out=np.zeros(shared.shape), where=union > 0)
+    return pd.DataFrame(similarity, index=incidence.rows, columns=incidence.rows)
+
+
+def project(incidence: IncidenceMatrix, reference: IncidenceMatrix) -> IncidenceMatrix:
+    """
+    Projects an incidence matrix onto the columns of a reference matrix
+    whose rows are its columns (e.g. sample x KO through KO x compound).
+
+    Parameters
+    ----------
+    incidence : IncidenceMatrix
+        Matrix to project (e.g. sample x KO).
+    reference : IncidenceMatrix
+        Reference matrix (e.g. KO x compound). Column labels of
+        ``incidence`` absent from its rows are ignored.
+
+    Returns
+    -------
+    IncidenceMatrix
+        ``incidence.rows`` x ``reference.columns``: number of distinct
+        column labels of ``incidence`` linking each pair.
+    """
+    positions = reference.rows.get_indexer(incidence.columns)
+    matched = np.flatnonzero(positions >= 0)
+    product = incidence.binary().matrix[:, matched] @ reference.binary().matrix[positions[matched]]
+    return IncidenceMatrix(product.astype(np.int32), incidence.rows, reference.columns)
+
+
+def identical_row_groups(incidence: IncidenceMatrix) -> np.ndarray:
+    """
+    Returns a group id per row: rows with the same set of column labels
+    share an id, numbered in row order.
+    """
+    # Column indices are sorted within rows (canonical CSR, see IncidenceMatrix)
+    matrix = incidence.matrix
+    profiles = [
+        matrix.indices[start:end].tobytes()
+        for start, end in zip(matrix.indptr[:-1], matrix.indptr[1:])
+    ]
+    return pd.factorize(pd.Series(profiles, dtype=object))[0]
+
+
+def column_memberships(incidence: IncidenceMatrix) -> pd.Series:
+    """
+    Returns the row labels of every column label with at least one row.
+
+    Returns
+    -------
+    pd.Series
+        Column label -> list of row labels (in axis order).
+    """
+    matrix = incidence.matrix.tocsc()
+    matrix.sort_indices()
+    labels = np.asarray(incidence.rows, dtype=object)[matrix.indices]
+    members = np.split(labels, matrix.indptr[1:-1])
+    present = np.diff(matrix.indptr) > 0
+    return pd.Series(
+        [list(member) for member, keep in zip(members, present) if keep],
+        index=incidence.columns[present],
+        name=incidence.rows.name,
+        dtype=object,
+    )
@@ -0,0 +1,166 @@
+"""
+input_batch.py
+--------------
+Batches of input files (e.g. one file per genome) parsed in parallel and
+combined into one input table.
+
+Every file is parsed on its own by a worker of a thread pool (the parsers
+spend most of their time in NumPy and pandas, and the KO codes come from the
+process-wide shared vocabulary, so the tables of all workers share one
+dictionary). The tables are then combined in the order of the files: a file
+that cannot be parsed, or whose samples were already given by an earlier
+file, is reported with its own error and left out, and the others are still
+combined. Concatenation works on the codes: the 'ko' columns keep the shared
+KO vocabulary and the 'sample' categories are merged and sorted.
+
+Functions:
+- InputBatch: Combined table of a batch and its per-file errors and warnings.
+- concat_input_frames: Concatenates parsed input tables.
+- combine_input_batch: Parses the files of a batch in parallel and combines them.
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from utils.core.vocabulary import KO_VOCABULARY
+from utils.logger_config import setup_logger
+
+logger = setup_logger(__name__)
+
+# Sample names listed in a duplicate-sample error
+_MAX_LISTED_SAMPLES = 5
+
+
+class InputBatch:
+    """
+    Combined table of a batch of input files.
+
+    Attributes
+    ----------
+    df : pd.DataFrame or None
+        Concatenated 'sample'/'ko' table of the accepted files, or None if no
+        file was accepted.
+    accepted : list of str
+        Names of the files in ``df``, in batch order.
+    errors : list of tuple
+        ``(file name, error message)`` of every rejected file.
+    warnings : list of tuple
+        ``(file name, warning message)`` of the accepted files.
+    samples : dict
+        File name -> number of samples, for the accepted files.
+    """
+
+    def __init__(self):
+        self.df = None
+        self.accepted = []
+        self.errors = []
+        self.warnings = []
+        self.samples = {}
+
+
+def concat_input_frames(frames: list) -> pd.DataFrame:
+    """
+    Concatenates parsed input tables, keeping categorical columns.
+
+    Parameters
+    ----------
+    frames : list of pd.DataFrame
+        Tables with a categorical 'sample' column and a 'ko' column encoded
+        with the shared KO vocabulary (other 'ko' columns are encoded first).
+
+    Returns
+    -------
+    pd.DataFrame
+        Rows of every table in order, with sorted 'sample' categories and the
+        current shared KO dtype.
+    """
+    sample = union_categoricals(
+        [frame["sample"].astype("category") for frame in frames], sort_categories=True
+    )
+    ko_codes = [
+        frame["ko"].cat.codes.to_numpy(dtype=np.int32)
+        if KO_VOCABULARY.is_shared(frame["ko"].dtype) else KO_VOCABULARY.encode(frame["ko"])
+        for frame in frames
+    ]
+    ko = pd.Categorical.from_codes(np.concatenate(ko_codes), dtype=KO_VOCABULARY.dtype, validate=False)
+    return pd.DataFrame({"sample": sample, "ko": ko})
+
+
+def combine_input_batch(items, parse, max_workers: int = None) -> InputBatch:
+    """
+    Parses the files of a batch in parallel and combines the valid ones.
+
+    Parameters
+    ----------
+    items : iterable of tuple
+        ``(file name, payload)`` of every file.
+    parse : callable
+        ``parse(payload, file name)`` returning ``(df, error message,
+        warnings)``, as `ingest_upload` does. Exceptions are reported as the
+        error of the file.
+    max_workers : int, optional
+        Size of the thread pool. Defaults to the number of files, capped at
+        the CPU count.
+
+    Returns
+    -------
+    InputBatch
+        Combined table, accepted files, per-file errors and warnings. A file
+        holding a sample name of an earlier accepted file is rejected.
+    """
+    items = list(items)
+    batch = InputBatch()
+    if not items:
+        return batch
+    if max_workers is None:
+        max_workers = max(1, min(len(items), os.cpu_count() or 1))
+
+    def run(item):
+        name, payload = item
+        try:
+            return parse(payload, name)
+        except Exception as e:
+            logger.exception(f"Failed to parse {name}")
+            return None, str(e), []
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="upload") as pool:
+        results = list(pool.map(run, items))
+
+    frames = []
+    sample_files = {}
+    for (name, _), (df, error, warnings) in zip(items, results):
+        if error is None and df is None:
+            error = "Nenhuma amostra encontrada no arquivo."
+        if error is not None:
+            batch.errors.append((name, error))
+            continue
+
+        samples = df["sample"].astype("category").cat.remove_unused_categories().cat.categories
+        duplicates = [sample for sample in samples if sample in sample_files]
+        if duplicates:
+            listed = ", ".join(map(str, duplicates[:_MAX_LISTED_SAMPLES]))
+            more = f" (+{len(duplicates) - _MAX_LISTED_SAMPLES})" if len(duplicates) > _MAX_LISTED_SAMPLES else ""
+            batch.errors.append(
+                (name, f"Amostras duplicadas (já presentes em {sample_files[duplicates[0]]}): {listed}{more}")
+            )
+            continue
+
+        sample_files.update(dict.fromkeys(samples, name))
+        frames.append(df)
+        batch.accepted.append(name)
+        batch.samples[name] = len(samples)
+        batch.warnings.extend((name, warning) for warning in warnings)
+
+    if frames:
+        batch.df = concat_input_frames(frames)
+    logger.info(
+        f"Input batch of {len(items)} files parsed in {time.perf_counter() - start:.2f}s "
+        f"({max_workers} workers): {len(batch.accepted)} accepted, {len(batch.errors)} rejected"
+    )
+    return batch
@@ -0,0 +1,201 @@
+"""
+merge_scheduler.py
+------------------
+Dependency-aware, concurrent execution of the reference database merges.
+
+The merges form a small DAG: HADEG only needs the user input, while KEGG and
+ToxCSM only need the BioRemPP result. `run_merge_dag` runs every stage as soon
+as its dependency is available on a thread pool (pandas and NumPy release the
+GIL in their heavy loops, and threads share the process-wide reference
+registry), so the total latency is the length of the critical path instead of
+the sum of all merges. Each stage records its wall time and CPU time.
+
+Functions:
+- run_merge_dag: Runs a DAG of stages on a thread pool.
+- run_reference_merges: Runs the merges of the registered reference databases.
+"""
+
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import pandas as pd
+
+from utils.core.data_processing import merge_with_reference
+from utils.core.reference_specs import merge_plan
+from utils.logger_config import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class MergeStage:
+    """
+    One node of a merge DAG.
+
+    Parameters
+    ----------
+    name : str
+        Stage name.
+    func : callable
+        Function ``func(upstream_result)`` run by the stage. Stages without a
+        dependency receive the DAG input.
+    depends_on : str, optional
+        Name of the stage whose result is passed to ``func``.
+    """
+
+    def __init__(self, name: str, func, depends_on: str = None):
+        self.name = name
+        self.func = func
+        self.depends_on = depends_on
+
+
+class DagResult:
+    """
+    Outcome of `run_merge_dag`.
+
+    Attributes
+    ----------
+    results : dict
+        Stage name -> returned value, for successful stages.
+    errors : dict
+        Stage name -> exception, for failed stages.
+    skipped : dict
+        Stage name -> name of the failed stage that caused the skip.
+    wall_times : dict
+        Stage name -> wall-clock seconds spent in the stage.
+    cpu_times : dict
+        Stage name -> CPU seconds consumed by the stage's thread.
+    total_time : float
+        Wall-clock seconds for the whole DAG.
+    """
+
+    def __init__(self):
+        self.results = {}
+        self.errors = {}
+        self.skipped = {}
+        self.wall_times = {}
+        self.cpu_times = {}
+        self.total_time = 0.0
+
+
+def _timed_call(func, argument) -> tuple:
+    """
+    Runs ``func(argument)`` and returns ``(result, error, wall, cpu)``.
+    """
+    wall_start = time.perf_counter()
+    cpu_start = time.thread_time()
+    try:
+        result, error = func(argument), None
+    except Exception as e:
+        result, error = None, e
+    return result, error, time.perf_counter() - wall_start, time.thread_time() - cpu_start
+
+
+def run_merge_dag(stages, data, max_workers: int = None) -> DagResult:
+    """
+    Runs a DAG of stages, each one as soon as its dependency has finished.
+
+    Parameters
+    ----------
+    stages : list of MergeStage
+        Stages in dependency order (a stage's dependency comes before it).
+    data : object
+        Input passed to stages without a dependency.
+    max_workers : int, optional
+        Size of the thread pool. Defaults to the number of stages, capped at
+        the CPU count.
+
+    Returns
+    -------
+    DagResult
+        Results, errors, skipped stages and per-stage timings. A stage whose
+        dependency failed or was skipped is skipped as well.
+    """
+    outcome = DagResult()
+    if not stages:
+        return outcome
+    if max_workers is None:
+        max_workers = max(1, min(len(stages), os.cpu_count() or 1))
+
+    pending = {stage.name: stage for stage in stages}
+    running = {}
+    dag_start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="merge") as pool:
+        while pending or running:
+            for name, stage in list(pending.items()):
+                upstream = stage.depends_on
+                if upstream is None:
+                    argument = data
+                elif upstream in outcome.results:
+                    argument = outcome.results[upstream]
+                elif upstream in outcome.errors or upstream in outcome.skipped:
+                    # Record the failed stage at the root of the chain
+                    outcome.skipped[name] = outcome.skipped.get(upstream, upstream)
+                    logger.warning(f"{name} skipped: dependency {upstream} did not complete.")
+                    del pending[name]
+                    continue
+                else:
+                    continue
+                logger.info(f"Starting stage {name}...")
+                running[pool.submit(_timed_call, stage.func, argument)] = name
+                del pending[name]
+
+            if not running:
+                if pending:
+                    raise ValueError(f"Unresolvable dependencies for stages: {sorted(pending)}")
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                result, error, wall, cpu = future.result()
+                outcome.wall_times[name] = wall
+                outcome.cpu_times[name] = cpu
+                if error is None:
+                    outcome.results[name] = result
+                    logger.info(f"Stage {name} completed in {wall:.2f}s (CPU {cpu:.2f}s)")
+                else:
+                    outcome.errors[name] = error
+                    logger.error(f"Stage {name} failed after {wall:.2f}s: {error}")
+
+    outcome.total_time = time.perf_counter() - dag_start
+    return outcome
+
+
+def run_reference_merges(input_df: pd.DataFrame, names=None, max_workers: int = None) -> DagResult:
+    """
+    Merges the input with the registered reference databases concurrently.
+
+    Parameters
+    ----------
+    input_df : pd.DataFrame
+        Parsed user input with 'sample' and 'ko' columns.
+    names : iterable of str, optional
+        Databases to merge (dependencies are added). Defaults to all of them.
+    max_workers : int, optional
+        Size of the thread pool.
+
+    Returns
+    -------
+    DagResult
+        Stage names are the spec names ('biorempp', 'kegg', 'hadeg', 'toxcsm').
+
+    Notes
+    -----
+    A merge whose spec sets ``upstream_columns`` (KEGG) receives the
+    distinct rows of those columns of its dependency's result instead of
+    the whole result.
+    """
+    def stage_func(spec):
+        if spec.upstream_columns is None:
+            return lambda df: merge_with_reference(df.copy(), spec.name)
+        return lambda df: merge_with_reference(
+            df[spec.upstream_columns].drop_duplicates(ignore_index=True), spec.name
+        )
+
+    stages = [
+        MergeStage(spec.name, stage_func(spec), spec.depends_on)
+        for spec in merge_plan(names)
+    ]
+    return run_merge_dag(stages, input_df, max_workers=max_workers)
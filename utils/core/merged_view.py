@@ -0,0 +1,348 @@
+"""
+merged_view.py
+--------------
+Lazy view of the merge of an input table with a reference database, kept as
+the distinct sample/key pairs of the input and the indexed reference table.
+
+The inner join of the input with `database.csv` repeats every sample/KO pair
+once per reference row of the KO (one row per compound, gene and reference),
+although everything in it can be recovered from the pairs and the reference
+table. A `MergedView` only stores the pairs (categorical codes) and the key
+slot of each pair in the cached key index of the reference (see
+`utils.core.reference_index`); the reference table itself is the read-only
+registry table shared by every merge of the process. Its memory therefore
+grows with the number of pairs, not with the number of joined rows.
+
+Distinct counts per group run without the joined rows: the sample x key
+incidence matrix of the pairs times the key x value incidence matrix of the
+reference rows (a sparse product) gives the distinct sample/value
+combinations of the join, and the counts are taken on those. Groupings that
+do not involve the samples only need the reference rows of the matched keys.
+A pandas frame of the join is materialized only on request (`to_frame`), for
+table display or export.
+
+Functions:
+- MergedView: Lazy inner join of sample/key pairs with an indexed reference table.
+- build_merged_view: Builds the view of an input table on a registered database.
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from utils.core.aggregate_bundle import AGGREGATE_SPECS, count_distinct
+from utils.core.data_processing import get_indexed_reference, get_reference_incidence
+from utils.core.incidence import IncidenceMatrix, build_incidence, project, row_counts
+from utils.core.optimize_dtypes import get_spec_optimizer
+from utils.core.reference_index import distinct_rows, index_join
+from utils.core.reference_registry import freeze_dataframe
+from utils.core.reference_specs import get_reference_spec
+from utils.core.vocabulary import align_shared_categories
+from utils.logger_config import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def _tuple_ids(df: pd.DataFrame) -> tuple:
+    """
+    Returns ``(ids, first_rows)``: a dense id per distinct row of ``df`` (in
+    order of first occurrence, missing values included) and the position of
+    the first occurrence of every id.
+    """
+    ids = np.zeros(len(df), dtype=np.int64)
+    for col in df.columns:
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes, n_codes = series.cat.codes.to_numpy(), len(series.cat.categories)
+        else:
+            codes, uniques = pd.factorize(series)
+            n_codes = len(uniques)
+        # Re-densified after every column, so the combined keys stay below n_rows * n_codes
+        ids = pd.factorize(ids * (n_codes + 1) + (codes.astype(np.int64) + 1))[0].astype(np.int64)
+    first_rows = np.unique(ids, return_index=True)[1] if len(ids) else np.zeros(0, dtype=np.int64)
+    return ids, first_rows
+
+
+class MergedView:
+    """
+    Lazy inner join of distinct sample/key pairs with an indexed reference table.
+
+    Parameters
+    ----------
+    pairs : pd.DataFrame
+        Sample/key pairs: a 'sample' column (converted to categorical) and
+        the join column, typed like the reference key (see
+        `build_merged_view`). Duplicate pairs are dropped.
+    reference : pd.DataFrame
+        Reference table the index was built from.
+    index : KeyIndex
+        Key index of ``reference``.
+    name : str, optional
+        Name of the reference spec, selecting the registered aggregates
+        (``AGGREGATE_SPECS``) of the view.
+
+    Attributes
+    ----------
+    pairs : pd.DataFrame
+        Distinct pairs with at least one matching reference row, in input order.
+    slots : np.ndarray
+        Key slot of every pair in ``index``.
+    n_rows : int
+        Number of rows of the join.
+
+    Raises
+    ------
+    KeyError
+        If ``pairs`` is not made of the 'sample' and join columns, or the
+        reference has a 'sample' column.
+    """
+
+    def __init__(self, pairs: pd.DataFrame, reference: pd.DataFrame, index, name: str = None):
+        key = index.key
+        if sorted(pairs.columns) != sorted(["sample", key]) or "sample" in reference.columns:
+            raise KeyError(f"A merged view joins 'sample'/'{key}' pairs with a reference table without samples.")
+        if len(reference) != index.n_rows:
+            raise ValueError("The key index does not match the reference table.")
+
+        # Pairs without a matching reference row are not part of the join;
+        # they are dropped before the (costlier) deduplication
+        matched = np.flatnonzero(index.match_counts(pairs[key]))
+        pairs = distinct_rows(pairs[["sample", key]].take(matched))
+        if not isinstance(pairs["sample"].dtype, pd.CategoricalDtype):
+            pairs["sample"] = pairs["sample"].astype("category")
+        self.pairs = pairs
+        self.slots = index.slots(pairs[key])
+        self.n_rows = int(np.diff(index.offsets)[self.slots].sum())
+        self.reference = reference
+        self.index = index
+        self.name = name
+
+    def __len__(self) -> int:
+        return self.n_rows
+
+    def __repr__(self) -> str:
+        return f"MergedView(name={self.name!r}, pairs={len(self.pairs)}, rows={self.n_rows})"
+
+    @property
+    def key(self) -> str:
+        return self.index.key
+
+    @property
+    def columns(self) -> list:
+        """
+        Columns of the join, in ``pd.merge`` order.
+        """
+        return ["sample", self.key] + [col for col in self.reference.columns if col != self.key]
+
+    def memory_usage(self) -> int:
+        """
+        Returns the bytes held by the view itself (pairs and slots; the
+        reference table is shared with the registry).
+        """
+        return int(self.pairs.memory_usage(index=True, deep=True).sum() + self.slots.nbytes)
+
+    def to_frame(self, columns=None, distinct: bool = False) -> pd.DataFrame:
+        """
+        Materializes the join, e.g. for table display or export.
+
+        Parameters
+        ----------
+        columns : list of str, optional
+            Result columns, in this order. Defaults to every column.
+        distinct : bool, optional
+            If True, only the distinct result rows are returned.
+
+        Returns
+        -------
+        pd.DataFrame
+            Same rows as ``index_join(pairs, reference, index, ...)``.
+        """
+        return index_join(self.pairs, self.reference, self.index, columns=columns, distinct=distinct)
+
+    def distinct_combinations(self, columns) -> pd.DataFrame:
+        """
+        Returns the distinct rows of the join projected on ``columns``,
+        computed on codes without expanding the joined rows.
+
+        With 'sample' among the columns the sample x key incidence matrix of
+        the pairs is multiplied by the key x value incidence matrix of the
+        reference rows; every nonzero of the product is a distinct
+        combination. Otherwise only the reference rows of the matched keys
+        are read.
+
+        Parameters
+        ----------
+        columns : list of str
+            Columns of the join.
+
+        Returns
+        -------
+        pd.DataFrame
+            Same rows as ``to_frame(columns, distinct=True)``, ordered by
+            sample code, then by first occurrence in the reference table.
+            The join column is taken from the reference.
+
+        Raises
+        ------
+        KeyError
+            If a column is not a column of the join.
+        """
+        columns = list(columns)
+        missing = [col for col in columns if col not in self.columns]
+        if missing:
+            raise KeyError(f"Columns {missing} are not columns of the join result.")
+
+        reference_columns = [col for col in columns if col != "sample"]
+        tuple_ids, first_rows = _tuple_ids(self.reference[reference_columns])
+        row_slots = self.index.row_slots()
+
+        if "sample" in columns:
+            sample = self.pairs["sample"]
+            n_samples = len(sample.cat.categories)
+            # Missing samples (code -1) get their own row of the incidence matrix
+            sample_codes = sample.cat.codes.to_numpy().astype(np.int64)
+            sample_codes[sample_codes < 0] = n_samples
+            pair_incidence = sparse.csr_matrix(
+                (np.ones(len(self.slots), dtype=np.int32), (sample_codes, self.slots)),
+                shape=(n_samples + 1, len(self.index)),
+            )
+            reference_incidence = sparse.csr_matrix(
+                (np.ones(len(row_slots), dtype=np.int32), (row_slots, tuple_ids)),
+                shape=(len(self.index), len(first_rows)),
+            )
+            combinations = (pair_incidence @ reference_incidence).tocoo()
+            order = np.lexsort((combinations.col, combinations.row))
+            tuples = combinations.col[order]
+            sample_codes = combinations.row[order]
+            sample_codes[sample_codes == n_samples] = -1
+        else:
+            matched = np.zeros(len(self.index), dtype=bool)
+            matched[self.slots] = True
+            tuples = np.unique(tuple_ids[matched[row_slots]])
+
+        result = self.reference[reference_columns].take(first_rows[tuples]).reset_index(drop=True)
+        if "sample" in columns:
+            result["sample"] = pd.Categorical.from_codes(sample_codes, dtype=self.pairs["sample"].dtype)
+        return result[columns]
+
+    def sample_incidence(self) -> IncidenceMatrix:
+        """
+        Returns the sample x key incidence matrix of the pairs.
+        """
+        return build_incidence(self.pairs, "sample", self.key)
+
+    def entity_incidence(self, column: str) -> IncidenceMatrix:
+        """
+        Returns the sample x entity incidence matrix of the join (e.g.
+        sample x compound): entry ``(i, j)`` is the number of distinct keys
+        linking sample ``i`` to entity ``j``.
+
+        One sparse product of `sample_incidence` with the key x entity
+        matrix of the reference, precompiled in the registry for a view of a
+        registered spec (see `get_reference_incidence`).
+        """
+        if self.name is None:
+            reference = build_incidence(self.reference, self.key, column)
+        else:
+            reference = get_reference_incidence(self.name, column)
+        return project(self.sample_incidence(), reference)
+
+    def _sample_counts(self, by: list, value: str, name: str):
+        """
+        Returns the counts per sample (``by=['sample']``) or per sample and
+        entity (``by=['sample', entity]``, counting keys) read from the
+        incidence matrices, or None for other groupings.
+        """
+        entities = [col for col in self.reference.columns if col != self.key]
+        if by == ["sample"] and (value == self.key or value in entities):
+            incidence = self.sample_incidence() if value == self.key else self.entity_incidence(value)
+            counts = row_counts(incidence)
+            return pd.DataFrame({"sample": counts.index, name: counts.to_numpy()})
+        if len(by) == 2 and by[0] == "sample" and by[1] in entities and value == self.key:
+            incidence = self.entity_incidence(by[1])
+            # Canonical CSR: nonzeros in (sample, entity) order, as the groups of count_distinct
+            matrix = incidence.matrix.tocoo()
+            return pd.DataFrame({
+                "sample": incidence.rows.take(matrix.row),
+                by[1]: incidence.columns.take(matrix.col),
+                name: matrix.data.astype(np.int64),
+            })
+        return None
+
+    def count_distinct(self, by: list, value: str, name: str) -> pd.DataFrame:
+        """
+        Counts the distinct values of a column per group of the join.
+
+        Same result as `utils.core.aggregate_bundle.count_distinct` on the
+        materialized join. Counts per sample (of keys or of an entity) and
+        per sample and entity (of keys) are read from the incidence matrices
+        (see `entity_incidence`); other groupings are computed on
+        `distinct_combinations`.
+        """
+        by = list(by)
+        counts = self._sample_counts(by, value, name)
+        if counts is None:
+            counts = count_distinct(self.distinct_combinations(by + [value]), by, value, name)
+        return counts
+
+    def aggregate_bundle(self) -> dict:
+        """
+        Computes every aggregate registered for the view's table.
+
+        Returns
+        -------
+        dict
+            Aggregate name -> read-only DataFrame, as `build_aggregate_bundle`
+            returns for the materialized join.
+        """
+        specs = AGGREGATE_SPECS.get(self.name)
+        if specs is None or self.n_rows == 0:
+            return {}
+        bundle = {}
+        for name, spec in specs.items():
+            counts = self.count_distinct(spec.by, spec.value, spec.name)
+            bundle[name] = freeze_dataframe(spec.finish(counts) if spec.finish is not None else counts)
+        return bundle
+
+
+def build_merged_view(input_df: pd.DataFrame, name: str = "biorempp") -> MergedView:
+    """
+    Builds the lazy merge of an input table with a registered reference database.
+
+    Parameters
+    ----------
+    input_df : pd.DataFrame
+        Input table with 'sample' and the spec's join column (other columns
+        are ignored). For a spec merged after another one, the upstream
+        merged table (e.g. the BioRemPP table for 'kegg').
+    name : str, optional
+        Name of the registered spec. Defaults to 'biorempp'.
+
+    Returns
+    -------
+    MergedView
+        View over the distinct sample/key pairs of the input, typed as
+        `merge_with_reference` types its input.
+
+    Raises
+    ------
+    FileNotFoundError
+        If the database file does not exist.
+    KeyError
+        If the spec is unknown or a required column is missing.
+    """
+    spec = get_reference_spec(name)
+    for col in ("sample", spec.key):
+        if col not in input_df.columns:
+            logger.error(f"Column '{col}' is missing from input DataFrame.")
+            raise KeyError(f"Required column '{col}' is missing in the input DataFrame.")
+
+    reference_df, index = get_indexed_reference(name)
+    pairs = input_df[["sample", spec.key]]
+    if spec.optimize_by_default:
+        pairs = get_spec_optimizer(spec)(pairs.copy())
+    if spec.optimize_by_default or spec.always_encode_key:
+        pairs, reference_df = align_shared_categories(pairs, reference_df)
+    view = MergedView(pairs, reference_df, index, name)
+    logger.info(f"{spec.label} merged view built: {len(view.pairs)} pairs, {len(view)} joined rows")
+    return view
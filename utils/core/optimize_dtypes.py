@@ -1,25 +1,42 @@
 import pandas as pd
 import logging
 
+from utils.core.reference_specs import ReferenceSpec, get_reference_spec
+from utils.core.vocabulary import SHARED_VOCABULARIES, to_shared_categorical
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-def optimize_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+def _to_category(df: pd.DataFrame, col: str) -> None:
     """
-    Optimize data types by converting repetitive string columns to categorical.
+    Converts a column to categorical in place. Join keys ('ko', 'cpd') are
+    encoded with the process-wide dictionaries from `utils.core.vocabulary`,
+    so every optimized frame shares the same integer codes for them.
+    """
+    if col in SHARED_VOCABULARIES:
+        df[col] = to_shared_categorical(df[col], SHARED_VOCABULARIES[col])
+    else:
+        df[col] = df[col].astype('category')
+
+
+def optimize_with_spec(df: pd.DataFrame, spec: ReferenceSpec) -> pd.DataFrame:
+    """
+    Optimizes data types following the column lists of a reference spec.
 
     Parameters
     ----------
     df : pd.DataFrame
-        Input DataFrame to be optimized.
+        Input DataFrame (reference table, user input or merge result).
+    spec : ReferenceSpec
+        Spec declaring the categorical and numeric columns.
 
     Returns
     -------
     pd.DataFrame
-        DataFrame with optimized dtypes to reduce memory usage.
-    
+        The same DataFrame with optimized dtypes.
+
     Raises
     ------
     TypeError
@@ -29,22 +46,53 @@ def optimize_dtypes(df: pd.DataFrame) -> pd.DataFrame:
         logger.error("Input must be a pandas DataFrame.")
         raise TypeError("Input must be a pandas DataFrame.")
 
-    categorical_columns = [
-        'ko', 'genesymbol', 'genename', 'cpd', 'compoundclass',
-        'referenceAG', 'compoundname', 'enzyme_activity', 'sample'
-    ]
-
-    for col in categorical_columns:
+    for col in spec.categorical_columns:
         if col in df.columns:
             logger.debug(f"Converting column '{col}' to categorical.")
-            df[col] = df[col].astype('category')
+            _to_category(df, col)
         else:
-            logger.info(f"Column '{col}' not found. Skipping.")
+            logger.info(f"Column '{col}' not found in {spec.label} DataFrame. Skipping.")
+
+    # Handle prefixed columns (e.g. ToxCSM label_* and value_*)
+    if spec.categorical_prefixes:
+        for col in [col for col in df.columns if col.startswith(spec.categorical_prefixes)]:
+            logger.debug(f"Converting column '{col}' to categorical.")
+            df[col] = df[col].astype('category')
+
+    if spec.numeric_prefixes:
+        for col in [col for col in df.columns if col.startswith(spec.numeric_prefixes)]:
+            try:
+                logger.debug(f"Converting value column '{col}' to float32.")
+                df[col] = pd.to_numeric(df[col], errors='coerce').astype('float32')
+            except Exception as e:
+                logger.warning(f"Failed to convert column '{col}' to float32: {e}")
 
-    logger.info("DataFrame optimization (general) completed.")
+    logger.info(f"{spec.label} DataFrame optimization completed.")
     return df
 
 
+def optimize_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Optimize data types by converting repetitive string columns to categorical.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Input DataFrame to be optimized.
+
+    Returns
+    -------
+    pd.DataFrame
+        DataFrame with optimized dtypes to reduce memory usage.
+    
+    Raises
+    ------
+    TypeError
+        If input is not a pandas DataFrame.
+    """
+    return optimize_with_spec(df, get_reference_spec("biorempp"))
+
+
 def optimize_kegg_dtypes(df: pd.DataFrame) -> pd.DataFrame:
     """
     Optimize KEGG DataFrame by converting repetitive columns to categorical.
@@ -64,21 +112,7 @@ def optimize_kegg_dtypes(df: pd.DataFrame) -> pd.DataFrame:
     TypeError
         If input is not a pandas DataFrame.
     """
-    if not isinstance(df, pd.DataFrame):
-        logger.error("Input must be a pandas DataFrame.")
-        raise TypeError("Input must be a pandas DataFrame.")
-
-    kegg_columns = ['ko', 'pathname', 'genesymbol', 'sample']
-
-    for col in kegg_columns:
-        if col in df.columns:
-            logger.debug(f"Converting column '{col}' to categorical.")
-            df[col] = df[col].astype('category')
-        else:
-            logger.info(f"Column '{col}' not found in KEGG DataFrame. Skipping.")
-
-    logger.info("KEGG DataFrame optimization completed.")
-    return df
+    return optimize_with_spec(df, get_reference_spec("kegg"))
 
 
 def optimize_hadeg_dtypes(df: pd.DataFrame) -> pd.DataFrame:
@@ -100,21 +134,7 @@ def optimize_hadeg_dtypes(df: pd.DataFrame) -> pd.DataFrame:
     TypeError
         If input is not a pandas DataFrame.
     """
-    if not isinstance(df, pd.DataFrame):
-        logger.error("Input must be a pandas DataFrame.")
-        raise TypeError("Input must be a pandas DataFrame.")
-
-    hadeg_columns = ['Gene', 'ko', 'Pathway', 'compound_pathway', 'sample']
-
-    for col in hadeg_columns:
-        if col in df.columns:
-            logger.debug(f"Converting column '{col}' to categorical.")
-            df[col] = df[col].astype('category')
-        else:
-            logger.info(f"Column '{col}' not found in HADEG DataFrame. Skipping.")
-
-    logger.info("HADEG DataFrame optimization completed.")
-    return df
+    return optimize_with_spec(df, get_reference_spec("hadeg"))
 
 
 def optimize_toxcsm_dtypes(df: pd.DataFrame) -> pd.DataFrame:
@@ -137,32 +157,40 @@ def optimize_toxcsm_dtypes(df: pd.DataFrame) -> pd.DataFrame:
     TypeError
         If input is not a pandas DataFrame.
     """
-    if not isinstance(df, pd.DataFrame):
-        logger.error("Input must be a pandas DataFrame.")
-        raise TypeError("Input must be a pandas DataFrame.")
+    return optimize_with_spec(df, get_reference_spec("toxcsm"))
 
-    categorical_columns = ['SMILES', 'cpd', 'ChEBI', 'compoundname', 'sample']
-    for col in categorical_columns:
-        if col in df.columns:
-            logger.debug(f"Converting column '{col}' to categorical.")
-            df[col] = df[col].astype('category')
-        else:
-            logger.info(f"Column '{col}' not found in ToxCSM DataFrame. Skipping.")
 
-    # Handle label_* columns
-    label_columns = [col for col in df.columns if col.startswith('label_')]
-    for col in label_columns:
-        logger.debug(f"Converting label column '{col}' to categorical.")
-        df[col] = df[col].astype('category')
+# Optimizers of the built-in reference databases, by spec name
+_SPEC_OPTIMIZERS = {
+    "biorempp": optimize_dtypes,
+    "kegg": optimize_kegg_dtypes,
+    "hadeg": optimize_hadeg_dtypes,
+    "toxcsm": optimize_toxcsm_dtypes,
+}
 
-    # Handle value_* columns
-    value_columns = [col for col in df.columns if col.startswith('value_')]
-    for col in value_columns:
-        try:
-            logger.debug(f"Converting value column '{col}' to float32.")
-            df[col] = pd.to_numeric(df[col], errors='coerce').astype('float32')
-        except Exception as e:
-            logger.warning(f"Failed to convert column '{col}' to float32: {e}")
 
-    logger.info("ToxCSM DataFrame optimization completed.")
-    return df
+def get_spec_optimizer(spec: ReferenceSpec):
+    """
+    Returns the dtype optimizer of a reference spec.
+
+    Built-in databases use their ``optimize_*_dtypes`` function; other specs
+    get a generated ``optimize_<name>_dtypes`` function, created once so that
+    cached tables keep a stable identity.
+
+    Parameters
+    ----------
+    spec : ReferenceSpec
+        Registered spec.
+
+    Returns
+    -------
+    callable
+        Function ``optimizer(df) -> pd.DataFrame``.
+    """
+    optimizer = _SPEC_OPTIMIZERS.get(spec.name)
+    if optimizer is None:
+        def optimizer(df: pd.DataFrame) -> pd.DataFrame:
+            return optimize_with_spec(df, get_reference_spec(spec.name))
+        optimizer.__name__ = f"optimize_{spec.name}_dtypes"
+        _SPEC_OPTIMIZERS[spec.name] = optimizer
+    return optimizer
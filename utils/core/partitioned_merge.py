@@ -0,0 +1,576 @@
+"""
+partitioned_merge.py
+--------------------
+Out-of-core reference merges for inputs whose merged tables do not fit in
+memory.
+
+A merge repeats every (sample, KO) pair of the input once per matching
+reference row, so the merged tables of a large cohort can be orders of
+magnitude larger than the input. The partitioned mode splits the input into
+partitions of whole samples, sized from the number of merged rows each input
+row produces (read from the cached key indexes, without merging), and runs
+the merges one partition at a time. The merged rows of each partition are
+appended straight to the output files by a `PartitionWriter` and then
+released, so memory is bounded by the partition size instead of the cohort
+size.
+
+The aggregate bundles (see `aggregate_bundle`) are folded across partitions
+by `AggregateFold`. Since partitions never share a sample, counts grouped by
+sample are simply concatenated and counts of distinct samples are summed;
+other counts keep the distinct (group, value) rows seen so far, which are
+bounded by the reference tables. The folded bundle is identical to the bundle
+of the full merged table.
+
+Partitions can also be sharded across a pool of forked worker processes
+(``jobs``): the workers inherit the input and the preloaded reference tables
+and key indexes read-only, merge and fold their partitions, and return only
+the folded aggregates; their merged rows are written to shard files appended
+to the outputs in partition order, so the outputs do not depend on the
+number of processes.
+
+Functions:
+- estimate_merged_rows: Estimates the merged rows produced by each input row.
+- partition_samples: Splits an input table into partitions of whole samples.
+- concat_partitions: Concatenates tables of different partitions.
+- PartitionWriter: Appends the tables of successive partitions to output files.
+- AggregateFold: Folds the aggregate bundle of a merged table across partitions.
+- run_partitioned_merges: Runs the reference merges partition by partition,
+  optionally sharded across worker processes.
+"""
+
+import glob
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from utils.core.aggregate_bundle import AGGREGATE_SPECS
+from utils.core.data_processing import reference_match_counts
+from utils.core.merge_scheduler import run_reference_merges
+from utils.core.reference_registry import freeze_dataframe
+from utils.core.reference_specs import merge_plan
+from utils.logger_config import setup_logger
+
+logger = setup_logger(__name__)
+
+OUTPUT_FORMATS = ("csv", "parquet")
+
+# Partitions per worker process when no partition size is given, so that
+# uneven partitions still keep every worker busy
+_SHARDS_PER_JOB = 4
+
+
+def estimate_merged_rows(input_df: pd.DataFrame, names=None) -> np.ndarray:
+    """
+    Estimates the number of merged rows each input row produces.
+
+    The estimate is the largest result among the merges joined on 'ko': the
+    number of matching reference rows, multiplied along the merges they
+    depend on with their whole result. Merges joined on distinct upstream
+    rows (KEGG, see ``upstream_columns``) count their own matches for rows
+    the dependency matched, and merges on other keys deduplicate their input
+    first and are not counted.
+
+    Parameters
+    ----------
+    input_df : pd.DataFrame
+        Input table with a 'ko' column.
+    names : iterable of str, optional
+        Merges considered (see `merge_plan`). Defaults to all of them.
+
+    Returns
+    -------
+    np.ndarray
+        int64 estimate per input row.
+    """
+    fanouts = {}
+    for spec in merge_plan(names):
+        if spec.key != "ko":
+            continue
+        counts = reference_match_counts(input_df["ko"], spec.name)
+        if spec.depends_on in fanouts:
+            upstream = fanouts[spec.depends_on]
+            counts = counts * (upstream if spec.upstream_columns is None else upstream > 0)
+        fanouts[spec.name] = counts
+    if not fanouts:
+        return np.ones(len(input_df), dtype=np.int64)
+    return np.max(np.vstack(list(fanouts.values())), axis=0)
+
+
+def partition_samples(input_df: pd.DataFrame, max_rows: int, weights=None) -> list:
+    """
+    Splits the rows of an input table into partitions of whole samples.
+
+    Samples are taken in sorted order and added to the current partition
+    until its weight would exceed ``max_rows``. A sample heavier than
+    ``max_rows`` gets a partition of its own.
+
+    Parameters
+    ----------
+    input_df : pd.DataFrame
+        Input table with a 'sample' column.
+    max_rows : int
+        Weight budget of a partition.
+    weights : array-like, optional
+        Weight of each row (e.g. `estimate_merged_rows`). Defaults to 1.
+
+    Returns
+    -------
+    list of np.ndarray
+        Row positions of every non-empty partition, in input order within
+        each partition.
+    """
+    if max_rows < 1:
+        raise ValueError("max_rows must be a positive number of rows.")
+    sample = input_df["sample"]
+    if isinstance(sample.dtype, pd.CategoricalDtype):
+        codes, n_samples = sample.cat.codes.to_numpy(), len(sample.cat.categories)
+    else:
+        codes, uniques = pd.factorize(sample, sort=True)
+        n_samples = len(uniques)
+    sample_weights = np.bincount(codes, weights=weights, minlength=n_samples)
+
+    sample_partition = np.empty(n_samples, dtype=np.int64)
+    partition, total = 0, 0
+    for i, weight in enumerate(sample_weights):
+        if total and total + weight > max_rows:
+            partition, total = partition + 1, 0
+        sample_partition[i] = partition
+        total += weight
+
+    row_partition = sample_partition[codes]
+    order = np.argsort(row_partition, kind="stable")
+    bounds = np.searchsorted(row_partition[order], np.arange(partition + 2))
+    return [order[start:stop] for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start]
+
+
+def concat_partitions(frames: list) -> pd.DataFrame:
+    """
+    Concatenates tables of different partitions.
+
+    Categorical columns stay categorical when their categories differ between
+    partitions (e.g. a vocabulary that grew in between): the categories are
+    united in first-seen order.
+
+    Parameters
+    ----------
+    frames : list of pd.DataFrame
+        Tables with the same columns.
+
+    Returns
+    -------
+    pd.DataFrame
+        Rows of every table, with a fresh RangeIndex.
+    """
+    if len(frames) == 1:
+        return frames[0].reset_index(drop=True)
+    result = pd.concat(frames, ignore_index=True)
+    for column in result.columns:
+        columns = [frame[column] for frame in frames]
+        if (not isinstance(result[column].dtype, pd.CategoricalDtype)
+                and all(isinstance(col.dtype, pd.CategoricalDtype) for col in columns)):
+            result[column] = union_categoricals(columns, ignore_order=True)
+    return result
+
+
+class PartitionWriter:
+    """
+    Appends the tables of successive partitions to one output per table:
+    ``<output_dir>/<name>.csv`` (header written once), or a
+    ``<output_dir>/<name>.parquet/`` directory of part files.
+
+    Parameters
+    ----------
+    output_dir : str
+        Directory of the outputs (created if needed).
+    output_format : str
+        'csv' or 'parquet'.
+
+    Attributes
+    ----------
+    paths : dict
+        Table name -> output path, for every table written.
+    rows : dict
+        Table name -> number of rows written.
+    """
+
+    def __init__(self, output_dir: str, output_format: str = "csv"):
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unsupported output format: {output_format!r}")
+        self.output_dir = output_dir
+        self.output_format = output_format
+        self.paths = {}
+        self.rows = {}
+
+    def _open(self, name: str) -> bool:
+        """
+        Registers the output of a table on its first write, replacing any
+        output of an earlier run. Returns True on the first write.
+        """
+        if name in self.paths:
+            return False
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"{name}.{self.output_format}")
+        if self.output_format == "parquet":
+            os.makedirs(path, exist_ok=True)
+            for stale in glob.glob(os.path.join(path, "part-*.parquet")):
+                os.remove(stale)
+        self.paths[name] = path
+        self.rows[name] = 0
+        return True
+
+    def _next_part(self, name: str) -> str:
+        """
+        Returns the path of the next Parquet part file of a table.
+        """
+        path = self.paths[name]
+        return os.path.join(path, f"part-{len(glob.glob(os.path.join(path, 'part-*.parquet'))):05d}.parquet")
+
+    def write(self, name: str, df: pd.DataFrame) -> None:
+        """
+        Appends the rows of one partition to the output of a table.
+        """
+        if df.empty:
+            return
+        first = self._open(name)
+        if self.output_format == "csv":
+            df.to_csv(self.paths[name], mode="w" if first else "a", header=first, index=False)
+        else:
+            # Plain values, so that every part has the same schema
+            categorical = [col for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)]
+            df = df.astype({col: df[col].cat.categories.dtype for col in categorical})
+            df.columns = [str(column) for column in df.columns]
+            df.to_parquet(self._next_part(name), index=False)
+        self.rows[name] += len(df)
+
+    def append_output(self, name: str, path: str, rows: int) -> None:
+        """
+        Appends (and removes) the output of a table written by another writer
+        of the same format, e.g. in a worker process.
+
+        Parameters
+        ----------
+        name : str
+            Table name.
+        path : str
+            Output of the other writer (see `paths`).
+        rows : int
+            Number of rows of that output.
+        """
+        first = self._open(name)
+        if self.output_format == "csv":
+            with open(path, "rb") as source, open(self.paths[name], "wb" if first else "ab") as target:
+                if not first:
+                    source.readline()
+                shutil.copyfileobj(source, target)
+            os.remove(path)
+        else:
+            for part in sorted(glob.glob(os.path.join(path, "part-*.parquet"))):
+                os.replace(part, self._next_part(name))
+            shutil.rmtree(path, ignore_errors=True)
+        self.rows[name] += rows
+
+
+def _sum_counts(parts: list, spec) -> pd.DataFrame:
+    """
+    Sums the partial count tables of a `DistinctCount` per group, in the
+    group order of `count_distinct`.
+    """
+    counts = concat_partitions(parts)
+    if len(parts) == 1:
+        return counts
+    return counts.groupby(spec.by, observed=True, sort=True)[spec.name].sum().reset_index()
+
+
+class AggregateFold:
+    """
+    Folds the aggregate bundle of a merged table across sample partitions.
+
+    Parameters
+    ----------
+    table : str
+        Name of the merged table ('biorempp', 'kegg' or 'hadeg'; other
+        tables have no aggregates).
+    """
+
+    def __init__(self, table: str):
+        self.table = table
+        self.specs = AGGREGATE_SPECS.get(table, {})
+        self._parts = {name: [] for name in self.specs}
+
+    def __getstate__(self) -> dict:
+        # Specs hold finisher closures; a worker's fold is sent back without them
+        return {"table": self.table, "_parts": self._parts}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(state["table"])
+        self._parts = state["_parts"]
+
+    @staticmethod
+    def _is_additive(spec) -> bool:
+        """
+        Counts grouped by sample, or of distinct samples, add up across
+        partitions of disjoint samples.
+        """
+        return "sample" in spec.by or spec.value == "sample"
+
+    def _extend(self, name: str, parts: list) -> None:
+        """
+        Adds partial results of an aggregate, compacting those whose groups
+        recur across partitions.
+        """
+        spec = self.specs[name]
+        kept = self._parts[name]
+        kept.extend(parts)
+        if "sample" in spec.by or len(kept) < 2:
+            return
+        if spec.value == "sample":
+            kept[:] = [_sum_counts(kept, spec)]
+        else:
+            kept[:] = [concat_partitions(kept).drop_duplicates()]
+
+    def add(self, df: pd.DataFrame) -> None:
+        """
+        Adds the merged rows of one partition.
+        """
+        if df.empty:
+            return
+        for name, spec in self.specs.items():
+            if self._is_additive(spec):
+                self._extend(name, [spec.count(df)])
+            else:
+                self._extend(name, [df[spec.by + [spec.value]].drop_duplicates()])
+
+    def merge(self, other: "AggregateFold") -> None:
+        """
+        Adds the partitions folded by another fold of the same table (e.g. in
+        a worker process).
+        """
+        for name in self.specs:
+            self._extend(name, other._parts[name])
+
+    def result(self) -> dict:
+        """
+        Returns the folded bundle: aggregate name -> read-only DataFrame, as
+        `build_aggregate_bundle` returns for the full merged table.
+        """
+        bundle = {}
+        for name, spec in self.specs.items():
+            parts = self._parts[name]
+            if not parts:
+                continue
+            counts = _sum_counts(parts, spec) if self._is_additive(spec) else spec.count(concat_partitions(parts))
+            bundle[name] = freeze_dataframe(spec.finish(counts) if spec.finish is not None else counts)
+        return bundle
+
+
+class PartitionedMerge:
+    """
+    Outcome of `run_partitioned_merges`.
+
+    Attributes
+    ----------
+    aggregates : dict
+        Merged table name -> folded aggregate bundle.
+    rows : dict
+        Merged table name -> total number of merged rows.
+    partials : list
+        Return values of ``on_partition``, in partition order.
+    partitions : int
+        Number of partitions merged.
+    peak_rows : int
+        Largest number of merged rows (all tables) held for one partition.
+    jobs : int
+        Number of worker processes used (1 when run in-process).
+    total_time : float
+        Wall time of the whole run in seconds.
+    """
+
+    def __init__(self):
+        self.aggregates = {}
+        self.rows = {}
+        self.partials = []
+        self.partitions = 0
+        self.peak_rows = 0
+        self.jobs = 1
+        self.total_time = 0.0
+
+
+class _PartitionResult:
+    """
+    Folded aggregates and outputs of the partitions merged by one process.
+    """
+
+    def __init__(self):
+        self.folds = {}
+        self.rows = {}
+        self.partials = []
+        self.peak_rows = 0
+        self.outputs = {}
+
+
+def _merge_partition(input_df: pd.DataFrame, result: _PartitionResult, names, max_workers,
+                     writer: PartitionWriter, write_merged: bool, on_partition) -> None:
+    """
+    Merges one partition and adds its rows to ``result``.
+    """
+    dag = run_reference_merges(input_df, names=names, max_workers=max_workers)
+    if dag.errors:
+        name, error = next(iter(dag.errors.items()))
+        raise RuntimeError(f"Merge with {name} failed: {error}") from error
+
+    merged = {name: df for name, df in dag.results.items() if not df.empty}
+    for name, df in merged.items():
+        if writer is not None and write_merged:
+            writer.write(name, df)
+        result.folds.setdefault(name, AggregateFold(name)).add(df)
+        result.rows[name] = result.rows.get(name, 0) + len(df)
+    result.partials.append(on_partition(merged, writer) if on_partition is not None else None)
+    result.peak_rows = max(result.peak_rows, sum(len(df) for df in merged.values()))
+
+
+# Arguments of the sharded run, inherited by the forked worker processes
+# instead of being pickled (input table, reference tables and key indexes)
+_shard_context = None
+
+
+def _merge_shard(index: int) -> _PartitionResult:
+    """
+    Worker process task: merges partition ``index`` of the sharded run.
+    """
+    input_df, partitions, names, shard_dir, output_format, write_merged, on_partition = _shard_context
+    writer = None
+    if shard_dir is not None:
+        writer = PartitionWriter(os.path.join(shard_dir, f"{index:05d}"), output_format)
+    result = _PartitionResult()
+    _merge_partition(input_df.iloc[partitions[index]], result, names, 1, writer, write_merged, on_partition)
+    if writer is not None:
+        result.outputs = {name: (path, writer.rows[name]) for name, path in writer.paths.items()}
+    return result
+
+
+def _fork_context():
+    """
+    Returns the 'fork' multiprocessing context, or None where it is not
+    available.
+    """
+    if "fork" not in multiprocessing.get_all_start_methods():
+        return None
+    return multiprocessing.get_context("fork")
+
+
+def run_partitioned_merges(input_df: pd.DataFrame, max_rows: int = None, writer: PartitionWriter = None,
+                           names=None, max_workers: int = None, on_partition=None,
+                           write_merged: bool = True, jobs: int = 1) -> PartitionedMerge:
+    """
+    Runs the reference merges one sample partition at a time, in this
+    process or sharded across worker processes.
+
+    With ``jobs > 1`` the partitions are merged by a pool of forked worker
+    processes. The workers inherit the input table and the preloaded
+    reference tables and key indexes (see `preload_reference_databases`), so
+    only partition numbers are sent to them; they send back folded
+    aggregates and write their rows to shard files that are appended to the
+    outputs in partition order.
+
+    Parameters
+    ----------
+    input_df : pd.DataFrame
+        Parsed input with 'sample' and 'ko' columns.
+    max_rows : int, optional
+        Estimated merged rows per partition (see `estimate_merged_rows`).
+        Defaults to ``_SHARDS_PER_JOB`` partitions per job.
+    writer : PartitionWriter, optional
+        Receives the merged rows of every partition, under the table names
+        ('biorempp', 'kegg', 'hadeg', 'toxcsm'), and the rows written by
+        ``on_partition``.
+    names : iterable of str, optional
+        Merges to run (see `run_reference_merges`).
+    max_workers : int, optional
+        Threads running the merges of a partition in this process (worker
+        processes use one thread).
+    on_partition : callable, optional
+        Called as ``on_partition(merged, writer)`` with the non-empty merged
+        tables of every partition, before they are released, and the writer
+        of the process (None without ``writer``). Its return values are
+        collected in ``partials``; they must be picklable when ``jobs > 1``.
+    write_merged : bool
+        Whether the merged tables are written to ``writer``.
+    jobs : int
+        Number of worker processes; 1 merges in this process. Platforms
+        without 'fork' always merge in this process.
+
+    Returns
+    -------
+    PartitionedMerge
+        Folded aggregates, row counts and partial results.
+
+    Raises
+    ------
+    RuntimeError
+        If a merge fails.
+    """
+    global _shard_context
+    start = time.perf_counter()
+    outcome = PartitionedMerge()
+    weights = estimate_merged_rows(input_df, names)
+    if max_rows is None:
+        max_rows = max(1, int(np.ceil(weights.sum() / (max(jobs, 1) * _SHARDS_PER_JOB))))
+    partitions = partition_samples(input_df, max_rows, weights)
+
+    context = _fork_context() if jobs > 1 and len(partitions) > 1 else None
+    if jobs > 1 and context is None and len(partitions) > 1:
+        logger.warning("Process sharding requires the 'fork' start method; merging in this process.")
+
+    results = []
+    if context is None:
+        result = _PartitionResult()
+        for rows in partitions:
+            _merge_partition(input_df.iloc[rows], result, names, max_workers, writer, write_merged, on_partition)
+        results.append(result)
+    else:
+        outcome.jobs = min(jobs, len(partitions))
+        shard_dir = None
+        if writer is not None:
+            os.makedirs(writer.output_dir, exist_ok=True)
+            shard_dir = tempfile.mkdtemp(prefix=".shards-", dir=writer.output_dir)
+        _shard_context = (input_df, partitions, names, shard_dir, writer.output_format if writer else None,
+                          write_merged, on_partition)
+        try:
+            with ProcessPoolExecutor(max_workers=outcome.jobs, mp_context=context) as pool:
+                for result in pool.map(_merge_shard, range(len(partitions))):
+                    for name, (path, rows) in result.outputs.items():
+                        writer.append_output(name, path, rows)
+                    results.append(result)
+        finally:
+            _shard_context = None
+            if shard_dir is not None:
+                shutil.rmtree(shard_dir, ignore_errors=True)
+
+    folds = {}
+    for result in results:
+        for name, fold in result.folds.items():
+            if name in folds:
+                folds[name].merge(fold)
+            else:
+                folds[name] = fold
+        for name, rows in result.rows.items():
+            outcome.rows[name] = outcome.rows.get(name, 0) + rows
+        outcome.partials.extend(result.partials)
+        outcome.peak_rows = max(outcome.peak_rows, result.peak_rows)
+
+    outcome.partitions = len(partitions)
+    outcome.aggregates = {name: fold.result() for name, fold in folds.items()}
+    outcome.total_time = time.perf_counter() - start
+    logger.info(
+        f"Partitioned merge of {len(input_df)} input rows in {outcome.partitions} partitions "
+        f"on {outcome.jobs} processes ({outcome.total_time:.2f}s): {outcome.rows}, "
+        f"at most {outcome.peak_rows} merged rows per partition"
+    )
+    return outcome
@@ -0,0 +1,347 @@
+"""
+reference_index.py
+------------------
+Precomputed join-key indexes for the reference databases and a vectorized
+inner join that uses them in place of ``pd.merge``.
+
+A `KeyIndex` stores the rows of a reference table grouped by join key: a row
+permutation that sorts the table by key (stable, so rows with the same key
+keep their file order) and an offsets array giving the row range of each key.
+Joining an input table then only needs one lookup per distinct input key;
+the output is expanded with ``np.repeat`` and ``take`` without building a
+hash table on every call.
+
+The join reproduces ``pd.merge(left, right, on=key, how="inner")`` exactly:
+rows follow the order of the left table, matching right rows keep their
+original order, missing keys match each other, and overlapping column names
+receive the ``_x``/``_y`` suffixes.
+
+A join can be restricted to a projection of its result columns: only those
+columns are taken from either table, and with ``distinct`` the input is
+deduplicated on the columns it contributes before the rows are expanded.
+
+Functions:
+- build_key_index: Builds the KeyIndex of a reference table.
+- distinct_rows: Returns the distinct rows of a table.
+- join_input_columns: Returns the input columns a projected join needs.
+- index_join: Inner-joins a table with an indexed reference table.
+"""
+
+import numpy as np
+import pandas as pd
+
+from utils.logger_config import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class KeyIndex:
+    """
+    Row ranges of a reference table grouped by join key.
+
+    Parameters
+    ----------
+    key : str
+        Name of the join column.
+    keys : pd.Index
+        Distinct key labels; position ``i`` owns rows
+        ``order[offsets[i]:offsets[i + 1]]``.
+    offsets : np.ndarray
+        int64 array of length ``len(keys) + 1``.
+    order : np.ndarray
+        Row permutation sorting the table by key.
+    n_rows : int
+        Number of rows of the indexed table.
+    """
+
+    def __init__(self, key: str, keys: pd.Index, offsets: np.ndarray, order: np.ndarray, n_rows: int):
+        self.key = key
+        self.keys = keys
+        self.offsets = offsets
+        self.order = order
+        self.n_rows = n_rows
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def slots(self, values: pd.Series) -> np.ndarray:
+        """
+        Returns the key slot of each value (-1 when the key is not indexed).
+
+        Categorical inputs are looked up once per category.
+        """
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            category_slots = self.keys.get_indexer(values.cat.categories)
+            # Code -1 (missing value) maps to the slot of a missing key, if any
+            category_slots = np.append(category_slots, self.keys.get_indexer([np.nan]))
+            return category_slots[values.cat.codes.to_numpy()]
+        return self.keys.get_indexer(values.to_numpy())
+
+    def match_counts(self, values: pd.Series) -> np.ndarray:
+        """
+        Returns the number of indexed rows matching each value (the number of
+        joined rows each left row produces).
+        """
+        return np.append(np.diff(self.offsets), 0)[self.slots(values)]
+
+    def row_slots(self) -> np.ndarray:
+        """
+        Returns the key slot of every row of the indexed table, in table order.
+        """
+        row_slots = np.empty(self.n_rows, dtype=np.int64)
+        row_slots[self.order] = np.repeat(np.arange(len(self.keys), dtype=np.int64), np.diff(self.offsets))
+        return row_slots
+
+    def row_ranges(self, slots: np.ndarray) -> tuple:
+        """
+        Expands key slots into matching row positions.
+
+        Parameters
+        ----------
+        slots : np.ndarray
+            Output of `slots` for the left table.
+
+        Returns
+        -------
+        tuple
+            ``(left_rows, right_rows)``: positions in the left table and in the
+            indexed table of every joined row, in ``pd.merge`` order.
+        """
+        # Slot -1 (key not indexed) reads the trailing zero-length range
+        slot_starts = np.append(self.offsets[:-1], 0)
+        slot_counts = np.append(np.diff(self.offsets), 0)
+
+        counts = slot_counts[slots]
+        matched = np.flatnonzero(counts)
+        counts = counts[matched]
+        starts = slot_starts[slots[matched]]
+
+        left_rows = np.repeat(matched, counts)
+        # Output position k of a range maps to right row order[start + k - range_start]
+        range_starts = np.cumsum(counts) - counts
+        shift = np.repeat(starts - range_starts, counts)
+        right_rows = self.order[shift + np.arange(len(left_rows), dtype=np.int64)]
+        return left_rows, right_rows
+
+
+def build_key_index(df: pd.DataFrame, key: str) -> KeyIndex:
+    """
+    Builds the KeyIndex of ``df`` on column ``key``.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Reference table.
+    key : str
+        Join column.
+
+    Returns
+    -------
+    KeyIndex
+        Index over the rows of ``df``.
+
+    Raises
+    ------
+    KeyError
+        If ``key`` is not a column of ``df``.
+    """
+    if key not in df.columns:
+        raise KeyError(f"Column '{key}' is not present in the reference table.")
+
+    codes, uniques = pd.factorize(df[key], use_na_sentinel=False)
+    order = np.argsort(codes, kind="stable")
+    counts = np.bincount(codes, minlength=len(uniques))
+    offsets = np.zeros(len(uniques) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+
+    keys = pd.Index(np.asarray(uniques, dtype=object), dtype=object)
+    logger.debug(f"Key index built on '{key}': {len(keys)} keys, {len(df)} rows")
+    return KeyIndex(key, keys, offsets, order.astype(np.int64), len(df))
+
+
+def _joinable(left: pd.Series, right: pd.Series) -> bool:
+    """
+    Returns True if the key dtypes are handled by `index_join` (text keys,
+    stored as object or categorical columns).
+    """
+    def is_text(dtype):
+        return dtype == object or isinstance(dtype, pd.CategoricalDtype)
+    return is_text(left.dtype) and is_text(right.dtype)
+
+
+def _first_rows(codes: list, n_rows: int):
+    """
+    Returns the positions of the first occurrence of every distinct row of
+    columns given as ``(codes, number of categories)`` pairs, or None if
+    their combined codes do not fit in int64.
+    """
+    row_keys = np.zeros(n_rows, dtype=np.int64)
+    size = 1
+    for column_codes, n_categories in codes:
+        n_codes = n_categories + 1
+        if size * n_codes >= 2 ** 62:
+            return None
+        # Codes shifted by one so that missing values (-1) get their own key
+        row_keys = row_keys * n_codes + (column_codes.astype(np.int64) + 1)
+        size *= n_codes
+    # Sort-based: structured keys (code * n_codes + code) collide heavily in
+    # the identity-hashed int64 tables of pandas
+    return np.sort(np.unique(row_keys, return_index=True)[1])
+
+
+def distinct_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns the distinct rows of ``df`` (first occurrences, in order), as
+    ``df.drop_duplicates(ignore_index=True)``.
+
+    Tables of categorical columns are deduplicated on their combined integer
+    codes instead of factorizing every column again.
+    """
+    dtypes = list(df.dtypes)
+    first = None
+    if dtypes and all(isinstance(dtype, pd.CategoricalDtype) for dtype in dtypes):
+        codes = [(df[col].cat.codes.to_numpy(), len(dtype.categories)) for col, dtype in zip(df.columns, dtypes)]
+        first = _first_rows(codes, len(df))
+    if first is None:
+        return df.drop_duplicates(ignore_index=True)
+    return df.take(first).reset_index(drop=True)
+
+
+def _result_names(left_columns, right_columns, key: str, suffixes: tuple) -> tuple:
+    """
+    Returns the result names of the left and right columns of a join, as
+    ``pd.merge`` names them (the key is a left column).
+    """
+    overlap = (set(left_columns) & set(right_columns)) - {key}
+    left_names = {col: f"{col}{suffixes[0]}" if col in overlap else col for col in left_columns}
+    right_names = {col: f"{col}{suffixes[1]}" if col in overlap else col for col in right_columns if col != key}
+    return left_names, right_names
+
+
+def join_input_columns(left_columns, right_columns, key: str, columns,
+                       suffixes: tuple = ("_x", "_y")) -> list:
+    """
+    Returns the columns of the left table needed by a join projected on
+    ``columns``: the join key and the left columns of the projection.
+
+    Parameters
+    ----------
+    left_columns, right_columns : iterable of str
+        Columns of the two tables.
+    key : str
+        Join column.
+    columns : iterable of str
+        Projected result columns, named as in the full join result.
+    suffixes : tuple, optional
+        Suffixes for overlapping column names, as in ``pd.merge``.
+
+    Returns
+    -------
+    list of str
+        Left columns, in table order.
+
+    Raises
+    ------
+    KeyError
+        If a projected column is not a column of the join result.
+    """
+    left_columns, columns = list(left_columns), list(columns)
+    left_names, right_names = _result_names(left_columns, right_columns, key, suffixes)
+    missing = [col for col in columns if col not in left_names.values() and col not in right_names.values()]
+    if missing:
+        raise KeyError(f"Columns {missing} are not columns of the join result.")
+    return [col for col in left_columns if col == key or left_names[col] in columns]
+
+
+def index_join(left: pd.DataFrame, right: pd.DataFrame, index: KeyIndex,
+               suffixes: tuple = ("_x", "_y"), columns=None, distinct: bool = False) -> pd.DataFrame:
+    """
+    Inner-joins ``left`` with ``right`` on ``index.key`` using a precomputed index.
+
+    Parameters
+    ----------
+    left : pd.DataFrame
+        Input table (e.g. sample/KO pairs).
+    right : pd.DataFrame
+        Reference table the index was built from (same rows, same order).
+    index : KeyIndex
+        Index of ``right`` on the join column.
+    suffixes : tuple, optional
+        Suffixes for overlapping column names, as in ``pd.merge``.
+    columns : iterable of str, optional
+        Result columns to materialize, in this order, named as in the full
+        result. Defaults to every column.
+    distinct : bool, optional
+        If True, only the distinct rows of the result are returned.
+
+    Returns
+    -------
+    pd.DataFrame
+        Same result as ``pd.merge(left, right, on=index.key, how="inner")``,
+        projected on ``columns`` and deduplicated when requested.
+
+    Raises
+    ------
+    KeyError
+        If the join column is missing from either table, or a projected
+        column is not a column of the result.
+    ValueError
+        If ``right`` does not have the number of rows the index was built on.
+    """
+    key = index.key
+    if key not in left.columns or key not in right.columns:
+        raise KeyError(f"Column '{key}' must be present in both DataFrames.")
+    if len(right) != index.n_rows:
+        raise ValueError("The key index does not match the reference table.")
+
+    left_names, right_names = _result_names(left.columns, right.columns, key, suffixes)
+    if columns is not None:
+        columns = list(columns)
+        needed = join_input_columns(left.columns, right.columns, key, columns, suffixes)
+        if distinct and len(needed) < len(left.columns):
+            # Rows differing only in dropped columns are expanded once
+            left = distinct_rows(left[needed])
+        else:
+            left = left[needed]
+
+    if not _joinable(left[key], right[key]):
+        result = pd.merge(left, right, on=key, how="inner", suffixes=suffixes)
+        result = result.rename(columns={**left_names, **right_names})
+        if columns is not None:
+            result = result[columns]
+        return distinct_rows(result) if distinct else result
+
+    left_rows, right_rows = index.row_ranges(index.slots(left[key]))
+
+    # (result name, table, source column, rows taken) of every output column
+    sources = [(left_names[col], left, col, left_rows) for col in left.columns]
+    sources += [(name, right, col, right_rows) for col, name in right_names.items()]
+    if columns is not None:
+        by_name = {source[0]: source for source in sources}
+        sources = [by_name[name] for name in columns]
+
+    if distinct and all(isinstance(table[col].dtype, pd.CategoricalDtype) for _, table, col, _ in sources):
+        # Deduplicate the joined row pairs on their codes before any column
+        # is materialized
+        first = _first_rows(
+            [(table[col].cat.codes.to_numpy()[rows], len(table[col].cat.categories))
+             for _, table, col, rows in sources],
+            len(left_rows),
+        )
+        if first is not None:
+            left_rows, right_rows, distinct = left_rows[first], right_rows[first], False
+            sources = [
+                (name, table, col, left_rows if table is left else right_rows)
+                for name, table, col, _ in sources
+            ]
+
+    data = {}
+    for name, table, col, rows in sources:
+        values = table[col].array.take(rows)
+        if table is left and col == key and left[key].dtype != right[key].dtype:
+            # pd.merge only keeps a categorical key when both dtypes are equal
+            values = np.asarray(values, dtype=object)
+        data[name] = values
+
+    result = pd.DataFrame(data, index=pd.RangeIndex(len(left_rows)), copy=False)
+    return distinct_rows(result) if distinct else result
@@ -0,0 +1,248 @@
+"""
+reference_registry.py
+---------------------
+Process-wide registry for the reference databases (BioRemPP, KEGG, HADEG and
+ToxCSM) used by the merge functions in `data_processing.py`.
+
+Each reference table is read and dtype-optimized once per process. Callers
+receive a read-only view of the cached DataFrame, and a table is only reloaded
+when the fingerprint (modification time and size) of its source file changes.
+
+Functions:
+- file_fingerprint: Returns the (mtime, size) fingerprint of a file.
+- freeze_dataframe: Returns a copy of a DataFrame backed by read-only arrays.
+- get_reference_table: Returns a cached reference table, loading it if needed.
+- get_reference_derived: Returns an object (e.g. a join index) derived from a cached table.
+- clear_reference_cache: Drops every cached reference table.
+"""
+
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from utils.logger_config import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def file_fingerprint(filepath: str) -> tuple:
+    """
+    Returns a cheap fingerprint of a file used to detect changes on disk.
+
+    Parameters
+    ----------
+    filepath : str
+        Path to the file.
+
+    Returns
+    -------
+    tuple
+        A tuple ``(st_mtime_ns, st_size)``.
+
+    Raises
+    ------
+    FileNotFoundError
+        If the file does not exist.
+    """
+    stat = os.stat(filepath)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _read_only(values: np.ndarray) -> np.ndarray:
+    """
+    Returns ``values`` as a read-only array, copying it only if it is writeable.
+    """
+    if values.flags.writeable:
+        values = values.copy()
+        values.flags.writeable = False
+    return values
+
+
+def freeze_dataframe(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns a copy of a DataFrame whose column arrays are marked read-only.
+
+    Any in-place write (``df.loc[...] = ...``, ``df[col].values[...] = ...``)
+    on the returned frame raises ``ValueError``; adding or replacing columns
+    on a shallow copy is still allowed and does not affect the frozen frame.
+    Arrays that are already read-only (e.g. memory-mapped snapshots) are
+    reused without copying.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        DataFrame to freeze.
+
+    Returns
+    -------
+    pd.DataFrame
+        Read-only copy of the input DataFrame.
+    """
+    columns = {}
+    for position in range(df.shape[1]):
+        series = df.iloc[:, position]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            columns[position] = pd.Categorical.from_codes(
+                _read_only(series.cat.codes.to_numpy()), dtype=series.dtype
+            )
+        else:
+            columns[position] = _read_only(series.to_numpy())
+    frozen = pd.DataFrame(columns, index=df.index, copy=False)
+    # Keep the original column labels (type, name, duplicates)
+    frozen.columns = df.columns
+    return frozen
+
+
+class ReferenceRegistry:
+    """
+    Thread-safe cache of reference tables keyed by absolute file path.
+
+    Parameters
+    ----------
+    None
+
+    Notes
+    -----
+    Loading happens while holding the registry lock, so concurrent requests
+    for a cold table parse the file only once.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.RLock()
+
+    def _entry(self, filepath: str, loader, variant) -> tuple:
+        """
+        Returns the up-to-date ``(fingerprint, table, derived)`` entry for a file.
+        """
+        path = os.path.abspath(filepath)
+        key = (path, variant)
+        fingerprint = file_fingerprint(path)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != fingerprint:
+                if entry is not None:
+                    logger.info(f"Reference file changed on disk, reloading: {path}")
+                df = freeze_dataframe(loader(filepath))
+                entry = (fingerprint, df, {})
+                self._entries[key] = entry
+                logger.info(f"Reference table cached: {path} {df.shape}")
+        return entry
+
+    def get(self, filepath: str, loader, variant=None) -> pd.DataFrame:
+        """
+        Returns the cached table for ``filepath``, (re)loading it when needed.
+
+        Parameters
+        ----------
+        filepath : str
+            Path to the reference file.
+        loader : callable
+            Function ``loader(filepath) -> pd.DataFrame`` used on a cache miss.
+        variant : hashable, optional
+            Distinguishes different loaders for the same file (e.g. with and
+            without dtype optimization).
+
+        Returns
+        -------
+        pd.DataFrame
+            Shallow, read-only copy of the cached table.
+        """
+        return self._entry(filepath, loader, variant)[1].copy(deep=False)
+
+    def get_derived(self, filepath: str, loader, name: str, builder, variant=None):
+        """
+        Returns an object derived from a cached table (e.g. a join index),
+        building it once per table version.
+
+        Parameters
+        ----------
+        filepath : str
+            Path to the reference file.
+        loader : callable
+            Function ``loader(filepath) -> pd.DataFrame`` used on a cache miss.
+        name : hashable
+            Identifies the derived object among those of the same table.
+        builder : callable
+            Function ``builder(df)`` computing the object from the cached table.
+        variant : hashable, optional
+            Table variant, as in `get`.
+
+        Returns
+        -------
+        object
+            The shared derived object; callers must not modify it.
+        """
+        with self._lock:
+            _, df, derived = self._entry(filepath, loader, variant)
+            if name not in derived:
+                derived[name] = builder(df)
+            return derived[name]
+
+    def clear(self) -> None:
+        """
+        Drops every cached table.
+        """
+        with self._lock:
+            self._entries.clear()
+
+
+# Process-wide registry instance
+_registry = ReferenceRegistry()
+
+
+def get_reference_table(filepath: str, loader, variant=None) -> pd.DataFrame:
+    """
+    Returns a reference table from the process-wide registry.
+
+    Parameters
+    ----------
+    filepath : str
+        Path to the reference file.
+    loader : callable
+        Function ``loader(filepath) -> pd.DataFrame`` used on a cache miss.
+    variant : hashable, optional
+        Distinguishes different loaders for the same file.
+
+    Returns
+    -------
+    pd.DataFrame
+        Shallow, read-only copy of the cached table.
+    """
+    return _registry.get(filepath, loader, variant)
+
+
+def get_reference_derived(filepath: str, loader, name: str, builder, variant=None):
+    """
+    Returns an object derived from a reference table in the process-wide
+    registry, rebuilt only when the table is reloaded.
+
+    Parameters
+    ----------
+    filepath : str
+        Path to the reference file.
+    loader : callable
+        Function ``loader(filepath) -> pd.DataFrame`` used on a cache miss.
+    name : hashable
+        Identifies the derived object.
+    builder : callable
+        Function ``builder(df)`` computing the object from the cached table.
+    variant : hashable, optional
+        Distinguishes different loaders for the same file.
+
+    Returns
+    -------
+    object
+        The shared derived object.
+    """
+    return _registry.get_derived(filepath, loader, name, builder, variant)
+
+
+def clear_reference_cache() -> None:
+    """
+    Drops every table cached in the process-wide registry.
+    """
+    _registry.clear()
@@ -0,0 +1,272 @@
+"""
+reference_snapshots.py
+----------------------
+Binary columnar snapshots of the reference database files.
+
+Parsing the semicolon-separated reference CSVs is the dominant cost of a cold
+start. This module compiles a parsed table once into a directory of NumPy
+``.npy`` files (integer code arrays plus category dictionaries for text
+columns, raw arrays for numeric columns) that are loaded with memory mapping.
+A snapshot records the fingerprint of its source file and is rebuilt
+automatically when the source changes.
+
+Snapshots are stored next to the source, in ``<source dir>/.snapshots/<file name>/``.
+
+Functions:
+- snapshot_dir_for: Returns the snapshot directory for a source file.
+- build_snapshot: Writes the snapshot of a DataFrame.
+- load_snapshot: Loads a snapshot if it is up to date with its source.
+- load_with_snapshot: Loads a source through its snapshot, (re)building it when needed.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from utils.core.reference_registry import file_fingerprint
+from utils.logger_config import setup_logger
+
+logger = setup_logger(__name__)
+
+SNAPSHOT_DIRNAME = ".snapshots"
+SNAPSHOT_FORMAT_VERSION = 1
+
+
+def snapshot_dir_for(source_path: str) -> str:
+    """
+    Returns the snapshot directory used for a source file.
+
+    Parameters
+    ----------
+    source_path : str
+        Path to the source file.
+
+    Returns
+    -------
+    str
+        Path of the form ``<source dir>/.snapshots/<file name>``.
+    """
+    source_path = os.path.abspath(source_path)
+    return os.path.join(
+        os.path.dirname(source_path), SNAPSHOT_DIRNAME, os.path.basename(source_path)
+    )
+
+
+def _string_categories(categories: pd.Index, col: str) -> np.ndarray:
+    """
+    Returns category labels as a fixed-width unicode array (no pickling needed).
+    """
+    values = categories.to_numpy()
+    if values.dtype != object or not all(isinstance(value, str) for value in values):
+        raise TypeError(f"Column '{col}' has non-string categories and cannot be snapshotted.")
+    return values.astype(str)
+
+
+def build_snapshot(df: pd.DataFrame, source_path: str) -> str:
+    """
+    Writes the snapshot of a parsed source table.
+
+    Text (object) and categorical columns are stored as one 2-D integer code
+    matrix plus a shared pool of category labels; numeric and boolean columns
+    are stored as one 2-D block per dtype. Keeping the number of files small
+    makes loading cost independent of the number of columns.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Table parsed from ``source_path``.
+    source_path : str
+        Path to the source file the table was parsed from.
+
+    Returns
+    -------
+    str
+        Path to the snapshot directory.
+
+    Raises
+    ------
+    TypeError
+        If a column cannot be stored without pickling.
+    """
+    fingerprint = file_fingerprint(source_path)
+    target = snapshot_dir_for(source_path)
+    root = os.path.dirname(target)
+    os.makedirs(root, exist_ok=True)
+
+    columns = []
+    code_columns = []
+    category_pool = []
+    pool_size = 0
+    numeric_blocks = {}
+
+    for col in df.columns:
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype) or series.dtype == object:
+            cat = series.astype("category").cat
+            labels = _string_categories(cat.categories, col)
+            columns.append({
+                "name": col,
+                "kind": "categorical" if isinstance(series.dtype, pd.CategoricalDtype) else "object",
+                "position": len(code_columns),
+                "categories": [pool_size, len(labels)],
+            })
+            code_columns.append(cat.codes.to_numpy().astype(np.int32))
+            category_pool.append(labels)
+            pool_size += len(labels)
+        elif series.dtype.kind in "biuf":
+            block = numeric_blocks.setdefault(series.dtype.str, [])
+            columns.append({
+                "name": col,
+                "kind": "numeric",
+                "block": series.dtype.str,
+                "position": len(block),
+            })
+            block.append(series.to_numpy())
+        else:
+            raise TypeError(f"Column '{col}' with dtype {series.dtype} cannot be snapshotted.")
+
+    tmp_dir = tempfile.mkdtemp(prefix=".tmp-", dir=root)
+    try:
+        codes = np.empty((len(df), len(code_columns)), dtype=np.int32, order="F")
+        for i, values in enumerate(code_columns):
+            codes[:, i] = values
+        np.save(os.path.join(tmp_dir, "codes.npy"), codes)
+        pool = np.concatenate(category_pool) if category_pool else np.array([], dtype=str)
+        np.save(os.path.join(tmp_dir, "categories.npy"), pool)
+
+        blocks = {}
+        for i, (dtype_str, arrays) in enumerate(numeric_blocks.items()):
+            block = np.empty((len(df), len(arrays)), dtype=np.dtype(dtype_str), order="F")
+            for j, values in enumerate(arrays):
+                block[:, j] = values
+            filename = f"numeric_{i}.npy"
+            np.save(os.path.join(tmp_dir, filename), block)
+            blocks[dtype_str] = filename
+
+        meta = {
+            "format_version": SNAPSHOT_FORMAT_VERSION,
+            "source_fingerprint": list(fingerprint),
+            "n_rows": len(df),
+            "columns": columns,
+            "numeric_blocks": blocks,
+        }
+        with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+        shutil.rmtree(target, ignore_errors=True)
+        os.replace(tmp_dir, target)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    logger.info(f"Snapshot written for {source_path}: {target}")
+    return target
+
+
+def load_snapshot(source_path: str, as_categorical: bool = False):
+    """
+    Loads the snapshot of a source file if it exists and is up to date.
+
+    Code matrices and numeric blocks are memory-mapped; only the category
+    labels are read into memory.
+
+    Parameters
+    ----------
+    source_path : str
+        Path to the source file.
+    as_categorical : bool, optional
+        If True, text columns are returned as categoricals (no decoding cost).
+        If False (default), they are decoded back to object columns, matching
+        the dtypes produced by ``pd.read_csv``.
+
+    Returns
+    -------
+    pd.DataFrame or None
+        The snapshotted table, or None if the snapshot is missing or stale.
+    """
+    target = snapshot_dir_for(source_path)
+    meta_path = os.path.join(target, "meta.json")
+    if not os.path.exists(meta_path):
+        return None
+
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        logger.warning(f"Unreadable snapshot metadata, ignoring: {meta_path}")
+        return None
+
+    if (
+        meta.get("format_version") != SNAPSHOT_FORMAT_VERSION
+        or tuple(meta.get("source_fingerprint", ())) != file_fingerprint(source_path)
+    ):
+        logger.info(f"Snapshot is stale for {source_path}")
+        return None
+
+    codes = np.asarray(np.load(os.path.join(target, "codes.npy"), mmap_mode="r"))
+    pool = np.load(os.path.join(target, "categories.npy")).astype(object)
+    blocks = {
+        dtype_str: np.asarray(np.load(os.path.join(target, filename), mmap_mode="r"))
+        for dtype_str, filename in meta["numeric_blocks"].items()
+    }
+
+    data = {}
+    for column in meta["columns"]:
+        if column["kind"] == "numeric":
+            data[column["name"]] = blocks[column["block"]][:, column["position"]]
+            continue
+
+        start, size = column["categories"]
+        dtype = pd.CategoricalDtype(pd.Index(pool[start:start + size], dtype=object))
+        values = pd.Categorical.from_codes(
+            codes[:, column["position"]], dtype=dtype, validate=False
+        )
+        if column["kind"] == "object" and not as_categorical:
+            values = np.asarray(values, dtype=object)
+        data[column["name"]] = values
+
+    return pd.DataFrame(data, index=pd.RangeIndex(meta["n_rows"]), copy=False)
+
+
+def load_with_snapshot(source_path: str, reader, as_categorical: bool = False) -> pd.DataFrame:
+    """
+    Loads a source table through its snapshot, building or rebuilding the
+    snapshot from ``reader`` when it is missing or stale.
+
+    Snapshot write failures (e.g. read-only data directory) are logged and the
+    freshly parsed table is returned.
+
+    Parameters
+    ----------
+    source_path : str
+        Path to the source file.
+    reader : callable
+        Function ``reader(source_path) -> pd.DataFrame`` parsing the source.
+    as_categorical : bool, optional
+        Passed to `load_snapshot`.
+
+    Returns
+    -------
+    pd.DataFrame
+        The loaded table.
+    """
+    df = load_snapshot(source_path, as_categorical=as_categorical)
+    if df is not None:
+        logger.info(f"Loaded snapshot for {source_path}")
+        return df
+
+    df = reader(source_path)
+    try:
+        build_snapshot(df, source_path)
+    except Exception as e:
+        logger.warning(f"Could not write snapshot for {source_path}: {e}")
+
+    if as_categorical:
+        df = df.copy()
+        for col in df.columns[df.dtypes == object]:
+            df[col] = df[col].astype("category")
+    return df
@@ -0,0 +1,223 @@
+"""
+reference_specs.py
+------------------
+Declarative descriptions of the reference databases merged with user input.
+
+A `ReferenceSpec` states everything the generic merge engine in
+`data_processing.py` needs to know about a database: where it lives, how it is
+parsed, which column it is joined on, how its columns are typed, and which
+merge result it is joined onto. The engine loads, caches, indexes and joins any
+registered database, so adding a reference source only takes a new spec.
+
+Functions:
+- register_reference_spec: Adds (or replaces) a spec in the registry.
+- get_reference_spec: Returns a registered spec by name.
+- merge_plan: Orders a set of merges so that dependencies run first.
+"""
+
+import os
+
+from utils.logger_config import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class ReferenceSpec:
+    """
+    Description of a reference database and of how it is merged.
+
+    Parameters
+    ----------
+    name : str
+        Registry key (e.g. 'biorempp').
+    label : str
+        Human-readable name used in log and error messages.
+    path : str
+        Default path of the database file (.csv or .xlsx).
+    key : str
+        Join column shared by the input and the database.
+    categorical_columns : sequence of str
+        Columns converted to categoricals wherever they are present (database,
+        input and merge result). 'ko' and 'cpd' use the shared dictionaries.
+    categorical_prefixes : sequence of str, optional
+        Column name prefixes also converted to categoricals.
+    numeric_prefixes : sequence of str, optional
+        Column name prefixes converted to float32 (non-numeric values become NaN).
+    sep : str, optional
+        Field separator of CSV files. Defaults to ';'.
+    depends_on : str, optional
+        Name of the merge whose result is the input of this one; None when the
+        database is joined directly onto the user input.
+    input_columns : sequence of str, optional
+        Columns required in the input. Defaults to ``[key]``.
+    reduce_input : bool, optional
+        If True, the input is reduced to ``input_columns`` and deduplicated
+        before the join.
+    upstream_columns : sequence of str, optional
+        Columns of the ``depends_on`` result that the merge pipeline
+        (`run_reference_merges`) passes to this merge, as distinct rows.
+        Defaults to the whole result.
+    incidence_columns : sequence of str, optional
+        Entity columns whose key x entity incidence matrix is precompiled
+        when the database is loaded (see `get_reference_incidence`).
+    always_encode_key : bool, optional
+        If True, the join key is encoded with its shared dictionary even when
+        dtype optimization is disabled.
+    optimize_by_default : bool, optional
+        Default of the ``optimize_types`` argument of the merge.
+    """
+
+    def __init__(self, name: str, label: str, path: str, key: str, categorical_columns,
+                 categorical_prefixes=(), numeric_prefixes=(), sep: str = ";",
+                 depends_on: str = None, input_columns=None, reduce_input: bool = False,
+                 always_encode_key: bool = False, optimize_by_default: bool = True,
+                 upstream_columns=None, incidence_columns=()):
+        self.name = name
+        self.label = label
+        self.path = path
+        self.key = key
+        self.categorical_columns = list(categorical_columns)
+        self.categorical_prefixes = tuple(categorical_prefixes)
+        self.numeric_prefixes = tuple(numeric_prefixes)
+        self.sep = sep
+        self.depends_on = depends_on
+        self.input_columns = list(input_columns) if input_columns is not None else [key]
+        self.reduce_input = reduce_input
+        self.always_encode_key = always_encode_key
+        self.optimize_by_default = optimize_by_default
+        self.upstream_columns = list(upstream_columns) if upstream_columns is not None else None
+        self.incidence_columns = list(incidence_columns)
+
+    def __repr__(self) -> str:
+        return f"ReferenceSpec(name={self.name!r}, path={self.path!r}, key={self.key!r})"
+
+
+# Registered databases, in the order they are merged by the application
+REFERENCE_SPECS = {}
+
+
+def register_reference_spec(spec: ReferenceSpec) -> ReferenceSpec:
+    """
+    Adds a spec to the registry, replacing any spec with the same name.
+
+    Parameters
+    ----------
+    spec : ReferenceSpec
+        Spec to register.
+
+    Returns
+    -------
+    ReferenceSpec
+        The registered spec.
+
+    Raises
+    ------
+    ValueError
+        If the spec depends on a database that is not registered.
+    """
+    if spec.depends_on is not None and spec.depends_on not in REFERENCE_SPECS:
+        raise ValueError(
+            f"Reference '{spec.name}' depends on unknown reference '{spec.depends_on}'."
+        )
+    REFERENCE_SPECS[spec.name] = spec
+    logger.debug(f"Reference spec registered: {spec}")
+    return spec
+
+
+def get_reference_spec(name: str) -> ReferenceSpec:
+    """
+    Returns the registered spec called ``name``.
+
+    Raises
+    ------
+    KeyError
+        If no spec is registered under ``name``.
+    """
+    try:
+        return REFERENCE_SPECS[name]
+    except KeyError:
+        raise KeyError(f"Unknown reference database: '{name}'.") from None
+
+
+def merge_plan(names=None) -> list:
+    """
+    Returns the merges needed to produce ``names``, dependencies first.
+
+    Parameters
+    ----------
+    names : iterable of str, optional
+        Requested merges. Defaults to every registered database.
+
+    Returns
+    -------
+    list of ReferenceSpec
+        Specs in an order where each one comes after its dependency.
+    """
+    if names is None:
+        names = list(REFERENCE_SPECS)
+
+    ordered = []
+    seen = set()
+
+    def visit(name):
+        if name in seen:
+            return
+        spec = get_reference_spec(name)
+        if spec.depends_on is not None:
+            visit(spec.depends_on)
+        seen.add(name)
+        ordered.append(spec)
+
+    for name in names:
+        visit(name)
+    return ordered
+
+
+register_reference_spec(ReferenceSpec(
+    name="biorempp",
+    label="BioRemPP",
+    path=os.path.join("data", "database.csv"),
+    key="ko",
+    categorical_columns=[
+        'ko', 'genesymbol', 'genename', 'cpd', 'compoundclass',
+        'referenceAG', 'compoundname', 'enzyme_activity', 'sample'
+    ],
+    incidence_columns=['compoundname', 'compoundclass', 'genesymbol', 'referenceAG', 'enzyme_activity'],
+))
+
+register_reference_spec(ReferenceSpec(
+    name="kegg",
+    label="KEGG",
+    path=os.path.join("data", "kegg_degradation_pathways.csv"),
+    key="ko",
+    categorical_columns=['ko', 'pathname', 'genesymbol', 'sample'],
+    depends_on="biorempp",
+    # Pathways are joined on the distinct sample/KO pairs, not on every
+    # compound row of the BioRemPP result; KEGG analyses count distinct KOs
+    upstream_columns=['sample', 'ko'],
+    incidence_columns=['pathname'],
+))
+
+register_reference_spec(ReferenceSpec(
+    name="hadeg",
+    label="HADEG",
+    path=os.path.join("data", "database_hadegDB.csv"),
+    key="ko",
+    categorical_columns=['Gene', 'ko', 'Pathway', 'compound_pathway', 'sample'],
+    incidence_columns=['Pathway'],
+))
+
+register_reference_spec(ReferenceSpec(
+    name="toxcsm",
+    label="ToxCSM",
+    path=os.path.join("data", "database_toxcsm.csv"),
+    key="cpd",
+    categorical_columns=['SMILES', 'cpd', 'ChEBI', 'compoundname', 'sample'],
+    categorical_prefixes=['label_'],
+    numeric_prefixes=['value_'],
+    depends_on="biorempp",
+    input_columns=['sample', 'compoundclass', 'cpd', 'ko'],
+    reduce_input=True,
+    always_encode_key=True,
+    optimize_by_default=False,
+))
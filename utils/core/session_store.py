@@ -0,0 +1,355 @@
+"""
+session_store.py
+----------------
+Server-side storage for the merged tables of a user session.
+
+Instead of serializing full tables into ``dcc.Store`` components (which the
+browser posts back with every callback that reads them), the merge callback
+stores each table here and puts a small handle in the ``dcc.Store``:
+
+    {"format": "session-store", "session": <token>, "key": "biorempp",
+     "hash": <content hash>, "rows": 31260, "columns": [...]}
+
+Tables are kept in memory up to a byte limit with least-recently-used
+eviction. Every table is also written to a spill directory on disk, so evicted
+tables, and tables created by another worker process of the same server, are
+reloaded transparently. Spilled files beyond the disk limit are removed
+oldest first.
+
+Limits and the spill directory can be set with the environment variables
+``BIOREMPP_SESSION_MEMORY_MB``, ``BIOREMPP_SESSION_DISK_MB`` and
+``BIOREMPP_SESSION_DIR``.
+
+Functions:
+- content_hash: Returns a stable hash of a DataFrame's content.
+- new_session_token: Returns a new random session token.
+- is_store_handle: Tells whether a store payload is a session-store handle.
+- store_dataframe: Stores a table and returns its handle.
+- load_dataframe: Returns the table referenced by a handle.
+- verify_handle: Returns the server-side identity of the table of a handle.
+- discard_session: Removes every table of a session.
+"""
+
+import hashlib
+import os
+import secrets
+import tempfile
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from utils.core.reference_registry import freeze_dataframe
+from utils.logger_config import setup_logger
+
+logger = setup_logger(__name__)
+
+HANDLE_FORMAT = "session-store"
+DEFAULT_MEMORY_LIMIT_BYTES = int(os.environ.get("BIOREMPP_SESSION_MEMORY_MB", 256)) * 1024 ** 2
+DEFAULT_DISK_LIMIT_BYTES = int(os.environ.get("BIOREMPP_SESSION_DISK_MB", 2048)) * 1024 ** 2
+DEFAULT_SPILL_DIR = os.environ.get(
+    "BIOREMPP_SESSION_DIR", os.path.join(tempfile.gettempdir(), "biorempp_session_store")
+)
+
+
+def content_hash(df: pd.DataFrame) -> str:
+    """
+    Returns a stable hash of a DataFrame's content (columns, dtypes and values).
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Table to hash.
+
+    Returns
+    -------
+    str
+        Hexadecimal SHA-1 digest.
+    """
+    digest = hashlib.sha1()
+    digest.update(repr(list(df.columns)).encode("utf-8"))
+    digest.update(repr([str(dtype) for dtype in df.dtypes]).encode("utf-8"))
+    if len(df.columns):
+        digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def new_session_token() -> str:
+    """
+    Returns a new random, URL-safe session token.
+    """
+    return secrets.token_hex(16)
+
+
+def is_store_handle(payload) -> bool:
+    """
+    Returns True if ``payload`` is a handle created by `store_dataframe`.
+    """
+    return isinstance(payload, dict) and payload.get("format") == HANDLE_FORMAT
+
+
+class SessionStore:
+    """
+    Memory-bounded LRU store of session tables, written through to disk.
+
+    Parameters
+    ----------
+    memory_limit : int
+        Maximum number of bytes of tables kept in memory.
+    spill_dir : str
+        Directory holding the on-disk copy of every table.
+    disk_limit : int
+        Maximum number of bytes kept in ``spill_dir``.
+    """
+
+    def __init__(self, memory_limit: int = DEFAULT_MEMORY_LIMIT_BYTES,
+                 spill_dir: str = DEFAULT_SPILL_DIR,
+                 disk_limit: int = DEFAULT_DISK_LIMIT_BYTES):
+        self.memory_limit = memory_limit
+        self.spill_dir = spill_dir
+        self.disk_limit = disk_limit
+        self._entries = OrderedDict()
+        self._memory_used = 0
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _check_name(value: str, what: str) -> str:
+        """
+        Validates a session token or key used to build file names.
+        """
+        if not isinstance(value, str) or not value or not value.replace("-", "").replace("_", "").isalnum():
+            raise ValueError(f"Invalid session store {what}: {value!r}")
+        return value
+
+    def _path(self, session: str, key: str, digest: str) -> str:
+        """
+        Returns the spill file of a table.
+        """
+        return os.path.join(self.spill_dir, f"{session}-{key}-{digest}.pkl")
+
+    def _remember(self, entry_key: tuple, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Adds a table to the in-memory LRU, evicting the oldest tables if needed.
+        Returns the read-only copy that is kept.
+        """
+        # Measured before freezing: pandas cannot inspect read-only object arrays
+        nbytes = int(df.memory_usage(index=True, deep=True).sum())
+        df = freeze_dataframe(df)
+        previous = self._entries.pop(entry_key, None)
+        if previous is not None:
+            self._memory_used -= previous[1]
+        self._entries[entry_key] = (df, nbytes)
+        self._memory_used += nbytes
+
+        while self._memory_used > self.memory_limit and len(self._entries) > 1:
+            evicted_key, (_, evicted_bytes) = self._entries.popitem(last=False)
+            self._memory_used -= evicted_bytes
+            logger.info(f"Session table evicted from memory: {evicted_key[1]} ({evicted_bytes} bytes)")
+        return df
+
+    def _prune_disk(self) -> None:
+        """
+        Removes the oldest spill files while the directory exceeds the disk limit.
+        """
+        try:
+            files = [
+                entry for entry in os.scandir(self.spill_dir)
+                if entry.is_file() and entry.name.endswith(".pkl")
+            ]
+        except FileNotFoundError:
+            return
+        stats = sorted(((entry.stat(), entry.path) for entry in files), key=lambda item: item[0].st_mtime)
+        total = sum(stat.st_size for stat, _ in stats)
+        for stat, path in stats:
+            if total <= self.disk_limit:
+                break
+            try:
+                os.remove(path)
+                total -= stat.st_size
+            except OSError:
+                pass
+
+    def put(self, session: str, key: str, df: pd.DataFrame) -> dict:
+        """
+        Stores a table and returns its handle.
+
+        Parameters
+        ----------
+        session : str
+            Session token (see `new_session_token`).
+        key : str
+            Name of the table inside the session (e.g. 'biorempp').
+        df : pd.DataFrame
+            Table to store.
+
+        Returns
+        -------
+        dict
+            JSON-serializable handle for a ``dcc.Store``.
+        """
+        self._check_name(session, "session")
+        self._check_name(key, "key")
+        digest = content_hash(df)
+
+        os.makedirs(self.spill_dir, exist_ok=True)
+        path = self._path(session, key, digest)
+        tmp_path = f"{path}.{secrets.token_hex(4)}.tmp"
+        df.to_pickle(tmp_path)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._remember((session, key, digest), df.copy())
+            self._prune_disk()
+
+        logger.info(f"Session table stored: {key} {df.shape}")
+        return {
+            "format": HANDLE_FORMAT,
+            "session": session,
+            "key": key,
+            "hash": digest,
+            "rows": int(len(df)),
+            "columns": [str(col) for col in df.columns],
+        }
+
+    def verify(self, handle: dict) -> tuple:
+        """
+        Returns the ``(session, key, hash)`` of the table referenced by a
+        handle, after checking that the store holds that table.
+
+        Handles travel through the browser, so their ``hash`` is only trusted
+        once the store has a table of that session and key with that hash.
+
+        Raises
+        ------
+        KeyError
+            If the store holds no such table.
+        """
+        session = self._check_name(handle["session"], "session")
+        key = self._check_name(handle["key"], "key")
+        digest = self._check_name(handle["hash"], "hash")
+        entry_key = (session, key, digest)
+
+        with self._lock:
+            if entry_key in self._entries or os.path.exists(self._path(session, key, digest)):
+                return entry_key
+        raise KeyError(f"Session table '{key}' is no longer available.")
+
+    def get(self, handle: dict) -> pd.DataFrame:
+        """
+        Returns the table referenced by a handle.
+
+        Parameters
+        ----------
+        handle : dict
+            Handle returned by `put`.
+
+        Returns
+        -------
+        pd.DataFrame
+            Shallow, read-only copy of the stored table.
+
+        Raises
+        ------
+        KeyError
+            If the table is no longer available (e.g. pruned from disk).
+        """
+        session = self._check_name(handle["session"], "session")
+        key = self._check_name(handle["key"], "key")
+        digest = self._check_name(handle["hash"], "hash")
+        entry_key = (session, key, digest)
+
+        with self._lock:
+            entry = self._entries.get(entry_key)
+            if entry is not None:
+                self._entries.move_to_end(entry_key)
+                return entry[0].copy(deep=False)
+
+            path = self._path(session, key, digest)
+            if not os.path.exists(path):
+                raise KeyError(f"Session table '{key}' is no longer available.")
+            df = self._remember(entry_key, pd.read_pickle(path))
+            logger.info(f"Session table reloaded from disk: {key} {df.shape}")
+            return df.copy(deep=False)
+
+    def discard_session(self, session: str) -> None:
+        """
+        Removes every table of a session from memory and disk.
+        """
+        self._check_name(session, "session")
+        with self._lock:
+            for entry_key in [k for k in self._entries if k[0] == session]:
+                self._memory_used -= self._entries.pop(entry_key)[1]
+            try:
+                names = os.listdir(self.spill_dir)
+            except FileNotFoundError:
+                names = []
+            for name in names:
+                if name.startswith(f"{session}-"):
+                    try:
+                        os.remove(os.path.join(self.spill_dir, name))
+                    except OSError:
+                        pass
+
+    @property
+    def memory_used(self) -> int:
+        """
+        Number of bytes of tables currently held in memory.
+        """
+        return self._memory_used
+
+
+# Process-wide store instance
+_store = SessionStore()
+
+
+def store_dataframe(df: pd.DataFrame, session: str, key: str) -> dict:
+    """
+    Stores a table in the process-wide session store.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Table to store.
+    session : str
+        Session token.
+    key : str
+        Name of the table inside the session.
+
+    Returns
+    -------
+    dict
+        Handle to put in a ``dcc.Store``.
+    """
+    return _store.put(session, key, df)
+
+
+def load_dataframe(handle: dict) -> pd.DataFrame:
+    """
+    Returns the table referenced by a handle from the process-wide store.
+
+    Raises
+    ------
+    KeyError
+        If the table is no longer available.
+    """
+    return _store.get(handle)
+
+
+def verify_handle(handle: dict) -> tuple:
+    """
+    Returns the ``(session, key, hash)`` of the table referenced by a handle,
+    checked against the process-wide store.
+
+    Raises
+    ------
+    KeyError
+        If the store holds no such table.
+    """
+    return _store.verify(handle)
+
+
+def discard_session(session: str) -> None:
+    """
+    Removes every table of a session from the process-wide store.
+    """
+    _store.discard_session(session)
@@ -0,0 +1,467 @@
+"""
+store_codec.py
+--------------
+Single entry point used by callbacks to turn the content of a ``dcc.Store``
+into a DataFrame.
+
+Merged tables are kept server-side (see `utils.core.session_store`) and the
+stores only hold a handle; uploaded input is still stored as a list of
+records. Callbacks and processing functions call `decode_store_data` instead of
+``pd.DataFrame(store_data)`` so they work with every payload form.
+
+When a table has to travel through the ``dcc.Store`` itself (inline backend,
+or the session store cannot write its spill directory), it is sent in a
+compact columnar format instead of records:
+
+    {"format": "columnar", "hash": <content hash>, "rows": 31260,
+     "packed": true, "columns": [
+        {"name": "ko", "kind": "dictionary", "categorical": true,
+         "categories": ["K00001", ...], "dtype": "<i2", "codes": <base64>},
+        {"name": "value", "kind": "values", "dtype": "<f8", "values": <base64>},
+        ...]}
+
+Text columns are dictionary-encoded (each distinct string is sent once,
+rows carry the smallest integer code type) and numeric columns are sent as
+raw arrays. Arrays are base64-packed little-endian bytes, or plain JSON lists
+when ``pack=False``.
+
+A single store update triggers many callbacks that all read the same table.
+Tables referenced by a handle are therefore decoded once per table into a
+typed frame (text columns as categoricals) and kept in a bounded LRU cache
+shared by every callback of the worker process. Callbacks receive shallow,
+read-only copies of the cached frame.
+
+Store payloads come back from the browser, which can edit them, so the
+``hash`` they carry is never used as a cache key on its own (see
+`store_cache_key`): handles are keyed on their session table once the session
+store confirms it holds a table with that hash, and compact payloads on a
+digest of their content computed on the server.
+
+The cache size can be set with the environment variable
+``BIOREMPP_DECODE_CACHE_SIZE`` (number of tables) and the backend used by
+`encode_store_data` with ``BIOREMPP_STORE_BACKEND`` ('session' or 'inline').
+
+Functions:
+- to_typed_frame: Converts low-cardinality text columns to categoricals.
+- to_shared_frame: Returns the read-only typed frame shared by callbacks.
+- encode_compact: Encodes a DataFrame in the compact columnar format.
+- decode_compact: Decodes a compact columnar payload.
+- encode_store_data: Returns the ``dcc.Store`` payload for a table.
+- store_cache_key: Returns a cache key of a payload's table that the client cannot forge.
+- decode_store_data: Returns the DataFrame held by a store payload.
+- clear_decode_cache: Empties the decoded-table cache.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from utils.core.reference_registry import freeze_dataframe
+from utils.core.session_store import content_hash, is_store_handle, load_dataframe, store_dataframe, verify_handle
+from utils.logger_config import setup_logger
+
+logger = setup_logger(__name__)
+
+DECODE_CACHE_SIZE = int(os.environ.get("BIOREMPP_DECODE_CACHE_SIZE", 32))
+STORE_BACKEND = os.environ.get("BIOREMPP_STORE_BACKEND", "session")
+MAX_CATEGORY_RATIO = 0.5
+COMPACT_FORMAT = "columnar"
+
+
+def _sorted_categorical(series: pd.Series) -> pd.Series:
+    """
+    Returns a categorical version of ``series`` whose categories are only the
+    observed values, in sorted order (so sorting matches the text values).
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.cat.remove_unused_categories()
+    else:
+        series = series.astype("category")
+    try:
+        categories = series.cat.categories.sort_values()
+    except TypeError:
+        # Mixed, unorderable values: keep the order of appearance
+        return series
+    return series.cat.reorder_categories(categories)
+
+
+def to_typed_frame(df: pd.DataFrame, max_ratio: float = MAX_CATEGORY_RATIO) -> pd.DataFrame:
+    """
+    Converts the low-cardinality text columns of a DataFrame to categoricals.
+
+    Object columns with at most ``max_ratio * len(df)`` distinct values and
+    existing categorical columns get sorted categories limited to the observed
+    values. Numeric and high-cardinality columns are left unchanged.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Table to convert.
+    max_ratio : float, optional
+        Maximum ratio of distinct values to rows for a text column to become
+        categorical.
+
+    Returns
+    -------
+    pd.DataFrame
+        Typed table (the input is not modified).
+    """
+    limit = max_ratio * len(df)
+    columns = {}
+    for col in df.columns:
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            columns[col] = _sorted_categorical(series)
+        elif series.dtype == object and series.nunique(dropna=True) <= limit:
+            columns[col] = _sorted_categorical(series)
+    return df.assign(**columns) if columns else df
+
+
+def to_shared_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns a read-only, typed copy of a table that can be shared by callbacks.
+
+    Every text column is dictionary-encoded, not only the low-cardinality
+    ones: pandas cannot compare a read-only object array with a scalar
+    (``df[col] == value`` raises ``ValueError``), while categorical codes can.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Table to share.
+
+    Returns
+    -------
+    pd.DataFrame
+        Frozen typed table (see `freeze_dataframe`).
+    """
+    return freeze_dataframe(to_typed_frame(df, max_ratio=1.0))
+
+
+def _code_dtype(n_values: int) -> np.dtype:
+    """
+    Returns the smallest signed integer type holding codes -1..n_values-1.
+    """
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_values <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def _pack_array(values: np.ndarray, pack: bool):
+    """
+    Returns a little-endian array as base64 text, or as a JSON-safe list.
+    """
+    values = values.astype(values.dtype.newbyteorder("<"), copy=False)
+    if pack:
+        return base64.b64encode(np.ascontiguousarray(values).tobytes()).decode("ascii")
+    if values.dtype.kind == "f":
+        # NaN is not valid JSON
+        return [None if np.isnan(value) else value for value in values.tolist()]
+    return values.tolist()
+
+
+def _unpack_array(data, dtype: str) -> np.ndarray:
+    """
+    Inverse of `_pack_array`.
+    """
+    if isinstance(data, str):
+        return np.frombuffer(base64.b64decode(data), dtype=np.dtype(dtype)).copy()
+    if np.dtype(dtype).kind == "f":
+        return np.array([np.nan if value is None else value for value in data], dtype=dtype)
+    return np.asarray(data, dtype=dtype)
+
+
+def is_compact_payload(payload) -> bool:
+    """
+    Returns True if ``payload`` was created by `encode_compact`.
+    """
+    return isinstance(payload, dict) and payload.get("format") == COMPACT_FORMAT
+
+
+def encode_compact(df: pd.DataFrame, pack: bool = True) -> dict:
+    """
+    Encodes a DataFrame in the compact columnar format.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Table to encode.
+    pack : bool, optional
+        Whether arrays are base64-packed (default) or plain JSON lists.
+
+    Returns
+    -------
+    dict
+        JSON-serializable payload for a ``dcc.Store``.
+    """
+    typed = to_typed_frame(df)
+    columns = []
+    for col in typed.columns:
+        series = typed[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            categorical = True
+            codes = series.cat.codes.to_numpy()
+            categories = series.cat.categories
+        elif series.dtype == object or not isinstance(series.dtype, np.dtype):
+            categorical = False
+            try:
+                codes, categories = pd.factorize(series, sort=True)
+            except TypeError:
+                codes, categories = pd.factorize(series)
+        else:
+            columns.append({
+                "name": col,
+                "kind": "values",
+                "dtype": series.dtype.newbyteorder("<").str,
+                "values": _pack_array(series.to_numpy(), pack),
+            })
+            continue
+        code_dtype = _code_dtype(len(categories))
+        columns.append({
+            "name": col,
+            "kind": "dictionary",
+            "categorical": categorical,
+            "categories": categories.tolist(),
+            "dtype": code_dtype.newbyteorder("<").str,
+            "codes": _pack_array(codes.astype(code_dtype), pack),
+        })
+
+    return {
+        "format": COMPACT_FORMAT,
+        "hash": content_hash(df),
+        "rows": int(len(df)),
+        "packed": pack,
+        "columns": columns,
+    }
+
+
+def decode_compact(payload: dict) -> pd.DataFrame:
+    """
+    Decodes a payload created by `encode_compact`.
+
+    Parameters
+    ----------
+    payload : dict
+        Compact columnar payload.
+
+    Returns
+    -------
+    pd.DataFrame
+        Typed table: dictionary-encoded columns flagged as categorical are
+        returned as categoricals, the others as object columns.
+    """
+    data = {}
+    for column in payload["columns"]:
+        if column["kind"] == "dictionary":
+            codes = _unpack_array(column["codes"], column["dtype"])
+            categories = pd.Index(column["categories"])
+            values = pd.Categorical.from_codes(codes, categories=categories)
+            if not column["categorical"]:
+                values = np.asarray(values, dtype=object)
+        else:
+            values = _unpack_array(column["values"], column["dtype"])
+        data[column["name"]] = values
+    return pd.DataFrame(data, index=pd.RangeIndex(payload["rows"]), copy=False)
+
+
+class DecodeCache:
+    """
+    Bounded LRU cache of decoded tables (or objects derived from them),
+    keyed by `store_cache_key`.
+
+    Parameters
+    ----------
+    max_entries : int
+        Maximum number of tables kept.
+    """
+
+    def __init__(self, max_entries: int = DECODE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        """
+        Returns the cached table for ``key``, or None.
+        """
+        with self._lock:
+            df = self._entries.get(key)
+            if df is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return df
+
+    def put(self, key: str, df: pd.DataFrame) -> None:
+        """
+        Caches a table, evicting the least recently used ones beyond the limit.
+        """
+        with self._lock:
+            self._entries[key] = df
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """
+        Removes every cached table.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Process-wide cache shared by every callback
+_decode_cache = DecodeCache()
+
+
+def _payload_digest(payload: dict) -> str:
+    """
+    Returns a SHA-1 digest of the rows and columns of a compact payload.
+    """
+    content = json.dumps([payload["rows"], payload["columns"]], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+def store_cache_key(payload) -> tuple:
+    """
+    Returns a cache key for the table of a store payload that the client
+    cannot forge.
+
+    Parameters
+    ----------
+    payload : dict, list of dict or pd.DataFrame
+        Store payload of a table (see `decode_store_data`).
+
+    Returns
+    -------
+    tuple
+        ``(key, df)``. ``key`` is ``("handle", session, key, hash)`` for a
+        handle whose table the session store holds, ``("columnar", digest)``
+        for a compact payload (digest computed from its content) and
+        ``("content", hash)`` for other payloads. ``df`` is the shared
+        decoded table when computing the key required decoding it (other
+        payloads), None otherwise.
+
+    Raises
+    ------
+    KeyError
+        If a handle refers to a table that the session store does not hold.
+    """
+    if is_store_handle(payload):
+        return ("handle",) + verify_handle(payload), None
+    if is_compact_payload(payload):
+        return (COMPACT_FORMAT, _payload_digest(payload)), None
+    df = to_shared_frame(decode_store_data(payload))
+    return ("content", content_hash(df)), df
+
+
+def _decode_cached(key: tuple, decoder, payload) -> pd.DataFrame:
+    """
+    Returns the typed, read-only table of a payload, decoding it at most once
+    per cache key.
+    """
+    df = _decode_cache.get(key)
+    if df is None:
+        df = to_shared_frame(decoder(payload))
+        _decode_cache.put(key, df)
+        logger.info(f"Decoded store table {key[0]} {df.shape}")
+    return df
+
+
+def encode_store_data(df: pd.DataFrame, session: str, key: str, backend: str = None) -> dict:
+    """
+    Returns the ``dcc.Store`` payload for a table.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Table to send to the consumers.
+    session : str
+        Session token used by the session store.
+    key : str
+        Name of the table inside the session (e.g. 'biorempp').
+    backend : str, optional
+        'session' (handle to the server-side session store) or 'inline'
+        (compact columnar payload). Defaults to ``STORE_BACKEND``.
+
+    Returns
+    -------
+    dict
+        Session-store handle, or compact payload for the inline backend and
+        when the session store cannot write to disk.
+
+    Raises
+    ------
+    ValueError
+        If the backend is unknown.
+    """
+    backend = backend or STORE_BACKEND
+    if backend not in ("session", "inline"):
+        raise ValueError(f"Unknown store backend: {backend}")
+    if backend == "session":
+        try:
+            return store_dataframe(df, session, key)
+        except OSError as e:
+            logger.warning(f"Session store unavailable ({e}); sending {key} inline.")
+    return encode_compact(df)
+
+
+def decode_store_data(payload) -> pd.DataFrame:
+    """
+    Returns the DataFrame held by a ``dcc.Store`` payload.
+
+    Parameters
+    ----------
+    payload : dict, list of dict, pd.DataFrame or None
+        A session-store handle, a compact columnar payload, a list of
+        records, a DataFrame (returned unchanged) or an empty value.
+
+    Returns
+    -------
+    pd.DataFrame
+        Typed table. Handles and compact payloads are decoded once per
+        table (see `store_cache_key`) into a shared frame whose text columns are all
+        categoricals (see `to_shared_frame`): the returned shallow copy
+        accepts new or replaced columns, but in-place writes to existing
+        columns raise ``ValueError``. Lists of records give a private frame
+        whose low-cardinality text columns are categoricals. Empty payloads
+        give an empty DataFrame.
+
+    Raises
+    ------
+    KeyError
+        If a handle refers to a table that is no longer available.
+    """
+    if isinstance(payload, pd.DataFrame):
+        return payload
+    if payload is None or (isinstance(payload, (list, tuple)) and not payload):
+        return pd.DataFrame()
+    if is_store_handle(payload):
+        key, _ = store_cache_key(payload)
+        return _decode_cached(key, load_dataframe, payload).copy(deep=False)
+    if is_compact_payload(payload):
+        key, _ = store_cache_key(payload)
+        return _decode_cached(key, decode_compact, payload).copy(deep=False)
+    return to_typed_frame(pd.DataFrame(payload))
+
+
+def clear_decode_cache() -> None:
+    """
+    Empties the process-wide decoded-table cache.
+    """
+    _decode_cache.clear()
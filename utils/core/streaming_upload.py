@@ -0,0 +1,521 @@
+"""
+streaming_upload.py
+-------------------
+Chunked, resumable uploads of large input files, outside of the Dash callbacks.
+
+``dcc.Upload`` sends the whole file as one base64 string through the callback
+JSON, which limits uploads to `MAX_UPLOAD_SIZE_MB`. The routes added to the
+Flask server by `register_streaming_upload` accept the file in pieces instead:
+
+    POST /upload/stream                        {"filename": "bins.txt.gz"}
+         -> {"upload_id": ..., "chunk_size": ...}
+    GET  /upload/stream/<upload_id>            -> {"received": <bytes>}
+    PUT  /upload/stream/<upload_id>            next piece of the file, with
+         the header ``Upload-Offset: <bytes received>``
+    POST /upload/stream/<upload_id>/complete   -> {"handle": ..., "warnings": [...]}
+
+Pieces are streamed to a temporary file. A piece sent at another offset than
+the bytes received so far is rejected with 409 and the current offset, so an
+interrupted upload resumes where it stopped (``GET`` gives the offset too).
+On completion the file is read back (and decompressed, for .gz, .bz2, .xz
+and .zip files, see `compressed_input`) in blocks through a `ContentParser`:
+the content is never held as one string and memory stays bounded by the block
+size and the parsed table. The table is put in the session store and its
+handle replaces the uploaded records in the 'stored-data' store (the page is
+opened with ``?upload=<upload_id>``), so the Submit flow uses it unchanged.
+
+Temporary files live in ``BIOREMPP_UPLOAD_DIR`` (default: a directory in the
+system temp dir), shared by the worker processes of the server. Disk use is
+bounded by:
+- the maximum file size, ``BIOREMPP_STREAM_UPLOAD_MB`` (default 1024);
+- the maximum number of uploads in progress, ``BIOREMPP_STREAM_UPLOADS``
+  (default 8) and their total size, ``BIOREMPP_STREAM_UPLOAD_DISK_MB``
+  (default 4096);
+- the removal of uploads without activity for
+  ``BIOREMPP_STREAM_UPLOAD_TTL_MIN`` minutes (default 60), checked whenever an
+  upload starts. The metadata of a completed upload is removed once the page
+  has loaded its handle.
+
+Functions:
+- StreamingUploads: Temporary files and parsing of chunked uploads.
+- register_streaming_upload: Adds the upload routes to a Flask server.
+- get_upload_handle: Returns (once) the session-store handle of a completed upload.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+import weakref
+
+from flask import jsonify, request
+
+from utils.core.annotation_readers import annotation_sample_name
+from utils.core.columnar_input import columnar_format, read_columnar_file
+from utils.core.compressed_input import UNSUPPORTED_FILE_MESSAGE, input_compression, is_supported_input, parse_input_file
+from utils.core.data_validator import ParsedContent
+from utils.core.session_store import new_session_token, store_dataframe
+from utils.logger_config import setup_logger
+
+logger = setup_logger(__name__)
+
+DEFAULT_UPLOAD_DIR = os.environ.get(
+    "BIOREMPP_UPLOAD_DIR", os.path.join(tempfile.gettempdir(), "biorempp_uploads")
+)
+DEFAULT_MAX_UPLOAD_BYTES = int(os.environ.get("BIOREMPP_STREAM_UPLOAD_MB", 1024)) * 1024 ** 2
+DEFAULT_MAX_OPEN_UPLOADS = int(os.environ.get("BIOREMPP_STREAM_UPLOADS", 8))
+DEFAULT_MAX_TOTAL_BYTES = int(os.environ.get("BIOREMPP_STREAM_UPLOAD_DISK_MB", 4096)) * 1024 ** 2
+DEFAULT_UPLOAD_TTL_SECONDS = int(os.environ.get("BIOREMPP_STREAM_UPLOAD_TTL_MIN", 60)) * 60
+
+# Piece size suggested to clients and size of the reads from requests and files
+UPLOAD_CHUNK_BYTES = 4 * 1024 ** 2
+_READ_BYTES = 1024 ** 2
+
+ROUTE_PREFIX = "/upload/stream"
+
+
+class StreamingUploads:
+    """
+    Temporary files of chunked uploads and their parsing.
+
+    Every upload has a ``<upload_id>.part`` file holding the bytes received so
+    far, a ``<upload_id>.json`` file with its metadata and, once completed, the
+    handle of the parsed table in the metadata. State is only kept on disk, so
+    the pieces of one upload can reach different worker processes.
+
+    Parameters
+    ----------
+    upload_dir : str
+        Directory of the temporary files.
+    max_bytes : int
+        Maximum size of an uploaded file.
+    max_uploads : int
+        Maximum number of uploads in progress (not completed).
+    max_total_bytes : int
+        Maximum total size of the uploads in progress.
+    ttl : float
+        Seconds without activity after which an upload is removed.
+    """
+
+    def __init__(self, upload_dir: str = DEFAULT_UPLOAD_DIR, max_bytes: int = DEFAULT_MAX_UPLOAD_BYTES,
+                 max_uploads: int = DEFAULT_MAX_OPEN_UPLOADS, max_total_bytes: int = DEFAULT_MAX_TOTAL_BYTES,
+                 ttl: float = DEFAULT_UPLOAD_TTL_SECONDS):
+        self.upload_dir = upload_dir
+        self.max_bytes = max_bytes
+        self.max_uploads = max_uploads
+        self.max_total_bytes = max_total_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # One lock per upload being appended to or completed, dropped once unused
+        self._upload_locks = weakref.WeakValueDictionary()
+        # Bytes that pieces being copied may still add, per upload
+        self._reserved = {}
+
+    def _path(self, upload_id: str, suffix: str) -> str:
+        """
+        Returns a file of an upload, rejecting identifiers that are not tokens.
+        """
+        if not isinstance(upload_id, str) or not upload_id.isalnum():
+            raise KeyError(f"Unknown upload: {upload_id!r}")
+        return os.path.join(self.upload_dir, f"{upload_id}{suffix}")
+
+    def _read_meta(self, upload_id: str) -> dict:
+        """
+        Returns the metadata of an upload.
+
+        Raises
+        ------
+        KeyError
+            If the upload does not exist.
+        """
+        try:
+            with open(self._path(upload_id, ".json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise KeyError(f"Unknown upload: {upload_id!r}") from None
+
+    def _write_meta(self, upload_id: str, meta: dict) -> None:
+        """
+        Replaces the metadata of an upload.
+        """
+        path = self._path(upload_id, ".json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, path)
+
+    def _upload_lock(self, upload_id: str) -> threading.Lock:
+        """
+        Returns the lock serializing the pieces and the completion of an upload.
+        """
+        with self._lock:
+            lock = self._upload_locks.get(upload_id)
+            if lock is None:
+                lock = self._upload_locks[upload_id] = threading.Lock()
+            return lock
+
+    def _files(self) -> dict:
+        """
+        Returns the temporary files grouped by upload: upload_id -> list of
+        ``os.DirEntry``.
+        """
+        try:
+            entries = [entry for entry in os.scandir(self.upload_dir) if entry.is_file()]
+        except FileNotFoundError:
+            return {}
+        files = {}
+        for entry in entries:
+            files.setdefault(entry.name.split(".", 1)[0], []).append(entry)
+        return files
+
+    def _sweep(self) -> dict:
+        """
+        Removes the uploads without activity for ``ttl`` seconds (abandoned
+        pieces and completed uploads never loaded).
+
+        Returns
+        -------
+        dict
+            upload_id -> size in bytes of the received file, for the uploads
+            still in progress.
+        """
+        now = time.time()
+        in_progress = {}
+        for upload_id, entries in self._files().items():
+            try:
+                stats = {entry.name: entry.stat() for entry in entries}
+            except FileNotFoundError:
+                continue
+            if now - max(stat.st_mtime for stat in stats.values()) > self.ttl:
+                self.discard(upload_id)
+                logger.info(f"Stale streaming upload removed: {upload_id}")
+            elif f"{upload_id}.part" in stats:
+                in_progress[upload_id] = stats[f"{upload_id}.part"].st_size
+        return in_progress
+
+    def create(self, filename: str) -> str:
+        """
+        Starts an upload.
+
+        Parameters
+        ----------
+        filename : str
+            Name of the uploaded file.
+
+        Returns
+        -------
+        str
+            Identifier of the upload.
+
+        Raises
+        ------
+        ValueError
+            If the file is not a supported input file.
+        RuntimeError
+            If ``max_uploads`` uploads are already in progress.
+        """
+        if not is_supported_input(filename):
+            raise ValueError(UNSUPPORTED_FILE_MESSAGE)
+        with self._lock:
+            if len(self._sweep()) >= self.max_uploads:
+                raise RuntimeError("Muitos envios em andamento. Tente novamente em alguns minutos.")
+            upload_id = new_session_token()
+            os.makedirs(self.upload_dir, exist_ok=True)
+            open(self._path(upload_id, ".part"), "wb").close()
+            self._write_meta(upload_id, {"filename": os.path.basename(filename), "handle": None})
+        logger.info(f"Streaming upload started: {upload_id} ({filename})")
+        return upload_id
+
+    def received(self, upload_id: str) -> int:
+        """
+        Returns the number of bytes received for an upload.
+
+        Raises
+        ------
+        KeyError
+            If the upload does not exist or is completed.
+        """
+        try:
+            return os.path.getsize(self._path(upload_id, ".part"))
+        except FileNotFoundError:
+            raise KeyError(f"Unknown upload: {upload_id!r}") from None
+
+    def append(self, upload_id: str, offset: int, stream, length: int = None) -> int:
+        """
+        Appends the next piece of an upload, copying it from a stream.
+
+        The offset check and the reservation of the piece's share of the disk
+        quota are the only steps holding the lock of all uploads: the stream
+        is copied under the lock of this upload, so a slow request does not
+        delay the other uploads.
+
+        Parameters
+        ----------
+        upload_id : str
+            Identifier of the upload.
+        offset : int
+            Position of the piece in the file; must be the number of bytes
+            received so far.
+        stream : file-like
+            Binary stream of the piece (e.g. the request body).
+        length : int, optional
+            Size of the piece, when known (e.g. the request's Content-Length).
+            Only this many bytes are reserved; otherwise the piece may use the
+            whole remaining quota.
+
+        Returns
+        -------
+        int
+            Number of bytes received after the piece.
+
+        Raises
+        ------
+        KeyError
+            If the upload does not exist.
+        ValueError
+            If ``offset`` is not the current offset (nothing is written), or
+            the file exceeds the size limit or the uploads in progress their
+            total size limit (the piece is discarded).
+        """
+        with self._upload_lock(upload_id):
+            with self._lock:
+                size = self.received(upload_id)
+                if offset != size:
+                    raise ValueError(f"Expected offset {size}, got {offset}.")
+                others = sum(
+                    entry.stat().st_size
+                    for other_id, entries in self._files().items() if other_id != upload_id
+                    for entry in entries if entry.name.endswith(".part")
+                ) + sum(reserved for other_id, reserved in self._reserved.items() if other_id != upload_id)
+                allowed = min(self.max_bytes - size, self.max_total_bytes - others - size)
+                if length is not None:
+                    if length > allowed:
+                        raise ValueError(self._limit_message(size + length))
+                    allowed = length
+                self._reserved[upload_id] = allowed
+
+            try:
+                with open(self._path(upload_id, ".part"), "r+b") as f:
+                    f.seek(size)
+                    while True:
+                        piece = stream.read(_READ_BYTES)
+                        if not piece:
+                            break
+                        if f.tell() - size + len(piece) > allowed:
+                            f.truncate(size)
+                            raise ValueError(self._limit_message(f.tell() + len(piece)))
+                        f.write(piece)
+                    return f.tell()
+            finally:
+                with self._lock:
+                    self._reserved.pop(upload_id, None)
+
+    def _limit_message(self, size: int) -> str:
+        """
+        Returns the error message of a piece that would make its file
+        ``size`` bytes long and exceeds a limit.
+        """
+        if size > self.max_bytes:
+            return f"O arquivo enviado ultrapassa {self.max_bytes // 1024 ** 2} MB."
+        return "Espaço para envios esgotado. Tente novamente em alguns minutos."
+
+    def parse(self, upload_id: str) -> ParsedContent:
+        """
+        Parses the bytes received for an upload, reading (and decompressing)
+        the file in blocks.
+
+        Raises
+        ------
+        KeyError
+            If the upload does not exist.
+        ValueError
+            If a compressed file cannot be decompressed, or a columnar file
+            cannot be read.
+        UnicodeDecodeError
+            If the file is not valid UTF-8.
+        """
+        filename = self._read_meta(upload_id)["filename"]
+        columnar = columnar_format(filename)
+        try:
+            with open(self._path(upload_id, ".part"), "rb") as f:
+                if columnar is not None:
+                    return read_columnar_file(f, columnar)
+                return parse_input_file(f, input_compression(filename), sample=annotation_sample_name(filename))
+        except FileNotFoundError:
+            raise KeyError(f"Unknown upload: {upload_id!r}") from None
+
+    def complete(self, upload_id: str) -> tuple:
+        """
+        Parses and validates a fully received upload and stores the table in
+        the session store. Concurrent completions of an upload in a worker
+        process run one after the other; later ones return the stored handle.
+
+        Parameters
+        ----------
+        upload_id : str
+            Identifier of the upload.
+
+        Returns
+        -------
+        tuple
+            (handle: dict or None, error_message: str or None, warnings: list)
+
+        Raises
+        ------
+        KeyError
+            If the upload does not exist.
+        """
+        # Imported here: upload_handlers imports this module
+        from utils.core.upload_handlers import check_parsed_upload
+
+        with self._upload_lock(upload_id):
+            meta = self._read_meta(upload_id)
+            if meta["handle"] is not None:
+                return meta["handle"], None, meta.get("warnings", [])
+
+            try:
+                parsed = self.parse(upload_id)
+            except (ValueError, UnicodeError) as e:
+                return None, f"Erro ao decodificar arquivo: {str(e)}", []
+            df, error, warnings = check_parsed_upload(parsed)
+            if error:
+                logger.warning(f"Streaming upload rejected: {upload_id}: {error}")
+                return None, error, []
+
+            handle = store_dataframe(df, upload_id, "input")
+            self._write_meta(upload_id, {**meta, "handle": handle, "warnings": warnings})
+            try:
+                os.remove(self._path(upload_id, ".part"))
+            except FileNotFoundError:
+                # Completed meanwhile by another worker process
+                pass
+        logger.info(f"Streaming upload completed: {upload_id} {df.shape}")
+        return handle, None, warnings
+
+    def handle(self, upload_id: str) -> dict:
+        """
+        Returns the session-store handle of a completed upload.
+
+        Raises
+        ------
+        KeyError
+            If the upload does not exist or is not completed.
+        """
+        handle = self._read_meta(upload_id)["handle"]
+        if handle is None:
+            raise KeyError(f"Upload not completed: {upload_id!r}")
+        return handle
+
+    def take(self, upload_id: str) -> dict:
+        """
+        Returns the session-store handle of a completed upload and removes its
+        metadata: the handle is handed out once.
+
+        Raises
+        ------
+        KeyError
+            If the upload does not exist or is not completed.
+        """
+        handle = self.handle(upload_id)
+        self.discard(upload_id)
+        return handle
+
+    def discard(self, upload_id: str) -> None:
+        """
+        Removes the temporary files of an upload.
+        """
+        for suffix in (".part", ".json"):
+            try:
+                os.remove(self._path(upload_id, suffix))
+            except (OSError, KeyError):
+                pass
+
+
+# Process-wide uploads (state is shared through the upload directory)
+_uploads = StreamingUploads()
+
+
+def get_upload_handle(upload_id: str) -> dict:
+    """
+    Returns the session-store handle of a completed upload, once: the
+    metadata of the upload is removed.
+
+    Raises
+    ------
+    KeyError
+        If the upload does not exist or is not completed.
+    """
+    return _uploads.take(upload_id)
+
+
+def register_streaming_upload(server, uploads: StreamingUploads = None) -> None:
+    """
+    Adds the chunked upload routes (see the module documentation) to a Flask
+    server.
+
+    Parameters
+    ----------
+    server : flask.Flask
+        Server of the Dash app (``app.server``).
+    uploads : StreamingUploads, optional
+        Upload storage; the process-wide one by default.
+    """
+    uploads = uploads or _uploads
+
+    def unknown(upload_id):
+        return jsonify({"error": f"Unknown upload: {upload_id}"}), 404
+
+    @server.route(ROUTE_PREFIX, methods=["POST"])
+    def create_stream_upload():
+        payload = request.get_json(silent=True) or {}
+        filename = payload.get("filename") or request.args.get("filename")
+        try:
+            upload_id = uploads.create(filename)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except RuntimeError as e:
+            return jsonify({"error": str(e)}), 503
+        return jsonify({"upload_id": upload_id, "chunk_size": UPLOAD_CHUNK_BYTES}), 201
+
+    @server.route(f"{ROUTE_PREFIX}/<upload_id>", methods=["GET"])
+    def stream_upload_status(upload_id):
+        try:
+            return jsonify({"received": uploads.received(upload_id)})
+        except KeyError:
+            return unknown(upload_id)
+
+    @server.route(f"{ROUTE_PREFIX}/<upload_id>", methods=["PUT"])
+    def append_stream_upload(upload_id):
+        try:
+            offset = int(request.headers.get("Upload-Offset", ""))
+        except ValueError:
+            return jsonify({"error": "Missing or invalid Upload-Offset header."}), 400
+        try:
+            received = uploads.received(upload_id)
+            if offset != received:
+                return jsonify({"error": "Unexpected offset.", "received": received}), 409
+            received = uploads.append(upload_id, offset, request.stream, request.content_length)
+        except KeyError:
+            return unknown(upload_id)
+        except ValueError as e:
+            # Nothing was kept: either another request moved the offset or the
+            # piece exceeds the size limit
+            try:
+                received = uploads.received(upload_id)
+            except KeyError:
+                # Discarded or expired meanwhile
+                return unknown(upload_id)
+            return jsonify({"error": str(e), "received": received}), 409 if received != offset else 413
+        return jsonify({"received": received})
+
+    @server.route(f"{ROUTE_PREFIX}/<upload_id>/complete", methods=["POST"])
+    def complete_stream_upload(upload_id):
+        try:
+            handle, error, warnings = uploads.complete(upload_id)
+        except KeyError:
+            return unknown(upload_id)
+        if error:
+            uploads.discard(upload_id)
+            return jsonify({"error": error}), 422
+        return jsonify({"upload_id": upload_id, "handle": handle, "warnings": warnings})
@@ -7,6 +7,15 @@ Functions:
 - validate_upload_size: Check if uploaded file size is within allowed limit.
 - load_example_data: Load an example dataset.
 - process_uploaded_file: Validate and process an uploaded file.
+- ingest_upload: Decode, validate and parse an upload in a single pass.
+- read_upload: Decode and parse an upload, without the content checks.
+- ingest_uploads: Parse several uploads in parallel and combine them.
+- handle_multiple_uploads: Load several uploaded files into one input table.
+- check_upload_structure: Apply the structure and content checks to a parse result.
+- check_parsed_upload: Turn a parse result into a table, error and warnings.
+- validate_upload_comprehensive: Validate an upload and collect warnings.
+- handle_streamed_upload: Load a chunked upload (see `streaming_upload`).
+- load_input_data: Return the input table of the 'stored-data' store.
 """
 
 import dash  # Core Dash functionality
@@ -15,15 +24,23 @@ from dash import html, dcc, callback, callback_context, dash_table  # Core Dash
 from dash.dependencies import Input, Output, State  # Input, Output, and State dependencies for callbacks
 from dash.exceptions import PreventUpdate  # To prevent unnecessary updates
 import pandas as pd  # For data manipulation
-import re
+import base64
 
 # Application Instance
 from app import app
 
+import io
 import os
-from utils.core.data_validator import validate_and_process_input
+from urllib.parse import parse_qs
+from utils.core.annotation_readers import annotation_sample_name, detect_annotation_format
+from utils.core.columnar_input import columnar_format, is_columnar_header, read_columnar_file
+from utils.core.compressed_input import UNSUPPORTED_FILE_MESSAGE, input_compression, is_supported_input, parse_input_file
+from utils.core.data_validator import parse_content_bytes, validate_and_process_input
+from utils.core.input_batch import combine_input_batch
+from utils.core.session_store import is_store_handle, load_dataframe, new_session_token, store_dataframe
+from utils.core.streaming_upload import get_upload_handle
 
-MAX_UPLOAD_SIZE_MB = 5  # 5 MB limit
+MAX_UPLOAD_SIZE_MB = 5  # 5 MB limit (of the compressed file for .gz, .bz2, .xz and .zip)
 
 def validate_upload_size(contents):
     """
@@ -60,18 +77,13 @@ def load_example_data():
 
 def process_uploaded_file(contents, filename):  
     """  
-    Processes a user-uploaded file with comprehensive validation.  
+    Processes a user-uploaded file with comprehensive validation, decoding  
+    and parsing it once (see `ingest_upload`).  
     """  
-    # Comprehensive validation  
-    is_valid, error_msg, warnings = validate_upload_comprehensive(contents, filename)  
-    if not is_valid:  
+    df, error_msg, warnings = ingest_upload(contents, filename)  
+    if error_msg:  
         return None, error_msg  
       
-    # Process with existing validator  
-    df, processing_error = validate_and_process_input(contents, filename)  
-    if processing_error:  
-        return None, processing_error  
-      
     # Add warnings to success message if any  
     success_msg = "File uploaded and validated successfully"  
     if warnings:  
@@ -86,9 +98,9 @@ def handle_upload_or_example(contents, n_clicks_example, filename):
     Handles file uploads or example dataset loading, processes the input, and updates the UI.
 
     Parameters:
-    - contents (str): File contents (uploaded by the user).
+    - contents (str or list): File contents (uploaded by the user), one per file.
     - n_clicks_example (int): Number of times the "See Example Data" button is clicked.
-    - filename (str): Name of the uploaded file.
+    - filename (str or list): Name of the uploaded file(s).
 
     Returns:
     - dict: Processed data to be stored.
@@ -146,6 +158,10 @@ def handle_upload_or_example(contents, n_clicks_example, filename):
 
     # Handle file upload
     if triggered_id == 'upload-data' and contents:
+        if isinstance(contents, list):
+            if len(contents) > 1:
+                return handle_multiple_uploads(contents, filename)
+            contents, filename = contents[0], filename[0]
         df, error = process_uploaded_file(contents, filename)  
         if error:
             return None, True, dbc.Alert(
@@ -180,85 +196,317 @@ def handle_upload_or_example(contents, n_clicks_example, filename):
 
 
 
-def validate_upload_comprehensive(contents, filename):  
-    """  
-    Performs comprehensive validation of uploaded file including size, format, and structure.  
-      
-    Parameters  
-    ----------  
-    contents : str  
-        File contents (base64 encoded if from upload)  
-    filename : str  
-        Name of the uploaded file  
-          
-    Returns  
-    -------  
-    tuple  
-        (is_valid: bool, error_message: str, warnings: list)  
-    """  
-    warnings = []  
-      
-    # 1. Size validation (existing)  
-    is_valid_size, size_error = validate_upload_size(contents)  
-    if not is_valid_size:  
-        return False, size_error, []  
-      
-    # 2. File extension validation  
-    if not filename.endswith('.txt'):  
-        return False, "Apenas arquivos .txt são suportados.", []  
-      
-    # 3. Content encoding validation  
-    try:  
-        if contents.startswith('data'):  
-            content_type, content_string = contents.split(',', 1)  
-            if 'text' not in content_type:  
-                return False, "Tipo de conteúdo inválido. Esperado arquivo de texto.", []  
-            decoded_content = base64.b64decode(content_string).decode('utf-8')  
-        else:  
-            decoded_content = contents  
-    except Exception as e:  
-        return False, f"Erro ao decodificar arquivo: {str(e)}", []  
-      
-    # 4. Structure validation  
-    lines = decoded_content.split('\n')  
-    sample_count = 0  
-    ko_count = 0  
-    current_sample = None  
-      
-    identifier_pattern = re.compile(r'^>([^\n]+)')  
-    ko_pattern = re.compile(r"^(K\d+)")  
-      
-    for i, line in enumerate(lines, 1):  
-        line = line.strip()  
-        if not line:  
-            continue  
-              
-        if identifier_pattern.match(line):  
-            sample_count += 1  
-            current_sample = line  
-        elif ko_pattern.match(line):  
-            if current_sample is None:  
-                return False, f"Linha {i}: Identificador KO encontrado sem amostra definida.", []  
-            ko_count += 1  
-        else:  
-            return False, f"Linha {i}: Formato inválido. Esperado identificador de amostra (>) ou KO (K...).", []  
-      
-    # 5. Content quality checks  
-    if sample_count == 0:  
-        return False, "Nenhuma amostra encontrada no arquivo.", []  
-      
-    if ko_count == 0:  
-        return False, "Nenhum identificador KO encontrado no arquivo.", []  
-      
-    if sample_count > 1000:  
-        warnings.append(f"Arquivo contém {sample_count} amostras. Processamento pode ser lento.")  
-      
-    if ko_count > 10000:  
-        warnings.append(f"Arquivo contém {ko_count} identificadores KO. Considere dividir em arquivos menores.")  
-      
-    # 6. Data distribution validation  
-    avg_ko_per_sample = ko_count / sample_count  
-    if avg_ko_per_sample < 5:  
-        warnings.append("Poucas entradas KO por amostra. Verifique se o arquivo está completo.")  
-      
-    return True, None, warnings
+def ingest_upload(contents, filename):
+    """
+    Decodes, validates and parses an uploaded file in a single pass.
+
+    The base64 payload is decoded once to bytes, which are parsed in place
+    (see `parse_content_bytes`): the structure checks, the sample/KO counts
+    used for the warnings and the DataFrame all come out of the same pass.
+    Compressed files (.gz, .bz2, .xz, .zip) are decompressed as a stream into
+    the parser (see `compressed_input`), KofamKOALA / eggNOG-mapper tables
+    are read directly (see `annotation_readers`), and tab-separated, `.npz`
+    and Parquet sample/KO tables are encoded by columns (see `columnar_input`).
+
+    Parameters
+    ----------
+    contents : str
+        File contents (base64 encoded if from upload)
+    filename : str
+        Name of the uploaded file
+
+    Returns
+    -------
+    tuple
+        (df: pd.DataFrame or None, error_message: str or None, warnings: list)
+    """
+    parsed, error = read_upload(contents, filename)
+    if error:
+        return None, error, []
+    return check_parsed_upload(parsed)
+
+
+def read_upload(contents, filename):
+    """
+    Decodes and parses an uploaded file (see `ingest_upload`), without the
+    structure and content checks.
+
+    Parameters
+    ----------
+    contents : str
+        File contents (base64 encoded if from upload)
+    filename : str
+        Name of the uploaded file
+
+    Returns
+    -------
+    tuple
+        (parsed: ParsedContent or None, error_message: str or None)
+    """
+    # 1. Size validation
+    is_valid_size, size_error = validate_upload_size(contents)
+    if not is_valid_size:
+        return None, size_error
+
+    # 2. File extension validation
+    if not is_supported_input(filename):
+        return None, UNSUPPORTED_FILE_MESSAGE
+    compression = input_compression(filename)
+
+    # 3. Content encoding validation
+    try:
+        if contents.startswith('data'):
+            content_type, content_string = contents.split(',', 1)
+            if filename.lower().endswith(('.txt', '.tsv')) and 'text' not in content_type:
+                return None, "Tipo de conteúdo inválido. Esperado arquivo de texto."
+            raw = base64.b64decode(content_string)
+        else:
+            raw = contents.encode('utf-8')
+        columnar = columnar_format(filename)
+        if columnar is not None:
+            parsed = read_columnar_file(io.BytesIO(raw), columnar)
+        elif compression is None and detect_annotation_format(raw) is None and not is_columnar_header(raw):
+            parsed = parse_content_bytes(raw)
+        else:
+            parsed = parse_input_file(io.BytesIO(raw), compression, sample=annotation_sample_name(filename))
+    except (ValueError, UnicodeError) as e:
+        return None, f"Erro ao decodificar arquivo: {str(e)}"
+    except Exception as e:
+        return None, f"Error processing content: {e}"
+
+    return parsed, None
+
+
+def ingest_uploads(contents_list, filenames, max_workers=None):
+    """
+    Decodes, validates and parses several uploaded files in parallel (see
+    `ingest_upload` and `combine_input_batch`) and combines the valid ones.
+
+    Parameters
+    ----------
+    contents_list : list of str
+        Contents of the files (base64 encoded if from upload).
+    filenames : list of str
+        Names of the files.
+    max_workers : int, optional
+        Number of files parsed at once (default: up to the CPU count).
+
+    Returns
+    -------
+    InputBatch
+        Combined table and the errors of the rejected files (invalid content
+        or sample names already given by another file).
+    """
+    return combine_input_batch(zip(filenames, contents_list), ingest_upload, max_workers)
+
+
+def handle_multiple_uploads(contents_list, filenames):
+    """
+    Loads several uploaded files into one input table, kept in the session
+    store. Files that cannot be loaded are listed in the alert and do not
+    block the others.
+
+    Parameters:
+    - contents_list (list): File contents (uploaded by the user).
+    - filenames (list): Names of the uploaded files.
+
+    Returns:
+    - dict: Session-store handle of the combined table.
+    - bool: Whether to disable the "Submit" button.
+    - dbc.Alert: Alert message with the per-file errors.
+    - str: Updated page state ('initial' or 'loaded').
+    """
+    batch = ingest_uploads(contents_list, filenames)
+    file_errors = html.Ul(
+        [html.Li([html.Strong(name), f": {error}"]) for name, error in batch.errors],
+        className='mb-0'
+    )
+    if batch.df is None:
+        return None, True, dbc.Alert(
+            ["None of the uploaded files could be loaded:", file_errors],
+            color='danger',
+            is_open=True,
+            dismissable=True
+        ), 'initial'
+
+    handle = store_dataframe(batch.df, new_session_token(), 'input')
+    message = [
+        f"{len(batch.accepted)} files uploaded and validated successfully "
+        f"({sum(batch.samples.values())} samples, {len(batch.df)} KO entries)",
+        html.Br(),
+        'Click "Submit" to process the data'
+    ]
+    if batch.errors:
+        message += [html.Br(), f"{len(batch.errors)} files were skipped:", file_errors]
+
+    return (
+        handle,
+        False,
+        dbc.Alert(
+            message,
+            color='warning' if batch.errors else 'success',
+            is_open=True,
+            dismissable=True
+        ),
+        'loaded'
+    )
+
+
+def check_upload_structure(parsed):
+    """
+    Applies the structure and content checks of an upload to its parse result.
+
+    Lines are checked in order of the file: the first line that is neither a
+    sample header nor starts with a KO identifier, or a KO line before any
+    sample header, is reported. A KO identifier followed by other characters
+    passes these checks and is only rejected by `check_parsed_upload`.
+
+    Parameters
+    ----------
+    parsed : ParsedContent
+        Result of `parse_content_bytes` (or of a `ContentParser`).
+
+    Returns
+    -------
+    tuple
+        (error_message: str or None, warnings: list)
+    """
+    # 4. Structure validation (line numbers of the raw file)
+    if parsed.structure_kind == 'orphan':
+        line = parsed.structure_line + parsed.leading_lines
+        return f"Linha {line}: Identificador KO encontrado sem amostra definida.", []
+    if parsed.structure_kind == 'invalid':
+        line = parsed.structure_line + parsed.leading_lines
+        return f"Linha {line}: Formato inválido. Esperado identificador de amostra (>) ou KO (K...).", []
+    if parsed.error_kind == 'pair':
+        return parsed.error_message(), []
+
+    # 5. Content quality checks
+    if parsed.sample_count == 0:
+        return "Nenhuma amostra encontrada no arquivo.", []
+
+    if parsed.ko_count == 0:
+        return "Nenhum identificador KO encontrado no arquivo.", []
+
+    warnings = []
+    if parsed.sample_count > 1000:
+        warnings.append(f"Arquivo contém {parsed.sample_count} amostras. Processamento pode ser lento.")
+
+    if parsed.ko_count > 10000:
+        warnings.append(f"Arquivo contém {parsed.ko_count} identificadores KO. Considere dividir em arquivos menores.")
+
+    # 6. Data distribution validation
+    if parsed.kos_per_sample < 5:
+        warnings.append("Poucas entradas KO por amostra. Verifique se o arquivo está completo.")
+
+    return None, warnings
+
+
+def check_parsed_upload(parsed):
+    """
+    Applies the checks of `check_upload_structure` to the parse result of an
+    upload, then rejects the malformed KO lines it lets through.
+
+    Parameters
+    ----------
+    parsed : ParsedContent
+        Result of `parse_content_bytes` (or of a `ContentParser`).
+
+    Returns
+    -------
+    tuple
+        (df: pd.DataFrame or None, error_message: str or None, warnings: list)
+    """
+    error, warnings = check_upload_structure(parsed)
+    if error:
+        return None, error, []
+
+    # 7. Parsing errors
+    if parsed.error_kind == 'malformed':
+        return None, parsed.error_message(), []
+
+    return parsed.df, None, warnings
+
+
+def validate_upload_comprehensive(contents, filename):
+    """
+    Performs comprehensive validation of uploaded file including size, format, and structure.
+
+    Parameters
+    ----------
+    contents : str
+        File contents (base64 encoded if from upload)
+    filename : str
+        Name of the uploaded file
+
+    Returns
+    -------
+    tuple
+        (is_valid: bool, error_message: str, warnings: list)
+    """
+    parsed, error = read_upload(contents, filename)
+    if error:
+        return False, error, []
+    error, warnings = check_upload_structure(parsed)
+    return error is None, error, warnings
+
+
+def handle_streamed_upload(search):
+    """
+    Loads a completed chunked upload into the 'stored-data' store when the page
+    is opened with ``?upload=<upload_id>`` (see `streaming_upload`).
+
+    Parameters:
+    - search (str): Query string of the page URL.
+
+    Returns:
+    - dict: Session-store handle of the uploaded table.
+    - bool: Whether to disable the "Submit" button.
+    - dbc.Alert: Alert message indicating success or error.
+    - str: Updated page state ('initial' or 'loaded').
+    """
+    upload_id = parse_qs((search or '').lstrip('?')).get('upload', [None])[0]
+    if not upload_id:
+        raise PreventUpdate
+
+    try:
+        handle = get_upload_handle(upload_id)
+    except KeyError:
+        return None, True, dbc.Alert(
+            'The uploaded file is no longer available. Please upload it again.',
+            color='danger',
+            is_open=True,
+            duration=4000
+        ), 'initial'
+
+    return (
+        handle,
+        False,
+        dbc.Alert(
+            [
+                f"File uploaded and validated successfully ({handle['rows']} KO entries)",
+                html.Br(),
+                'Click "Submit" to process the data'
+            ],
+            color='success',
+            is_open=True,
+            dismissable=True
+        ),
+        'loaded'
+    )
+
+
+def load_input_data(stored_data):
+    """
+    Returns the input table kept in the 'stored-data' store: records of a
+    `dcc.Upload` or the session-store handle of a chunked upload.
+
+    Parameters:
+    - stored_data (list or dict): Content of the store.
+
+    Returns:
+    - pd.DataFrame: Input table with 'sample' and 'ko' columns.
+    """
+    if is_store_handle(stored_data):
+        return load_dataframe(stored_data)
+    return pd.DataFrame(stored_data)
@@ -0,0 +1,204 @@
+"""
+vocabulary.py
+-------------
+Process-wide dictionaries for the join keys shared by user input and the
+reference databases: KEGG Orthology identifiers (``ko``) and KEGG compound
+identifiers (``cpd``).
+
+A `Vocabulary` is append-only: a label keeps the same integer code for the
+lifetime of the process. Columns encoded through the same vocabulary are
+categoricals with identical categories, so pandas joins and groupbys on them
+run on the integer codes instead of comparing Python strings.
+
+Functions:
+- to_shared_categorical: Encodes a Series with a shared vocabulary.
+- apply_shared_vocabularies: Encodes the 'ko' and 'cpd' columns of a DataFrame.
+- align_shared_categories: Re-wraps shared columns with the current dictionary.
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+from utils.logger_config import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class Vocabulary:
+    """
+    Append-only, thread-safe mapping between string labels and integer codes.
+
+    Parameters
+    ----------
+    name : str
+        Name used in log messages.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._labels = []
+        self._codes = {}
+        self._dtype = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+    def __contains__(self, label) -> bool:
+        return label in self._codes
+
+    def encode(self, values) -> np.ndarray:
+        """
+        Returns the codes of ``values``, adding unseen labels to the dictionary.
+
+        Parameters
+        ----------
+        values : array-like
+            Labels to encode. Missing values are encoded as -1.
+
+        Returns
+        -------
+        np.ndarray
+            int32 array of codes.
+        """
+        local_codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+        with self._lock:
+            mapping = np.empty(len(uniques), dtype=np.int32)
+            for i, label in enumerate(uniques):
+                code = self._codes.get(label)
+                if code is None:
+                    code = len(self._labels)
+                    self._labels.append(label)
+                    self._codes[label] = code
+                mapping[i] = code
+        codes = np.full(len(local_codes), -1, dtype=np.int32)
+        valid = local_codes >= 0
+        codes[valid] = mapping[local_codes[valid]]
+        return codes
+
+    def lookup(self, values) -> np.ndarray:
+        """
+        Returns the codes of ``values`` without modifying the dictionary.
+
+        Unknown and missing labels are returned as -1.
+        """
+        local_codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+        mapping = np.array([self._codes.get(label, -1) for label in uniques], dtype=np.int32)
+        codes = np.full(len(local_codes), -1, dtype=np.int32)
+        valid = local_codes >= 0
+        codes[valid] = mapping[local_codes[valid]]
+        return codes
+
+    def decode(self, codes) -> np.ndarray:
+        """
+        Returns the labels for an array of codes (-1 decodes to NaN).
+        """
+        return np.asarray(pd.Categorical.from_codes(codes, dtype=self.dtype), dtype=object)
+
+    @property
+    def dtype(self) -> pd.CategoricalDtype:
+        """
+        CategoricalDtype holding every label currently in the dictionary.
+
+        Dtypes are cached per dictionary size; because the dictionary is
+        append-only, every dtype issued earlier is a prefix of the current one.
+        """
+        with self._lock:
+            if self._dtype is None or len(self._dtype.categories) != len(self._labels):
+                self._dtype = pd.CategoricalDtype(pd.Index(self._labels, dtype=object))
+            return self._dtype
+
+    def is_shared(self, dtype) -> bool:
+        """
+        Returns True if ``dtype`` was issued by this vocabulary, i.e. its
+        categories are a prefix of the current dictionary.
+        """
+        if not isinstance(dtype, pd.CategoricalDtype) or dtype.ordered:
+            return False
+        current = self.dtype.categories
+        categories = dtype.categories
+        if categories is current:
+            return True
+        return len(categories) <= len(current) and categories.equals(current[:len(categories)])
+
+    def categorical(self, values) -> pd.Categorical:
+        """
+        Encodes ``values`` as a Categorical using the shared dictionary.
+        """
+        codes = self.encode(values)
+        return pd.Categorical.from_codes(codes, dtype=self.dtype, validate=False)
+
+
+# Global dictionaries shared by the parser, the reference tables and every merge
+KO_VOCABULARY = Vocabulary("ko")
+CPD_VOCABULARY = Vocabulary("cpd")
+
+SHARED_VOCABULARIES = {
+    "ko": KO_VOCABULARY,
+    "cpd": CPD_VOCABULARY,
+}
+
+
+def to_shared_categorical(series: pd.Series, vocabulary: Vocabulary) -> pd.Series:
+    """
+    Returns ``series`` as a categorical using the shared ``vocabulary``.
+
+    Columns that are already encoded with the vocabulary are only re-wrapped
+    with the current dictionary (no re-encoding of values).
+
+    Parameters
+    ----------
+    series : pd.Series
+        Column to encode.
+    vocabulary : Vocabulary
+        Shared dictionary to use.
+
+    Returns
+    -------
+    pd.Series
+        Categorical Series sharing categories with every other column encoded
+        through the same vocabulary.
+    """
+    if vocabulary.is_shared(series.dtype):
+        dtype = vocabulary.dtype
+        if series.dtype.categories is dtype.categories:
+            return series
+        values = pd.Categorical.from_codes(series.cat.codes.to_numpy(), dtype=dtype, validate=False)
+    else:
+        values = vocabulary.categorical(series.to_numpy(dtype=object))
+    return pd.Series(values, index=series.index, name=series.name)
+
+
+def apply_shared_vocabularies(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Encodes the 'ko' and 'cpd' columns of ``df`` with the global dictionaries.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        DataFrame to encode in place.
+
+    Returns
+    -------
+    pd.DataFrame
+        The same DataFrame, with shared categorical join keys.
+    """
+    for col, vocabulary in SHARED_VOCABULARIES.items():
+        if col in df.columns:
+            df[col] = to_shared_categorical(df[col], vocabulary)
+    return df
+
+
+def align_shared_categories(*frames: pd.DataFrame) -> list:
+    """
+    Returns shallow copies of ``frames`` whose shared columns use the current
+    dictionary, so that frames encoded at different times can be joined on
+    integer codes.
+    """
+    aligned = []
+    for df in frames:
+        df = df.copy(deep=False)
+        aligned.append(apply_shared_vocabularies(df))
+    return aligned
@@ -44,7 +44,7 @@ def count_unique_enzyme_activities(merged_df: pd.DataFrame, sample: str) -> pd.D
 
     logger.info("Counting unique KOs per enzyme activity.")
     enzyme_count = (
-        filtered_df.groupby('enzyme_activity')['ko']
+        filtered_df.groupby('enzyme_activity', observed=True)['ko']
         .nunique()
         .reset_index(name='unique_ko_count')
     )
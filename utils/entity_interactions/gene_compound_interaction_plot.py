@@ -56,7 +56,7 @@ def plot_gene_compound_scatter(df: pd.DataFrame) -> go.Figure:
         logger.debug(f"Dynamic width calculated: {width}")
 
         # --- Step 3: Order compounds by frequency for better y-axis presentation ---
-        compound_order = df['compoundname'].value_counts().index.tolist()
+        compound_order = df['compoundname'].astype(object).value_counts().index.tolist()
         logger.info("Compound order determined by frequency.")
 
         # --- Step 4: Create scatter plot ---
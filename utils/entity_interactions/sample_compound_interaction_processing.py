@@ -9,6 +9,8 @@ import pandas as pd
 
 import pandas as pd
 
+from utils.core.store_codec import decode_store_data
+
 def extract_compound_classes(biorempp_data):
     """
     Extrai as classes de compostos únicas dos dados processados (list[dict] ou DataFrame).
@@ -30,7 +32,7 @@ def extract_compound_classes(biorempp_data):
     # Para lista ou None
     if not biorempp_data:
         return []
-    df = pd.DataFrame(biorempp_data)
+    df = decode_store_data(biorempp_data)
     if 'compoundclass' not in df.columns:
         return []
     values = df['compoundclass'].dropna().unique()
@@ -58,7 +60,7 @@ def filter_by_compound_class(biorempp_data, selected_class):
     # Para lista ou None
     if not biorempp_data or not selected_class:
         return pd.DataFrame()
-    df = pd.DataFrame(biorempp_data)
+    df = decode_store_data(biorempp_data)
     if 'compoundclass' not in df.columns:
         return pd.DataFrame()
     return df[df['compoundclass'] == selected_class]
@@ -65,7 +65,7 @@ def plot_sample_gene_scatter(df: pd.DataFrame) -> go.Figure:
     logger.info(f"Calculated plot width: {width}px for {num_labels_x} unique genes.")
 
     # Order samples by frequency
-    sample_order = df['sample'].value_counts().index.tolist()
+    sample_order = df['sample'].astype(object).value_counts().index.tolist()
 
     try:
         # Generate the plot
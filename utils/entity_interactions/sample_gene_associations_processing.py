@@ -2,13 +2,15 @@
 
 import pandas as pd
 
+from utils.core.store_codec import decode_store_data
+
 def extract_dropdown_options(biorempp_data):
     """
     Extrai as opções dos dropdowns de amostras e genes.
     """
     if not biorempp_data:
         return [], []
-    df = pd.DataFrame(biorempp_data)
+    df = decode_store_data(biorempp_data)
     sample_options = [{'label': sample, 'value': sample} for sample in sorted(df['sample'].unique())]
     gene_options = [{'label': gene, 'value': gene} for gene in sorted(df['genesymbol'].unique())]
     return sample_options, gene_options
@@ -19,7 +21,7 @@ def filter_sample_gene_data(biorempp_data, selected_samples=None, selected_genes
     """
     if not biorempp_data:
         return pd.DataFrame()  # vazio
-    df = pd.DataFrame(biorempp_data)
+    df = decode_store_data(biorempp_data)
     if selected_samples:
         df = df[df['sample'].isin(selected_samples)]
     if selected_genes:
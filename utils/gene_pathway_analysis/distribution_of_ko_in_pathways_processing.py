@@ -56,7 +56,7 @@ def count_ko_per_pathway(merged_df: pd.DataFrame) -> pd.DataFrame:
 
         logger.info("Calculando o número de KOs únicos por via metabólica e por amostra...")
         pathway_count = (
-            merged_df.groupby(['sample', 'pathname'])['ko']
+            merged_df.groupby(['sample', 'pathname'], observed=True)['ko']
             .nunique()
             .reset_index(name='unique_ko_count')
         )
@@ -110,7 +110,7 @@ def count_ko_per_sample_for_pathway(merged_df: pd.DataFrame, selected_pathway: s
 
         logger.info("Calculando o número de KOs únicos por amostra...")
         sample_count = (
-            filtered_df.groupby('sample')['ko']
+            filtered_df.groupby('sample', observed=True)['ko']
             .nunique()
             .reset_index(name='unique_ko_count')
         )
@@ -7,6 +7,8 @@ It also includes basic preprocessing functions for compound data visualization.
 import pandas as pd
 import logging
 
+from utils.core.incidence import build_incidence, row_counts
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -72,9 +74,9 @@ def process_ko_data(merged_df) -> pd.DataFrame:
     # Validate essential columns
     validate_ko_dataframe(merged_df)
 
-    # Count unique KOs per sample
+    # Count unique KOs per sample on the sample x KO incidence matrix
     logging.info("Counting unique KOs per sample...")
-    ko_count = merged_df.groupby('sample')['ko'].nunique().reset_index(name='ko_count')
+    ko_count = row_counts(build_incidence(merged_df, 'sample', 'ko')).reset_index(name='ko_count')
 
     # Sort the counts
     ko_count_sorted = ko_count.sort_values('ko_count', ascending=False)
@@ -108,7 +110,7 @@ def process_ko_data_violin(df: pd.DataFrame) -> pd.DataFrame:
     validate_ko_dataframe(df)
 
     # Group and count KOs
-    ko_count_per_sample = df.groupby('sample')['ko'].nunique().reset_index(name='ko_count')
+    ko_count_per_sample = df.groupby('sample', observed=True)['ko'].nunique().reset_index(name='ko_count')
 
     logging.info("Violin plot data processing complete.")
     return ko_count_per_sample
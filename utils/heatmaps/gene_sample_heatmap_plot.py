@@ -44,7 +44,7 @@ def plot_sample_gene_heatmap(grouped_df: pd.DataFrame) -> go.Figure:
 
     try:
         logger.debug("Pivotando a matriz de dados...")
-        pivot_df = grouped_df.pivot(index='Gene', columns='sample', values='ko_count').fillna(0)
+        pivot_df = grouped_df.pivot(index='Gene', columns='sample', values='ko_count').sort_index().fillna(0)
 
         logger.debug("Gerando figura com Plotly...")
         fig = px.imshow(
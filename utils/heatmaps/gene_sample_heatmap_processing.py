@@ -43,7 +43,7 @@ def process_gene_sample_data(merged_df: pd.DataFrame) -> pd.DataFrame:
     try:
         grouped_df = (
             merged_df
-            .groupby(['sample', 'Gene', 'compound_pathway', 'Pathway'])['ko']
+            .groupby(['sample', 'Gene', 'compound_pathway', 'Pathway'], observed=True)['ko']
             .nunique()
             .reset_index(name='ko_count')
         )
@@ -65,7 +65,8 @@ def plot_pathway_heatmap(df: pd.DataFrame, selected_sample: str) -> go.Figure:
             columns='compound_pathway',
             values='ko_count',
             aggfunc='sum',
-            fill_value=0
+            fill_value=0,
+            observed=True
         )
 
         heatmap_data = heatmap_data.loc[
@@ -35,7 +35,7 @@ def process_pathway_data(merged_df: pd.DataFrame) -> pd.DataFrame:
 
     grouped_df = (
         merged_df
-        .groupby(['Pathway', 'compound_pathway', 'sample'])['ko']
+        .groupby(['Pathway', 'compound_pathway', 'sample'], observed=True)['ko']
         .nunique()
         .reset_index(name='ko_count')
     )
@@ -36,7 +36,7 @@ def process_sample_reference_heatmap(merged_df: pd.DataFrame) -> pd.DataFrame:
     logger.info("Grouping data by 'sample' and 'referenceAG' to count unique 'compoundname'")
     try:
         grouped_df = (
-            merged_df.groupby(['sample', 'referenceAG'])['compoundname']
+            merged_df.groupby(['sample', 'referenceAG'], observed=True)['compoundname']
             .nunique()
             .reset_index()
         )
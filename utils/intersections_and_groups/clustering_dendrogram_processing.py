@@ -7,6 +7,8 @@ import pandas as pd
 import scipy.spatial.distance as ssd  
 import scipy.cluster.hierarchy as sch  
 import logging  
+
+from utils.core.incidence import build_incidence
   
 # Configuração básica de logging  
 logging.basicConfig(level=logging.INFO)  
@@ -93,6 +95,51 @@ def clear_distance_cache() -> None:
     _distance_cache.clear()  
     logger.info("Distance matrix cache cleared")  
   
+def calculate_profile_clustering(pivot_df: pd.DataFrame, distance_metric: str, method: str) -> np.ndarray:
+    """
+    Calculates the hierarchical clustering of a sample-by-KO count matrix,
+    reusing cached distance matrices.
+
+    Parameters
+    ----------
+    pivot_df : pd.DataFrame
+        Matrix with one row per sample and one column per KO.
+    distance_metric : str
+        The distance metric to use (e.g., 'euclidean', 'cityblock').
+    method : str
+        The hierarchical clustering method to use (e.g., 'single', 'ward').
+
+    Returns
+    -------
+    np.ndarray
+        The linkage matrix; leaves are the rows of ``pivot_df``.
+
+    Raises
+    ------
+    ValueError
+        If the matrix has fewer than two samples.
+    """
+    if pivot_df.shape[0] < 2:
+        logger.warning(
+            "Not enough samples for clustering (need at least 2, got %d)",
+            pivot_df.shape[0]
+        )
+        raise ValueError("At least two samples are required for clustering.")
+
+    # Tentar recuperar matriz de distância do cache
+    distance_matrix = _get_cached_distance_matrix(pivot_df, distance_metric)
+
+    if distance_matrix is None:
+        # Calcular nova matriz de distância
+        logger.info("Computing new distance matrix with metric: %s", distance_metric)
+        distance_matrix = ssd.pdist(pivot_df, metric=distance_metric)
+        # Armazenar no cache
+        _cache_distance_matrix(pivot_df, distance_metric, distance_matrix)
+
+    # Clustering hierárquico (sempre recalculado pois é rápido)
+    return sch.linkage(distance_matrix, method=method)
+
+
 def calculate_sample_clustering(input_df: pd.DataFrame, distance_metric: str, method: str) -> np.ndarray:
     """
     Calculates a hierarchical clustering matrix based on sample-by-KO data with caching optimization.
@@ -128,33 +175,10 @@ def calculate_sample_clustering(input_df: pd.DataFrame, distance_metric: str, me
         raise ValueError(f"Missing required columns in input data: {missing}")
 
     try:
-        # Pivot da tabela para obter matriz amostra vs KO
-        pivot_df = input_df.pivot_table(
-            index='sample',
-            columns='ko',
-            aggfunc='size',
-            fill_value=0
-        )
+        # Matriz amostra vs KO (contagem de registros) a partir da matriz de incidência
+        pivot_df = build_incidence(input_df, 'sample', 'ko').to_frame()
 
-        if pivot_df.shape[0] < 2:
-            logger.warning(
-                "Not enough samples for clustering (need at least 2, got %d)",
-                pivot_df.shape[0]
-            )
-            raise ValueError("At least two samples are required for clustering.")
-
-        # Tentar recuperar matriz de distância do cache
-        distance_matrix = _get_cached_distance_matrix(pivot_df, distance_metric)
-
-        if distance_matrix is None:
-            # Calcular nova matriz de distância
-            logger.info("Computing new distance matrix with metric: %s", distance_metric)
-            distance_matrix = ssd.pdist(pivot_df, metric=distance_metric)
-            # Armazenar no cache
-            _cache_distance_matrix(pivot_df, distance_metric, distance_matrix)
-
-        # Clustering hierárquico (sempre recalculado pois é rápido)
-        clustering_matrix = sch.linkage(distance_matrix, method=method)
+        clustering_matrix = calculate_profile_clustering(pivot_df, distance_metric, method)
 
         logger.info("Clustering completed successfully.")
         return clustering_matrix
@@ -5,25 +5,24 @@ import matplotlib.pyplot as plt
 import pandas as pd
 from upsetplot import from_memberships, plot
 
-from utils.intersections_and_groups.intersection_analysis_processing import (
-    prepare_upsetplot_data,
-)
-from utils.core.data_processing import merge_input_with_database
+from utils.core.incidence import column_memberships, get_incidence
 
 # Configure logger
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
 
-def render_upsetplot(stored_data: dict, selected_samples: list) -> str:
+def render_upsetplot(merged_data, selected_samples: list) -> str:
     """
-    Renders an UpSet Plot based on selected samples and their associated KOs 
-    after merging with the reference database.
+    Renders an UpSet Plot based on selected samples and their associated KOs
+    in the merged BioRemPP table.
 
     Parameters
     ----------
-    stored_data : dict
-        Dictionary-formatted input data, typically obtained via Dash callbacks.
+    merged_data : dict, list of dict or pd.DataFrame
+        Store payload of the merged BioRemPP table (see `decode_store_data`)
+        or the table itself. Its sample/KO pairs come from the cached
+        incidence matrix of the table (see `get_incidence`).
     selected_samples : list
         List of selected sample names to include in the plot.
 
@@ -41,20 +40,9 @@ def render_upsetplot(stored_data: dict, selected_samples: list) -> str:
     if not isinstance(selected_samples, list) or len(selected_samples) < 2:
         raise ValueError("At least two samples must be selected.")
 
-    logger.info("Converting stored data to DataFrame...")
-    input_df = pd.DataFrame(stored_data)
-
-    logger.info("Merging input data with reference database...")
-    merged_data = merge_input_with_database(input_df)
-
-    logger.info("Preparing data for UpSet plot...")
-    filtered_df = prepare_upsetplot_data(merged_data, selected_samples)
-
     logger.info("Generating KO to sample memberships...")
-    memberships = (
-        filtered_df.groupby("ko")["sample"]
-        .apply(lambda x: list(set(x)))
-    )
+    incidence = get_incidence(merged_data, "sample", "ko")
+    memberships = column_memberships(incidence.select_rows(selected_samples))
 
     if memberships.empty:
         raise ValueError("No valid KO/sample memberships found.")
@@ -1,65 +1,70 @@
 import logging
+import numpy as np
 import pandas as pd
 from typing import List
 
+from utils.core.incidence import build_incidence, identical_row_groups
+
 # Configure o logger do módulo
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
 
 def group_by_class(compoundclass_choice: str, tabela: pd.DataFrame) -> pd.DataFrame:
-    """  
-    Groups samples by their compound profiles using hash-based set comparison for O(n) complexity.  
-    """  
-    required_cols = {'compoundclass', 'sample', 'compoundname'}  
-    if not required_cols.issubset(tabela.columns):  
-        missing = required_cols - set(tabela.columns)  
-        raise ValueError(f"Missing required columns in input DataFrame: {missing}")  
-  
-    logger.info("Filtering data by compound class: '%s'", compoundclass_choice)  
-    dados_selecionados = tabela[tabela['compoundclass'] == compoundclass_choice]  
-  
-    if dados_selecionados.empty:  
-        raise ValueError(f"No data found for compound class: {compoundclass_choice}")  
-  
-    # Usar hash de conjuntos para agrupamento O(n)  
-    compound_profile_to_group = {}  # hash do perfil -> índice do grupo  
-    grupos = []  
-      
-    for sample in dados_selecionados['sample'].unique():  
-        compostos = frozenset(dados_selecionados.loc[  
-            dados_selecionados['sample'] == sample, 'compoundname'  
-        ].unique())  
-          
-        if compostos:  
-            # Usar hash do frozenset como chave  
-            profile_hash = hash(compostos)  
-              
-            if profile_hash in compound_profile_to_group:  
-                # Grupo já existe, adicionar amostra  
-                group_idx = compound_profile_to_group[profile_hash]  
-                grupos[group_idx]['samples'].append(sample)  
-            else:  
-                # Criar novo grupo  
-                new_group = {'compostos': list(compostos), 'samples': [sample]}  
-                grupos.append(new_group)  
-                compound_profile_to_group[profile_hash] = len(grupos) - 1  
-  
-    logger.info("Identified %d distinct groups for class '%s'", len(grupos), compoundclass_choice)  
-  
-    # Resto da função permanece igual  
-    tabela_grupos = tabela.copy()  
-    tabela_grupos['grupo'] = None  
-  
-    for i, grupo in enumerate(grupos):  
-        label = f"{compoundclass_choice} - Group {i + 1}"  
-        tabela_grupos.loc[  
-            (tabela_grupos['sample'].isin(grupo['samples'])) &  
-            (tabela_grupos['compoundname'].isin(grupo['compostos'])),  
-            'grupo'  
-        ] = label  
-  
-    resultado = tabela_grupos[tabela_grupos['compoundclass'] == compoundclass_choice]  
+    """
+    Groups samples by their compound profiles within a compound class.
+
+    Samples with the same set of compounds in the class form a group; groups
+    are found on the sample x compound incidence matrix of the class and
+    numbered in order of first appearance of their samples.
+
+    Parameters
+    ----------
+    compoundclass_choice : str
+        Compound class to analyze.
+    tabela : pd.DataFrame
+        Merged table with 'compoundclass', 'sample' and 'compoundname' columns.
+
+    Returns
+    -------
+    pd.DataFrame
+        Rows of the class with a 'grupo' column labelling the group of their
+        sample (None for rows without a sample).
+
+    Raises
+    ------
+    ValueError
+        If required columns are missing or the class has no rows.
+    """
+    required_cols = {'compoundclass', 'sample', 'compoundname'}
+    if not required_cols.issubset(tabela.columns):
+        missing = required_cols - set(tabela.columns)
+        raise ValueError(f"Missing required columns in input DataFrame: {missing}")
+
+    logger.info("Filtering data by compound class: '%s'", compoundclass_choice)
+    dados_selecionados = tabela[tabela['compoundclass'] == compoundclass_choice]
+
+    if dados_selecionados.empty:
+        raise ValueError(f"No data found for compound class: {compoundclass_choice}")
+
+    # Samples with identical rows of the incidence matrix share a profile
+    perfis = build_incidence(dados_selecionados, 'sample', 'compoundname')
+    perfil_por_amostra = identical_row_groups(perfis)
+
+    # Groups numbered by first appearance of their samples in the table
+    amostras = perfis.rows.get_indexer(dados_selecionados['sample'])
+    ordem = pd.unique(perfil_por_amostra[amostras[amostras >= 0]])
+    numero = np.empty(len(ordem), dtype=np.int64)
+    numero[ordem] = np.arange(1, len(ordem) + 1)
+
+    logger.info("Identified %d distinct groups for class '%s'", len(ordem), compoundclass_choice)
+
+    rotulos = np.array(
+        [f"{compoundclass_choice} - Group {n}" for n in numero[perfil_por_amostra]] + [None], dtype=object
+    )
+    resultado = dados_selecionados.copy()
+    # Position -1 (missing sample) reads the trailing None
+    resultado['grupo'] = rotulos[amostras]
     return resultado
 
 
@@ -93,7 +98,7 @@ def minimize_groups(df: pd.DataFrame) -> List[str]:
     logger.info("Minimizing groups to cover all compounds")
 
     group_compounds = (
-        df.groupby('grupo')['compoundname']
+        df.groupby('grupo', observed=True)['compoundname']
         .apply(lambda x: list(set(x)))
         .reset_index()
     )
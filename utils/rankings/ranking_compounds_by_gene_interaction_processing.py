@@ -40,7 +40,7 @@ def process_compound_gene_ranking(merged_df: pd.DataFrame) -> pd.DataFrame:
 
     logger.info("Grouping data by 'compoundname' and counting unique 'genesymbol'.")
     compound_gene_ranking = (
-        merged_df.groupby('compoundname')['genesymbol']
+        merged_df.groupby('compoundname', observed=True)['genesymbol']
         .nunique()
         .reset_index(name='num_genes')
         .sort_values(by='num_genes', ascending=False)
@@ -39,7 +39,7 @@ def process_compound_ranking(merged_df: pd.DataFrame) -> pd.DataFrame:
     try:
         # Compute unique sample count per compound
         compound_ranking = (
-            merged_df.groupby("compoundname")["sample"]
+            merged_df.groupby("compoundname", observed=True)["sample"]
             .nunique()
             .reset_index(name="num_samples")
         )
@@ -40,7 +40,7 @@ def process_sample_ranking(merged_df: pd.DataFrame) -> pd.DataFrame:
     try:
         # Group and count unique compounds per sample
         sample_ranking = (
-            merged_df.groupby('sample')['compoundname']
+            merged_df.groupby('sample', observed=True)['compoundname']
             .nunique()
             .reset_index(name='num_compounds')
             .sort_values(by='num_compounds', ascending=False)
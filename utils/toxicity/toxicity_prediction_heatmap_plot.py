@@ -53,7 +53,7 @@ def plot_heatmap_faceted(df: pd.DataFrame) -> go.Figure:
         subset = df[df['category'] == category]
 
         grouped = subset.groupby(
-            ['compoundname', 'subcategoria', 'label'], as_index=False
+            ['compoundname', 'subcategoria', 'label'], as_index=False, observed=True
         )['value'].mean()
 
         heatmap_data = grouped.pivot(